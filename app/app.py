@@ -1,6 +1,31 @@
 import streamlit as st
 import pandas as pd
-import plotly.graph_objects as go
+import numpy as np
+from catalog import (available_alternatives, build_dutycycle_index, build_option_tree, build_province_index,
+                     build_vehicle_index, powertrain_options)
+from charts import (ALTERNATIVE_COLOR, BASE_COLOR, abatement_curve_figure, cached_figure, cumulative_cost_figure,
+                    figure_data_hash, overlay_cost_figure, pareto_figure, province_heatmap_figure, stacked_cost_figure)
+from custom_catalog import catalog_overrides, merged_vehicle_index, read_catalog, validate_catalog
+from degradation import efficiency_path, fuel_use_factors, lifetime_average, load_degradation_rates
+from embodied_emissions import embodied_per_vehicle, infrastructure_embodied, lifecycle_ghg, load_embodied_factors
+from financing import FINANCING_TYPES
+from fleet import COST_COLUMNS, DUTY_CYCLE_COLUMNS, REQUIRED_COLUMNS as FLEET_COLUMNS, evaluate_fleet, validate_fleet
+from goal_seek import SOLVABLE_INPUTS, goal_seek
+from hydrogen_station import daily_hydrogen_demand, load_station_components, size_station, station_bill_of_materials
+from incentives import compile_incentive_rules, infrastructure_subsidy, load_incentive_rules, program_amounts
+from jobs import ACTIVE_STATUSES, cancel_job, job_result, job_status, submit_job
+from lifecycle_events import load_event_schedule
+from macc import abatement_costs, abatement_curve
+from pareto import CHARGING_HOURS, DEFAULT_RESIDUAL, charger_options, financing_options, option_grid, pareto_front, station_options
+from price_paths import carbon_price_path, load_carbon_schedule
+from profiling import profiling_requested, start_profiler
+from precompute import default_results_table, lookup_default_results, source_fingerprint
+from scenario_batch import evaluate_alternatives, evaluate_options, evaluate_provinces, evaluate_scenario
+from scenario_store import find_scenarios, load_scenario, save_scenario, scenario_fingerprint
+from tco_kernel import ALTERNATIVE_FUELS, CATEGORIES
+from range_feasibility import daily_distance_matrix, default_distance_matrix, load_battery_capacities, range_feasibility
+from reference_data import combined_labels, load_reference_table
+from telematics import group_duty_cycles, load_telematics
 
 # Set the page config with a custom title, favicon, and hide the Streamlit menu
 st.set_page_config(
@@ -33,6 +58,10 @@ if "session_id" not in st.session_state:
     session_start_time = datetime.now().isoformat()
     logger.info(f"New user session: {st.session_state['session_id']} at {session_start_time}")
 
+# Opt-in sampling profile of this rerun, written on the server only (see profiling.py)
+if profiling_requested(st.query_params.get("profile")):
+    start_profiler(st.session_state["session_id"])
+
 
 
 
@@ -127,33 +156,164 @@ st.sidebar.markdown("For any issues or questions, email **altfleet@mobilityfutur
 st.title('AltFleet Insight')
 
 # Automatically load datasets at the start of the app
-#@st.cache_data
+@st.cache_resource
 def load_datasets():
     """
     Loads various datasets required for the total cost of ownership (TCO) analysis tool.
     This includes vehicle information, charging infrastructure details, duty cycles, and
-    energy prices.
+    energy prices. The datasets are read and validated once per process and shared by every
+    session, which leaves them unchanged.
     
     Returns:
-        A dictionary of datasets returned as individual dataframes.
+        A tuple of datasets returned as individual dataframes and lookups.
+    """
+    vehicles_info = load_reference_table('MHDV_costs_efficiency_final.csv')
+    charging_infra_info = load_reference_table('MHDV_charging_infa_prices_final.csv')
+    vehicles_dutycycles = load_reference_table('MHDV_duty_cycles_final.csv')
+    energy_price_province = load_reference_table('province_energy_prices.csv')
+    fuel_escalation = load_reference_table('province_fuel_escalation.csv')
+    carbon_schedule = load_carbon_schedule('carbon_price_schedule.csv')
+    lifecycle_schedule = load_event_schedule('lifecycle_events.csv')
+    battery_capacities = load_battery_capacities('bev_battery_capacity.csv')
+    incentive_rules = load_incentive_rules('incentive_rules.csv')
+    station_components = load_station_components('hydrogen_station_costs.csv')
+    degradation_rates = load_degradation_rates('powertrain_degradation.csv')
+    embodied_factors = load_embodied_factors('embodied_emissions.csv')
+
+    vehicles_info['Weight_Confi'] = combined_labels(vehicles_info, ['WeightClass', 'Configuration'])
+    vehicles_dutycycles['Weight_Confi'] = combined_labels(vehicles_dutycycles, ['WeightClass', 'Configuration'])
+    charging_infra_info['charging_models'] = combined_labels(charging_infra_info, ['PowerLevel', 'PortConfiguration'])
+
+    return vehicles_info, charging_infra_info, vehicles_dutycycles, energy_price_province, fuel_escalation, carbon_schedule, lifecycle_schedule, battery_capacities, incentive_rules, station_components, degradation_rates, embodied_factors
+
+
+@st.cache_resource
+def build_lookups(_vehicles_info, _vehicles_dutycycles, _energy_price_province, _fuel_escalation, _incentive_rules):
     """
-    try:
-        vehicles_info = pd.read_csv('MHDV_costs_efficiency_final.csv')
-        charging_infra_info = pd.read_csv('MHDV_charging_infa_prices_final.csv')
-        vehicles_dutycycles = pd.read_csv('MHDV_duty_cycles_final.csv')
-        energy_price_province = pd.read_csv('province_energy_prices.csv')
+    Builds the O(1) lookups used by the batch views and the incentive tables (see incentives.py), once per
+    process like the datasets they are built from.
 
-        vehicles_info['Weight_Confi'] = vehicles_info['WeightClass'] + " " + vehicles_info['Configuration']
-        vehicles_dutycycles['Weight_Confi'] = vehicles_dutycycles['WeightClass'] + " " + vehicles_dutycycles['Configuration']
-        charging_infra_info['charging_models'] = charging_infra_info['PowerLevel'] + " " + charging_infra_info['PortConfiguration']
+    Returns:
+        tuple: vehicle_index, province_index, dutycycle_index and incentive_tables.
+    """
+    vehicle_index = build_vehicle_index(_vehicles_info)
+    province_index = build_province_index(_energy_price_province, _fuel_escalation)
+    dutycycle_index = build_dutycycle_index(_vehicles_dutycycles)
+    incentive_tables = compile_incentive_rules(_incentive_rules, province_index, dutycycle_index, _vehicles_info['Powertrain'].unique())
+    return vehicle_index, province_index, dutycycle_index, incentive_tables
 
-        return vehicles_info, charging_infra_info, vehicles_dutycycles, energy_price_province
-    
-    except Exception as e:
-        st.error(f"Failed to load data: {e}")
-        return None
 
-vehicles_info, charging_infra_info, vehicles_dutycycles, energy_price_province = load_datasets()
+@st.cache_resource
+def load_option_tree(_vehicles_dutycycles, _vehicle_index):
+    """
+    Builds the options of the cascading vehicle selectors (see catalog.build_option_tree) once per process, from
+    the built-in catalog; with an uploaded catalog, the fuel options come from the session's vehicle index instead.
+    """
+    return build_option_tree(_vehicles_dutycycles, _vehicle_index)
+
+
+try:
+    vehicles_info, charging_infra_info, vehicles_dutycycles, energy_price_province, fuel_escalation, carbon_schedule, lifecycle_schedule, battery_capacities, incentive_rules, station_components, degradation_rates, embodied_factors = load_datasets()
+except Exception as e:
+    # Failed loads are not cached, so the next rerun reads the datasets again
+    st.error(f"Failed to load data: {e}")
+    st.stop()
+
+# O(1) lookups used by the batch views, and the federal and provincial incentive programs as lookup tables
+vehicle_index, province_index, dutycycle_index, incentive_tables = build_lookups(
+    vehicles_info, vehicles_dutycycles, energy_price_province, fuel_escalation, incentive_rules)
+# Options of the cascading vehicle selectors, built once per process so that rendering them does no DataFrame work
+option_tree = load_option_tree(vehicles_dutycycles, vehicle_index)
+
+
+@st.cache_resource
+def load_default_results(fingerprint, _vehicle_index, _dutycycle_index, _province_index, _incentive_tables):
+    """
+    Loads the precomputed results of every default-input scenario, once per process and dataset version.
+    The archive is rebuilt if it is missing or was built from other datasets.
+    """
+    return default_results_table(_vehicle_index, _dutycycle_index, _province_index, fingerprint, _incentive_tables)
+
+
+default_results = load_default_results(source_fingerprint(), vehicle_index, dutycycle_index, province_index, incentive_tables)
+
+# Number of result sets kept per session, keyed by input fingerprint
+RESULTS_CACHE_SIZE = 32
+
+# Inputs that decide which catalog defaults apply; the other inputs of a loaded scenario are only
+# used while these are unchanged
+SELECTION_INPUTS = ("user_province", "user_application", "user_configuration", "vehicle_weightClass",
+                    "existing_fuel", "evaluated_fuel")
+
+
+def session_results(kind, inputs, compute):
+    """
+    Returns results cached in the session for these inputs, computing them on a miss.
+
+    Parameters:
+        kind (str): Name of the result set (e.g. 'costs').
+        inputs (dict): Inputs the results depend on.
+        compute (callable): Zero-argument function computing the results.
+
+    Returns:
+        The cached or computed results.
+    """
+    cache = st.session_state.setdefault("results_cache", {})
+    key = (kind, scenario_fingerprint(inputs))
+    if key not in cache:
+        if len(cache) >= RESULTS_CACHE_SIZE:
+            cache.pop(next(iter(cache)))
+        cache[key] = compute()
+    return cache[key]
+
+
+def apply_loaded_scenario(scenario):
+    """
+    Makes a scenario from the scenario store the source of the input defaults, and places its stored
+    results in the session cache so they are shown without recomputation.
+
+    Parameters:
+        scenario (dict): Scenario returned by load_scenario.
+    """
+    st.session_state["loaded_scenario"] = scenario
+    cache = st.session_state.setdefault("results_cache", {})
+    inputs = scenario["inputs"]
+    outputs = scenario["outputs"]
+    cost_part = {key: value for key, value in inputs.items() if key != "hydro_electricity_intensity"}
+    # Outputs saved before a change of the cost categories are recomputed
+    if "costs" in outputs and np.shape(outputs["costs"]["by_category"])[-1] == len(CATEGORIES):
+        cache[("costs", scenario_fingerprint(cost_part))] = {key: np.asarray(value, dtype=float) for key, value in outputs["costs"].items()}
+    for kind in ("ghg", "nox_pm25"):
+        if kind in outputs:
+            cache[(kind, scenario_fingerprint(inputs))] = tuple(outputs[kind])
+
+
+def scenario_default(name, default):
+    """
+    Returns the value of an input in the scenario loaded from the scenario store, or the default when no
+    scenario is loaded, it has no value for this input, or the vehicle and fuel selections have changed since.
+    """
+    loaded = st.session_state.get("loaded_scenario")
+    if not loaded or loaded["inputs"].get(name) is None:
+        return default
+    if name not in SELECTION_INPUTS and not loaded_selections_kept:
+        return default
+    return loaded["inputs"][name]
+
+
+def option_index(options, value):
+    """Position of value in a selectbox's options, or the placeholder if it is not an option."""
+    return options.index(value) if value in options else 0
+
+
+# Shareable scenario links (?scenario=<id>) load the scenario before any widget is drawn
+requested_scenario = st.query_params.get("scenario")
+if requested_scenario and st.session_state.get("loaded_scenario", {}).get("scenario_id") != requested_scenario:
+    shared_scenario = load_scenario(requested_scenario)
+    if shared_scenario:
+        apply_loaded_scenario(shared_scenario)
+    else:
+        st.warning(f"Scenario {requested_scenario} was not found.")
 
 # Section title for Market of Operations
 st.header('1. Market of Operations')
@@ -164,93 +324,143 @@ def get_user_province_territory():
                                  "Newfoundland and Labrador", "Northwest Territories", "Nova Scotia", 
                                  "Nunavut", "Ontario", "Prince Edward Island", "Quebec", 
                                  "Saskatchewan", "Yukon"]
+    options = [""] + provinces_and_territories
     user_province = st.selectbox("Select the province where your fleet is located:",
-                                 options=[""] + provinces_and_territories,
+                                 options=options,
+                                 index=option_index(options, scenario_default("user_province", "")),
                                  format_func=lambda x: "Select a province" if x == "" else x)
     return user_province
 
 user_province = get_user_province_territory()
 
 # Function to get the vehicle application from the user
-def get_user_vehicleapplication():
-    vehicle_applications = ["Passenger Transport", "Freight and Cargo", "Specialized Services"]
+def get_user_vehicleapplication(option_tree):
+    options = [""] + list(option_tree)
     user_application = st.selectbox("Select vehicle application:",
-                                    options=[""] + vehicle_applications,
+                                    options=options,
+                                    index=option_index(options, scenario_default("user_application", "")),
                                     format_func=lambda x: "Select a vehicle application" if x == "" else x)
     return user_application
 
-user_application = get_user_vehicleapplication()
+user_application = get_user_vehicleapplication(option_tree)
 
 # Function to get the user's vehicle configuration
-def get_user_vehicle_configuration(user_application, vehicles_dutycycles):
+def get_user_vehicle_configuration(user_application, option_tree):
     if user_application:
-        filtered_df = vehicles_dutycycles[vehicles_dutycycles['VehicleApplication'] == user_application]
-        unique_configurations = filtered_df['Configuration'].unique()
+        options = [""] + list(option_tree[user_application])
         vehicle_configuration = st.selectbox("Select the vehicle configuration:",
-                                             options=[""] + list(unique_configurations),
+                                             options=options,
+                                             index=option_index(options, scenario_default("user_configuration", "")),
                                             format_func=lambda x: "Select a vehicle configuration" if x == "" else x,)
                                              #help = "Class 8 tractors are day cabs due to ZEV focus, with long-haul options still developing.")
         return vehicle_configuration
     st.write("Please select a vehicle application first.")
     return None
 
-user_configuration = get_user_vehicle_configuration(user_application, vehicles_dutycycles)
+user_configuration = get_user_vehicle_configuration(user_application, option_tree)
 
 # Function to get the user's vehicle weight class
-def get_user_vehicle_weightclass(user_configuration, vehicles_dutycycles):
+def get_user_vehicle_weightclass(user_configuration, option_tree):
     if not user_application:
         return None, None
     if user_configuration:
-        filtered = vehicles_dutycycles[vehicles_dutycycles['Configuration'] == user_configuration]
-        unique_weightClasses = filtered['WeightClass'].unique()
+        weight_classes = option_tree[user_application][user_configuration]
+        options = [""] + list(weight_classes)
         vehicle_weightClass = st.selectbox("Select the vehicle weight class you operate in:",
-                                           options=[""] + list(unique_weightClasses),
+                                           options=options,
+                                           index=option_index(options, scenario_default("vehicle_weightClass", "")),
                                            format_func=lambda x: "Select a vehicle weight class" if x == "" else x)
         if vehicle_weightClass:
-            user_weight_configuration = vehicle_weightClass + " " + user_configuration
-            return vehicle_weightClass, user_weight_configuration
+            return vehicle_weightClass, weight_classes[vehicle_weightClass]["weight_configuration"]
         return None, None
     else:
         st.write("Please select a vehicle configuration first.")
     return None, None
 
-vehicle_weightClass, user_weight_configuration = get_user_vehicle_weightclass(user_configuration, vehicles_dutycycles)
+vehicle_weightClass, user_weight_configuration = get_user_vehicle_weightclass(user_configuration, option_tree)
 
 
 # Section title for Technologies Assessed
 st.header('2. Technologies Assessed')
 
+def get_custom_catalog(vehicle_index, dutycycle_index):
+    """
+    Lets the user upload their own vehicle catalog (CSV or Excel, with the columns of the built-in one),
+    whose valid rows replace the catalog defaults for this session.
+
+    Parameters:
+        vehicle_index (dict): The built-in vehicle index, shared by every session.
+        dutycycle_index (dict): Duty cycles by Weight_Confi, which decide the configurations a catalog may cover.
 
-def get_existing_fuel(user_weight_configuration, vehicles_info):
+    Returns:
+        tuple: The session's vehicle index (the built-in one with the uploaded rows layered over it) and the
+        uploaded catalog (dict with 'valid' rows and 'models' positions, see custom_catalog), or None.
+    """
+    with st.expander("Use your own vehicle catalog"):
+        file = st.file_uploader("Vehicle catalog with the columns WeightClass, Configuration, Powertrain, Default_price ($), "
+                                "FuelEfficiencyCAD (L/100 km, kWh/km or kg/100 km), Maintenance ($/km) and optionally "
+                                "Model, GHG EF, NOx EF and PM2.5 EF (g/km):", type=["csv", "xlsx", "xls"])
+        if not file:
+            return merged_vehicle_index(vehicle_index, {}), None
+
+        # The file is validated once per upload, not on every rerun; a new upload gets a new file id even when it
+        # has the same name and size
+        upload_key = file.file_id
+        cached = st.session_state.get("custom_catalog")
+        if cached is None or cached[0] != upload_key:
+            try:
+                valid, errors = validate_catalog(read_catalog(file, file.name), list(dutycycle_index),
+                                                 vehicle_index)
+            except ValueError as e:
+                st.error(str(e))
+                return merged_vehicle_index(vehicle_index, {}), None
+            overrides, models = catalog_overrides(valid)
+            cached = (upload_key, dict(valid=valid, errors=errors, overrides=overrides, models=models))
+            st.session_state["custom_catalog"] = cached
+        custom_catalog = cached[1]
+
+        st.write(f"{len(custom_catalog['valid']):,d} models loaded for {len(custom_catalog['overrides'])} "
+                 "configurations and powertrains.")
+        errors = custom_catalog["errors"]
+        if len(errors):
+            st.warning(f"{errors['row'].nunique():,d} rows were rejected:")
+            st.dataframe(errors.head(1000), hide_index=True, use_container_width=True)
+        return merged_vehicle_index(vehicle_index, custom_catalog["overrides"]), custom_catalog
+
+# The session's vehicle catalog: the built-in index, with the rows of an uploaded catalog taking precedence
+vehicle_index, custom_catalog = get_custom_catalog(vehicle_index, dutycycle_index)
+
+# Powertrains offered for the selected vehicle; an uploaded catalog may add models, so they are looked up in the
+# session's index then
+if not user_weight_configuration:
+    fuel_options = None
+elif custom_catalog:
+    fuel_options = powertrain_options(vehicle_index, user_weight_configuration)
+else:
+    fuel_options = option_tree[user_application][user_configuration][vehicle_weightClass]
+
+
+def get_existing_fuel(fuel_options):
     """
     Determines the existing fuel technology based on user input through a Streamlit dropdown menu.
 
     Parameters:
-        user_weight_configuration (str): The user's weight and configuration.
-        vehicles_info (DataFrame): A DataFrame containing information about vehicles, including powertrain and configuration.
+        fuel_options (dict): Powertrains offered for the user's vehicle, see catalog.powertrain_options; None
+                             until a vehicle is selected.
 
     Returns:
         str or None: The existing fuel technology selected by the user, or None if no input was provided.
     """
-    if not user_weight_configuration:
+    if not fuel_options:
         st.write("Please select a vehicle configuration and weight class first.")
         return None
 
-    # Filter vehicles that are viable for gasoline
-    vehicles_info_gasoline = vehicles_info[vehicles_info["Powertrain"] == "Gasoline"]
-    gasoline_weight_configurations = vehicles_info_gasoline["Weight_Confi"].unique()
-    
-    # Default existing fuel is diesel at a minimum
-    existing_fuels = ["Diesel"]
-    
-    # If the user configuration is in the gasoline configurations, add gasoline to the options
-    if user_weight_configuration in gasoline_weight_configurations:
-        existing_fuels.append("Gasoline")
-
-    # Streamlit dropdown for selecting existing fuel
+    # Diesel, and gasoline where the catalog has a gasoline model of the configuration
+    options = [""] + fuel_options["existing"]
     existing_fuel = st.selectbox(
         "Select the fuel type you currently use:",
-        options=[""] + existing_fuels,
+        options=options,
+        index=option_index(options, scenario_default("existing_fuel", "")),
         format_func=lambda x: "Select a fuel type" if x == "" else x
     )
     
@@ -258,50 +468,36 @@ def get_existing_fuel(user_weight_configuration, vehicles_info):
     return existing_fuel if existing_fuel else None
 
 # Example usage within the app
-# Assuming 'vehicles_info' DataFrame and 'user_weight_configuration' are defined
-existing_fuel = get_existing_fuel(user_weight_configuration, vehicles_info)
+# Assuming 'fuel_options' is defined
+existing_fuel = get_existing_fuel(fuel_options)
 #if existing_fuel:
 #    st.write(f"Selected Existing Fuel: {existing_fuel}")
 #else:
 #    st.write("No existing fuel type selected yet.")
 
 
-def select_alternative_fuel(user_weight_configuration, vehicles_info):
+def select_alternative_fuel(fuel_options):
     """
     Allows the user to select an alternative fuel technology based on the vehicle configuration.
 
     Parameters:
-        user_weight_configuration (str): The configuration of the vehicle selected by the user.
-        vehicles_info (DataFrame): DataFrame containing vehicle information, including powertrains.
+        fuel_options (dict): Powertrains offered for the user's vehicle, see catalog.powertrain_options; None
+                             until a vehicle is selected.
 
     Returns:
         str or None: The alternative fuel technology selected by the user, or None if no input was provided.
     """
-    if not user_weight_configuration:
+    if not fuel_options:
         #st.write("Please select a vehicle configuration and weight class first.")
         return None
 
-    # Filter vehicles that are viable for hydrogen fuel cell and hybrid technologies
-    vehicles_info_hydrogen = vehicles_info[vehicles_info["Powertrain"] == "Hydrogen Fuel Cell"]
-    hydrogen_weight_configurations = vehicles_info_hydrogen["Weight_Confi"].unique()
-    
-    vehicles_info_hybrid = vehicles_info[vehicles_info["Powertrain"] == "HEV"]
-    hybrid_weight_configurations = vehicles_info_hybrid["Weight_Confi"].unique()
-
-    # Default alternative fuels
-    evaluated_fuels = ["Biodiesel B20", "Renewable Diesel R99", "Battery electric"]
-
-    # Add specific fuels based on configuration checks
-    if user_weight_configuration in hydrogen_weight_configurations:
-        evaluated_fuels.append("Hydrogen Fuel Cell")
-        
-    if user_weight_configuration in hybrid_weight_configurations:
-        evaluated_fuels.append("HEV")
-
-    # Streamlit dropdown for selecting alternative fuel
+    # Default alternative fuels, with hydrogen fuel cell and hybrid technologies where the catalog has a model of
+    # the configuration
+    options = [""] + fuel_options["alternative"]
     evaluated_fuel = st.selectbox(
         "Select the alternative fuel type you are exploring:",
-        options=[""] + evaluated_fuels,
+        options=options,
+        index=option_index(options, scenario_default("evaluated_fuel", "")),
         format_func=lambda x: "Select an alternative fuel type" if x == "" else x
     )
     
@@ -309,8 +505,53 @@ def select_alternative_fuel(user_weight_configuration, vehicles_info):
     return evaluated_fuel if evaluated_fuel else None
 
 # Example usage within the app
-# Assuming 'vehicles_info' DataFrame is defined and 'user_weight_configuration' is obtained from previous selections
-evaluated_fuel = select_alternative_fuel(user_weight_configuration, vehicles_info)
+# Assuming 'fuel_options' is obtained from previous selections
+evaluated_fuel = select_alternative_fuel(fuel_options)
+
+
+def select_catalog_models(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index, custom_catalog):
+    """
+    Lets the user pick the model of each vehicle when the uploaded catalog has several for its configuration
+    and powertrain.
+
+    Returns:
+        tuple: The vehicle index with the selected models layered over it, and a fingerprint of the catalog rows
+        of both vehicles when either comes from the uploaded catalog (None when both are built-in).
+    """
+    if not (custom_catalog and user_weight_configuration and existing_fuel and evaluated_fuel):
+        return vehicle_index, None
+
+    def reset_model_inputs(prefix):
+        # Keyed inputs keep their value across reruns; drop them so they take the new model's defaults
+        for key in (f"{prefix}_fuel_price", f"{prefix}_maintenance"):
+            st.session_state.pop(key, None)
+
+    selected = {}
+    for label, prefix, fuel in (("existing", "existing", existing_fuel), ("alternative", "evaluated", evaluated_fuel)):
+        positions = custom_catalog["models"].get((user_weight_configuration, fuel))
+        if positions is not None and len(positions) > 1:
+            models = custom_catalog["valid"].iloc[positions]
+            model = st.selectbox(f"Model of the {label} vehicle ({fuel}):", options=models["Model"].tolist(),
+                                 key=f"{label}_model", on_change=reset_model_inputs, args=(prefix,))
+            selected[(user_weight_configuration, fuel)] = models[models["Model"] == model].iloc[0].to_dict()
+    vehicle_index = vehicle_index.new_child(selected)
+
+    keys = [(user_weight_configuration, existing_fuel), (user_weight_configuration, evaluated_fuel)]
+    if not any(key in layer for key in keys for layer in vehicle_index.maps[:-1]):
+        return vehicle_index, None
+    return vehicle_index, scenario_fingerprint({" / ".join(key): vehicle_index[key] for key in keys})
+
+vehicle_index, catalog_fingerprint = select_catalog_models(user_weight_configuration, existing_fuel, evaluated_fuel,
+                                                           vehicle_index, custom_catalog)
+
+# Whether the values of a scenario loaded from the store still apply to the current selections
+loaded_scenario = st.session_state.get("loaded_scenario")
+loaded_selections_kept = bool(loaded_scenario) and all(
+    loaded_scenario["inputs"].get(name) == value for name, value in dict(
+        user_province=user_province, user_application=user_application, user_configuration=user_configuration,
+        vehicle_weightClass=vehicle_weightClass, existing_fuel=existing_fuel, evaluated_fuel=evaluated_fuel,
+    ).items()
+)
 #if evaluated_fuel:
 #    st.write(f"Selected Alternative Fuel: {evaluated_fuel}")
 #else:
@@ -319,7 +560,7 @@ evaluated_fuel = select_alternative_fuel(user_weight_configuration, vehicles_inf
 
 
 
-def print_fuel_efficiency_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info):
+def print_fuel_efficiency_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index):
     """
     Streamlit app function to compare fuel efficiencies between existing and evaluated fuel options based on user input or defaults.
     """
@@ -330,21 +571,15 @@ def print_fuel_efficiency_and_decide_override(user_weight_configuration, existin
         return None, None
 
     # Get existing fuel efficiency
-    existing_fuel_efficiency_default = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == existing_fuel),
-        'FuelEfficiencyCAD'
-    ].iloc[0]
+    existing_fuel_efficiency_default = vehicle_index[(user_weight_configuration, existing_fuel)]['FuelEfficiencyCAD']
 
     # Get evaluated fuel efficiency
-    evaluated_fuel_efficiency_default = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'FuelEfficiencyCAD'
-    ].iloc[0]
+    evaluated_fuel_efficiency_default = vehicle_index[(user_weight_configuration, evaluated_fuel)]['FuelEfficiencyCAD']
 
     # Collect user input for existing vehicle fuel efficiency
     existing_fuel_efficiency = st.number_input(
         "Existing vehicle fuel efficiency (L/100 km):",
-        value=float(existing_fuel_efficiency_default),
+        value=float(scenario_default("existing_fuel_efficiency", existing_fuel_efficiency_default)),
         format="%.2f"
     )
     
@@ -359,7 +594,7 @@ def print_fuel_efficiency_and_decide_override(user_weight_configuration, existin
     # Collect user input for alternative vehicle fuel efficiency
     evaluated_fuel_efficiency = st.number_input(
         prompt,
-        value=float(evaluated_fuel_efficiency_default),
+        value=float(scenario_default("evaluated_fuel_efficiency", evaluated_fuel_efficiency_default)),
         format="%.2f"
     )
 
@@ -367,7 +602,7 @@ def print_fuel_efficiency_and_decide_override(user_weight_configuration, existin
 
 # Example usage within Streamlit
 # Assuming 'vehicles_dutycycles' DataFrame and 'user_weight_configuration' are properly defined
-existing_fuel_efficiency, evaluated_fuel_efficiency = print_fuel_efficiency_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info)
+existing_fuel_efficiency, evaluated_fuel_efficiency = print_fuel_efficiency_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index)
 #st.write(f"Existing Fuel Efficiency: ${existing_fuel_efficiency}")
 #st.write(f"Alternative Fuel Efficiecny: ${evaluated_fuel_efficiency}")
 
@@ -383,7 +618,7 @@ def get_n_alternative_fuel_vehicles():
     n_alternative_fuel_vehicles = st.number_input(
         "How many vehicles do you want to purchase?",
         min_value=0,  # Minimum value set to 0 to avoid negative numbers
-        value=0,      # Default value set to 0
+        value=int(scenario_default("n_vehicles", 0)),      # Default value set to 0
         step=1,       # Increment by 1
         format="%d"   # Ensure the input is treated as an integer
     )
@@ -402,18 +637,62 @@ n_vehicles = get_n_alternative_fuel_vehicles()
 # Section title for Operational Conditions
 st.header('3. Operational Conditions')
 
-def get_user_daily_distance(user_weight_configuration, vehicles_dutycycles):
+def get_telematics_duty_cycle():
+    """
+    Lets the user upload telematics exports and pick the vehicle group whose measured duty cycle replaces
+    the default daily distance and days of operation.
+
+    Accepts raw odometer logs (vehicle_id, timestamp, odometer_km), trip logs (vehicle_id, start_time,
+    distance_km), daily distances (vehicle_id, day, distance_km) or a per-vehicle summary written by
+    app/telematics.py, which is the way to go for multi-gigabyte exports.
+
+    Returns:
+        tuple: The selected group's duty cycle (dict with 'average_daily_distance' and 'yearly_days_operation')
+        and its vehicles' daily distances (DataFrame, None for a summary upload), or (None, None).
+    """
+    with st.expander("Derive the duty cycle from telematics logs"):
+        files = st.file_uploader("Odometer or trip logs, daily distances, or a duty cycle summary (CSV):",
+                                 type="csv", accept_multiple_files=True)
+        if not files:
+            return None, None
+
+        # Files are streamed once per upload, not on every rerun; a new upload gets a new file id even when it has
+        # the same name and size
+        upload_key = tuple(f.file_id for f in files)
+        cached = st.session_state.get("telematics")
+        if cached is None or cached[0] != upload_key:
+            try:
+                daily, summary = load_telematics(files)
+            except ValueError as e:
+                st.error(str(e))
+                return None, None
+            cached = (upload_key, daily, summary)
+            st.session_state["telematics"] = cached
+        _, daily, summary = cached
+
+        groups = group_duty_cycles(summary)
+        st.dataframe(groups.round(1), hide_index=True, use_container_width=True)
+        group = st.selectbox("Vehicle group used for the duty cycle:", options=groups["vehicle_group"].tolist())
+        duty_cycle = groups[groups["vehicle_group"] == group].iloc[0].to_dict()
+        if daily is not None:
+            vehicles = summary.loc[summary["vehicle_group"] == group, "vehicle_id"]
+            daily = daily[daily["vehicle_id"].isin(vehicles)]
+        return duty_cycle, daily
+
+telematics_duty_cycle, telematics_daily = get_telematics_duty_cycle()
+
+def get_user_daily_distance(user_weight_configuration, dutycycle_index, telematics_duty_cycle=None):
     if user_weight_configuration:
         # Extract the default average daily distance based on the vehicle configuration
-        default_distance = vehicles_dutycycles.loc[
-            vehicles_dutycycles['Weight_Confi'] == user_weight_configuration, 'average_daily_distance'
-        ].values[0]
+        default_distance = dutycycle_index[user_weight_configuration]['average_daily_distance']
+        if telematics_duty_cycle:
+            default_distance = round(telematics_duty_cycle['average_daily_distance'])
         
         # Display default distance and allow user to override if desired
         daily_distance = st.number_input(
             f"Average daily distance traveled for {user_weight_configuration} (km):",
             min_value=0,
-            value=int(default_distance),
+            value=int(scenario_default("daily_distance", default_distance)),
             step=5,
             format="%d"
         )
@@ -423,21 +702,21 @@ def get_user_daily_distance(user_weight_configuration, vehicles_dutycycles):
         return None
 
 # Usage of the function is delayed until user_weight_configuration is defined
-daily_distance = get_user_daily_distance(user_weight_configuration, vehicles_dutycycles)
+daily_distance = get_user_daily_distance(user_weight_configuration, dutycycle_index, telematics_duty_cycle)
 # st.write(f"The daily distance used for calculations: {daily_distance} km")
 
-def get_user_yearly_days_operation(user_weight_configuration, vehicles_dutycycles):
+def get_user_yearly_days_operation(user_weight_configuration, dutycycle_index, telematics_duty_cycle=None):
     if user_weight_configuration:
         # Fetch the default number of operation days based on the vehicle configuration
-        default_days_operations = vehicles_dutycycles.loc[
-            vehicles_dutycycles['Weight_Confi'] == user_weight_configuration, 'yearly_days_operation'
-        ].values[0]
+        default_days_operations = dutycycle_index[user_weight_configuration]['yearly_days_operation']
+        if telematics_duty_cycle:
+            default_days_operations = round(telematics_duty_cycle['yearly_days_operation'])
 
         # Streamlit number input for user to modify default days of operation
         yearly_days_operations = st.number_input(
             "Days of operation per year (days):",
             min_value=0,
-            value=int(default_days_operations),
+            value=int(scenario_default("yearly_days_operations", default_days_operations)),
             step=5,
             format="%d"
         )
@@ -446,21 +725,19 @@ def get_user_yearly_days_operation(user_weight_configuration, vehicles_dutycycle
         #st.write("Please select a vehicle configuration and weight class first.")
         return None
 
-yearly_days_operations = get_user_yearly_days_operation(user_weight_configuration, vehicles_dutycycles)
+yearly_days_operations = get_user_yearly_days_operation(user_weight_configuration, dutycycle_index, telematics_duty_cycle)
 # st.write(f"The number of operation days per year: {yearly_days_operations}")
 
-def get_user_vehicle_lifetime(user_weight_configuration, vehicles_dutycycles):
+def get_user_vehicle_lifetime(user_weight_configuration, dutycycle_index):
     if user_weight_configuration:
         # Fetch the default vehicle lifetime based on the vehicle configuration
-        default_vehicle_lifetime = vehicles_dutycycles.loc[
-            vehicles_dutycycles['Weight_Confi'] == user_weight_configuration, 'years_ownership'
-        ].values[0]
+        default_vehicle_lifetime = dutycycle_index[user_weight_configuration]['years_ownership']
 
         # Streamlit number input for user to modify default vehicle lifetime
         vehicle_lifetime = st.number_input(
             "Vehicle lifetime (years):",
             min_value=0,
-            value=int(default_vehicle_lifetime),
+            value=int(scenario_default("vehicle_lifetime", default_vehicle_lifetime)),
             step=1,
             format="%d"
         )
@@ -470,10 +747,58 @@ def get_user_vehicle_lifetime(user_weight_configuration, vehicles_dutycycles):
         return None
 
 
-vehicle_lifetime = get_user_vehicle_lifetime(user_weight_configuration, vehicles_dutycycles)
+vehicle_lifetime = get_user_vehicle_lifetime(user_weight_configuration, dutycycle_index)
 # st.write(f"The expected vehicle lifetime: {vehicle_lifetime} years")
 
 
+def check_range_feasibility(user_weight_configuration, evaluated_fuel, evaluated_fuel_efficiency, daily_distance,
+                            yearly_days_operations, n_vehicles, telematics_daily, battery_capacities):
+    """
+    Checks whether battery-electric replacements can cover each day's distance on a single charge, using the
+    telematics daily distances of the selected vehicle group when uploaded, or the duty cycle entered above.
+    Vehicles failing more than the accepted share of their operating days are flagged.
+    """
+    if evaluated_fuel != "Battery electric" or not (user_weight_configuration and evaluated_fuel_efficiency and daily_distance and yearly_days_operations):
+        return
+
+    with st.expander("Range feasibility without opportunity charging", expanded=True):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            usable_capacity = st.number_input("Usable battery capacity (kWh):", min_value=1.0,
+                                              value=float(battery_capacities.get(user_weight_configuration, 300.0)), step=10.0)
+        with col2:
+            reserve = st.number_input("Battery reserve (%):", min_value=0.0, max_value=90.0, value=20.0, step=5.0,
+                                      help="Capacity kept for cold weather, battery degradation and a return margin.")
+        with col3:
+            accepted_share = st.number_input("Accepted share of failed days (%):", min_value=0.0, max_value=100.0, value=2.0, step=1.0)
+
+        if telematics_daily is not None and len(telematics_daily):
+            vehicle_ids, distances = daily_distance_matrix(telematics_daily)
+        else:
+            distances = default_distance_matrix(daily_distance, yearly_days_operations, n_vehicles or 1)
+            vehicle_ids = np.arange(1, len(distances) + 1)
+
+        feasibility = range_feasibility(distances, evaluated_fuel_efficiency, usable_capacity, reserve / 100)
+        infeasible = feasibility["failure_share"] > accepted_share / 100
+        st.write(f"Single-charge range: {feasibility['range_km'][0]:,.0f} km.")
+        if infeasible.any():
+            st.warning(f"{infeasible.sum()} of {len(infeasible)} vehicles would not complete more than {accepted_share:g}% of their "
+                       "operating days on a single charge. Consider opportunity charging, a larger battery or shorter routes.")
+        else:
+            st.success(f"All {len(infeasible)} vehicles complete their daily distance on a single charge.")
+        if telematics_daily is not None and len(telematics_daily):
+            st.dataframe(pd.DataFrame({
+                "vehicle_id": vehicle_ids,
+                "operating days": feasibility["operating_days"],
+                "failed days": feasibility["failed_days"],
+                "failed share (%)": np.round(feasibility["failure_share"] * 100, 1),
+                "feasible": ~infeasible,
+            }), hide_index=True, use_container_width=True)
+
+check_range_feasibility(user_weight_configuration, evaluated_fuel, evaluated_fuel_efficiency, daily_distance,
+                        yearly_days_operations, n_vehicles, telematics_daily, battery_capacities)
+
+
 # Section title for Financial Assumptions
 st.header('4. Financial Assumptions')
 
@@ -483,7 +808,7 @@ def get_user_discount_rate():
     The user inputs a discount rate, and the app uses this rate directly or defaults to 0.03 if the input is outside the acceptable range (0 to 1).
     """
     # Use st.number_input to ensure that the input is a float and provide a default and range
-    discount_rate = st.number_input("Enter discount rate:", min_value=0.0, max_value=1.0, value=0.03, format="%.2f")
+    discount_rate = st.number_input("Enter discount rate:", min_value=0.0, max_value=1.0, value=float(scenario_default("discount_rate", 0.03)), format="%.2f")
     
     # Display the discount rate directly; no need for a button
     return discount_rate
@@ -493,39 +818,32 @@ discount_rate = get_user_discount_rate()
 #st.write(f"Discount Rate: {discount_rate:.2f}")
 
 
-def print_vehicle_fuelcost_and_decide_override(energy_price_province, user_province, existing_fuel, evaluated_fuel):
+def print_vehicle_fuelcost_and_decide_override(province_index, user_province, existing_fuel, evaluated_fuel):
     """
     Streamlit app function to compare fuel costs between existing and evaluated fuel types based on user input or defaults.
     """
     if (user_province and existing_fuel and evaluated_fuel):
         # Fetch default fuel prices based on the province and fuel type
-        existing_fuel_price_default = energy_price_province.loc[
-            (energy_price_province['province'] == user_province),
-            existing_fuel
-        ].iloc[0]
-        
-        evaluated_fuel_price_default = energy_price_province.loc[
-            (energy_price_province['province'] == user_province),
-            evaluated_fuel
-        ].iloc[0]
+        existing_fuel_price_default = province_index[user_province][existing_fuel]
+        evaluated_fuel_price_default = province_index[user_province][evaluated_fuel]
         
         # Define user input fields for existing and alternative fuel costs
         if existing_fuel == "Diesel":
-            existing_fuel_price = st.number_input("Diesel fuel cost ($/L):", value=float(existing_fuel_price_default), format="%.2f")
+            existing_fuel_price = st.number_input("Diesel fuel cost ($/L):", value=float(scenario_default("existing_fuel_price", existing_fuel_price_default)), format="%.2f")
         elif existing_fuel == "Gasoline":
-            existing_fuel_price = st.number_input("Gasoline fuel cost ($/L):", value=float(existing_fuel_price_default), format="%.2f")
+            existing_fuel_price = st.number_input("Gasoline fuel cost ($/L):", value=float(scenario_default("existing_fuel_price", existing_fuel_price_default)), format="%.2f")
 
         # Define user input fields based on the evaluated fuel type
         if evaluated_fuel == "Battery electric":
-            evaluated_fuel_price = st.number_input("Charging cost ($/kWh):", value=float(evaluated_fuel_price_default), format="%.2f", help ="Please account for demand charges in your cost per kWh for deployments large enough for these charges to be significant.")
+            evaluated_fuel_price = st.number_input("Charging cost ($/kWh):", value=float(scenario_default("evaluated_fuel_price", evaluated_fuel_price_default)), format="%.2f", help ="Please account for demand charges in your cost per kWh for deployments large enough for these charges to be significant.")
         elif evaluated_fuel == "HEV":
-            evaluated_fuel_price = st.number_input("Diesel fuel cost ($/L) for HEV:", value=float(evaluated_fuel_price_default), format="%.2f")
+            evaluated_fuel_price = st.number_input("Diesel fuel cost ($/L) for HEV:", value=float(scenario_default("evaluated_fuel_price", evaluated_fuel_price_default)), format="%.2f")
         elif evaluated_fuel == "Biodiesel B20":
-            evaluated_fuel_price = st.number_input("Biodiesel B20 fuel cost ($/L):", value=float(evaluated_fuel_price_default), format="%.2f", help = "Default fuel prices are based on historical trends. For the most current and accurate pricing in your area, please contact your fuel provider")
+            evaluated_fuel_price = st.number_input("Biodiesel B20 fuel cost ($/L):", value=float(scenario_default("evaluated_fuel_price", evaluated_fuel_price_default)), format="%.2f", help = "Default fuel prices are based on historical trends. For the most current and accurate pricing in your area, please contact your fuel provider")
         elif evaluated_fuel == "Renewable Diesel R99":
-            evaluated_fuel_price = st.number_input("Renewable Diesel R99 fuel cost ($/L):", value=float(evaluated_fuel_price_default), format="%.2f", help = "Default fuel prices are based on historical trends. For the most current and accurate pricing in your area, please contact your fuel provider")
+            evaluated_fuel_price = st.number_input("Renewable Diesel R99 fuel cost ($/L):", value=float(scenario_default("evaluated_fuel_price", evaluated_fuel_price_default)), format="%.2f", help = "Default fuel prices are based on historical trends. For the most current and accurate pricing in your area, please contact your fuel provider")
         elif evaluated_fuel == "Hydrogen Fuel Cell":
-            evaluated_fuel_price = st.number_input("Hydrogen fuel cost ($/kg):", value=float(evaluated_fuel_price_default), format="%.2f")
+            evaluated_fuel_price = st.number_input("Hydrogen fuel cost ($/kg):", value=float(scenario_default("evaluated_fuel_price", evaluated_fuel_price_default)), format="%.2f")
 
         return existing_fuel_price, evaluated_fuel_price
     
@@ -535,14 +853,14 @@ def print_vehicle_fuelcost_and_decide_override(energy_price_province, user_provi
 
 # Example usage within Streamlit
 existing_fuel_price, evaluated_fuel_price = print_vehicle_fuelcost_and_decide_override(
-        energy_price_province, user_province, existing_fuel, evaluated_fuel)
+        province_index, user_province, existing_fuel, evaluated_fuel)
 #st.write(f"Existing Fuel Cost: ${existing_fuel_price} per unit")
 #st.write(f"Evaluated Fuel Cost: ${evaluated_fuel_price} per unit")
 
 
 st.subheader("4.1 Vehicle")
 
-def fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info):
+def fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index):
     """
     Fetches and allows user input for the purchase prices of existing and evaluated fuel vehicles based on their configurations.
 
@@ -550,30 +868,22 @@ def fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluate
         user_weight_configuration (str): Configuration of the vehicle selected by the user.
         existing_fuel (str): Fuel type of the existing vehicle.
         evaluated_fuel (str): Fuel type of the evaluated vehicle.
-        vehicles_info (DataFrame): DataFrame containing vehicle information including price.
+        vehicle_index (Mapping): Vehicle catalog indexed by (Weight_Confi, Powertrain), including price.
 
     Returns:
         tuple: Containing the user input or default prices for existing and evaluated vehicle purchases.
     """
     if (user_weight_configuration and existing_fuel and evaluated_fuel):
         # Fetch existing vehicle purchase price from the dataset
-        existing_fuel_vehicle_price_default = vehicles_info.loc[
-            (vehicles_info['Weight_Confi'] == user_weight_configuration) & 
-            (vehicles_info['Powertrain'] == existing_fuel),
-            'Default_price'
-        ].iloc[0]
+        existing_fuel_vehicle_price_default = vehicle_index[(user_weight_configuration, existing_fuel)]['Default_price']
 
         # Fetch evaluated fuel vehicle purchase price from the dataset
-        evaluated_fuel_vehicle_price_default = vehicles_info.loc[
-            (vehicles_info['Weight_Confi'] == user_weight_configuration) & 
-            (vehicles_info['Powertrain'] == evaluated_fuel),
-            'Default_price'
-        ].iloc[0]
+        evaluated_fuel_vehicle_price_default = vehicle_index[(user_weight_configuration, evaluated_fuel)]['Default_price']
 
         # User inputs for existing and evaluated vehicle prices
         existing_fuel_vehicle_price = st.number_input(
             "MSRP (Manufacturer's Suggested Retail Price) for existing vehicle ($):",
-            value=int(existing_fuel_vehicle_price_default),
+            value=int(scenario_default("existing_price", existing_fuel_vehicle_price_default)),
             step=5000,
             format="%d",
             key="existing_fuel_price"
@@ -581,7 +891,7 @@ def fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluate
 
         evaluated_fuel_vehicle_price = st.number_input(
             "MSRP (Manufacturer's Suggested Retail Price) for alternative vehicle ($):",
-            value=int(evaluated_fuel_vehicle_price_default),
+            value=int(scenario_default("evaluated_price", evaluated_fuel_vehicle_price_default)),
             step=5000,
             format="%d",
             key="evaluated_fuel_price"
@@ -593,40 +903,52 @@ def fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluate
 
 # Example usage within the app
 # Define these variables based on earlier selections in your app
-existing_price, evaluated_price = fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info)
+existing_price, evaluated_price = fetch_fuel_vehicle_prices(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index)
 #st.write(f"Existing Vehicle Price: ${existing_price}")
 #st.write(f"Evaluated Vehicle Price: ${evaluated_price}")
 
 
-def get_user_vehicle_incentive_amount():
+def get_user_vehicle_incentive_amount(incentive_tables, user_province, user_weight_configuration, evaluated_fuel, existing_price, evaluated_price, n_vehicles):
     """
     Allows the user to input the total amount of federal and provincial subsidies available for an alternative vehicle.
+    The amount defaults to the incentives the rules of incentive_rules.csv grant to the province, vehicle and
+    powertrain, whose breakdown by program is shown below the input.
 
     Returns:
         float or None: The total subsidy amount for an alternative vehicle, or None if no input was provided.
     """
+    rule_subsidy = 0.0
+    if evaluated_fuel and evaluated_price is not None and existing_price is not None:
+        table = incentive_tables["Vehicle"]
+        amounts = program_amounts(table, user_province, user_weight_configuration, evaluated_fuel, evaluated_price,
+                                  evaluated_price - existing_price, n_vehicles or 1)
+        rule_subsidy = float(amounts.sum())
+
     # Streamlit number input to get user input for subsidy amount
     user_vehicle_incentive_amount = st.number_input(
         "Total federal and provincial subsidy per alternative vehicle ($):",
         min_value=0.0,  # Set a minimum value to avoid negative subsidies
-        value=0.0,      # Default value set to 0.0
+        value=float(scenario_default("user_vehicle_incentive_amount", rule_subsidy)),      # Defaults to the incentive rules
         step=5000.0,     # Step size to increment the subsidy amount
         format="%.2f",   # Format the input to display two decimal places
-        help="Apply the federal incentive amount shown in the sidebar for all applications except school buses and public transit. Include applicable provincial incentives based on program eligibility and stackable options"
+        help="Defaults to the federal and provincial incentives the province, vehicle and powertrain are eligible for, with their per-class, percentage and stacking limits. Adjust it if your fleet's eligibility differs, e.g. beyond the program's yearly vehicle limits."
     )
-    
+    if rule_subsidy > 0:
+        st.caption("Incentive rules: " + ", ".join(
+            f"{program} ${amount:,.0f}" for program, amount in zip(table["programs"], amounts) if amount > 0) + " per vehicle")
+
     # Return the subsidy amount; returns 0 if no value is entered
     return user_vehicle_incentive_amount if user_vehicle_incentive_amount > 0 else 0
 
 # Example usage in the Streamlit app
-user_vehicle_incentive_amount = get_user_vehicle_incentive_amount()
+user_vehicle_incentive_amount = get_user_vehicle_incentive_amount(incentive_tables, user_province, user_weight_configuration, evaluated_fuel, existing_price, evaluated_price, n_vehicles)
 #if user_vehicle_incentive_amount is not None:
 #    st.write(f"Total subsidy amount specified: ${user_vehicle_incentive_amount}")
 #else:
 #    st.write("No subsidy amount specified.")
 
 
-def print_vehicle_maintenance_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info):
+def print_vehicle_maintenance_and_decide_override(user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index):
     """
     Displays maintenance costs for existing and evaluated vehicles based on their configurations and allows the user to override these values.
 
@@ -634,36 +956,28 @@ def print_vehicle_maintenance_and_decide_override(user_weight_configuration, exi
         user_weight_configuration (str): Configuration of the vehicle.
         existing_fuel (str): Fuel type of the existing vehicle.
         evaluated_fuel (str): Fuel type of the evaluated vehicle.
-        vehicles_info (DataFrame): DataFrame containing vehicle information including maintenance costs.
+        vehicle_index (Mapping): Vehicle catalog indexed by (Weight_Confi, Powertrain), including maintenance costs.
 
     Returns:
         tuple: Containing the potentially overridden maintenance costs for existing and evaluated vehicles.
     """
     if (user_weight_configuration and existing_fuel and evaluated_fuel):
         # Fetch default maintenance costs from the dataset
-        existing_fuel_maintenance_default = vehicles_info.loc[
-            (vehicles_info['Weight_Confi'] == user_weight_configuration) & 
-            (vehicles_info['Powertrain'] == existing_fuel), 
-            'Maintenance'
-        ].iloc[0]
-
-        evaluated_fuel_maintenance_default = vehicles_info.loc[
-            (vehicles_info['Weight_Confi'] == user_weight_configuration) & 
-            (vehicles_info['Powertrain'] == evaluated_fuel), 
-            'Maintenance'
-        ].iloc[0]
+        existing_fuel_maintenance_default = vehicle_index[(user_weight_configuration, existing_fuel)]['Maintenance']
+
+        evaluated_fuel_maintenance_default = vehicle_index[(user_weight_configuration, evaluated_fuel)]['Maintenance']
 
         # User inputs for existing and evaluated vehicle maintenance costs
         existing_fuel_maintenance = st.number_input(
             "Existing vehicle maintenance ($/km):",
-            value=float(existing_fuel_maintenance_default),
+            value=float(scenario_default("existing_maintenance", existing_fuel_maintenance_default)),
             format="%.2f",
             key="existing_maintenance"
         )
 
         evaluated_fuel_maintenance = st.number_input(
             "Alternative vehicle maintenance ($/km):",
-            value=float(evaluated_fuel_maintenance_default),
+            value=float(scenario_default("evaluated_maintenance", evaluated_fuel_maintenance_default)),
             format="%.2f",
             key="evaluated_maintenance",
             help= "Maintenance costs for battery electric and hydrogen fuel cell vehicles are estimated based on industry expectations but can vary as these technologies are new and data is limited."
@@ -675,7 +989,7 @@ def print_vehicle_maintenance_and_decide_override(user_weight_configuration, exi
 
 # Example usage within the app
 existing_maintenance, evaluated_maintenance = print_vehicle_maintenance_and_decide_override(
-    user_weight_configuration, existing_fuel, evaluated_fuel, vehicles_info
+    user_weight_configuration, existing_fuel, evaluated_fuel, vehicle_index
 )
 #st.write(f"Final Existing Vehicle Maintenance: ${existing_maintenance} per km")
 #st.write(f"Final Evaluated Vehicle Maintenance: ${evaluated_maintenance} per km")
@@ -727,11 +1041,11 @@ def get_user_insurance_rates():
     existing_vehicle_insurance = 0
     alternative_vehicle_insurance = 0
 
-    activate_insurance = st.checkbox("Include Vehicle Insurance")
+    activate_insurance = st.checkbox("Include Vehicle Insurance", value=bool(scenario_default("existing_vehicle_insurance", 0) or scenario_default("alternative_vehicle_insurance", 0)))
 
     if activate_insurance:
-        existing_vehicle_insurance = st.number_input("Enter existing vehicle insurance cost ($/km):", min_value=0.0, max_value = 1.0, value = 0.0,  step=0.01)
-        alternative_vehicle_insurance = st.number_input("Enter alternative vehicle insurance cost ($/km):", min_value=0.0, max_value = 1.0,value = 0.0,  step=0.01)
+        existing_vehicle_insurance = st.number_input("Enter existing vehicle insurance cost ($/km):", min_value=0.0, max_value = 1.0, value = float(scenario_default("existing_vehicle_insurance", 0.0)),  step=0.01)
+        alternative_vehicle_insurance = st.number_input("Enter alternative vehicle insurance cost ($/km):", min_value=0.0, max_value = 1.0,value = float(scenario_default("alternative_vehicle_insurance", 0.0)),  step=0.01)
     return existing_vehicle_insurance, alternative_vehicle_insurance
 
 existing_vehicle_insurance, alternative_vehicle_insurance = get_user_insurance_rates()
@@ -744,14 +1058,14 @@ def get_user_depreciation_rates():
     existing_vehicle_depreciation = None
     alternative_vehicle_depreciation = None
 
-    activate_depreciation = st.checkbox("Include Vehicle Resale at end of lifetime")
+    activate_depreciation = st.checkbox("Include Vehicle Resale at end of lifetime", value=scenario_default("existing_vehicle_depreciation", None) is not None)
 
     if activate_depreciation:
         existing_vehicle_depreciation = st.number_input(
             "Enter existing vehicle yearly depreciation rate (%)",
             min_value=0.0,
             max_value=100.0,
-            value=0.0,
+            value=float(scenario_default("existing_vehicle_depreciation", 0.0)),
             step=5.0,
         )
 
@@ -759,7 +1073,7 @@ def get_user_depreciation_rates():
             "Enter alternative vehicle yearly depreciation rate (%)",
             min_value=0.0,
             max_value=100.0,
-            value=0.0,
+            value=float(scenario_default("alternative_vehicle_depreciation", 0.0)),
             step=5.0,
         )
 
@@ -771,21 +1085,34 @@ existing_vehicle_depreciation, alternative_vehicle_depreciation = get_user_depre
 # Financing parameters function
 def get_user_financing_parameters():
     """
-    Asks the user for financing details including financing period, downpayment, and financing rate.
+    Asks the user for financing details including the financing type (loan, balloon loan or lease), term,
+    downpayment, financing rate, and the balloon or residual value of balloon loans and leases.
+    Payments are monthly, see financing.vehicle_payments.
     """
+    financing_type = None
     financing_period = None
     downpayment = None
     financing_rate = None
+    financing_residual = None
+    lease_buyout = None
 
     # Activate financing option
-    activate_financing = st.checkbox("Include Vehicle Financing")
+    activate_financing = st.checkbox("Include Vehicle Financing", value=scenario_default("financing_period", None) is not None)
 
     if activate_financing:
+        financing_type = st.selectbox(
+            "Financing type",
+            FINANCING_TYPES,
+            index=option_index(list(FINANCING_TYPES), scenario_default("financing_type", "Loan")),
+            help="Loans and balloon loans are repaid monthly and the vehicles are owned; leases are paid monthly "
+                 "and the vehicles are returned at the end of the term unless the residual value is bought out.",
+        )
+
         financing_period = st.number_input(
-            "Enter financing period (years)",
+            "Enter financing period (years)" if financing_type != "Lease" else "Enter lease term (years)",
             min_value=0,
             max_value=30,
-            value=5,
+            value=int(scenario_default("financing_period", 5)),
             step=1,
         )
 
@@ -793,7 +1120,7 @@ def get_user_financing_parameters():
             "Enter downpayment percentage (%)",
             min_value=0.0,
             max_value=100.0,
-            value=20.0,
+            value=float(scenario_default("downpayment", 20.0 if financing_type != "Lease" else 0.0)),
             step=5.0,
         )
 
@@ -801,24 +1128,219 @@ def get_user_financing_parameters():
             "Enter annual financing interest rate (%)",
             min_value=0.0,
             max_value=100.0,
-            value=5.0,
+            value=float(scenario_default("financing_rate", 5.0)),
             step=0.1,
         )
 
-    return financing_period, downpayment, financing_rate
+        if financing_type != "Loan":
+            financing_residual = st.number_input(
+                "Enter balloon payment (% of vehicle price)" if financing_type == "Balloon loan"
+                else "Enter residual value at the end of the lease (% of vehicle price)",
+                min_value=0.0,
+                max_value=100.0,
+                value=float(scenario_default("financing_residual", 20.0)),
+                step=5.0,
+            )
+
+        if financing_type == "Lease":
+            lease_buyout = st.checkbox(
+                "Buy out the residual value at the end of the lease",
+                value=bool(scenario_default("lease_buyout", False)),
+                help="Without a buyout, the lease is renewed on the same terms until the end of the vehicle "
+                     "lifetime and the vehicles are returned, with no resale value.",
+            )
+
+    return financing_type, financing_period, downpayment, financing_rate, financing_residual, lease_buyout
 
 # Call the function to get financing parameters
-financing_period, downpayment, financing_rate = get_user_financing_parameters()
+financing_type, financing_period, downpayment, financing_rate, financing_residual, lease_buyout = get_user_financing_parameters()
+
+
+def get_user_price_escalation(user_province, existing_fuel, evaluated_fuel, vehicle_lifetime, province_index, carbon_schedule):
+    """
+    Asks the user for yearly price escalation rates and whether the federal carbon price schedule applies.
+
+    Parameters:
+        user_province (str): The province of the user, used for the default fuel price escalation.
+        existing_fuel (str): Fuel type of the existing vehicle.
+        evaluated_fuel (str): Fuel type of the evaluated vehicle.
+        vehicle_lifetime (int): Number of years of operation.
+        province_index (dict): Provincial energy price index, with fuel price escalation rates.
+        carbon_schedule (dict): Carbon price ($/tCO2eq) per calendar year.
+
+    Returns:
+        dict or None: Escalation rates (%) for 'maintenance', 'insurance', 'existing_fuel' and 'evaluated_fuel',
+        and 'carbon_prices' for each year of operation (None without carbon pricing); None if prices are constant.
+    """
+    loaded = scenario_default("price_escalation", None) or {}
+    activate_escalation = st.checkbox("Include price escalation and carbon pricing", value=bool(loaded))
+    if not (activate_escalation and user_province and existing_fuel and evaluated_fuel and vehicle_lifetime):
+        return None
+
+    escalation = province_index[user_province].get("escalation", {})
+    col1, col2 = st.columns(2)
+    with col1:
+        existing_fuel_escalation = st.number_input(f"{existing_fuel} price escalation (%/year):", min_value=-20.0, max_value=20.0,
+                                                   value=float(loaded.get("existing_fuel", escalation.get(existing_fuel, 0.0))), step=0.5)
+        maintenance_escalation = st.number_input("Maintenance cost escalation (%/year):", min_value=-20.0, max_value=20.0,
+                                                 value=float(loaded.get("maintenance", 2.0)), step=0.5)
+    with col2:
+        evaluated_fuel_escalation = st.number_input(f"{evaluated_fuel} price escalation (%/year):", min_value=-20.0, max_value=20.0,
+                                                    value=float(loaded.get("evaluated_fuel", escalation.get(evaluated_fuel, 0.0))), step=0.5)
+        insurance_escalation = st.number_input("Insurance cost escalation (%/year):", min_value=-20.0, max_value=20.0,
+                                               value=float(loaded.get("insurance", 2.0)), step=0.5)
+
+    carbon_prices = None
+    apply_carbon_price = st.checkbox("Apply the federal carbon price schedule", value=loaded.get("carbon_prices") is not None,
+                                     help="Charged on each vehicle's GHG emission factor on top of the fuel prices above. "
+                                          "The consumer fuel charge was set to zero in April 2025; use this as a policy scenario.")
+    if apply_carbon_price:
+        start_year = st.number_input("First year of operation:", min_value=2019, max_value=2060,
+                                     value=int(loaded.get("start_year") or datetime.now().year), step=1)
+        carbon_prices = carbon_price_path(carbon_schedule, start_year, vehicle_lifetime)
+
+    return dict(maintenance=maintenance_escalation, insurance=insurance_escalation,
+                existing_fuel=existing_fuel_escalation, evaluated_fuel=evaluated_fuel_escalation,
+                carbon_prices=carbon_prices, start_year=start_year if apply_carbon_price else None)
+
+price_escalation = get_user_price_escalation(user_province, existing_fuel, evaluated_fuel, vehicle_lifetime, province_index, carbon_schedule)
+
+
+def get_user_lifecycle_events(existing_fuel, evaluated_fuel, lifecycle_schedule):
+    """
+    Lets the user include and edit scheduled one-off costs such as battery pack or fuel cell stack replacements,
+    engine overhauls and charger refreshes.
+
+    Parameters:
+        existing_fuel (str): Fuel type of the existing vehicle.
+        evaluated_fuel (str): Fuel type of the evaluated vehicle.
+        lifecycle_schedule (DataFrame): Default event schedule per powertrain.
+
+    Returns:
+        list or None: Event dicts (Powertrain, Event, Applies_to, Year, Cost_share), or None if not included.
+    """
+    loaded = scenario_default("lifecycle_events", None)
+    activate_events = st.checkbox("Include scheduled lifecycle events (replacements, overhauls, charger refresh)", value=loaded is not None)
+    if not (activate_events and existing_fuel and evaluated_fuel):
+        return None
+
+    if loaded is not None:
+        events = pd.DataFrame(loaded, columns=lifecycle_schedule.columns)
+    else:
+        events = lifecycle_schedule[lifecycle_schedule["Powertrain"].isin([existing_fuel, evaluated_fuel])]
+    st.caption("Cost share is a percentage of the vehicle price (per vehicle) or of the infrastructure cost. "
+               "Events at or after the end of the vehicle lifetime are not incurred.")
+    events = st.data_editor(
+        events.reset_index(drop=True),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Powertrain": st.column_config.SelectboxColumn(options=[existing_fuel, evaluated_fuel], required=True),
+            "Applies_to": st.column_config.SelectboxColumn("Applies to", options=["Vehicle", "Infrastructure"], required=True),
+            "Year": st.column_config.NumberColumn(min_value=1, max_value=40, step=1, required=True),
+            "Cost_share": st.column_config.NumberColumn("Cost share (%)", min_value=0.0, max_value=200.0, required=True),
+        },
+        key=f"lifecycle_events_{existing_fuel}_{evaluated_fuel}",
+    )
+    return events.dropna(subset=["Powertrain", "Applies_to", "Year", "Cost_share"]).to_dict("records")
+
+lifecycle_events = get_user_lifecycle_events(existing_fuel, evaluated_fuel, lifecycle_schedule)
+
+
+def get_user_efficiency_degradation(existing_fuel, evaluated_fuel, existing_fuel_efficiency, evaluated_fuel_efficiency, vehicle_lifetime, degradation_rates):
+    """
+    Lets the user include the rise in energy use per km as the vehicles age, and edit its rates.
+
+    Parameters:
+        existing_fuel (str): Fuel type of the existing vehicle.
+        evaluated_fuel (str): Fuel type of the evaluated vehicle.
+        existing_fuel_efficiency (float): Fuel efficiency of the new existing vehicle.
+        evaluated_fuel_efficiency (float): Fuel efficiency of the new evaluated vehicle.
+        vehicle_lifetime (int): Number of years of operation.
+        degradation_rates (dict): Default degradation rates per powertrain.
+
+    Returns:
+        dict or None: Degradation rates per powertrain (see degradation.load_degradation_rates), with the values
+        entered for the existing and evaluated fuels; None if not included.
+    """
+    loaded = scenario_default("efficiency_degradation", None)
+    activate_degradation = st.checkbox("Include efficiency degradation as vehicles age", value=loaded is not None,
+                                       help="Energy use per km rises each year (battery and fuel cell ageing, engine wear) "
+                                            "up to a ceiling; applies to fuel costs and GHG emissions.")
+    if not (activate_degradation and existing_fuel and evaluated_fuel and existing_fuel_efficiency and evaluated_fuel_efficiency and vehicle_lifetime):
+        return None
+
+    rates = dict(degradation_rates, **(loaded or {}))
+    col1, col2 = st.columns(2)
+    for col, fuel, efficiency in ((col1, existing_fuel, existing_fuel_efficiency), (col2, evaluated_fuel, evaluated_fuel_efficiency)):
+        default = rates.get(fuel, {"Yearly_increase": 0.0, "Max_increase": 0.0})
+        with col:
+            yearly_increase = st.number_input(f"{fuel} energy use increase (%/year):", min_value=0.0, max_value=10.0,
+                                              value=float(default["Yearly_increase"]), step=0.1)
+            max_increase = st.number_input(f"{fuel} maximum energy use increase (%):", min_value=0.0, max_value=50.0,
+                                           value=float(default["Max_increase"]), step=1.0)
+            rates[fuel] = {"Yearly_increase": yearly_increase, "Max_increase": max_increase}
+            final_efficiency = efficiency_path(efficiency, fuel_use_factors(rates, fuel, int(vehicle_lifetime)))[-1]
+            st.caption(f"Fuel efficiency in year {int(vehicle_lifetime)}: {final_efficiency:,.2f} (new: {efficiency:,.2f})")
+    return rates
+
+efficiency_degradation = get_user_efficiency_degradation(existing_fuel, evaluated_fuel, existing_fuel_efficiency, evaluated_fuel_efficiency, vehicle_lifetime, degradation_rates)
+
+def size_hydrogen_station(station_components, n_vehicles, daily_distance, evaluated_fuel_efficiency):
+    """
+    Sizes the cheapest hydrogen refuelling station able to refuel the fleet within the user's fill window,
+    from the component cost table (see hydrogen_station.py).
 
-def collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, chargingInfra_info):
+    Returns:
+        tuple: Equipment cost, installation and site cost, and total station cost ($); zero for each until the fleet
+        has a hydrogen demand, and None for each if no design of the cost table can refuel the fleet within the window.
+    """
+    # Missing or zero inputs leave no demand to size a station for
+    if not (n_vehicles and daily_distance and evaluated_fuel_efficiency):
+        st.info("Enter the fleet size, daily distance and hydrogen consumption above to size a refuelling station.")
+        return 0.0, 0.0, 0.0
+    st.write(f"Daily hydrogen demand: {float(daily_hydrogen_demand(n_vehicles, daily_distance, evaluated_fuel_efficiency)):,.0f} kg")
+    fill_window = st.number_input("Hours in which every vehicle must be refuelled (peak fill window):", min_value=0.5,
+                                  max_value=24.0, value=4.0, step=0.5, format="%.1f")
+    design = size_station(station_components, n_vehicles, daily_distance, evaluated_fuel_efficiency, fill_window)
+    if np.isnan(design["cost"]):
+        st.warning("No station design in the cost table can refuel this fleet within the fill window. Widen the window "
+                   "or enter the refuelling infrastructure cost directly.")
+        return None, None, None
+    bill = pd.DataFrame(station_bill_of_materials(station_components, design), columns=["Component", "Option", "Units", "Cost ($)"])
+    st.dataframe(bill, hide_index=True, use_container_width=True, column_config={"Cost ($)": st.column_config.NumberColumn(format="%.0f")})
+    equipment_cost = float(design["equipment_cost"])
+    total_cost = float(design["cost"])
+    st.write(f"Total refuelling station cost ($): {total_cost:,.2f}")
+    return equipment_cost, total_cost - equipment_cost, total_cost
+
+
+def collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, chargingInfra_info, infrastructure_incentive, station_components):
+    # infrastructure_incentive gives the subsidy of the incentive rules for an infrastructure cost, the default subsidy
     if evaluated_fuel:
 
-        alternative_with_refuelling = ['Biodiesel B20','Renewable Diesel R99', 'Hydrogen Fuel Cell', 'HEV']
+        alternative_with_refuelling = ['Biodiesel B20','Renewable Diesel R99', 'HEV']
         
-        if evaluated_fuel in alternative_with_refuelling:
+        if evaluated_fuel == "Hydrogen Fuel Cell":
             st.subheader("4.2 Refuelling Infrastructure")
-            charging_refuelling_infra_cost = st.number_input("Total refuelling infrastructure cost ($):", min_value=0.0, value=0.0, step= 5000.0, format="%.2f")
-            user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for refuelling infrastructure ($):", min_value=0.0, value=0.0, step= 5000.0,  format="%.2f")
+            options = ['Directly input total refuelling infrastructure cost', 'Size a hydrogen refuelling station from the bottom up']
+            user_refuelling_infra_approach = st.selectbox("Select refuelling infrastructure cost estimation approach:", options)
+
+            station_costs = (None, None, None)
+            if user_refuelling_infra_approach == options[1]:
+                station_costs = size_hydrogen_station(station_components, n_vehicles, daily_distance, evaluated_fuel_efficiency)
+            if station_costs[2] is None:
+                charging_refuelling_infra_cost = st.number_input("Total refuelling infrastructure cost ($):", min_value=0.0, value=float(scenario_default("total_infra_cost", 0.0)), step= 5000.0, format="%.2f")
+                station_costs = (0, 0, charging_refuelling_infra_cost)
+            user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for refuelling infrastructure ($):", min_value=0.0, value=float(scenario_default("user_chargerRefuelling_incentive_amount", infrastructure_incentive(station_costs[2]))), step= 5000.0,  format="%.2f")
+
+            return station_costs + (user_chargerRefuelling_incentive_amount,)
+
+        elif evaluated_fuel in alternative_with_refuelling:
+            st.subheader("4.2 Refuelling Infrastructure")
+            charging_refuelling_infra_cost = st.number_input("Total refuelling infrastructure cost ($):", min_value=0.0, value=float(scenario_default("total_infra_cost", 0.0)), step= 5000.0, format="%.2f")
+            user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for refuelling infrastructure ($):", min_value=0.0, value=float(scenario_default("user_chargerRefuelling_incentive_amount", infrastructure_incentive(charging_refuelling_infra_cost))), step= 5000.0,  format="%.2f")
             
             return 0, 0, charging_refuelling_infra_cost, user_chargerRefuelling_incentive_amount
         
@@ -828,8 +1350,8 @@ def collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, chargingInfr
             user_charging_infra_approach = st.selectbox("Select charging infrastructure cost estimation approach:", options)
             
             if user_charging_infra_approach == options[0]:
-                charging_refuelling_infra_cost = st.number_input("Total charging infrastructure cost including stations, construction and upgrades ($):", min_value=0.0, value=0.0, step= 5000.0, format="%.0f")
-                user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for charging infrastructure ($):", min_value=0.0, value=0.0, step= 5000.0, format="%.0f")
+                charging_refuelling_infra_cost = st.number_input("Total charging infrastructure cost including stations, construction and upgrades ($):", min_value=0.0, value=float(scenario_default("total_infra_cost", 0.0)), step= 5000.0, format="%.0f")
+                user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for charging infrastructure ($):", min_value=0.0, value=float(scenario_default("user_chargerRefuelling_incentive_amount", infrastructure_incentive(charging_refuelling_infra_cost))), step= 5000.0, format="%.0f")
                 
                 return 0, 0, charging_refuelling_infra_cost, user_chargerRefuelling_incentive_amount
             
@@ -856,161 +1378,75 @@ def collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, chargingInfr
                 charging_refuelling_infra_cost = charging_station_costs + infra_constr_grid_upgrade_costs
                 st.write(f"Total Charging Infrastructure cost ($): {charging_refuelling_infra_cost:.2f}")
                 
-                user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for charging infrastructure ($):", min_value=0.0, value=0.0, step = 5000.0, format="%.2f")
+                user_chargerRefuelling_incentive_amount = st.number_input("Total federal and provincial subsidy for charging infrastructure ($):", min_value=0.0, value=float(scenario_default("user_chargerRefuelling_incentive_amount", infrastructure_incentive(charging_refuelling_infra_cost))), step = 5000.0, format="%.2f")
                 
                 return charging_station_costs, infra_constr_grid_upgrade_costs, charging_refuelling_infra_cost, user_chargerRefuelling_incentive_amount
     else:
         return None, None, None, None
 # Assuming chargingInfra_info is available as a DataFrame or similar structure in your context
 # If not, you'll need to define or load it accordingly
-charging_station_costs, infra_constr_grid_upgrade_costs, total_infra_cost, user_chargerRefuelling_incentive_amount = collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, charging_infra_info)
+def infrastructure_incentive(infra_cost):
+    """Subsidy the incentive rules grant to the charging or refuelling infrastructure of the selected vehicle ($)."""
+    return float(infrastructure_subsidy(incentive_tables, user_province, user_weight_configuration, evaluated_fuel, infra_cost))
+
+charging_station_costs, infra_constr_grid_upgrade_costs, total_infra_cost, user_chargerRefuelling_incentive_amount = collect_charging_refuelling_infrastrcture_costs(evaluated_fuel, charging_infra_info, infrastructure_incentive, station_components)
 #st.write(f"Charging station costs: ${charging_station_costs} per unit")
 #st.write(f"Construction and grid upgrade costs: ${infra_constr_grid_upgrade_costs} per unit")
 #st.write(f"Total Charging-Refueling Infrastructure costs: ${charging_refuelling_infra_cost} per unit")
 #st.write(f"Total Charging-Refuelling Infrastructure subsidy: ${user_chargerRefuelling_incentive_amount} per unit")
 
 
-st.header("5. Results")
-st.subheader("5.1 Project costs")
-
-
-def discounted_TCO(base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost, refueling_station_cost,
-                   refueling_station_infra, maintenance_base, maintenance_alt, fuel_base, fuel_alt, v_lifetime,
-                   daily_distance, days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate, user_province, energy_price_province, total_infra_cost,
-                   existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation, financing_period, downpayment, financing_rate):
-    
-    # Convert all numerical inputs to appropriate types
-    n_vehicles = float(n_vehicles)
-    basevehicle_cost = float(basevehicle_cost)
-    altvehicle_cost = float(altvehicle_cost)
-    refueling_station_cost = float(refueling_station_cost)
-    refueling_station_infra = float(refueling_station_infra)
-    maintenance_base = float(maintenance_base)
-    maintenance_alt = float(maintenance_alt)
-    fuel_base = float(fuel_base)
-    fuel_alt = float(fuel_alt)
-    v_lifetime = int(v_lifetime)
-    daily_distance = float(daily_distance)
-    days_operation = float(days_operation)
-    vehicle_subsidy = float(vehicle_subsidy)
-    infrastructure_subsidy = float(infrastructure_subsidy)
-    discount_rate = float(discount_rate)
-    existing_vehicle_insurance = float(existing_vehicle_insurance)
-    alternative_vehicle_insurance = float(alternative_vehicle_insurance)
-    
-    # Depreciation values (as percentage)
-    existing_vehicle_depreciation = float(existing_vehicle_depreciation) if existing_vehicle_depreciation and existing_vehicle_depreciation > 0 else None
-    alternative_vehicle_depreciation = float(alternative_vehicle_depreciation) if alternative_vehicle_depreciation and alternative_vehicle_depreciation > 0 else None
-    
-     # Financing parameters defaults if not specified
-    if financing_period is None:
-        financing_period = 0  # Assume no financing if not provided
-    if downpayment is None:
-        downpayment = 100.0  # Assume full payment upfront if not provided
-    if financing_rate is None:
-        financing_rate = 0.0  # No interest if not provided
-
-    downpayment = downpayment / 100  # Ensure downpayment is divided by 100 once
-    financing_rate = financing_rate / 100
-
-    # Tax rate per province (moved outside the loop)
-    provincial_tax = energy_price_province.loc[(energy_price_province['province'] == user_province)]['taxes_perc'].iloc[0] / 100
-    
-    # Initialize dataframe where yearly cost will be added
-    df_total_cost = pd.DataFrame(columns=['Year', 'DCO_base', 'DCO_alternative', 'DCO_alternative_Withincentive'])
-    
-    # Calculate loan amounts and annual payments for both base and alternative vehicles
-    # Only apply financing to the vehicle cost after the subsidy (for the scenario with the subsidy)
-
-    # Base vehicle loan amount (no subsidy assumed)
-    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
-
-    # Alternative vehicle loan amount with and without subsidy
-    loan_amount_alt_without_subsidy = altvehicle_cost * n_vehicles * (1 - downpayment)
-    loan_amount_alt_with_subsidy = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
+# Scenario entered above, keyed by input name; saved to the scenario store and used by the batch views
+cost_inputs = dict(
+    user_province=user_province, user_application=user_application, user_configuration=user_configuration,
+    vehicle_weightClass=vehicle_weightClass, user_weight_configuration=user_weight_configuration,
+    existing_fuel=existing_fuel, evaluated_fuel=evaluated_fuel, n_vehicles=n_vehicles,
+    existing_fuel_efficiency=existing_fuel_efficiency, evaluated_fuel_efficiency=evaluated_fuel_efficiency,
+    daily_distance=daily_distance, yearly_days_operations=yearly_days_operations, vehicle_lifetime=vehicle_lifetime,
+    discount_rate=discount_rate, existing_fuel_price=existing_fuel_price, evaluated_fuel_price=evaluated_fuel_price,
+    existing_price=existing_price, evaluated_price=evaluated_price, user_vehicle_incentive_amount=user_vehicle_incentive_amount,
+    existing_maintenance=existing_maintenance, evaluated_maintenance=evaluated_maintenance,
+    existing_fuel_perkm=existing_fuel_perkm, evaluated_fuel_perkm=evaluated_fuel_perkm,
+    existing_vehicle_insurance=existing_vehicle_insurance, alternative_vehicle_insurance=alternative_vehicle_insurance,
+    existing_vehicle_depreciation=existing_vehicle_depreciation, alternative_vehicle_depreciation=alternative_vehicle_depreciation,
+    financing_type=financing_type, financing_period=financing_period, downpayment=downpayment,
+    financing_rate=financing_rate, financing_residual=financing_residual, lease_buyout=lease_buyout,
+    price_escalation=price_escalation, lifecycle_events=lifecycle_events, efficiency_degradation=efficiency_degradation,
+    total_infra_cost=total_infra_cost, user_chargerRefuelling_incentive_amount=user_chargerRefuelling_incentive_amount,
+)
+# Results with vehicles from an uploaded catalog also depend on its emission factors, which are not form inputs
+if catalog_fingerprint:
+    cost_inputs["vehicle_catalog"] = catalog_fingerprint
 
-    # If there is a financing period, calculate the annual payment, else set it to 0
-    if financing_period > 0:
-        # For base vehicle (no subsidy)
-        annual_payment_base = (loan_amount_base * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-        
-        # For alternative vehicle with and without subsidy
-        annual_payment_alt_with_subsidy = (loan_amount_alt_with_subsidy * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-        annual_payment_alt_without_subsidy = (loan_amount_alt_without_subsidy * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-    else:
-        # No financing applied
-        annual_payment_base = 0
-        annual_payment_alt_with_subsidy = 0
-        annual_payment_alt_without_subsidy = 0
+inputs_complete = bool(existing_fuel and evaluated_fuel and n_vehicles and existing_price and evaluated_price and existing_maintenance and evaluated_maintenance and existing_fuel_perkm and evaluated_fuel_perkm and vehicle_lifetime and daily_distance and yearly_days_operations and discount_rate and user_province)
 
-    # Determine if we are including incentives
-    plot_incentive = vehicle_subsidy > 0 or infrastructure_subsidy > 0
 
-    # Loop through each year
-    for year in range(v_lifetime + 1):
-        discount_factor = 1 / ((1 + discount_rate) ** year)  # moved calculation here instead of inside the loop
-        
-        if year == 0:
-            # For year 0, include downpayment and infrastructure costs
-            df_total_cost.loc[year, 'Year'] = year
-            df_total_cost.loc[year, 'DCO_base'] = (basevehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax) * discount_factor
-            
-            # Correct subsidy calculation for alternative vehicles
-            alt_capital_cost = (altvehicle_cost * n_vehicles * downpayment) + (refueling_station_cost + refueling_station_infra if refueling_station_cost > 0 else total_infra_cost)
-            df_total_cost.loc[year, 'DCO_alternative'] = alt_capital_cost * discount_factor * (1 + provincial_tax)
-            
-            # For alternative vehicles with incentives, apply the subsidy only once per vehicle
-            if plot_incentive:
-                alt_capital_cost_with_incentive = ((altvehicle_cost - vehicle_subsidy)  * n_vehicles * downpayment)  + (refueling_station_cost + refueling_station_infra if refueling_station_cost > 0 else total_infra_cost) - infrastructure_subsidy
-                df_total_cost.loc[year, 'DCO_alternative_Withincentive'] = alt_capital_cost_with_incentive * discount_factor * (1 + provincial_tax)
-        else:
-            # Add discounted operational costs for each year
-            df_total_cost.loc[year, 'Year'] = year
-            discounted_op_cost_base = (maintenance_base + fuel_base + existing_vehicle_insurance) * daily_distance * days_operation * n_vehicles * discount_factor
-            discounted_op_cost_alt = (maintenance_alt + fuel_alt + alternative_vehicle_insurance) * daily_distance * days_operation * n_vehicles * discount_factor
-            
-            # Add loan payments during the financing period
-            if year <= financing_period:
-                discounted_payment_base = annual_payment_base * discount_factor
-                # Without subsidy
-                discounted_payment_alt_without_subsidy = annual_payment_alt_without_subsidy * discount_factor
-                
-                if plot_incentive:
-                    # With subsidy
-                    discounted_payment_alt_with_subsidy = annual_payment_alt_with_subsidy * discount_factor
-            else:
-                discounted_payment_base = 0
-                discounted_payment_alt_without_subsidy = 0
-                discounted_payment_alt_with_subsidy = 0
-
-            # Add cumulative discounted operational and payment costs for base vehicle
-            df_total_cost.loc[year, 'DCO_base'] = df_total_cost.loc[year - 1, 'DCO_base'] + discounted_op_cost_base + discounted_payment_base
-            
-            # Add cumulative discounted operational and payment costs for alternative vehicle without subsidy
-            df_total_cost.loc[year, 'DCO_alternative'] = df_total_cost.loc[year - 1, 'DCO_alternative'] + discounted_op_cost_alt + discounted_payment_alt_without_subsidy
-            
-            # If there are incentives, add the alternative vehicle cost with subsidy
-            if plot_incentive:
-                df_total_cost.loc[year, 'DCO_alternative_Withincentive'] = df_total_cost.loc[year - 1, 'DCO_alternative_Withincentive'] + discounted_op_cost_alt + discounted_payment_alt_with_subsidy
+st.header("5. Results")
+st.subheader("5.1 Project costs")
 
-    # Calculate resale value if depreciation rates are provided
-    if existing_vehicle_depreciation and alternative_vehicle_depreciation:
-        # Resale value at end of ownership period
-        resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
-        resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
 
-        # Discount resale values to present value
-        resale_value_base_discounted = resale_value_base / ((1 + discount_rate) ** v_lifetime)
-        resale_value_alt_discounted = resale_value_alt / ((1 + discount_rate) ** v_lifetime)
+def discounted_TCO(base_tech, alternative_tech, results, plot_incentive):
+    """
+    Builds the cumulative discounted total cost of ownership chart.
 
-        # Subtract resale value from final year
-        df_total_cost.loc[v_lifetime, 'DCO_base'] -= resale_value_base_discounted * n_vehicles
-        df_total_cost.loc[v_lifetime, 'DCO_alternative'] -= resale_value_alt_discounted * n_vehicles
-        if plot_incentive:
-            df_total_cost.loc[v_lifetime, 'DCO_alternative_Withincentive'] -= resale_value_alt_discounted * n_vehicles
+    Parameters:
+        base_tech (str): The label for the base technology (e.g., 'Diesel').
+        alternative_tech (str): The label for the alternative technology (e.g., 'Battery electric').
+        results (dict): Kernel results for the scenario, see evaluate_scenario.
+        plot_incentive (bool): Whether the alternative with subsidies is shown.
 
-    # Convert columns to float for consistency
-    df_total_cost = df_total_cost.astype(float)
+    Returns:
+        tuple: The Plotly figure and a dataframe of the cumulative discounted costs per year.
+    """
+    cumulative = np.asarray(results["cumulative"], dtype=float)
+
+    # Cumulative discounted costs per year
+    df_total_cost = pd.DataFrame({
+        'Year': np.arange(cumulative.shape[-1], dtype=float),
+        'DCO_base': cumulative[0],
+        'DCO_alternative': cumulative[1],
+        'DCO_alternative_Withincentive': cumulative[2] if plot_incentive else np.nan,
+    })
 
     # Scale for plotting
     max_value = df_total_cost['DCO_alternative'].max()
@@ -1023,44 +1459,18 @@ def discounted_TCO(base_tech, alternative_tech, n_vehicles, basevehicle_cost, al
     
     df_total_cost[['DCO_base', 'DCO_alternative', 'DCO_alternative_Withincentive']] /= scale
 
-    # Prepare the data for Plotly
-    df_long = df_total_cost.melt(id_vars='Year', var_name='Category', value_name='Cost')
-    df_long['Category'] = df_long['Category'].replace({
-        'DCO_base': base_tech,
-        'DCO_alternative': alternative_tech,
-        'DCO_alternative_Withincentive': f"{alternative_tech} with subsidies"
-    })
-
-    # Create the Plotly figure
-    fig = go.Figure()
-
-    # Add the base technology line
-    fig.add_trace(go.Scatter(x=df_long[df_long['Category'] == base_tech]['Year'], 
-                             y=df_long[df_long['Category'] == base_tech]['Cost'].round(2),
-                             mode='lines+markers',
-                             name=base_tech,
-                             line=dict(color='red')))
-
-    # Add the alternative technology line
-    fig.add_trace(go.Scatter(x=df_long[df_long['Category'] == alternative_tech]['Year'], 
-                             y=df_long[df_long['Category'] == alternative_tech]['Cost'].round(2),
-                             mode='lines+markers',
-                             name=alternative_tech,
-                             line=dict(color='#1B5E20')))
-
-    # Add the alternative technology with subsidies line
+    # Build the Plotly figure straight from the cost arrays
+    years = df_total_cost['Year'].to_numpy()
+    series = [
+        (base_tech, df_total_cost['DCO_base'].to_numpy(), dict(color=BASE_COLOR)),
+        (alternative_tech, df_total_cost['DCO_alternative'].to_numpy(), dict(color=ALTERNATIVE_COLOR)),
+    ]
     if plot_incentive:
-        fig.add_trace(go.Scatter(x=df_long[df_long['Category'] == f"{alternative_tech} with subsidies"]['Year'], 
-                             y=df_long[df_long['Category'] == f"{alternative_tech} with subsidies"]['Cost'].round(2),
-                             mode='lines+markers',
-                             name=f"{alternative_tech} with subsidies",
-                             line=dict(color='#1B5E20', dash='dash')))
-
-    # Update layout
-    fig.update_layout(#title="Discounted Total Cost of Ownership Over Time",
-                      xaxis_title='Years',
-                      yaxis_title=ylabel,
-                      legend_title='Technology')
+        series.append((f"{alternative_tech} with subsidies", df_total_cost['DCO_alternative_Withincentive'].to_numpy(),
+                       dict(color=ALTERNATIVE_COLOR, dash='dash')))
+
+    data_hash = figure_data_hash(years, series, ylabel)
+    fig = cached_figure("cumulative_costs", data_hash, lambda: cumulative_cost_figure(years, series, ylabel))
 
     return fig, df_total_cost
 
@@ -1115,68 +1525,19 @@ def analyze_break_even_points_interpolated(df_total_cost, base_tech, alternative
         else:
             st.write(f"{alternative_tech} technology with subsidies does not reach break-even with {base_tech} within the evaluated period.")
 
-import pandas as pd
-import plotly.graph_objects as go
-
-import pandas as pd
-import plotly.graph_objects as go
-
-def stacked_bar_DCO(
-    base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost,
-    refueling_station_cost, refueling_station_infra, maintenance_base,
-    maintenance_alt, fuel_base, fuel_alt, v_lifetime, daily_distance,
-    days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate,
-    user_province, energy_price_province, total_infra_cost,
-    existing_vehicle_insurance, alternative_vehicle_insurance,
-    existing_vehicle_depreciation, alternative_vehicle_depreciation,
-    financing_period=None, downpayment=None, financing_rate=None
-):
-    # ---------- Numeric conversions ----------
-    n_vehicles = float(n_vehicles)
-    basevehicle_cost = float(basevehicle_cost)
-    altvehicle_cost = float(altvehicle_cost)
-    maintenance_base = float(maintenance_base)
-    maintenance_alt = float(maintenance_alt)
-    fuel_base = float(fuel_base)
-    fuel_alt = float(fuel_alt)
-    daily_distance = float(daily_distance)
-    days_operation = float(days_operation)
-    v_lifetime = int(v_lifetime)
-    vehicle_subsidy = float(vehicle_subsidy)
-    infrastructure_subsidy = float(infrastructure_subsidy)
-    discount_rate = float(discount_rate)
-
-    existing_vehicle_insurance = float(existing_vehicle_insurance or 0)
-    alternative_vehicle_insurance = float(alternative_vehicle_insurance or 0)
-
-    if existing_vehicle_depreciation not in [None, "", 0]:
-        existing_vehicle_depreciation = float(existing_vehicle_depreciation) / 100
-    else:
-        existing_vehicle_depreciation = None
+def stacked_bar_DCO(base_tech, alternative_tech, results, plot_incentive):
+    """
+    Builds the stacked bar chart of the total discounted costs per category.
 
-    if alternative_vehicle_depreciation not in [None, "", 0]:
-        alternative_vehicle_depreciation = float(alternative_vehicle_depreciation) / 100
-    else:
-        alternative_vehicle_depreciation = None
-
-    if financing_period is None:
-        financing_period = 0
-    if downpayment is None:
-        downpayment = 100
-    if financing_rate is None:
-        financing_rate = 0
-
-    financing_period = int(financing_period)
-    downpayment = float(downpayment) / 100
-    financing_rate = float(financing_rate) / 100
-
-    # ---------- Tax rate ----------
-    provincial_tax = (
-        energy_price_province.loc[
-            energy_price_province["province"] == user_province, "taxes_perc"
-        ].iloc[0] / 100
-    )
+    Parameters:
+        base_tech (str): The label for the base technology (e.g., 'Diesel').
+        alternative_tech (str): The label for the alternative technology (e.g., 'Battery electric').
+        results (dict): Kernel results for the scenario, see evaluate_scenario.
+        plot_incentive (bool): Whether the alternative with subsidies is shown.
 
+    Returns:
+        go.Figure: The stacked bar chart.
+    """
     # ---------- Infra label ----------
     if alternative_tech == "Battery electric":
         infra_label = "Charging Infrastructure"
@@ -1185,117 +1546,30 @@ def stacked_bar_DCO(
     else:
         infra_label = "Charging/Refuelling Infrastructure"
 
-    # ---------- Financing ----------
-    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
-    loan_amount_alt = altvehicle_cost * n_vehicles * (1 - downpayment)
-    loan_amount_alt_sub = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
-
-    if financing_period > 0 and financing_rate > 0:
-        ann_pay_base = (loan_amount_base * financing_rate) / (1 - (1 + financing_rate)**(-financing_period))
-        ann_pay_alt = (loan_amount_alt * financing_rate) / (1 - (1 + financing_rate)**(-financing_period))
-        ann_pay_alt_sub = (loan_amount_alt_sub * financing_rate) / (1 - (1 + financing_rate)**(-financing_period))
-    else:
-        ann_pay_base = ann_pay_alt = ann_pay_alt_sub = 0
-
-    # ---------- Initialize cost storage ----------
-    total_costs = {}
-
-    # Base tech
-    total_costs[base_tech] = {
-        "Vehicle": basevehicle_cost * n_vehicles * downpayment * (1 + provincial_tax),
-        "Maintenance": 0.0,
-        "Fuel": 0.0,
-        "Insurance": 0.0,
-        infra_label: 0.0,
-    }
-
-    # Alternative tech (no subsidy)
-    total_costs[alternative_tech] = {
-        "Vehicle": altvehicle_cost * n_vehicles * downpayment * (1 + provincial_tax),
-        "Maintenance": 0.0,
-        "Fuel": 0.0,
-        "Insurance": 0.0,
-        infra_label: total_infra_cost * (1 + provincial_tax),
-    }
-
-    # Alternative tech (with subsidies)
-    alt_sub_name = alternative_tech + " (with subsidies)"
-    plot_incentive = vehicle_subsidy > 0 or infrastructure_subsidy > 0
-
-    if plot_incentive:
-        total_costs[alt_sub_name] = {
-            "Vehicle": (altvehicle_cost - vehicle_subsidy) * n_vehicles * downpayment * (1 + provincial_tax),
-            "Maintenance": 0.0,
-            "Fuel": 0.0,
-            "Insurance": 0.0,
-            infra_label: (total_infra_cost - infrastructure_subsidy) * (1 + provincial_tax),
-        }
-
-    # ---------- Discounted lifetime accumulation ----------
-    km_year = daily_distance * days_operation * n_vehicles
-
-    for year in range(1, v_lifetime + 1):
-        df = 1 / ((1 + discount_rate) ** year)
-
-        # base tech
-        total_costs[base_tech]["Maintenance"] += maintenance_base * km_year * df
-        total_costs[base_tech]["Fuel"] += fuel_base * km_year * df
-        if existing_vehicle_insurance > 0:
-            total_costs[base_tech]["Insurance"] += existing_vehicle_insurance * km_year * df
-        if year <= financing_period:
-            total_costs[base_tech]["Vehicle"] += ann_pay_base * df
-
-        # alternative techs
-        for tech in total_costs.keys():
-            if tech == base_tech:
-                continue
-
-            total_costs[tech]["Maintenance"] += maintenance_alt * km_year * df
-            total_costs[tech]["Fuel"] += fuel_alt * km_year * df
-            if alternative_vehicle_insurance > 0:
-                total_costs[tech]["Insurance"] += alternative_vehicle_insurance * km_year * df
-
-            if year <= financing_period:
-                if tech == alternative_tech:
-                    total_costs[tech]["Vehicle"] += ann_pay_alt * df
-                elif tech == alt_sub_name:
-                    total_costs[tech]["Vehicle"] += ann_pay_alt_sub * df
-
-    # ---------- Resale ----------
-    if existing_vehicle_depreciation is not None:
-        resale_base = basevehicle_cost * (1 - existing_vehicle_depreciation)**v_lifetime * n_vehicles
-        resale_base /= (1 + discount_rate)**v_lifetime
-        total_costs[base_tech]["Vehicle"] = max(0, total_costs[base_tech]["Vehicle"] - resale_base)
-
-    if alternative_vehicle_depreciation is not None:
-        resale_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation)**v_lifetime * n_vehicles
-        resale_alt /= (1 + discount_rate)**v_lifetime
-        for tech in total_costs.keys():
-            if tech != base_tech:
-                total_costs[tech]["Vehicle"] = max(0, total_costs[tech]["Vehicle"] - resale_alt)
-
     # ---------- Build DataFrame ----------
-    df = pd.DataFrame(total_costs).transpose()
+    categories = [infra_label if category == "Infrastructure" else category for category in CATEGORIES]
+    names = [base_tech, alternative_tech, alternative_tech + " (with subsidies)"]
+    df = pd.DataFrame(np.asarray(results["by_category"], dtype=float), index=names, columns=categories)
+    if not plot_incentive:
+        df = df.iloc[:2]
 
-    # Ensure uniform columns for stacking
-    for col in ["Vehicle", "Maintenance", "Fuel", "Insurance", infra_label]:
-        if col not in df.columns:
-            df[col] = 0.0
+    # Resale can exceed what is left of the vehicle cost; show no vehicle cost rather than a negative bar
+    df["Vehicle"] = df["Vehicle"].clip(lower=0)
 
-    df = df[["Vehicle", infra_label, "Maintenance", "Fuel", "Insurance"]]
+    df = df[["Vehicle", infra_label, "Maintenance", "Fuel", "Insurance", "Lifecycle events"]]
 
     # ---- Drop Insurance if it's zero everywhere ----
     if df["Insurance"].sum() == 0:
         df = df.drop(columns=["Insurance"])
 
+    # ---- Drop lifecycle events if none are scheduled ----
+    if df["Lifecycle events"].sum() == 0:
+        df = df.drop(columns=["Lifecycle events"])
+
     # ---- Drop infra column if zero everywhere (e.g. no infra cost) ----
     if df[infra_label].sum() == 0:
         df = df.drop(columns=[infra_label])
 
-    # ---------- Proportions for labels ----------
-    totals = df.sum(axis=1).replace(0, 1e-9)
-    df_props = df.div(totals, axis=0)
-
     # ---------- Scaling ----------
     max_vehicle_cost = df["Vehicle"].max()
     if max_vehicle_cost < 1e6:
@@ -1305,148 +1579,36 @@ def stacked_bar_DCO(
         scale = 1e6
         ylabel = "Total Costs (Millions $)"
 
-    df_plot = df / scale
+    values = df.to_numpy(dtype=float) / scale
+    scenarios = list(df.index)
+    categories = list(df.columns)
 
     # ---------- Plot ----------
-    fig = go.Figure()
-    colors = ["#215E21", "#507250", "#7E9E7E", "#AFCFAF", "#D3E6D3"]
-
-    for i, col in enumerate(df_plot.columns):
-        fig.add_trace(
-            go.Bar(
-                x=df_plot.index,
-                y=df_plot[col],
-                name=col,
-                marker_color=colors[i % len(colors)],
-                text=(df_props[col] * 100).round(0).astype(int).astype(str) + "%",
-                textposition="inside",
-                hovertemplate=(
-                    "<b>%{x}</b><br>"
-                    + col + " cost: %{y:.2f}<br>"
-                    + col + " share: %{text}<extra></extra>"
-                ),
-            )
-        )
-
-    fig.update_layout(
-        barmode="stack",
-        yaxis_title=ylabel,
-        legend_title="Category",
-        legend=dict(x=1, y=0.5),
-        template="plotly_white",
-        paper_bgcolor="white",
-        plot_bgcolor="white",
-    )
+    data_hash = figure_data_hash(values, scenarios, categories, ylabel)
+    fig = cached_figure("stacked_costs", data_hash, lambda: stacked_cost_figure(scenarios, categories, values, ylabel))
 
     return fig
 
 
 
-def calculate_NPV_and_percent_changes(base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost, refueling_station_cost,
-                                      refueling_station_infra, maintenance_base, maintenance_alt, fuel_base, fuel_alt, v_lifetime,
-                                      daily_distance, days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate, user_province, energy_price_province, total_infra_cost,
-                                      existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation,
-                                      financing_period=None, downpayment=None, financing_rate=None):
-    
-    # Determine tax rate per province
-    provincial_tax = energy_price_province.loc[(energy_price_province['province'] == user_province)]['taxes_perc'].iloc[0] / 100
-    
-    # Initialize variables for financing
-    if financing_period is None:
-        financing_period = 0  # Default to no financing
-    if downpayment is None:
-        downpayment = 100.0  # Default to full payment upfront
-    if financing_rate is None:
-        financing_rate = 0.0  # Default to no interest
-    
-    downpayment /= 100  # Convert downpayment percentage
-    financing_rate /= 100  # Convert financing rate percentage
-    
-    # Adjust vehicle costs for downpayment and tax
-    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
-    loan_amount_alt = altvehicle_cost * n_vehicles * (1 - downpayment)
-    
-    # If subsidies are present, reduce the alternative vehicle cost
-    loan_amount_alt_with_subsidy = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
-    
-    # Calculate annual payments for financing, if any
-    if financing_period > 0:
-        annual_payment_base = (loan_amount_base * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-        annual_payment_alt = (loan_amount_alt * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-        annual_payment_alt_with_subsidy = (loan_amount_alt_with_subsidy * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
-    else:
-        annual_payment_base = 0
-        annual_payment_alt = 0
-        annual_payment_alt_with_subsidy = 0
-    
-    # Determine infrastructure label based on alternative technology
-    infra_label = "Charging Infrastructure" if alternative_tech == "Battery electric" else "Refuelling Infrastructure"
-    
-    # Initialize a dictionary to store total discounted costs
-    total_costs = {
-        base_tech: {'Vehicle': (basevehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax), 'Maintenance': 0, 'Fuel': 0},
-        alternative_tech: {'Vehicle': (altvehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax), infra_label: total_infra_cost * (1 + provincial_tax), 'Maintenance': 0, 'Fuel': 0}
-    }
-    
-    if vehicle_subsidy > 0 or infrastructure_subsidy > 0:
-        total_costs[alternative_tech + ' (with subsidies)'] = {
-            'Vehicle': ((altvehicle_cost - vehicle_subsidy) * n_vehicles * downpayment) * (1 + provincial_tax),
-            infra_label: (total_infra_cost - infrastructure_subsidy) * (1 + provincial_tax),
-            'Maintenance': 0,
-            'Fuel': 0
-        }
-
-    # Calculate total discounted costs for each category over the vehicle lifetime
-    for year in range(1, v_lifetime + 1):
-        discount_factor = 1 / ((1 + discount_rate) ** year)
-        
-        # Base technology
-        total_costs[base_tech]['Maintenance'] += maintenance_base * daily_distance * days_operation * n_vehicles * discount_factor
-        total_costs[base_tech]['Fuel'] += fuel_base * daily_distance * days_operation * n_vehicles * discount_factor
-        
-        if year <= financing_period:
-            total_costs[base_tech]['Vehicle'] += annual_payment_base * discount_factor
-        
-        # Alternative technology
-        for tech in total_costs:
-            if tech != base_tech:
-                total_costs[tech]['Maintenance'] += maintenance_alt * daily_distance * days_operation * n_vehicles * discount_factor
-                total_costs[tech]['Fuel'] += fuel_alt * daily_distance * days_operation * n_vehicles * discount_factor
-                
-                if tech == alternative_tech and year <= financing_period:
-                    total_costs[tech]['Vehicle'] += annual_payment_alt * discount_factor
-                elif tech == alternative_tech + ' (with subsidies)' and year <= financing_period:
-                    total_costs[tech]['Vehicle'] += annual_payment_alt_with_subsidy * discount_factor
-
-    # Calculate resale value only if depreciation inputs are provided
-    if existing_vehicle_depreciation and alternative_vehicle_depreciation:
-        resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
-        resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
-        
-        total_costs[base_tech]['Vehicle'] -= resale_value_base / ((1 + discount_rate) ** v_lifetime)
-        
-        for tech in total_costs:
-            if tech != base_tech:
-                total_costs[tech]['Vehicle'] -= resale_value_alt / ((1 + discount_rate) ** v_lifetime)
-    
-    # Convert total costs to DataFrame
-    df_total_costs = pd.DataFrame(total_costs).transpose()
+def calculate_NPV_and_percent_changes(base_tech, alternative_tech, results, plot_incentive):
+    """
+    Displays the total NPV of each scenario and its change relative to the base technology.
 
-    # Define column order based on the infrastructure type
-    columns = ['Vehicle', 'Maintenance', 'Fuel']
-    if total_infra_cost > 0:
-        columns.insert(1, infra_label)
-    
-    df_total_costs = df_total_costs[columns]
-    
-    # Calculate NPV for each scenario
-    npvs = df_total_costs.sum(axis=1)
+    Parameters:
+        base_tech (str): The label for the base technology (e.g., 'Diesel').
+        alternative_tech (str): The label for the alternative technology (e.g., 'Battery electric').
+        results (dict): Kernel results for the scenario, see evaluate_scenario.
+        plot_incentive (bool): Whether the alternative with subsidies is shown.
+    """
+    npvs = dict(zip([base_tech, alternative_tech, alternative_tech + ' (with subsidies)'], results["npv"]))
+    if not plot_incentive:
+        npvs.pop(alternative_tech + ' (with subsidies)')
     
     # Calculate the percentage change relative to the base scenario
     base_npv = npvs[base_tech]
     
     # Display total NPV and percentage change in Streamlit
-    #st.write("\n=== Total NPV for Each Scenario ===")
     for scenario, npv in npvs.items():
         if scenario == base_tech:
             st.write(f"Total NPV for {scenario}: ${int(npv):,d}")
@@ -1454,27 +1616,22 @@ def calculate_NPV_and_percent_changes(base_tech, alternative_tech, n_vehicles, b
             pct_change = ((npv - base_npv) / base_npv) * 100
             st.write(f"Total NPV for {scenario}: ${int(npv):,d} ({pct_change:.1f}% change relative to {base_tech})")
 
-if (existing_fuel and evaluated_fuel and n_vehicles and existing_price and evaluated_price and existing_maintenance and evaluated_maintenance and existing_fuel_perkm and evaluated_fuel_perkm and vehicle_lifetime and daily_distance and yearly_days_operations and discount_rate and user_province):
-        
+if inputs_complete:
+    plot_incentive = user_vehicle_incentive_amount > 0 or user_chargerRefuelling_incentive_amount > 0
+    # Scenarios that keep every default are served from the precomputed results
+    precomputed = None if catalog_fingerprint else lookup_default_results(default_results, cost_inputs)
+    cost_results = session_results("costs", cost_inputs, lambda: precomputed["costs"] if precomputed else evaluate_scenario(cost_inputs, vehicle_index, province_index))
+
     tab1, tab2 = st.tabs(["Stacked Net Present Value Costs", "Cumulative Costs Over Time"])
 
     with tab1:
-        fig1 = stacked_bar_DCO(existing_fuel, evaluated_fuel, n_vehicles, existing_price, evaluated_price, charging_station_costs,
-              infra_constr_grid_upgrade_costs, existing_maintenance, evaluated_maintenance, existing_fuel_perkm, evaluated_fuel_perkm, vehicle_lifetime,
-              daily_distance, yearly_days_operations, user_vehicle_incentive_amount, user_chargerRefuelling_incentive_amount, discount_rate, user_province, energy_price_province, total_infra_cost,
-              existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation, financing_period, downpayment, financing_rate)
+        fig1 = stacked_bar_DCO(existing_fuel, evaluated_fuel, cost_results, plot_incentive)
         st.plotly_chart(fig1, use_container_width=True)
 
-        calculate_NPV_and_percent_changes(existing_fuel, evaluated_fuel, n_vehicles, existing_price, evaluated_price, charging_station_costs,
-              infra_constr_grid_upgrade_costs, existing_maintenance, evaluated_maintenance, existing_fuel_perkm, evaluated_fuel_perkm, vehicle_lifetime,
-              daily_distance, yearly_days_operations, user_vehicle_incentive_amount, user_chargerRefuelling_incentive_amount, discount_rate, user_province, energy_price_province, total_infra_cost,
-               existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation, financing_period, downpayment, financing_rate)
+        calculate_NPV_and_percent_changes(existing_fuel, evaluated_fuel, cost_results, plot_incentive)
 
     with tab2:
-        fig2, df_total_cost = discounted_TCO(existing_fuel, evaluated_fuel, n_vehicles, existing_price, evaluated_price, charging_station_costs,
-              infra_constr_grid_upgrade_costs, existing_maintenance, evaluated_maintenance, existing_fuel_perkm, evaluated_fuel_perkm, vehicle_lifetime,
-              daily_distance, yearly_days_operations, user_vehicle_incentive_amount, user_chargerRefuelling_incentive_amount, discount_rate, user_province, energy_price_province, total_infra_cost,
-               existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation, financing_period, downpayment, financing_rate)
+        fig2, df_total_cost = discounted_TCO(existing_fuel, evaluated_fuel, cost_results, plot_incentive)
         st.plotly_chart(fig2, use_container_width=True)
 
         analyze_break_even_points_interpolated(df_total_cost, existing_fuel, evaluated_fuel)
@@ -1492,14 +1649,14 @@ st.subheader('5.2 Project emission reductions')
 import streamlit as st
 
 # Function to allow the user to modify electricity or hydrogen intensity
-def show_electricity_hydrogen_intensity(evaluated_fuel, user_province, energy_price_province):
+def show_electricity_hydrogen_intensity(evaluated_fuel, user_province, province_index):
     """
     This function allows the user to modify the intensity (EF) for electricity or hydrogen based on the selected fuel.
     
     Parameters:
     evaluated_fuel (str): The fuel type selected by the user.
     user_province (str): The province of the user, used to adjust electricity factors.
-    energy_price_province (DataFrame): The DataFrame containing energy price information for provinces.
+    province_index (dict): Provincial energy prices and intensities by province.
     
     Returns:
     EF (float): The emission factor chosen or modified by the user.
@@ -1524,35 +1681,35 @@ def show_electricity_hydrogen_intensity(evaluated_fuel, user_province, energy_pr
             EF = hydrogen_EFs[hydrogen_index]  # Get the default EF for the selected hydrogen type
             
             # Show the default EF and allow the user to modify it if desired
-            EF = st.number_input(f"Emission Factor for {hydrogen_type} (gCO2eq/kg):", value=EF)
+            EF = st.number_input(f"Emission Factor for {hydrogen_type} (gCO2eq/kg):", value=scenario_default("hydro_electricity_intensity", EF))
     
     # If the evaluated fuel is electricity, show the electricity EF for the user's province
     elif evaluated_fuel == "Battery electric":
         # Get the default EF for electricity based on the user's province
-        EF = energy_price_province.loc[energy_price_province['province'] == user_province, 'grid_intensity'].values[0]
+        EF = province_index[user_province]['grid_intensity']
         
         # Show the default EF and allow the user to modify it
-        EF = st.number_input(f"Emission Factor for electricity in {user_province} (gCO2eq/kWh):", value=EF)
+        EF = st.number_input(f"Emission Factor for electricity in {user_province} (gCO2eq/kWh):", value=float(scenario_default("hydro_electricity_intensity", EF)))
     
     return EF
 
-hydro_electricity_intensity = show_electricity_hydrogen_intensity(evaluated_fuel, user_province, energy_price_province)
+hydro_electricity_intensity = show_electricity_hydrogen_intensity(evaluated_fuel, user_province, province_index)
+
+scenario_inputs = dict(cost_inputs, hydro_electricity_intensity=hydro_electricity_intensity)
+precomputed = None if catalog_fingerprint else lookup_default_results(default_results, scenario_inputs)
 
 # estimate GHG
-def estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_fuel, evaluated_fuel, n_alternative_fuel_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, evaluated_fuel_efficiency, vehicles_info):
+def estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_fuel, evaluated_fuel, n_alternative_fuel_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, evaluated_fuel_efficiency, vehicle_index, fuel_use=(1.0, 1.0)):
+    # fuel_use: lifetime average energy use relative to new of the existing and alternative vehicles (degradation)
     if existing_fuel == "Diesel":
         # extract ghg EF
-        Diesel_GHG_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == existing_fuel),
-        'GHG EF'].iloc[0]
+        Diesel_GHG_EF = vehicle_index[(user_weight_configuration, existing_fuel)]['GHG EF']
         # estimate GHG emissions
         existing_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * Diesel_GHG_EF
         
     elif existing_fuel == "Gasoline":
         # extract ghg EF
-        Gasoline_GHG_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == existing_fuel),
-        'GHG EF'].iloc[0]
+        Gasoline_GHG_EF = vehicle_index[(user_weight_configuration, existing_fuel)]['GHG EF']
         # estimate GHG emissions
         existing_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * Gasoline_GHG_EF
         
@@ -1565,21 +1722,15 @@ def estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_f
         alternative_total_GHG_emissions= n_alternative_fuel_vehicles * vehicle_lifetime * evaluated_fuel_efficiency * daily_distance * yearly_days_operations * hydro_electricity_intensity
     elif evaluated_fuel == "HEV":
         # extract ghg EF
-        HEV_GHG_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'GHG EF'].iloc[0]
+        HEV_GHG_EF = vehicle_index[(user_weight_configuration, evaluated_fuel)]['GHG EF']
         # estimate GHG emissions
         alternative_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * HEV_GHG_EF
     elif evaluated_fuel == "Biodiesel B20":
-        B20_GHG_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'GHG EF'].iloc[0]
+        B20_GHG_EF = vehicle_index[(user_weight_configuration, evaluated_fuel)]['GHG EF']
          # estimate GHG emissions
         alternative_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * B20_GHG_EF
     elif evaluated_fuel == "Renewable Diesel R99":
-        R99_GHG_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'GHG EF'].iloc[0]
+        R99_GHG_EF = vehicle_index[(user_weight_configuration, evaluated_fuel)]['GHG EF']
          # estimate GHG emissions
         alternative_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * R99_GHG_EF
     elif evaluated_fuel == "Hydrogen Fuel Cell":
@@ -1588,27 +1739,27 @@ def estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_f
         # estimate ghg emissions
         alternative_total_GHG_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * evaluated_fuel_efficiency/100 * daily_distance * yearly_days_operations * hydro_electricity_intensity
         
-    return existing_total_GHG_emissions/1000000, alternative_total_GHG_emissions/1000000
+    return existing_total_GHG_emissions * fuel_use[0]/1000000, alternative_total_GHG_emissions * fuel_use[1]/1000000
 
 if (user_province and existing_fuel and evaluated_fuel and n_vehicles and vehicle_lifetime and daily_distance and yearly_days_operations and evaluated_fuel_efficiency):
-    existing_total_GHG_emissions, alternative_total_GHG_emissions = estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_fuel, evaluated_fuel, n_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, evaluated_fuel_efficiency, vehicles_info)
+    fuel_use = (1.0, 1.0)
+    if efficiency_degradation:
+        fuel_use = tuple(float(lifetime_average(fuel_use_factors(efficiency_degradation, fuel, int(vehicle_lifetime)), vehicle_lifetime))
+                         for fuel in (existing_fuel, evaluated_fuel))
+    existing_total_GHG_emissions, alternative_total_GHG_emissions = session_results("ghg", scenario_inputs, lambda: precomputed["ghg"] if precomputed else estimateGHG_emissions(hydro_electricity_intensity, user_province, existing_fuel, evaluated_fuel, n_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, evaluated_fuel_efficiency, vehicle_index, fuel_use))
 else:
     existing_total_GHG_emissions, alternative_total_GHG_emissions = None, None
     "Please complete previous sections first."
 
 
 # NOx and PM2.5 emission
-def estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_alternative_fuel_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, vehicles_info):
+def estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_alternative_fuel_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, vehicle_index):
 
     # existing fuel NOx and PM2.5 emissions
     # extract NOX and PM2.5 EFs
-    existing_NOx_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == existing_fuel),
-        'NOx EF'].iloc[0]
+    existing_NOx_EF = vehicle_index[(user_weight_configuration, existing_fuel)]['NOx EF']
     
-    existing_PM25_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == existing_fuel),
-        'PM2.5 EF'].iloc[0]
+    existing_PM25_EF = vehicle_index[(user_weight_configuration, existing_fuel)]['PM2.5 EF']
     
     # estimate NOX and PM2.5 emissions
     existing_total_NOX_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * existing_NOx_EF
@@ -1616,13 +1767,9 @@ def estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_alternative_fuel_ve
 
     # Alternative fuel NOx and PM2.5 emissions
     # extract NOX and PM2.5 EFs
-    alternative_NOx_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'NOx EF'].iloc[0]
+    alternative_NOx_EF = vehicle_index[(user_weight_configuration, evaluated_fuel)]['NOx EF']
     
-    alternative_PM25_EF = vehicles_info.loc[
-        (vehicles_info['Weight_Confi'] == user_weight_configuration) & (vehicles_info['Powertrain'] == evaluated_fuel),
-        'PM2.5 EF'].iloc[0]
+    alternative_PM25_EF = vehicle_index[(user_weight_configuration, evaluated_fuel)]['PM2.5 EF']
     
     # estimate NOX and PM2.5 emissions
     alternative_total_NOX_emissions = n_alternative_fuel_vehicles * vehicle_lifetime * daily_distance * yearly_days_operations * alternative_NOx_EF
@@ -1632,7 +1779,7 @@ def estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_alternative_fuel_ve
     return existing_total_NOX_emissions, existing_total_PM25_emissions , alternative_total_NOX_emissions, alternative_total_PM25_emissions
 
 if (existing_fuel and evaluated_fuel and n_vehicles and vehicle_lifetime and daily_distance and yearly_days_operations):
-    existing_total_NOX_emissions, existing_total_PM25_emissions , alternative_total_NOX_emissions, alternative_total_PM25_emissions = estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, vehicles_info)
+    existing_total_NOX_emissions, existing_total_PM25_emissions , alternative_total_NOX_emissions, alternative_total_PM25_emissions = session_results("nox_pm25", scenario_inputs, lambda: precomputed["nox_pm25"] if precomputed else estimateNOXPM_emissions(existing_fuel, evaluated_fuel, n_vehicles, vehicle_lifetime, daily_distance, yearly_days_operations, energy_price_province, vehicle_index))
 else:
     existing_total_NOX_emissions, existing_total_PM25_emissions , alternative_total_NOX_emissions, alternative_total_PM25_emissions = None, None, None, None
 
@@ -1676,3 +1823,582 @@ if (existing_total_NOX_emissions is not None and existing_total_PM25_emissions i
         alternative_total_NOX_emissions, alternative_total_PM25_emissions,
         existing_total_GHG_emissions, alternative_total_GHG_emissions)
 
+
+def show_lifecycle_emissions(existing_total_GHG_emissions, alternative_total_GHG_emissions, user_weight_configuration, existing_fuel,
+                             evaluated_fuel, n_vehicles, vehicle_lifetime, total_infra_cost, embodied_factors):
+    """
+    Displays the lifecycle GHG emissions, adding the embodied emissions of the vehicles, their batteries and the
+    infrastructure to the well-to-wheel emissions, and the carbon payback year.
+
+    Parameters:
+        existing_total_GHG_emissions (float): Existing well-to-wheel GHG emissions in tonnes.
+        alternative_total_GHG_emissions (float): Alternative well-to-wheel GHG emissions in tonnes.
+        user_weight_configuration (str): Weight class and configuration of the vehicles.
+        existing_fuel (str): Fuel type of the existing vehicle.
+        evaluated_fuel (str): Fuel type of the evaluated vehicle.
+        n_vehicles (int): Number of vehicles.
+        vehicle_lifetime (int): Number of years of operation.
+        total_infra_cost (float): Charging or refuelling infrastructure cost ($).
+        embodied_factors (dict): Embodied emissions per vehicle, see embodied_emissions.load_embodied_factors.
+    """
+    vehicle, battery = embodied_per_vehicle(embodied_factors, user_weight_configuration, [existing_fuel, evaluated_fuel])
+    if np.isnan(vehicle).any() or np.isnan(battery).any():
+        st.info(f"Embodied emissions are not available for the {user_weight_configuration} selected; lifecycle emissions are not shown.")
+        return
+    infra = float(infrastructure_embodied(total_infra_cost or 0.0))
+    lifecycle = lifecycle_ghg(n_vehicles, vehicle_lifetime, [existing_total_GHG_emissions, alternative_total_GHG_emissions],
+                              vehicle + battery, infra)
+    total = lifecycle["total"]
+    payback = float(lifecycle["payback"])
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Lifecycle GHG Reduction (CO2eq)", f"{total[0] - total[1]:.0f} tonnes",
+                f"{-(total[0] - total[1]) / total[0] * 100:.2f}%", delta_color="inverse")
+    col2.metric("Carbon payback year", "Immediate" if payback == 0 else "Not within lifetime" if np.isnan(payback) else f"{payback:.1f}",
+                help="Year in which the alternative's cumulative lifecycle emissions fall to those of the existing vehicles.")
+    col3.metric(f"{evaluated_fuel} embodied emissions", f"{lifecycle['amortized'][1]:.1f} tonnes/year",
+                help="Manufacturing and infrastructure emissions amortized over the vehicle lifetime.")
+
+    with st.expander("Lifecycle emissions breakdown"):
+        breakdown = pd.DataFrame({
+            existing_fuel: [vehicle[0] * n_vehicles, battery[0] * n_vehicles, 0.0, existing_total_GHG_emissions],
+            evaluated_fuel: [vehicle[1] * n_vehicles, battery[1] * n_vehicles, infra, alternative_total_GHG_emissions],
+        }, index=["Vehicle manufacturing", "Battery manufacturing", "Infrastructure construction", "Operation (well to wheel)"])
+        breakdown.loc["Total"] = breakdown.sum()
+        st.dataframe(breakdown.style.format("{:,.1f}"), use_container_width=True)
+        st.caption("Tonnes of CO2eq over the vehicle lifetime. Infrastructure emissions are estimated from its cost.")
+
+if existing_total_GHG_emissions is not None and alternative_total_GHG_emissions is not None:
+    show_lifecycle_emissions(existing_total_GHG_emissions, alternative_total_GHG_emissions, user_weight_configuration, existing_fuel,
+                             evaluated_fuel, n_vehicles, vehicle_lifetime, total_infra_cost, embodied_factors)
+
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for comparison of every alternative
+st.subheader('5.3 Compare all alternatives')
+
+
+def show_alternatives_comparison(scenario_inputs, vehicle_index, province_index, incentive_tables, embodied_factors):
+    """
+    Evaluates every alternative powertrain available for the selected configuration in one batched
+    computation and displays a ranked table and an overlay of the cumulative costs.
+
+    Parameters:
+        scenario_inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Vehicle catalog index.
+        province_index (dict): Provincial energy price index.
+        incentive_tables (dict): Compiled incentive rules giving the other alternatives' subsidies.
+        embodied_factors (dict): Embodied emissions per vehicle, for the lifecycle GHG reductions.
+    """
+    if not st.checkbox("Evaluate every alternative powertrain for this configuration"):
+        return
+
+    existing_fuel = scenario_inputs["existing_fuel"]
+    alternatives = available_alternatives(vehicle_index, scenario_inputs["user_weight_configuration"])
+    result = evaluate_alternatives(scenario_inputs, vehicle_index, province_index, alternatives, incentive_tables, embodied_factors)
+
+    base_npv = result["npv"][0, 0]
+    with_subsidies = result["npv"][:, 2]
+    table = pd.DataFrame({
+        "Alternative": alternatives,
+        "NPV ($)": result["npv"][:, 1],
+        "NPV with subsidies ($)": with_subsidies,
+        f"Change vs {existing_fuel} (%)": (with_subsidies - base_npv) / base_npv * 100,
+        "Break-even year": result["break_even"][:, 1],
+        "GHG reduction (tonnes)": result["ghg"][:, 0] - result["ghg"][:, 1],
+        "Lifecycle GHG reduction (tonnes)": result["lifecycle_ghg"][:, 0] - result["lifecycle_ghg"][:, 1],
+        "Carbon payback year": result["carbon_payback"],
+        "NOx reduction (kg)": (result["nox"][:, 0] - result["nox"][:, 1]) / 1000,
+        "PM2.5 reduction (kg)": (result["pm25"][:, 0] - result["pm25"][:, 1]) / 1000,
+    })
+    # The other alternatives may get the subsidy of the incentive rules even when none is entered
+    if np.array_equal(result["npv"][:, 2], result["npv"][:, 1]):
+        table = table.drop(columns=["NPV with subsidies ($)"])
+    table = table.sort_values(f"Change vs {existing_fuel} (%)").reset_index(drop=True)
+    table.index += 1
+
+    st.caption(f"Alternatives ranked by NPV against {existing_fuel} (total NPV ${int(base_npv):,d}). "
+               f"Your inputs apply to {scenario_inputs['evaluated_fuel']}; other alternatives use catalog and provincial defaults "
+               "without infrastructure costs, with the vehicle subsidy of the incentive rules.")
+    st.dataframe(table.style.format({
+        "NPV ($)": "{:,.0f}", "NPV with subsidies ($)": "{:,.0f}", f"Change vs {existing_fuel} (%)": "{:.1f}",
+        "Break-even year": "{:.2f}", "GHG reduction (tonnes)": "{:.0f}", "Lifecycle GHG reduction (tonnes)": "{:.0f}",
+        "Carbon payback year": "{:.1f}", "NOx reduction (kg)": "{:.1f}",
+        "PM2.5 reduction (kg)": "{:.1f}",
+    }, na_rep="-"), use_container_width=True)
+
+    # Overlay chart of the cumulative costs with subsidies, on the same scale rule as discounted_TCO
+    cumulative = result["cumulative"]
+    scale, ylabel = (1e3, 'Cumulative Costs \n(Thousands $)') if cumulative[:, 1].max() < 1e6 else (1e6, 'Cumulative Costs \n(Millions $)')
+    years = np.arange(cumulative.shape[-1])
+    base_values = cumulative[0, 0] / scale
+    values = cumulative[:, 2] / scale
+    data_hash = figure_data_hash(years, base_values, values, alternatives, ylabel)
+    fig = cached_figure("alternatives_overlay", data_hash,
+                        lambda: overlay_cost_figure(years, existing_fuel, base_values, alternatives, values, ylabel))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+if inputs_complete:
+    show_alternatives_comparison(scenario_inputs, vehicle_index, province_index, incentive_tables, embodied_factors)
+else:
+    st.write("Please complete all input fields.")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for the cross-province view
+st.subheader('5.4 Compare across provinces')
+
+
+def show_province_heatmap(scenario_inputs, vehicle_index, province_index, incentive_tables):
+    """
+    Evaluates the current configuration in every province in one batched computation and displays
+    the NPV difference, break-even year and GHG reduction as a heatmap.
+
+    Parameters:
+        scenario_inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Vehicle catalog index.
+        province_index (dict): Provincial energy price index.
+        incentive_tables (dict): Compiled incentive rules giving the other provinces' subsidies.
+    """
+    if not st.checkbox("Evaluate this configuration in every province"):
+        return
+
+    result = evaluate_provinces(scenario_inputs, vehicle_index, province_index, incentive_tables)
+    # Provinces other than the user's take the subsidies of the incentive rules
+    has_subsidies = bool(np.any(result["npv"][:, 2] != result["npv"][:, 1]))
+    series = 2 if has_subsidies else 1
+
+    npv_delta = result["npv"][:, series] - result["npv"][:, 0]
+    break_even = result["break_even"][:, series - 1]
+    ghg_reduction = result["ghg"][:, 0] - result["ghg"][:, 1]
+    values = np.stack([npv_delta, break_even, ghg_reduction], axis=1)
+    text = [[f"${delta:,.0f}", "-" if np.isnan(year) else f"{year:.1f}", f"{ghg:,.0f} t"]
+            for delta, year, ghg in values]
+
+    suffix = " with subsidies" if has_subsidies else ""
+    metrics = [f"NPV difference vs {scenario_inputs['existing_fuel']}{suffix}", f"Break-even year{suffix}", "GHG reduction"]
+    provinces = list(result["province"])
+
+    st.caption(f"{scenario_inputs['evaluated_fuel']} replacing {scenario_inputs['existing_fuel']} in each province, using provincial "
+               "fuel prices, taxes, emission intensities and incentive programs (your own values for your province). Green is most favourable.")
+    data_hash = figure_data_hash(values, provinces, metrics)
+    fig = cached_figure("province_heatmap", data_hash,
+                        lambda: province_heatmap_figure(provinces, metrics, values, text, [True, True, False]))
+    st.plotly_chart(fig, use_container_width=True)
+
+
+if inputs_complete:
+    show_province_heatmap(scenario_inputs, vehicle_index, province_index, incentive_tables)
+else:
+    st.write("Please complete all input fields.")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for the abatement cost curve
+st.subheader('5.5 Marginal abatement cost curve')
+
+
+def show_abatement_curve(user_province, existing_fuel, default_results, dutycycle_index):
+    """
+    Displays the cost per tonne of CO2eq avoided for every vehicle configuration and alternative powertrain
+    in the province, as a stepped curve weighted by the number of vehicles of each configuration.
+
+    Parameters:
+        user_province (str): Province of operation.
+        existing_fuel (str): Fuel replaced; Diesel if none is selected.
+        default_results (dict): Precomputed default results of the whole catalog.
+        dutycycle_index (dict): Duty cycles by Weight_Confi, listing the vehicle configurations.
+    """
+    if not st.checkbox("Build the abatement cost curve for the whole catalog"):
+        return
+
+    existing_fuel = existing_fuel or "Diesel"
+    costs = abatement_costs(default_results, user_province, existing_fuel)
+
+    st.caption(f"Lifetime NPV difference against {existing_fuel} divided by the lifetime GHG reduction, per vehicle, "
+               f"at the catalog, duty cycle and {user_province} defaults without infrastructure costs or subsidies. "
+               "Enter your fleet to weight each configuration; alternatives for the same configuration are competing options, "
+               "so the curve shows the cheapest per tonne of each.")
+    configurations = list(dutycycle_index)
+    fleet = st.data_editor(
+        pd.DataFrame({"Weight_Confi": configurations, "Vehicles": 1}),
+        disabled=["Weight_Confi"],
+        hide_index=True,
+        use_container_width=True,
+        column_config={"Weight_Confi": "Vehicle", "Vehicles": st.column_config.NumberColumn(min_value=0, step=1)},
+        key="abatement_fleet",
+    )
+    curve = abatement_curve(costs, dict(zip(fleet["Weight_Confi"], fleet["Vehicles"].fillna(0))))
+    if curve.empty:
+        st.write("No configuration of the fleet reduces emissions.")
+        return
+
+    labels = (curve["Weight_Confi"] + " - " + curve["Powertrain"]).tolist()
+    data_hash = figure_data_hash(curve["start"].to_numpy(), curve["abatement"].to_numpy(),
+                                 curve["cost_per_tonne"].to_numpy(), labels)
+    fig = cached_figure("abatement_curve", data_hash, lambda: abatement_curve_figure(
+        curve["Weight_Confi"].tolist(), curve["Powertrain"].tolist(), curve["start"].to_numpy(),
+        curve["abatement"].to_numpy(), curve["cost_per_tonne"].to_numpy(), list(ALTERNATIVE_FUELS)))
+    st.plotly_chart(fig, use_container_width=True)
+
+    savings = curve[curve["cost_per_tonne"] < 0]
+    st.write(f"{len(savings)} of {len(curve)} configurations abate emissions at a net saving with their cheapest "
+             f"alternative, for {savings['abatement'].sum():,.0f} tonnes CO2eq if each were adopted.")
+    with st.expander("Every alternative of each configuration"):
+        st.dataframe(costs.rename(columns={"Weight_Confi": "Vehicle", "npv_delta": "NPV difference per vehicle ($)",
+                                           "ghg_reduction": "GHG reduction per vehicle (tonnes)",
+                                           "cost_per_tonne": "Abatement cost ($/tCO2eq)"}),
+                     hide_index=True, use_container_width=True)
+
+
+if user_province:
+    show_abatement_curve(user_province, existing_fuel, default_results, dutycycle_index)
+else:
+    st.write("Please select a province first.")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for the goal seek
+st.subheader('5.6 Goal seek')
+
+
+def show_goal_seek(scenario_inputs, vehicle_index, province_index):
+    """
+    Solves for the value of one input at which the alternative reaches parity with the existing vehicle,
+    for the scenario entered above and for any duty cycle variants added to the table, in one batch.
+
+    Parameters:
+        scenario_inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Vehicle catalog index.
+        province_index (dict): Provincial energy price index.
+    """
+    if not st.checkbox("Find the value that reaches parity"):
+        return
+
+    name = st.selectbox("Solve for:", options=list(SOLVABLE_INPUTS), format_func=SOLVABLE_INPUTS.get, key="goal_seek_input")
+    lifetime = int(scenario_inputs["vehicle_lifetime"])
+    target = st.radio("Target:", options=["Equal NPV over the vehicle lifetime", "Break-even by a given year"], key="goal_seek_target")
+    target_year = None
+    if target == "Break-even by a given year":
+        target_year = st.number_input("Break-even year:", min_value=1, max_value=lifetime, value=min(5, lifetime), step=1, key="goal_seek_year")
+    has_subsidies = bool(scenario_inputs["user_vehicle_incentive_amount"] or scenario_inputs["user_chargerRefuelling_incentive_amount"])
+    with_subsidies = has_subsidies or name == "user_vehicle_incentive_amount"
+
+    st.caption("Add rows to solve other duty cycles at the same time; the first row is the scenario entered above.")
+    variants = st.data_editor(
+        pd.DataFrame({"Vehicles": [scenario_inputs["n_vehicles"]], "Daily distance (km)": [scenario_inputs["daily_distance"]],
+                      "Days of operation per year": [scenario_inputs["yearly_days_operations"]]}),
+        num_rows="dynamic",
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            "Vehicles": st.column_config.NumberColumn(min_value=1, step=1, required=True),
+            "Daily distance (km)": st.column_config.NumberColumn(min_value=1, required=True),
+            "Days of operation per year": st.column_config.NumberColumn(min_value=1, max_value=365, step=1, required=True),
+        },
+        key="goal_seek_variants",
+    ).dropna().reset_index(drop=True)
+    if variants.empty:
+        return
+
+    batch_inputs = dict(scenario_inputs, n_vehicles=variants["Vehicles"].to_numpy(dtype=float),
+                        daily_distance=variants["Daily distance (km)"].to_numpy(dtype=float),
+                        yearly_days_operations=variants["Days of operation per year"].to_numpy(dtype=float))
+    result = goal_seek(batch_inputs, name, vehicle_index, province_index, target_year=target_year, with_subsidies=with_subsidies)
+
+    value, current_gap = result["value"], result["current_gap"]
+    decimals = 3 if name in ("evaluated_fuel_price", "existing_fuel_price") else 0
+    label = SOLVABLE_INPUTS[name]
+    goal = "equal NPV" if target_year is None else f"break-even by year {target_year}"
+    if np.isfinite(value[0]):
+        st.markdown(f"**{label}** for {goal}: **{value[0]:,.{decimals}f}** (currently {float(scenario_inputs[name] or 0):,.{decimals}f}).")
+    elif current_gap[0] <= 0:
+        st.markdown(f"{scenario_inputs['evaluated_fuel']} already reaches {goal} with the values entered.")
+    else:
+        st.markdown(f"No {label.lower()} reaches {goal} when the other inputs are kept.")
+
+    if len(variants) > 1:
+        table = variants.copy()
+        table[label] = np.where(np.isfinite(value), np.round(value, decimals), np.nan)
+        table["Status"] = np.where(np.isfinite(value), "Solved", np.where(current_gap <= 0, "Already at parity", "Unreachable"))
+        st.dataframe(table, hide_index=True, use_container_width=True)
+    st.caption(f"Solved with {result['evaluations']} batched model evaluations.")
+
+
+if inputs_complete:
+    show_goal_seek(scenario_inputs, vehicle_index, province_index)
+else:
+    st.write("Please complete all input fields.")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for the cost and emissions trade-off
+st.subheader('5.7 Cost and emissions trade-off')
+
+
+def show_pareto_frontier(scenario_inputs, vehicle_index, province_index, incentive_tables, embodied_factors, charging_infra_info, station_components):
+    """
+    Evaluates every combination of alternative powertrain, charging or refuelling infrastructure and vehicle
+    financing for the selected configuration in one batched computation, and plots their NPV against their
+    lifetime GHG emissions with the Pareto frontier of the options no other option beats on both.
+
+    Parameters:
+        scenario_inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Vehicle catalog index.
+        province_index (dict): Provincial energy price index.
+        incentive_tables (dict): Compiled incentive rules giving the subsidies of the options.
+        embodied_factors (dict): Embodied emissions per vehicle, for lifecycle emissions.
+        charging_infra_info (DataFrame): Charger models and prices.
+        station_components (dict): Hydrogen station component costs.
+    """
+    if not st.checkbox("Map the cost and emissions trade-off across every option"):
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        charging_hours = st.number_input("Hours a day the vehicles can charge:", min_value=1.0, max_value=24.0,
+                                         value=CHARGING_HOURS, step=1.0)
+    with col2:
+        financing_rate = st.number_input("Interest rate of the financing options (%):", min_value=0.0, max_value=100.0,
+                                         value=5.0 if scenario_inputs["financing_rate"] is None
+                                         else float(scenario_inputs["financing_rate"]), step=0.1)
+
+    weight_configuration = scenario_inputs["user_weight_configuration"]
+    evaluated_fuel = scenario_inputs["evaluated_fuel"]
+    n_vehicles, daily_distance = scenario_inputs["n_vehicles"], scenario_inputs["daily_distance"]
+    infrastructure = {}
+    for fuel in available_alternatives(vehicle_index, weight_configuration):
+        efficiency = (scenario_inputs["evaluated_fuel_efficiency"] if fuel == evaluated_fuel
+                      else vehicle_index[(weight_configuration, fuel)]["FuelEfficiencyCAD"])
+        if fuel == "Battery electric":
+            choices = charger_options(charging_infra_info, n_vehicles, efficiency * daily_distance, charging_hours)
+        elif fuel == "Hydrogen Fuel Cell":
+            choices = station_options(station_components, n_vehicles, daily_distance, efficiency)
+        else:
+            choices = [("No new infrastructure", 0.0)]
+        if fuel == evaluated_fuel and scenario_inputs["total_infra_cost"]:
+            choices = [("Infrastructure as entered", float(scenario_inputs["total_infra_cost"]))] + choices
+        if choices:
+            infrastructure[fuel] = choices
+
+    # Lifecycle emissions when every vehicle has embodied factors, well-to-wheel emissions otherwise
+    vehicle, _ = embodied_per_vehicle(embodied_factors, weight_configuration, [scenario_inputs["existing_fuel"]] + list(infrastructure))
+    embodied = embodied_factors if not np.isnan(vehicle).any() else None
+
+    started = datetime.now()
+    options = option_grid(infrastructure, financing_options(financing_rate, scenario_inputs["financing_residual"] or DEFAULT_RESIDUAL))
+    result = evaluate_options(scenario_inputs, vehicle_index, province_index, options, incentive_tables, embodied)
+    npv, ghg = result["npv"][:, 2], result["ghg"][:, 1]
+    front = pareto_front(npv, ghg)
+    elapsed = (datetime.now() - started).total_seconds()
+
+    emissions = "lifecycle" if embodied is not None else "well-to-wheel"
+    st.caption(f"NPV with subsidies against {emissions} GHG emissions of {len(npv):,d} options: every alternative powertrain, "
+               f"charger mix or refuelling station, and financing plan (evaluated in {elapsed * 1000:,.0f} ms). "
+               f"On the frontier ({int(front.sum())} of them), no other option is cheaper without emitting more.")
+    labels = options["powertrain"].astype(object) + ", " + options["infrastructure"] + ", " + options["financing"]
+    # The existing vehicles paid in cash, the first financing option of the grid
+    base_point = (result["npv"][0, 0], result["ghg"][0, 0])
+    data_hash = figure_data_hash(npv, ghg, front, base_point)
+    fig = cached_figure("pareto_frontier", data_hash, lambda: pareto_figure(
+        npv, ghg, labels, options["powertrain"], front, list(ALTERNATIVE_FUELS), f"{scenario_inputs['existing_fuel']} (existing)", base_point))
+    st.plotly_chart(fig, use_container_width=True)
+
+    table = pd.DataFrame({
+        "Alternative": options["powertrain"][front],
+        "Infrastructure": options["infrastructure"][front],
+        "Financing": options["financing"][front],
+        "NPV ($)": npv[front],
+        "GHG (tonnes)": ghg[front],
+        "GHG reduction (tonnes)": base_point[1] - ghg[front],
+    }).sort_values("NPV ($)", ignore_index=True)
+    table.index += 1
+    st.dataframe(table.style.format({"NPV ($)": "{:,.0f}", "GHG (tonnes)": "{:,.0f}", "GHG reduction (tonnes)": "{:,.0f}"}),
+                 use_container_width=True)
+
+
+if inputs_complete:
+    show_pareto_frontier(scenario_inputs, vehicle_index, province_index, incentive_tables, embodied_factors, charging_infra_info, station_components)
+else:
+    st.write("Please complete all input fields.")
+
+st.markdown("<br>", unsafe_allow_html=True)
+
+# Section title for saving, sharing and reloading scenarios
+st.header("6. Saved scenarios")
+
+
+def show_scenario_store(scenario_inputs, cost_results):
+    """
+    Saves the current scenario with its results to the scenario store, lists saved scenarios by
+    province, vehicle configuration and alternative powertrain, and reloads a scenario by ID.
+
+    Parameters:
+        scenario_inputs (dict): The scenario entered in the app.
+        cost_results (dict): Kernel summary of the scenario, or None if the inputs are incomplete.
+    """
+    loaded = st.session_state.get("loaded_scenario")
+    if loaded:
+        st.caption(f"Loaded scenario {loaded['scenario_id']} ({loaded['name']}, saved {loaded['created_at']}).")
+
+    # Default name from the selections made so far, e.g. "Class 8 Tractor Battery electric in Quebec"
+    described = " ".join(str(value) for value in (user_weight_configuration, evaluated_fuel) if value)
+    default_name = f"{described} in {user_province}" if described and user_province else described or user_province or ""
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        scenario_name = st.text_input("Scenario name:", value=default_name)
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        save = st.button("Save scenario", disabled=cost_results is None)
+    if save:
+        outputs = {
+            "costs": cost_results,
+            "ghg": (existing_total_GHG_emissions, alternative_total_GHG_emissions),
+            "nox_pm25": (existing_total_NOX_emissions, existing_total_PM25_emissions, alternative_total_NOX_emissions, alternative_total_PM25_emissions),
+        }
+        scenario_id = save_scenario(scenario_name, scenario_inputs, outputs)
+        st.success(f"Saved as scenario {scenario_id}. Share it by adding ?scenario={scenario_id} to this page's address.")
+
+    st.subheader("Find saved scenarios")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        province_filter = st.selectbox("Province:", options=[""] + sorted(province_index), key="scenario_filter_province")
+    with col2:
+        configuration_filter = st.selectbox("Vehicle:", options=[""] + sorted(vehicles_info["Weight_Confi"].dropna().unique()), key="scenario_filter_configuration")
+    with col3:
+        powertrain_filter = st.selectbox("Alternative powertrain:", options=[""] + list(ALTERNATIVE_FUELS), key="scenario_filter_powertrain")
+
+    scenarios = find_scenarios(province_filter, configuration_filter, powertrain_filter)
+    if scenarios:
+        st.dataframe(pd.DataFrame(scenarios), hide_index=True, use_container_width=True)
+    else:
+        st.write("No saved scenarios match these filters.")
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        scenario_id = st.text_input("Scenario ID to load:", key="scenario_load_id").strip()
+    with col2:
+        st.markdown("<br>", unsafe_allow_html=True)
+        load = st.button("Load scenario", disabled=not scenario_id)
+    if load:
+        scenario = load_scenario(scenario_id)
+        if scenario is None:
+            st.warning(f"Scenario {scenario_id} was not found.")
+        else:
+            apply_loaded_scenario(scenario)
+            st.query_params["scenario"] = scenario_id
+            st.rerun()
+
+
+show_scenario_store(scenario_inputs, cost_results if inputs_complete else None)
+
+
+st.header("7. Fleet inventory")
+
+# Fragments rerun on their own, so the job progress refreshes without rerunning the whole page
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+
+def get_fleet_inventory():
+    """
+    Lets the user upload a fleet inventory (CSV or Excel, one row per group of vehicles, see fleet.py).
+
+    Returns:
+        DataFrame: The valid rows of the inventory, or None.
+    """
+    file = st.file_uploader("Fleet inventory with the columns " + ", ".join(FLEET_COLUMNS) + " and optionally "
+                            + ", ".join(list(DUTY_CYCLE_COLUMNS) + list(COST_COLUMNS)) + ":", type=["csv", "xlsx", "xls"],
+                            key="fleet_upload")
+    if not file:
+        return None
+
+    # The file is validated once per upload, not on every rerun; a new upload gets a new file id even when it has the
+    # same name and size
+    upload_key = file.file_id
+    cached = st.session_state.get("fleet_inventory")
+    if cached is None or cached[0] != upload_key:
+        try:
+            valid, errors = validate_fleet(read_catalog(file, file.name), vehicle_index, dutycycle_index, province_index)
+        except ValueError as e:
+            st.error(str(e))
+            return None
+        cached = (upload_key, dict(valid=valid, errors=errors))
+        st.session_state["fleet_inventory"] = cached
+    fleet, errors = cached[1]["valid"], cached[1]["errors"]
+
+    st.write(f"{len(fleet):,d} vehicle groups loaded ({fleet['Vehicles'].sum():,d} vehicles).")
+    if len(errors):
+        st.warning(f"{errors['row'].nunique():,d} rows were rejected:")
+        st.dataframe(errors.head(1000), hide_index=True, use_container_width=True)
+    return fleet if len(fleet) else None
+
+
+@fragment(run_every=2)
+def show_fleet_progress(job_id):
+    """
+    Polls a queued or running fleet evaluation, with a cancel button, and reruns the page once it has finished.
+    """
+    status = job_status(job_id)
+    if status is None or status["status"] not in ACTIVE_STATUSES:
+        st.rerun()
+    st.progress(status["progress"], text=status["message"])
+    if st.button("Cancel evaluation", key="fleet_cancel"):
+        cancel_job(job_id)
+
+
+def show_fleet_job():
+    """
+    Shows the session's fleet evaluation: its progress while it runs (the only part polled) and the results once
+    it is done.
+    """
+    job_id = st.session_state.get("fleet_job")
+    if job_id is None:
+        return
+    status = job_status(job_id)
+    if status is None:
+        st.info("The fleet evaluation result expired; evaluate the fleet again.")
+        return
+
+    if status["status"] in ACTIVE_STATUSES:
+        show_fleet_progress(job_id)
+    elif status["status"] == "failed":
+        st.error(f"The fleet evaluation failed: {status['error']}")
+    elif status["status"] == "cancelled":
+        st.info("The fleet evaluation was cancelled.")
+    else:
+        results = job_result(job_id)
+        if results is None:
+            st.info("The fleet evaluation result expired; evaluate the fleet again.")
+            return
+        totals = results[["Vehicles", "NPV existing ($)", "NPV alternative ($)", "NPV alternative with subsidies ($)",
+                          "GHG existing (t)", "GHG alternative (t)", "GHG reduction (t)"]].sum()
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Vehicles", f"{totals['Vehicles']:,.0f}")
+        col2.metric("NPV difference with subsidies", f"${totals['NPV alternative with subsidies ($)'] - totals['NPV existing ($)']:,.0f}")
+        col3.metric("GHG reduction", f"{totals['GHG reduction (t)']:,.0f} t")
+        st.caption("Each group is costed with its own charging or refuelling infrastructure: the cost given in the "
+                   "inventory, or else the cheapest chargers or hydrogen station for its vehicles, with the "
+                   "infrastructure subsidy of the incentive rules. Insurance is only included for the groups that give it.")
+        st.dataframe(results.head(1000), hide_index=True, use_container_width=True)
+        # The CSV is written once per job rather than on every rerun
+        csv = st.session_state.get("fleet_results_csv")
+        if csv is None or csv[0] != job_id:
+            csv = (job_id, results.to_csv(index=False).encode("utf-8"))
+            st.session_state["fleet_results_csv"] = csv
+        st.download_button("Download fleet results (CSV)", csv[1], file_name="fleet_results.csv", mime="text/csv")
+
+
+with st.expander("Evaluate a whole fleet"):
+    fleet_inventory = get_fleet_inventory()
+    if st.button("Evaluate fleet in the background", disabled=fleet_inventory is None):
+        try:
+            st.session_state["fleet_job"] = submit_job(
+                evaluate_fleet, fleet_inventory, vehicle_index, dutycycle_index, province_index, incentive_tables,
+                discount_rate, chargers=charging_infra_info, station_components=station_components,
+                owner=st.session_state["session_id"], kind="fleet", weight=len(fleet_inventory))
+        except RuntimeError as e:
+            st.warning(str(e))
+    show_fleet_job()
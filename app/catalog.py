@@ -0,0 +1,123 @@
+"""
+Lookup indexes over the reference datasets loaded by load_datasets.
+
+The app repeatedly filters the vehicle, duty-cycle and province tables with boolean
+masks to fetch a single row. These helpers build plain dictionaries once so that
+batch views can fetch catalog defaults in O(1).
+
+build_option_tree does the same for the cascading vehicle selectors: the options
+of every dropdown are computed once, so that rendering a selector is a dict
+lookup.
+"""
+from tco_kernel import ALTERNATIVE_FUELS
+
+# Vehicle applications, in the order the app lists them
+VEHICLE_APPLICATIONS = ("Passenger Transport", "Freight and Cargo", "Specialized Services")
+
+# Alternatives offered for every configuration; hydrogen and hybrid ones only where the catalog has a model
+COMMON_ALTERNATIVES = ("Biodiesel B20", "Renewable Diesel R99", "Battery electric")
+
+
+def build_vehicle_index(vehicles_info):
+    """
+    Indexes the vehicle catalog by (Weight_Confi, Powertrain).
+
+    Parameters:
+        vehicles_info (DataFrame): Vehicle catalog with a 'Weight_Confi' column.
+
+    Returns:
+        dict: Maps (Weight_Confi, Powertrain) to a dict of the first matching row, as .iloc[0] would.
+    """
+    index = {}
+    for record in vehicles_info.dropna(subset=["Weight_Confi", "Powertrain"]).to_dict("records"):
+        index.setdefault((record["Weight_Confi"], record["Powertrain"]), record)
+    return index
+
+
+def build_dutycycle_index(vehicles_dutycycles):
+    """
+    Indexes the duty cycles by Weight_Confi.
+
+    Returns:
+        dict: Maps Weight_Confi to a dict of the first matching row.
+    """
+    index = {}
+    for record in vehicles_dutycycles.dropna(subset=["Weight_Confi"]).to_dict("records"):
+        index.setdefault(record["Weight_Confi"], record)
+    return index
+
+
+def build_province_index(energy_price_province, fuel_escalation=None):
+    """
+    Indexes the provincial energy prices by province.
+
+    Parameters:
+        energy_price_province (DataFrame): Provincial energy prices.
+        fuel_escalation (DataFrame): Optional yearly fuel price escalation (%) per province and fuel.
+
+    Returns:
+        dict: Maps the province name to a dict of its prices, intensities and tax rate, plus an 'escalation'
+        dict of fuel price escalation rates when fuel_escalation is given.
+    """
+    index = {record["province"]: record for record in energy_price_province.to_dict("records")}
+    if fuel_escalation is not None:
+        for record in fuel_escalation.to_dict("records"):
+            province = record.pop("province")
+            if province in index:
+                index[province]["escalation"] = record
+    return index
+
+
+def available_alternatives(vehicle_index, weight_configuration):
+    """
+    Alternative powertrains available in the catalog for a vehicle configuration.
+
+    Parameters:
+        vehicle_index (dict): Output of build_vehicle_index.
+        weight_configuration (str): The user's weight class and configuration.
+
+    Returns:
+        list: Alternative powertrains in the order used by select_alternative_fuel.
+    """
+    return [fuel for fuel in ALTERNATIVE_FUELS if (weight_configuration, fuel) in vehicle_index]
+
+
+def powertrain_options(vehicle_index, weight_configuration):
+    """
+    Existing and alternative powertrains offered for a vehicle configuration.
+
+    Parameters:
+        vehicle_index (Mapping): Vehicle catalog indexed by (Weight_Confi, Powertrain).
+        weight_configuration (str): The user's weight class and configuration.
+
+    Returns:
+        dict: 'existing' (diesel, and gasoline if the catalog has a model) and 'alternative' (COMMON_ALTERNATIVES,
+        then hydrogen fuel cell and HEV if the catalog has a model) lists of powertrains.
+    """
+    return {
+        "existing": ["Diesel"] + [fuel for fuel in ("Gasoline",) if (weight_configuration, fuel) in vehicle_index],
+        "alternative": list(COMMON_ALTERNATIVES) + [fuel for fuel in ("Hydrogen Fuel Cell", "HEV")
+                                                     if (weight_configuration, fuel) in vehicle_index],
+    }
+
+
+def build_option_tree(vehicles_dutycycles, vehicle_index):
+    """
+    Options of the cascading vehicle selectors: application, then configuration, then weight class.
+
+    Parameters:
+        vehicles_dutycycles (DataFrame): Duty cycles with a 'Weight_Confi' column, listing the vehicles offered.
+        vehicle_index (Mapping): Output of build_vehicle_index, for the powertrains of each vehicle.
+
+    Returns:
+        dict: Maps each application (in VEHICLE_APPLICATIONS order, then the others) to a dict mapping its
+        configurations to a dict mapping their weight classes to the vehicle's 'weight_configuration' and its
+        powertrain_options, each level in the order of the duty-cycle table.
+    """
+    tree = {application: {} for application in VEHICLE_APPLICATIONS}
+    columns = ["VehicleApplication", "Configuration", "WeightClass", "Weight_Confi"]
+    for record in vehicles_dutycycles.dropna(subset=columns).to_dict("records"):
+        weight_classes = tree.setdefault(record["VehicleApplication"], {}).setdefault(record["Configuration"], {})
+        weight_classes.setdefault(record["WeightClass"], dict(weight_configuration=record["Weight_Confi"],
+                                                              **powertrain_options(vehicle_index, record["Weight_Confi"])))
+    return {application: configurations for application, configurations in tree.items() if configurations}
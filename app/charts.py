@@ -0,0 +1,317 @@
+"""
+Figure layer for the AltFleet Insight results section.
+
+Figures are assembled straight from NumPy cost arrays (no melting or per-trace
+DataFrame filtering) on top of layout templates that are built once per
+process. Every figure is keyed by a hash of the data it shows: when a rerun
+produces the same data, the previously built figure object is reused as-is, so
+no Plotly work is done and the serialized chart is byte-identical to the one
+the browser already holds, which lets Streamlit's forward-message cache send a
+reference instead of the full figure JSON.
+"""
+import hashlib
+import warnings
+from functools import lru_cache
+
+import numpy as np
+import plotly.graph_objects as go
+import streamlit as st
+
+# Line colours used for the cumulative cost chart
+BASE_COLOR = "red"
+ALTERNATIVE_COLOR = "#1B5E20"
+
+# Bar colours used for the stacked NPV chart
+STACK_COLORS = ["#215E21", "#507250", "#7E9E7E", "#AFCFAF", "#D3E6D3", "#8D6E63"]
+
+# Line colours used when several alternatives share one chart
+OVERLAY_COLORS = ["#1B5E20", "#1F77B4", "#FF7F0E", "#9467BD", "#8C564B", "#17BECF"]
+
+
+def figure_data_hash(*parts):
+    """
+    Computes a stable hash of the data shown in a figure.
+
+    Parameters:
+        *parts: NumPy arrays, scalars, strings or sequences of those.
+
+    Returns:
+        str: Hex digest identifying the figure content.
+    """
+    digest = hashlib.sha1()
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str(part.dtype).encode())
+            digest.update(str(part.shape).encode())
+            digest.update(np.ascontiguousarray(part).tobytes())
+        elif isinstance(part, (list, tuple)):
+            digest.update(figure_data_hash(*part).encode())
+        else:
+            digest.update(repr(part).encode())
+        digest.update(b"|")
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def _line_layout(ylabel):
+    # Built once per label; go.Figure copies it so the cached object stays untouched
+    return go.Layout(xaxis_title="Years", yaxis_title=ylabel, legend_title="Technology")
+
+
+@lru_cache(maxsize=None)
+def _stacked_layout(ylabel):
+    return go.Layout(
+        barmode="stack",
+        yaxis_title=ylabel,
+        legend_title="Category",
+        legend=dict(x=1, y=0.5),
+        template="plotly_white",
+        paper_bgcolor="white",
+        plot_bgcolor="white",
+    )
+
+
+def cumulative_cost_figure(years, series, ylabel):
+    """
+    Builds the cumulative discounted cost line chart.
+
+    Parameters:
+        years (ndarray): Year index shared by every series.
+        series (list): (name, values, line) tuples where values is a NumPy array aligned with years
+                       and line is a Plotly line style dict.
+        ylabel (str): Y-axis title.
+
+    Returns:
+        go.Figure: The line chart.
+    """
+    x = np.asarray(years).tolist()
+    traces = [
+        go.Scatter(x=x, y=np.round(np.asarray(values, dtype=float), 2).tolist(),
+                   mode="lines+markers", name=name, line=line)
+        for name, values, line in series
+    ]
+    return go.Figure(data=traces, layout=_line_layout(ylabel))
+
+
+def stacked_cost_figure(scenarios, categories, values, ylabel):
+    """
+    Builds the stacked bar chart of discounted costs per category.
+
+    Parameters:
+        scenarios (list): Bar labels (one per row of values).
+        categories (list): Cost category names (one per column of values).
+        values (ndarray): (scenario x category) costs, already scaled for display.
+        ylabel (str): Y-axis title.
+
+    Returns:
+        go.Figure: The stacked bar chart.
+    """
+    values = np.asarray(values, dtype=float)
+    totals = values.sum(axis=1, keepdims=True)
+    totals[totals == 0] = 1e-9
+    shares = np.round(values / totals * 100).astype(int)
+
+    x = list(scenarios)
+    traces = []
+    for i, col in enumerate(categories):
+        traces.append(
+            go.Bar(
+                x=x,
+                y=values[:, i].tolist(),
+                name=col,
+                marker_color=STACK_COLORS[i % len(STACK_COLORS)],
+                text=[f"{share}%" for share in shares[:, i]],
+                textposition="inside",
+                hovertemplate=(
+                    "<b>%{x}</b><br>"
+                    + col + " cost: %{y:.2f}<br>"
+                    + col + " share: %{text}<extra></extra>"
+                ),
+            )
+        )
+    return go.Figure(data=traces, layout=_stacked_layout(ylabel))
+
+
+def cached_figure(key, data_hash, build):
+    """
+    Returns the figure stored for this chart in the session if its data hash is unchanged,
+    otherwise builds it and stores it.
+
+    Parameters:
+        key (str): Identifier of the chart within the page.
+        data_hash (str): Hash of the data shown, from figure_data_hash.
+        build (callable): Zero-argument function building the figure.
+
+    Returns:
+        go.Figure: The cached or freshly built figure.
+    """
+    state_key = f"_figure_cache_{key}"
+    cached = st.session_state.get(state_key)
+    if cached is not None and cached[0] == data_hash:
+        return cached[1]
+
+    fig = build()
+    st.session_state[state_key] = (data_hash, fig)
+    return fig
+
+
+def overlay_cost_figure(years, base_name, base_values, names, values, ylabel):
+    """
+    Builds a line chart overlaying the cumulative costs of several alternatives on the base technology.
+
+    Parameters:
+        years (ndarray): Year index shared by every series.
+        base_name (str): Label of the base technology.
+        base_values (ndarray): Cumulative costs of the base technology.
+        names (list): Labels of the alternatives.
+        values (ndarray): (alternative x year) cumulative costs.
+        ylabel (str): Y-axis title.
+
+    Returns:
+        go.Figure: The line chart.
+    """
+    series = [(base_name, base_values, dict(color=BASE_COLOR))]
+    series += [(name, row, dict(color=OVERLAY_COLORS[i % len(OVERLAY_COLORS)]))
+               for i, (name, row) in enumerate(zip(names, values))]
+    return cumulative_cost_figure(years, series, ylabel)
+
+
+def province_heatmap_figure(provinces, metrics, values, text, reverse):
+    """
+    Builds a heatmap of several metrics (columns) across provinces (rows).
+
+    Each column is coloured on its own min-max scale so metrics with different units can share one
+    chart; the cells show the actual values.
+
+    Parameters:
+        provinces (list): Row labels.
+        metrics (list): Column labels.
+        values (ndarray): (province x metric) values, NaN where not applicable.
+        text (list): (province x metric) formatted cell labels.
+        reverse (list): For each metric, True when lower values are better.
+
+    Returns:
+        go.Figure: The heatmap, green for the most favourable value of each metric.
+    """
+    values = np.asarray(values, dtype=float)
+    with warnings.catch_warnings():
+        # Columns that are entirely NaN (e.g. no break-even anywhere) are left blank
+        warnings.simplefilter("ignore", RuntimeWarning)
+        low, high = np.nanmin(values, axis=0), np.nanmax(values, axis=0)
+    span = np.where(high > low, high - low, 1.0)
+    score = (values - low) / span
+    score = np.where(np.asarray(reverse), 1 - score, score)
+
+    fig = go.Figure(go.Heatmap(
+        z=np.round(score, 3).tolist(),
+        x=list(metrics),
+        y=list(provinces),
+        text=text,
+        texttemplate="%{text}",
+        hoverinfo="text",
+        colorscale=[[0, "#D73027"], [0.5, "#FFFFBF"], [1, ALTERNATIVE_COLOR]],
+        showscale=False,
+        xgap=2,
+        ygap=2,
+    ))
+    fig.update_layout(yaxis=dict(autorange="reversed"), height=60 + 32 * len(provinces),
+                      margin=dict(t=30, b=10))
+    return fig
+
+
+def abatement_curve_figure(labels, powertrains, start, width, cost_per_tonne, powertrain_order):
+    """
+    Builds a stepped marginal abatement cost curve, one bar per option, as wide as the tonnes it abates.
+
+    Parameters:
+        labels (list): Option labels shown on hover (e.g. the vehicle configuration).
+        powertrains (list): Alternative powertrain of each option, used for the colour.
+        start (ndarray): Cumulative abatement (tonnes) where each bar starts.
+        width (ndarray): Abatement (tonnes) of each option.
+        cost_per_tonne (ndarray): Abatement cost ($/tCO2eq) of each option.
+        powertrain_order (list): Powertrains in legend order.
+
+    Returns:
+        go.Figure: The curve, options sorted as given.
+    """
+    start, width, cost_per_tonne = (np.asarray(x, dtype=float) for x in (start, width, cost_per_tonne))
+    labels, powertrains = np.asarray(labels), np.asarray(powertrains)
+    traces = []
+    for i, powertrain in enumerate(powertrain_order):
+        options = powertrains == powertrain
+        if not options.any():
+            continue
+        traces.append(go.Bar(
+            x=(start[options] + width[options] / 2).tolist(),
+            y=np.round(cost_per_tonne[options], 1).tolist(),
+            width=width[options].tolist(),
+            name=powertrain,
+            marker_color=OVERLAY_COLORS[i % len(OVERLAY_COLORS)],
+            marker_line=dict(color="white", width=0.5),
+            customdata=np.stack([labels[options], np.round(width[options], 1)], axis=-1).tolist(),
+            hovertemplate="<b>%{customdata[0]}</b><br>%{y:,.0f} $/tCO2eq<br>%{customdata[1]:,} tonnes<extra>"
+                          + powertrain + "</extra>",
+        ))
+    return go.Figure(data=traces, layout=go.Layout(
+        xaxis_title="Cumulative GHG reduction (tonnes CO2eq)",
+        yaxis_title="Abatement cost ($/tCO2eq)",
+        legend_title="Alternative",
+        bargap=0,
+        template="plotly_white",
+    ))
+
+
+def pareto_figure(npv, ghg, labels, powertrains, front, powertrain_order, base_name, base_point):
+    """
+    Builds a scatter of the options' NPV against their lifetime GHG emissions, with the Pareto frontier.
+
+    Parameters:
+        npv, ghg (ndarray): NPV ($) and GHG emissions (tonnes) of each option.
+        labels (list): Option labels shown on hover.
+        powertrains (list): Alternative powertrain of each option, used for the colour.
+        front (ndarray): Boolean mask of the options on the frontier.
+        powertrain_order (list): Powertrains in legend order.
+        base_name (str): Label of the existing vehicles.
+        base_point (tuple): NPV and GHG emissions of the existing vehicles.
+
+    Returns:
+        go.Figure: The scatter; WebGL markers keep tens of thousands of options responsive.
+    """
+    npv, ghg = np.asarray(npv, dtype=float), np.asarray(ghg, dtype=float)
+    labels, powertrains, front = np.asarray(labels), np.asarray(powertrains), np.asarray(front, dtype=bool)
+    traces = []
+    for i, powertrain in enumerate(powertrain_order):
+        options = powertrains == powertrain
+        if not options.any():
+            continue
+        traces.append(go.Scattergl(
+            x=np.round(ghg[options], 1).tolist(),
+            y=np.round(npv[options]).tolist(),
+            mode="markers",
+            name=powertrain,
+            marker=dict(color=OVERLAY_COLORS[i % len(OVERLAY_COLORS)], size=5, opacity=0.4),
+            text=labels[options].tolist(),
+            hovertemplate="%{text}<br>$%{y:,.0f}<br>%{x:,.0f} tonnes<extra>" + powertrain + "</extra>",
+        ))
+    order = np.argsort(npv[front])
+    traces.append(go.Scatter(
+        x=np.round(ghg[front][order], 1).tolist(),
+        y=np.round(npv[front][order]).tolist(),
+        mode="lines+markers",
+        name="Pareto frontier",
+        line=dict(color="black", shape="hv"),
+        marker=dict(color="black", size=8),
+        text=labels[front][order].tolist(),
+        hovertemplate="%{text}<br>$%{y:,.0f}<br>%{x:,.0f} tonnes<extra>Frontier</extra>",
+    ))
+    traces.append(go.Scatter(
+        x=[round(float(base_point[1]), 1)], y=[round(float(base_point[0]))], mode="markers", name=base_name,
+        marker=dict(color=BASE_COLOR, size=12, symbol="x"),
+        hovertemplate="$%{y:,.0f}<br>%{x:,.0f} tonnes<extra>" + base_name + "</extra>",
+    ))
+    return go.Figure(data=traces, layout=go.Layout(
+        xaxis_title="Lifetime GHG emissions (tonnes CO2eq)",
+        yaxis_title="NPV ($)",
+        legend_title="Option",
+        template="plotly_white",
+    ))
@@ -0,0 +1,236 @@
+"""
+User-supplied vehicle catalogs.
+
+A fleet can upload its own vehicle costs and efficiencies (CSV or Excel, with the
+columns of MHDV_costs_efficiency_final.csv) to replace the built-in defaults. The
+upload is validated column by column on the whole table at once, so that large
+catalogs are checked in well under a second, and rows with missing, non-numeric or
+implausible values (typically a value entered in the wrong unit) are rejected with
+one error per row and column. The valid rows override the built-in rows of the
+same weight class, configuration and powertrain for the current session only: the
+overrides are layered over the shared vehicle index with a ChainMap, which gives
+the same O(1) lookups as catalog.build_vehicle_index without copying it.
+
+An optional 'Model' column allows several models per configuration and powertrain;
+the first one is the default and the others can be selected in the app.
+"""
+from collections import ChainMap
+
+import numpy as np
+import pandas as pd
+
+from reference_data import EFFICIENCY_RANGES, LIQUID_EFFICIENCY_RANGE
+from tco_kernel import ALTERNATIVE_FUELS
+
+REQUIRED_COLUMNS = ("WeightClass", "Configuration", "Powertrain", "Default_price", "FuelEfficiencyCAD", "Maintenance")
+EMISSION_FACTOR_COLUMNS = ("GHG EF", "NOx EF", "PM2.5 EF")
+
+POWERTRAINS = ("Diesel", "Gasoline") + ALTERNATIVE_FUELS
+
+# Powertrains whose GHG emissions come from the provincial grid or hydrogen intensity instead of the GHG EF
+ZERO_TAILPIPE_POWERTRAINS = ("Battery electric", "Hydrogen Fuel Cell")
+
+# Plausible (lower, upper, unit) of each numeric column; the fuel efficiency range depends on the powertrain, see
+# reference_data.EFFICIENCY_RANGES
+VALUE_RANGES = {
+    "Default_price": (10_000, 5_000_000, "$"),
+    "Maintenance": (0.0, 10.0, "$/km"),
+    "GHG EF": (0.0, 5_000.0, "g/km"),
+    "NOx EF": (0.0, 50.0, "g/km"),
+    "PM2.5 EF": (0.0, 5.0, "g/km"),
+}
+
+# Spreadsheet row of the first data row (row 1 holds the column names)
+FIRST_ROW = 2
+
+
+def read_catalog(source, name):
+    """
+    Reads an uploaded catalog.
+
+    Parameters:
+        source: File path or file-like object.
+        name (str): File name, whose extension selects the format (.xlsx/.xls for Excel, CSV otherwise).
+
+    Returns:
+        DataFrame: The first sheet or the CSV table, unvalidated.
+
+    Raises:
+        ValueError: If an Excel file is given and no Excel reader is installed.
+    """
+    if name.lower().endswith((".xlsx", ".xls")):
+        try:
+            return pd.read_excel(source)
+        except ImportError as error:
+            raise ValueError(f"Reading Excel files requires openpyxl ({error}); save the sheet as CSV instead.") from error
+    return pd.read_csv(source, low_memory=False)
+
+
+def row_errors(mask, column, message):
+    """
+    Error table of the rows flagged in one column of an upload.
+
+    Parameters:
+        mask (array): True for each rejected row, in table order.
+        column (str): Column the errors refer to.
+        message: String, or function of the flagged row positions returning one message per row; it is called
+                 only when rows are flagged, so that messages are formatted for the rejected rows alone.
+
+    Returns:
+        DataFrame: One row per flagged row, with its spreadsheet 'row', the 'column' and the 'error'.
+    """
+    rows = np.flatnonzero(mask)
+    if callable(message):
+        message = np.asarray(message(rows), dtype=object) if len(rows) else []
+    return pd.DataFrame({"row": rows + FIRST_ROW, "column": column, "error": message})
+
+
+def text_values(column):
+    """
+    Label column of an upload as stripped strings.
+
+    Parameters:
+        column (Series): Raw column.
+
+    Returns:
+        Series: Stripped strings (object dtype), with NaN for empty cells.
+    """
+    text = column.where(column.isna(), column.astype(str).str.strip())
+    return text.where(text != "").astype(object)
+
+
+def _range_message(values, lower, upper, unit):
+    # Formats the out-of-range messages of the given rows; bounds and unit may be scalars or per-row arrays
+    def message(rows):
+        bounds = np.broadcast_to(np.array([lower, upper], dtype=object).T if np.ndim(lower) else [lower, upper],
+                                 (len(values), 2))[rows]
+        units = np.broadcast_to(np.asarray(unit, dtype=object), len(values))[rows]
+        return [f"{value:g} is outside the plausible range {low:g}-{high:g} {name}"
+                for value, (low, high), name in zip(values[rows], bounds, units)]
+    return message
+
+
+def validate_catalog(table, weight_configurations, base_index=None):
+    """
+    Checks an uploaded catalog and separates the valid rows from the rejected ones.
+
+    Emission factors missing from the upload (column absent or empty cell) are taken from the built-in row
+    of the same configuration and powertrain when there is one. The GHG EF is not needed for battery
+    electric and hydrogen vehicles.
+
+    Parameters:
+        table (DataFrame): Output of read_catalog.
+        weight_configurations (iterable): Weight class and configuration combinations ('Weight_Confi') that
+                                          have a duty cycle; rows for other combinations are rejected.
+        base_index (dict): Output of catalog.build_vehicle_index, used to fill in missing emission factors.
+
+    Returns:
+        tuple: The valid rows (with a 'Weight_Confi' column, the numeric columns as floats and a 'Model'
+        column) and the errors, a DataFrame with the spreadsheet 'row', the 'column' and the 'error'.
+
+    Raises:
+        ValueError: If required columns are missing.
+    """
+    table = table.rename(columns=lambda column: str(column).strip()).reset_index(drop=True)
+    missing = [column for column in REQUIRED_COLUMNS if column not in table]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}. Expected at least {', '.join(REQUIRED_COLUMNS)}.")
+
+    catalog = pd.DataFrame({column: text_values(table[column]) for column in ("WeightClass", "Configuration", "Powertrain")})
+    catalog["Model"] = text_values(table["Model"]) if "Model" in table else np.nan
+    catalog["Weight_Confi"] = catalog["WeightClass"] + " " + catalog["Configuration"]
+    powertrain = catalog["Powertrain"].to_numpy()
+    weight_configuration = catalog["Weight_Confi"]
+
+    errors = []
+    for column in ("WeightClass", "Configuration", "Powertrain"):
+        errors.append(row_errors(catalog[column].isna().to_numpy(), column, "Missing value"))
+    errors.append(row_errors(catalog["Powertrain"].notna() & ~catalog["Powertrain"].isin(POWERTRAINS), "Powertrain",
+                             "Unknown powertrain; expected one of " + ", ".join(POWERTRAINS)))
+    errors.append(row_errors(weight_configuration.notna() & ~weight_configuration.isin(list(weight_configurations)),
+                             "Configuration", lambda rows: "No duty cycle for " + weight_configuration.iloc[rows]))
+
+    # Emission factors left empty fall back to the built-in row of the same configuration and powertrain
+    base = pd.DataFrame.from_records(list((base_index or {}).values()),
+                                     columns=["Weight_Confi", "Powertrain"] + list(EMISSION_FACTOR_COLUMNS))
+    base = catalog[["Weight_Confi", "Powertrain"]].merge(
+        base.drop_duplicates(["Weight_Confi", "Powertrain"]), how="left", on=["Weight_Confi", "Powertrain"])
+
+    efficiency_lower = np.full(len(table), LIQUID_EFFICIENCY_RANGE[0])
+    efficiency_upper = np.full(len(table), LIQUID_EFFICIENCY_RANGE[1])
+    efficiency_unit = np.full(len(table), LIQUID_EFFICIENCY_RANGE[2], dtype=object)
+    for fuel, (lower, upper, unit) in EFFICIENCY_RANGES.items():
+        is_fuel = powertrain == fuel
+        efficiency_lower[is_fuel], efficiency_upper[is_fuel], efficiency_unit[is_fuel] = lower, upper, unit
+
+    for column in REQUIRED_COLUMNS[3:] + EMISSION_FACTOR_COLUMNS:
+        raw = table[column] if column in table else pd.Series(np.nan, index=table.index)
+        values = pd.to_numeric(raw, errors="coerce").astype(float).to_numpy()
+        empty = raw.isna().to_numpy().copy()
+        unparsed = np.isnan(values) & ~empty
+        if unparsed.any():
+            # Blank text cells count as empty, anything else that is not a number is rejected
+            blank = raw[unparsed].astype(str).str.strip() == ""
+            empty[np.flatnonzero(unparsed)[blank.to_numpy()]] = True
+            unparsed &= ~empty
+            errors.append(row_errors(unparsed, column, lambda rows: "Not a number: " + raw.iloc[rows].astype(str)))
+
+        if column in EMISSION_FACTOR_COLUMNS:
+            values = np.where(empty, base[column].to_numpy(dtype=float), values)
+            needed = ~np.isin(powertrain, ZERO_TAILPIPE_POWERTRAINS) if column == "GHG EF" else True
+            errors.append(row_errors(empty & np.isnan(values) & needed, column,
+                                     "Missing value, and no built-in value for this configuration and powertrain"))
+        else:
+            errors.append(row_errors(empty, column, "Missing value"))
+
+        if column == "FuelEfficiencyCAD":
+            lower, upper, unit = efficiency_lower, efficiency_upper, efficiency_unit
+        else:
+            lower, upper, unit = VALUE_RANGES[column]
+        errors.append(row_errors((values < lower) | (values > upper), column, _range_message(values, lower, upper, unit)))
+        catalog[column] = values
+
+    duplicated = catalog.duplicated(["Weight_Confi", "Powertrain", "Model"]) & weight_configuration.notna() & catalog["Powertrain"].notna()
+    errors.append(row_errors(duplicated, "Model" if "Model" in table else "Powertrain",
+                             "Duplicates an earlier row for the same configuration, powertrain and model"))
+
+    errors = pd.concat(errors, ignore_index=True).sort_values("row", kind="stable", ignore_index=True)
+    rejected = np.zeros(len(catalog), dtype=bool)
+    rejected[errors["row"].to_numpy() - FIRST_ROW] = True
+    valid = catalog[~rejected]
+    unnamed = valid["Model"].isna()
+    if unnamed.any():
+        valid = valid.assign(Model=valid["Model"].where(~unnamed, "Row " + (valid.index + FIRST_ROW).astype(str)))
+    return valid.reset_index(drop=True), errors
+
+
+def catalog_overrides(valid):
+    """
+    Indexes the valid rows of an uploaded catalog.
+
+    Parameters:
+        valid (DataFrame): Valid rows returned by validate_catalog.
+
+    Returns:
+        tuple: The overrides, mapping (Weight_Confi, Powertrain) to a dict of the first model's row as
+        catalog.build_vehicle_index does, and the models, mapping the same keys to the row positions of
+        every model in valid.
+    """
+    first = valid.drop_duplicates(["Weight_Confi", "Powertrain"])
+    overrides = {(record["Weight_Confi"], record["Powertrain"]): record for record in first.to_dict("records")}
+    models = valid.groupby(["Weight_Confi", "Powertrain"], sort=False).indices
+    return overrides, models
+
+
+def merged_vehicle_index(base_index, overrides):
+    """
+    Layers the session's catalog overrides over the built-in vehicle index.
+
+    Parameters:
+        base_index (dict): Output of catalog.build_vehicle_index, shared by every session and left unchanged.
+        overrides (dict): Overrides returned by catalog_overrides (or any dict of the same layout).
+
+    Returns:
+        ChainMap: Mapping with the lookups of a vehicle index, the overrides taking precedence.
+    """
+    return ChainMap(overrides, base_index)
@@ -0,0 +1,106 @@
+"""
+Efficiency degradation of ageing powertrains.
+
+The catalog's fuel efficiency is that of a new vehicle. As vehicles age, their
+energy use per kilometre rises: battery packs gain internal resistance, fuel
+cell stacks lose voltage, engines and aftertreatment wear. Each powertrain's
+degradation is read from a local table (powertrain_degradation.csv) as a
+yearly increase of the energy use (%/year) and a ceiling on the total increase
+(%). Year 1 runs at the new vehicle's efficiency; each later year adds the
+yearly increase until the ceiling is reached.
+
+fuel_use_factors turns the table into per-year factors for a batch of
+scenarios, which apply to the fuel costs through the kernel's year-by-year
+multipliers (degradation_multipliers) and to the GHG emissions through their
+lifetime average (lifetime_average). Tailpipe NOx and PM2.5 factors are per
+kilometre and are left unchanged.
+"""
+import numpy as np
+
+from reference_data import load_reference_table
+from tco_kernel import CATEGORIES, SERIES
+
+
+def load_degradation_rates(path="powertrain_degradation.csv"):
+    """
+    Reads the degradation rate of each powertrain.
+
+    Returns:
+        dict: Maps the powertrain to its 'Yearly_increase' (%/year) and 'Max_increase' (%) of energy use per km.
+    """
+    table = load_reference_table(path)
+    return {str(row.Powertrain): {"Yearly_increase": float(row.Yearly_increase), "Max_increase": float(row.Max_increase)}
+            for row in table.itertuples(index=False)}
+
+
+def fuel_use_factors(rates, powertrain, horizon):
+    """
+    Energy use per km in each year relative to the new vehicle.
+
+    Parameters:
+        rates (dict): Output of load_degradation_rates; powertrains it does not list do not degrade.
+        powertrain (array of str): Powertrain of each scenario.
+        horizon (int): Last year on the kernel's time axis.
+
+    Returns:
+        ndarray: Factors of shape batch + (horizon + 1,), equal to 1 in years 0 and 1.
+    """
+    powertrain = np.asarray(powertrain)
+    names, inverse = np.unique(powertrain, return_inverse=True)
+    yearly = np.array([rates.get(name, {}).get("Yearly_increase", 0.0) for name in names], dtype=float)[inverse]
+    ceiling = np.array([rates.get(name, {}).get("Max_increase", 0.0) for name in names], dtype=float)[inverse]
+    years = np.maximum(np.arange(horizon + 1) - 1, 0)
+    increase = np.minimum(yearly.reshape(powertrain.shape)[..., None] * years, ceiling.reshape(powertrain.shape)[..., None])
+    return 1 + increase / 100
+
+
+def efficiency_path(fuel_efficiency, factors):
+    """
+    Fuel efficiency in each year of a degrading vehicle.
+
+    Parameters:
+        fuel_efficiency (array): Efficiency of the new vehicle (L/100 km, kWh/km or kg/100 km).
+        factors (ndarray): Output of fuel_use_factors.
+
+    Returns:
+        ndarray: Efficiency of shape batch + (horizon + 1,), in the unit of fuel_efficiency.
+    """
+    return np.asarray(fuel_efficiency, dtype=float)[..., None] * factors
+
+
+def degradation_multipliers(base_factors, alt_factors):
+    """
+    Multiplier matrices applying degradation to the fuel costs of the kernel's yearly costs.
+
+    Parameters:
+        base_factors, alt_factors (ndarray): Output of fuel_use_factors for the existing and alternative vehicles.
+
+    Returns:
+        ndarray: Multipliers of shape batch + (series, category, horizon + 1), to combine with
+        price_paths.cost_multipliers by product. Costs other than fuel are left unchanged.
+    """
+    base_factors, alt_factors = np.broadcast_arrays(base_factors, alt_factors)
+    multipliers = np.ones(base_factors.shape[:-1] + (len(SERIES), len(CATEGORIES), base_factors.shape[-1]))
+    fuel_category = CATEGORIES.index("Fuel")
+    multipliers[..., 0, fuel_category, :] = base_factors
+    multipliers[..., 1:, fuel_category, :] = alt_factors[..., None, :]
+    return multipliers
+
+
+def lifetime_average(factors, lifetime):
+    """
+    Average of the factors over the years of operation, which scales lifetime emissions.
+
+    Parameters:
+        factors (ndarray): Output of fuel_use_factors.
+        lifetime (array): Vehicle lifetime (years).
+
+    Returns:
+        ndarray: Average factor of the batch shape, 1 where the lifetime is zero.
+    """
+    lifetime = np.asarray(lifetime, dtype=float)
+    years = np.arange(factors.shape[-1])
+    in_service = (years >= 1) & (years <= lifetime[..., None])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = (factors * in_service).sum(axis=-1) / in_service.sum(axis=-1)
+    return np.where(in_service.any(axis=-1), average, 1.0)
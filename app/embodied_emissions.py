@@ -0,0 +1,107 @@
+"""
+Lifecycle (cradle-to-grave) GHG emissions.
+
+Well-to-wheel emissions (estimateGHG_emissions, tco_kernel.ghg_per_km) cover
+the energy used in operation only. The lifecycle figure adds the embodied
+emissions of manufacturing the vehicles (glider, powertrain and, for
+electrified powertrains, the traction battery), read per Weight_Confi and
+Powertrain from a local table (embodied_emissions.csv, tCO2eq per vehicle),
+and of building the charging or refuelling infrastructure, estimated from its
+cost.
+
+Embodied emissions are incurred in year 0 and amortized over the vehicle
+lifetime; operating emissions accrue evenly over the years of operation. The
+carbon payback year is when the alternative's cumulative emissions fall to
+those of the existing vehicles, which are replaced one for one and so are
+built too. Every function works on arrays, so that a whole catalog or batch is
+evaluated at once.
+"""
+import numpy as np
+
+from reference_data import combined_labels, load_reference_table
+from tco_kernel import break_even_years
+
+# Embodied emissions of charging and refuelling infrastructure (kgCO2eq per $ of installed cost), spend-based
+INFRASTRUCTURE_INTENSITY = 0.25
+
+
+def load_embodied_factors(path="embodied_emissions.csv"):
+    """
+    Reads the embodied emissions of the catalog vehicles.
+
+    Returns:
+        dict: Maps (Weight_Confi, Powertrain) to the 'Vehicle_manufacturing' and 'Battery_manufacturing' emissions
+        (tCO2eq per vehicle).
+    """
+    table = load_reference_table(path)
+    table["Weight_Confi"] = combined_labels(table, ["WeightClass", "Configuration"])
+    return {(str(row.Weight_Confi), str(row.Powertrain)): {"Vehicle_manufacturing": float(row.Vehicle_manufacturing),
+                                                           "Battery_manufacturing": float(row.Battery_manufacturing)}
+            for row in table.itertuples(index=False)}
+
+
+def embodied_per_vehicle(factors, weight_configuration, powertrain):
+    """
+    Embodied emissions of a batch of vehicles.
+
+    Parameters:
+        factors (dict): Output of load_embodied_factors.
+        weight_configuration, powertrain (array of str): Vehicles, broadcast together.
+
+    Returns:
+        tuple: Vehicle and battery manufacturing emissions (tCO2eq per vehicle), NaN for vehicles not in the table.
+    """
+    weight_configuration, powertrain = np.broadcast_arrays(np.asarray(weight_configuration, dtype=object),
+                                                           np.asarray(powertrain, dtype=object))
+    missing = {"Vehicle_manufacturing": np.nan, "Battery_manufacturing": np.nan}
+    rows = [factors.get(key, missing) for key in zip(weight_configuration.ravel(), powertrain.ravel())]
+    return tuple(np.array([row[column] for row in rows], dtype=float).reshape(powertrain.shape)
+                 for column in ("Vehicle_manufacturing", "Battery_manufacturing"))
+
+
+def infrastructure_embodied(infra_cost, intensity=INFRASTRUCTURE_INTENSITY):
+    """
+    Embodied emissions of charging or refuelling infrastructure (tCO2eq) from its cost ($).
+    """
+    return np.asarray(infra_cost, dtype=float) * intensity / 1000
+
+
+def lifecycle_ghg(n_vehicles, lifetime, operating_ghg, embodied, infra_embodied=0.0, horizon=None):
+    """
+    Lifecycle GHG emissions of the existing and alternative vehicles, and the carbon payback year.
+
+    Parameters:
+        n_vehicles, lifetime (array): Fleet size and vehicle lifetime (years).
+        operating_ghg (array): Lifetime well-to-wheel emissions (tonnes), batch + ([existing, alternative],).
+        embodied (array): Embodied emissions per vehicle (tCO2eq), batch + ([existing, alternative],).
+        infra_embodied (array): Embodied emissions of the alternative's infrastructure (tCO2eq).
+        horizon (int): Number of years on the time axis; defaults to the longest lifetime.
+
+    Returns:
+        dict: 'embodied', 'total' (tonnes) and 'amortized' embodied emissions (tonnes/year) of shape batch + (2,),
+        'cumulative' emissions of shape batch + (2, year), and 'payback', the year the alternative's cumulative
+        emissions fall to the existing vehicles' (0 if they never exceed them, NaN if they never fall to them).
+    """
+    n_vehicles, lifetime, infra_embodied = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (n_vehicles, lifetime, infra_embodied)])
+    operating_ghg, embodied = np.broadcast_arrays(np.asarray(operating_ghg, dtype=float), np.asarray(embodied, dtype=float))
+    if horizon is None:
+        horizon = int(lifetime.max()) if lifetime.size else 0
+
+    total_embodied = embodied * n_vehicles[..., None] + np.stack([np.zeros_like(infra_embodied), infra_embodied], axis=-1)
+    years = np.arange(horizon + 1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        share_operated = np.clip(years / lifetime[..., None], 0.0, 1.0)
+        amortized = np.where(lifetime[..., None] > 0, total_embodied / lifetime[..., None], 0.0)
+    cumulative = total_embodied[..., None] + operating_ghg[..., None] * share_operated[..., None, :]
+
+    gap = cumulative[..., 1, :] - cumulative[..., 0, :]
+    never_above = (gap <= 0).all(axis=-1)
+    payback = np.where(never_above, 0.0, break_even_years(cumulative[..., 0, :], cumulative[..., 1, :]))
+    return {
+        "embodied": total_embodied,
+        "amortized": amortized,
+        "total": total_embodied + operating_ghg,
+        "cumulative": cumulative,
+        "payback": payback,
+    }
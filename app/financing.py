@@ -0,0 +1,183 @@
+"""
+Monthly loan and lease payments.
+
+Loans, balloon loans and operating leases are paid monthly. amortization_schedule
+builds the month-by-month payment, interest, principal and balance of a batch
+of loans as arrays (months on the last axis), and vehicle_payments turns a
+financing plan into the yearly present value of the fleet's vehicle payments,
+each month discounted at the scenario's discount rate, for
+tco_kernel.yearly_costs. Terms, rates, down payments, residuals and even the
+financing type may be arrays broadcast with the batch, so that a sweep over a
+financing grid is evaluated without a loop over scenarios or months.
+
+- Loan: level payments over the term; sales tax on the full price is paid at
+  purchase.
+- Balloon loan: lower level payments, and a final balloon (a share of the price)
+  repaid with the last payment.
+- Lease: level payments on the depreciation and finance charge down to the
+  residual value, with sales tax on every payment. With a buyout, the residual
+  is paid at the end of the term and the fleet keeps the vehicles; without one,
+  the lease is renewed on the same terms until the end of the lifetime and the
+  vehicles are returned, with no resale.
+
+A loan running past the end of the lifetime is paid off when the vehicles are
+sold.
+"""
+import numpy as np
+
+FINANCING_TYPES = ("Loan", "Balloon loan", "Lease")
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=float)
+
+
+def level_payment(principal, annual_rate, term_months, balloon=0.0):
+    """
+    Monthly payment of a loan, or of a lease with balloon as its residual value.
+
+    Parameters:
+        principal (array): Amount financed ($).
+        annual_rate (array): Annual interest rate (fraction), compounded monthly.
+        term_months (array): Number of monthly payments.
+        balloon (array): Amount still owed after the last level payment ($).
+
+    Returns:
+        ndarray: Monthly payment; zero where there is no term, and the straight-line
+        (principal - balloon) / term where the rate is zero.
+    """
+    principal, rate, term, balloon = np.broadcast_arrays(
+        _as_float(principal), _as_float(annual_rate) / 12, _as_float(term_months), _as_float(balloon))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        discount = (1 + rate) ** -term
+        payment = np.where(rate > 0, (principal - balloon * discount) * rate / (1 - discount),
+                           (principal - balloon) / term)
+    return np.where(term > 0, payment, 0.0)
+
+
+def amortization_schedule(principal, annual_rate, term_months, balloon=0.0, months=None):
+    """
+    Month-by-month schedule of a batch of loans.
+
+    Parameters:
+        principal, annual_rate, term_months, balloon (array): See level_payment; the balloon is repaid with the
+                                                              last payment.
+        months (int): Number of months on the time axis; defaults to the longest term.
+
+    Returns:
+        dict: 'payment', 'interest', 'principal' (repaid) and 'balance' (owed after the payment), each of shape
+        batch + (months,), month 1 first and zero after the term.
+    """
+    principal, rate, term, balloon = np.broadcast_arrays(
+        _as_float(principal), _as_float(annual_rate), _as_float(term_months), _as_float(balloon))
+    if months is None:
+        months = int(term.max()) if term.size else 0
+    payment = level_payment(principal, rate, term, balloon)[..., None]
+    monthly_rate = (rate / 12)[..., None]
+    elapsed = np.arange(months)
+
+    # Balance owed before each payment
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + monthly_rate) ** elapsed
+        owed = np.where(monthly_rate > 0, principal[..., None] * growth - payment * (growth - 1) / monthly_rate,
+                        principal[..., None] - payment * elapsed)
+
+    active = elapsed < term[..., None]
+    last = elapsed == term[..., None] - 1
+    interest = owed * monthly_rate * active
+    repaid = (payment - interest + balloon[..., None] * last) * active
+    return {
+        "payment": (payment + balloon[..., None] * last) * active,
+        "interest": interest,
+        "principal": repaid,
+        "balance": (owed - repaid) * active,
+    }
+
+
+def annual_present_values(monthly, discount_rate, horizon):
+    """
+    Sums monthly cash flows into years, each month discounted at the annual discount rate.
+
+    Parameters:
+        monthly (ndarray): Cash flows of shape batch + (months,), month 1 first.
+        discount_rate (array): Annual discount rate (fraction), broadcast with the batch.
+        horizon (int): Last year on the time axis; later months are dropped.
+
+    Returns:
+        ndarray: Present values of shape batch + (horizon + 1,), month m falling in year ceil(m / 12) and year 0
+        left at zero.
+    """
+    monthly = monthly[..., :horizon * 12]
+    months = monthly.shape[-1]
+    discount = (1 + _as_float(discount_rate)[..., None]) ** -(np.arange(1, months + 1) / 12)
+    present = monthly * discount
+    padded = np.zeros(present.shape[:-1] + (horizon * 12,))
+    padded[..., :months] = present
+    yearly = np.zeros(present.shape[:-1] + (horizon + 1,))
+    yearly[..., 1:] = padded.reshape(padded.shape[:-1] + (horizon, 12)).sum(axis=-1)
+    return yearly
+
+
+def vehicle_payments(financing_type, vehicle_cost, n_vehicles, provincial_tax, discount_rate, lifetime, horizon,
+                     term_months, downpayment, financing_rate, residual=0.0, buyout=False):
+    """
+    Discounted yearly vehicle payments of a batch of financed fleets.
+
+    Parameters:
+        financing_type (array of str): One of FINANCING_TYPES.
+        vehicle_cost (array): Vehicle price ($) per series, batch + (series,).
+        n_vehicles (array): Number of vehicles.
+        provincial_tax (array): Provincial sales tax (fraction).
+        discount_rate (array): Annual discount rate (fraction).
+        lifetime (array): Vehicle lifetime (years).
+        horizon (int): Last year on the kernel's time axis.
+        term_months (array): Loan or lease term (months); zero pays the financed share at purchase.
+        downpayment (array): Down payment (%), paid at purchase.
+        financing_rate (array): Annual interest rate (%).
+        residual (array): Balloon (balloon loans) or residual value (leases) as a % of the price; ignored for loans.
+        buyout (array of bool): Whether a lease ends with the residual value buyout.
+
+    Returns:
+        tuple: Present values of the payments of shape batch + (series, horizon + 1), tax included, with the down
+        payment in year 0; and whether the fleet owns the vehicles at the end of the lifetime (and so resells
+        them), batch + (series,).
+    """
+    scenario_args = [np.asarray(financing_type), *[_as_float(x) for x in (
+        n_vehicles, provincial_tax, discount_rate, lifetime, term_months, downpayment, financing_rate, residual)],
+        np.asarray(buyout, dtype=bool)]
+    # (batch, series) shape, scenario inputs gaining a series axis
+    shape = np.broadcast_shapes(np.shape(vehicle_cost), *[x.shape + (1,) for x in scenario_args])
+    vehicle_cost = np.broadcast_to(_as_float(vehicle_cost), shape)
+    (financing_type, n_vehicles, provincial_tax, discount_rate, lifetime, term_months, downpayment, financing_rate,
+     residual, buyout) = [np.broadcast_to(x[..., None], shape) for x in scenario_args]
+    is_lease = financing_type == "Lease"
+    has_balloon = is_lease | (financing_type == "Balloon loan")
+
+    price = vehicle_cost * n_vehicles
+    financed = price * (1 - downpayment / 100)
+    balloon = np.where(has_balloon, np.minimum(price * residual / 100, financed), 0.0)
+    term = np.where(term_months > 0, np.round(term_months), 0.0)
+
+    months = horizon * 12
+    month = np.arange(1, months + 1)
+    in_service = month <= (lifetime * 12)[..., None]
+    schedule = amortization_schedule(financed, financing_rate / 100, term, balloon, months)
+    monthly = schedule["payment"] * in_service
+
+    # Loans still running at the end of the lifetime are paid off then; renewed leases keep paying the level payment
+    sold = month == (lifetime * 12)[..., None]
+    payoff = np.where(is_lease[..., None], 0.0, schedule["balance"]) * sold
+    renewed = is_lease & ~buyout
+    level = level_payment(financed, financing_rate / 100, term, balloon)[..., None]
+    monthly = np.where(renewed[..., None], level * in_service * (term > 0)[..., None], monthly + payoff)
+
+    # Leases are taxed on every payment; purchases on the whole price up front
+    tax = provincial_tax[..., None]
+    monthly = monthly * np.where(is_lease[..., None], 1 + tax, 1.0)
+    upfront = price * downpayment / 100 * (1 + provincial_tax) + np.where(is_lease, 0.0, financed * provincial_tax)
+    upfront = upfront + np.where(term > 0, 0.0, financed * np.where(is_lease, 1 + provincial_tax, 1.0))
+
+    payments = annual_present_values(monthly, discount_rate, horizon)
+    payments[..., 0] = upfront
+    owned = ~is_lease | (buyout & (term <= lifetime * 12))
+    return payments, owned
@@ -0,0 +1,291 @@
+"""
+Fleet-wide evaluations of an uploaded fleet inventory.
+
+A fleet inventory lists groups of vehicles, one row each: the Province, the
+WeightClass and Configuration, the Existing fuel, the Alternative fuel it may be
+replaced with and the number of Vehicles, and optionally the group's Daily
+distance (km), Days of operation and Lifetime (years), which otherwise take the
+duty-cycle defaults, and its Infrastructure cost ($) and Insurance ($/km) of
+both vehicles. Prices, efficiencies and maintenance come from the catalog,
+fuel prices and grid intensities from the province, and subsidies from the
+incentive rules, as for the default scenarios of precompute.
+
+Each group gets its own charging or refuelling infrastructure: when its cost is
+not given, it is estimated as the cheapest set of chargers of one model that
+recharges the group's vehicles within the charging hours, or the cheapest
+hydrogen station meeting the default fill window (see hydrogen_station.py).
+Insurance is left out of the rows that do not give it.
+
+evaluate_fleet runs the TCO and emissions of every row in chunks of batched
+kernel calls, reporting its progress after each chunk, so that a large
+inventory can run as a background job (see jobs.py).
+"""
+import numpy as np
+import pandas as pd
+
+from custom_catalog import FIRST_ROW, row_errors, text_values
+from hydrogen_station import size_station
+from incentives import infrastructure_subsidy, vehicle_subsidy
+from pareto import CHARGING_HOURS
+from precompute import FIXED_DEFAULTS, default_inputs
+from scenario_batch import lifetime_pollutants
+from tco_kernel import ALTERNATIVE_FUELS, fuel_cost_per_km, ghg_per_km, summarize, yearly_costs
+
+REQUIRED_COLUMNS = ("Province", "WeightClass", "Configuration", "Existing fuel", "Alternative fuel", "Vehicles")
+
+EXISTING_FUELS = ("Diesel", "Gasoline")
+
+# Optional duty-cycle columns: the input they set, their plausible (lower, upper) range and their duty-cycle default
+DUTY_CYCLE_COLUMNS = {
+    "Daily distance (km)": ("daily_distance", (1, 2_000), "average_daily_distance"),
+    "Days of operation": ("yearly_days_operations", (1, 366), "yearly_days_operation"),
+    "Lifetime (years)": ("vehicle_lifetime", (1, 30), "years_ownership"),
+}
+
+# Optional cost columns: the input they set and their plausible (lower, upper) range; left out or empty, the
+# infrastructure cost is estimated (see infrastructure_costs) and insurance is none
+COST_COLUMNS = {
+    "Infrastructure cost ($)": ("total_infra_cost", (0, 50_000_000)),
+    "Insurance existing ($/km)": ("existing_vehicle_insurance", (0, 1)),
+    "Insurance alternative ($/km)": ("alternative_vehicle_insurance", (0, 1)),
+}
+
+# Rows evaluated per kernel call
+CHUNK_ROWS = 20_000
+
+
+def _numeric_column(table, column, lower, upper, errors):
+    # Values of an optional numeric column (NaN where left out or empty) and its empty cells; non-numbers and
+    # values outside [lower, upper] are added to errors
+    raw = table[column] if column in table else pd.Series(np.nan, index=table.index)
+    values = pd.to_numeric(raw, errors="coerce").astype(float).to_numpy()
+    empty = raw.isna().to_numpy() | (raw.astype(str).str.strip() == "").to_numpy()
+    errors.append(row_errors(np.isnan(values) & ~empty, column, lambda rows: "Not a number: " + raw.iloc[rows].astype(str)))
+    errors.append(row_errors((values < lower) | (values > upper), column,
+                             lambda rows: [f"{value:g} is outside the plausible range {lower:g}-{upper:g}"
+                                           for value in values[rows]]))
+    return values, empty
+
+
+def validate_fleet(table, vehicle_index, dutycycle_index, province_index):
+    """
+    Checks an uploaded fleet inventory and separates the valid rows from the rejected ones.
+
+    Parameters:
+        table (DataFrame): The inventory, e.g. read with custom_catalog.read_catalog.
+        vehicle_index, dutycycle_index, province_index (dict): Indexes from catalog.py.
+
+    Returns:
+        tuple: The valid rows (with a 'Weight_Confi' column, 'Vehicles' as integers, every duty-cycle column
+        filled in and the cost columns, NaN for an infrastructure cost to estimate) and the errors, a DataFrame
+        with the spreadsheet 'row', the 'column' and the 'error'.
+
+    Raises:
+        ValueError: If required columns are missing.
+    """
+    table = table.rename(columns=lambda column: str(column).strip()).reset_index(drop=True)
+    missing = [column for column in REQUIRED_COLUMNS if column not in table]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}. Expected at least {', '.join(REQUIRED_COLUMNS)}.")
+
+    fleet = pd.DataFrame({column: text_values(table[column]) for column in REQUIRED_COLUMNS[:5]})
+    fleet["Weight_Confi"] = fleet["WeightClass"] + " " + fleet["Configuration"]
+    weight_configuration = fleet["Weight_Confi"]
+    has_duty_cycle = weight_configuration.isin(list(dutycycle_index))
+
+    errors = []
+    for column in REQUIRED_COLUMNS[:5]:
+        errors.append(row_errors(fleet[column].isna().to_numpy(), column, "Missing value"))
+    errors.append(row_errors(fleet["Province"].notna() & ~fleet["Province"].isin(list(province_index)), "Province",
+                             "Unknown province; expected one of " + ", ".join(province_index)))
+    errors.append(row_errors(weight_configuration.notna() & ~has_duty_cycle, "Configuration",
+                             lambda rows: "No duty cycle for " + weight_configuration.iloc[rows]))
+    for column, fuels in (("Existing fuel", EXISTING_FUELS), ("Alternative fuel", ALTERNATIVE_FUELS)):
+        fuel = fleet[column]
+        known = fuel.isin(fuels)
+        errors.append(row_errors(fuel.notna() & ~known, column, "Unknown powertrain; expected one of " + ", ".join(fuels)))
+        in_catalog = np.array([(w, f) in vehicle_index for w, f in zip(weight_configuration, fuel)], dtype=bool)
+        errors.append(row_errors(known & has_duty_cycle & ~in_catalog, column,
+                                 lambda rows: "No " + fuel.iloc[rows] + " model in the catalog for " +
+                                 weight_configuration.iloc[rows]))
+
+    vehicles = pd.to_numeric(table["Vehicles"], errors="coerce").astype(float).to_numpy()
+    errors.append(row_errors(~(vehicles >= 1) | (vehicles != np.round(vehicles)), "Vehicles",
+                             "Expected a whole number of vehicles, at least 1"))
+    fleet["Vehicles"] = np.nan_to_num(vehicles).astype(np.int64)
+
+    # Duty-cycle columns left out or empty take the defaults of the configuration
+    for column, (_, (lower, upper), default_name) in DUTY_CYCLE_COLUMNS.items():
+        values, empty = _numeric_column(table, column, lower, upper, errors)
+        defaults = np.array([float(dutycycle_index[w][default_name]) if w in dutycycle_index else np.nan
+                             for w in weight_configuration], dtype=float)
+        fleet[column] = np.where(empty, defaults, values)
+    for column, (name, (lower, upper)) in COST_COLUMNS.items():
+        values, empty = _numeric_column(table, column, lower, upper, errors)
+        fleet[column] = np.where(empty, np.nan if name == "total_infra_cost" else 0.0, values)
+
+    errors = pd.concat(errors, ignore_index=True).sort_values("row", kind="stable", ignore_index=True)
+    rejected = np.zeros(len(fleet), dtype=bool)
+    rejected[errors["row"].to_numpy() - FIRST_ROW] = True
+    return fleet[~rejected].reset_index(drop=True), errors
+
+
+def fleet_inputs(fleet, vehicle_index, dutycycle_index, province_index):
+    """
+    Catalog and provincial inputs of every row of a validated fleet.
+
+    Catalog defaults are looked up once per distinct (province, Weight_Confi, existing fuel, alternative fuel)
+    combination and spread to its rows.
+
+    Returns:
+        dict: Arrays of the rows, keyed as precompute.DEFAULT_COLUMNS, with the duty-cycle and cost inputs of the
+        fleet (NaN 'total_infra_cost' where it is to be estimated), 'n_vehicles' and 'provincial_tax' (fraction).
+    """
+    labels = fleet[["Province", "Weight_Confi", "Existing fuel", "Alternative fuel"]]
+    codes, combinations = pd.factorize(pd.MultiIndex.from_frame(labels))
+    defaults = pd.DataFrame([default_inputs(vehicle_index, dutycycle_index, province_index, combination)
+                             for combination in combinations])
+    inputs = {name: defaults[name].to_numpy(dtype=float)[codes] for name in defaults}
+    for column, (name, _, _) in DUTY_CYCLE_COLUMNS.items():
+        inputs[name] = fleet[column].to_numpy(dtype=float)
+    for column, (name, _) in COST_COLUMNS.items():
+        inputs[name] = fleet[column].to_numpy(dtype=float)
+    inputs["n_vehicles"] = fleet["Vehicles"].to_numpy(dtype=float)
+    inputs["provincial_tax"] = np.array([province_index[p]["taxes_perc"] for p in combinations.get_level_values(0)],
+                                        dtype=float)[codes] / 100
+    return inputs
+
+
+def infrastructure_costs(inputs, evaluated_fuels, chargers=None, station_components=None,
+                         charging_hours=CHARGING_HOURS):
+    """
+    Estimated charging or refuelling infrastructure cost of each group of a fleet.
+
+    Battery electric groups get the cheapest set of chargers of one model that delivers every vehicle's daily energy
+    within the charging hours, hydrogen groups the cheapest station of hydrogen_station.size_station for its
+    default fill window; other alternatives need no new infrastructure.
+
+    Parameters:
+        inputs (dict): Output of fleet_inputs.
+        evaluated_fuels (array): Alternative fuel of each row.
+        chargers (DataFrame): Charger catalog with 'PowerLevel' (e.g. '50 kW') and 'Price'; no charger cost without it.
+        station_components (dict): Output of hydrogen_station.load_station_components; no station cost without it.
+        charging_hours (float): Hours a day the vehicles can charge.
+
+    Returns:
+        ndarray: Cost ($) of each row; NaN for a hydrogen group no station design can refuel in time.
+    """
+    evaluated_fuels = np.asarray(evaluated_fuels, dtype=object)
+    n_vehicles, daily_distance = inputs["n_vehicles"], inputs["daily_distance"]
+    efficiency = inputs["evaluated_fuel_efficiency"]
+    cost = np.zeros(len(evaluated_fuels))
+
+    electric = evaluated_fuels == "Battery electric"
+    if chargers is not None and electric.any():
+        power = chargers["PowerLevel"].astype(str).str.replace("kW", "").astype(float).to_numpy()
+        price = chargers["Price"].to_numpy(dtype=float)
+        energy = n_vehicles[electric] * efficiency[electric] * daily_distance[electric]
+        counts = np.maximum(np.ceil(energy[:, None] / (power * charging_hours)), 1)
+        cost[electric] = (counts * price).min(axis=1)
+
+    hydrogen = evaluated_fuels == "Hydrogen Fuel Cell"
+    if station_components is not None and hydrogen.any():
+        # Stations are sized once per distinct group, size_station costing every design of each
+        groups, inverse = np.unique(np.stack([n_vehicles[hydrogen], daily_distance[hydrogen], efficiency[hydrogen]],
+                                             axis=1), axis=0, return_inverse=True)
+        cost[hydrogen] = size_station(station_components, *groups.T)["cost"][inverse.ravel()]
+    return cost
+
+
+def evaluate_fleet(report, fleet, vehicle_index, dutycycle_index, province_index, incentives=None,
+                   discount_rate=FIXED_DEFAULTS["discount_rate"], chunk_rows=CHUNK_ROWS, chargers=None,
+                   station_components=None):
+    """
+    TCO and emissions of every group of a fleet inventory, replaced by its alternative.
+
+    Parameters:
+        report (callable): report(progress, message) called after each chunk, see jobs.submit_job.
+        fleet (DataFrame): Valid rows returned by validate_fleet.
+        vehicle_index, dutycycle_index, province_index (dict): Indexes from catalog.py.
+        incentives (dict): Output of incentives.compile_incentive_rules; no vehicle or infrastructure subsidy
+                           without it.
+        discount_rate (float): Discount rate.
+        chunk_rows (int): Rows evaluated per kernel call.
+        chargers, station_components: Charger catalog and hydrogen station components estimating the
+                                      infrastructure costs not given, see infrastructure_costs.
+
+    Returns:
+        DataFrame: The fleet's labels, vehicles, duty cycle and insurance, its infrastructure cost and subsidy ($),
+        the NPV of the existing vehicles, of the alternative and of the alternative with subsidies ($), the subsidy
+        per vehicle ($), the break-even year without and with subsidies (NaN if never), and the lifetime GHG
+        emissions of the existing and alternative vehicles and their reduction (tonnes).
+    """
+    inputs = fleet_inputs(fleet, vehicle_index, dutycycle_index, province_index)
+    weight_configurations = fleet["Weight_Confi"].to_numpy(dtype=object)
+    existing_fuels = fleet["Existing fuel"].to_numpy(dtype=object)
+    evaluated_fuels = fleet["Alternative fuel"].to_numpy(dtype=object)
+    provinces = fleet["Province"].to_numpy(dtype=object)
+
+    def catalog(fuels, name):
+        return np.array([vehicle_index[(w, f)][name] for w, f in zip(weight_configurations, fuels)], dtype=float)
+
+    subsidy = np.zeros(len(fleet)) if incentives is None else vehicle_subsidy(
+        incentives, provinces, weight_configurations, evaluated_fuels, inputs["evaluated_price"],
+        inputs["existing_price"], inputs["n_vehicles"])
+    infra_cost = np.where(np.isnan(inputs["total_infra_cost"]),
+                          infrastructure_costs(inputs, evaluated_fuels, chargers, station_components),
+                          inputs["total_infra_cost"])
+    infra_subsidy = np.zeros(len(fleet)) if incentives is None else infrastructure_subsidy(
+        incentives, provinces, weight_configurations, evaluated_fuels, np.nan_to_num(infra_cost))
+    intensity = np.nan_to_num(inputs["hydro_electricity_intensity"])
+    alt_ghg_per_km = ghg_per_km(evaluated_fuels, inputs["evaluated_fuel_efficiency"],
+                                catalog(evaluated_fuels, "GHG EF"), intensity, intensity)
+    base_ghg_ef = catalog(existing_fuels, "GHG EF")
+
+    npv = np.empty((len(fleet), 3))
+    break_even = np.empty((len(fleet), 2))
+    ghg = np.empty((len(fleet), 2))
+    for start in range(0, len(fleet), chunk_rows):
+        rows = slice(start, min(start + chunk_rows, len(fleet)))
+        costs = yearly_costs(
+            n_vehicles=inputs["n_vehicles"][rows],
+            daily_distance=inputs["daily_distance"][rows],
+            days_operation=inputs["yearly_days_operations"][rows],
+            lifetime=inputs["vehicle_lifetime"][rows],
+            discount_rate=discount_rate,
+            provincial_tax=inputs["provincial_tax"][rows],
+            base_vehicle_cost=inputs["existing_price"][rows],
+            alt_vehicle_cost=inputs["evaluated_price"][rows],
+            base_maintenance=inputs["existing_maintenance"][rows],
+            alt_maintenance=inputs["evaluated_maintenance"][rows],
+            base_fuel=inputs["existing_fuel_perkm"][rows],
+            alt_fuel=fuel_cost_per_km(evaluated_fuels[rows], inputs["evaluated_fuel_price"][rows],
+                                      inputs["evaluated_fuel_efficiency"][rows]),
+            base_insurance=inputs["existing_vehicle_insurance"][rows],
+            alt_insurance=inputs["alternative_vehicle_insurance"][rows],
+            infra_cost=infra_cost[rows],
+            vehicle_subsidy=subsidy[rows],
+            infra_subsidy=infra_subsidy[rows],
+        )
+        summary = summarize(costs)
+        npv[rows], break_even[rows] = summary["npv"], summary["break_even"]
+
+        duty = {name: inputs[name][rows] for name in ("n_vehicles", "daily_distance", "yearly_days_operations",
+                                                      "vehicle_lifetime")}
+        ghg[rows] = lifetime_pollutants(duty, {"GHG EF": base_ghg_ef[rows], "NOx EF": 0.0, "PM2.5 EF": 0.0},
+                                        alt_ghg_per_km[rows], 0.0, 0.0)["ghg"]
+        report(rows.stop / len(fleet), f"Evaluated {rows.stop:,d} of {len(fleet):,d} rows")
+
+    return fleet[list(REQUIRED_COLUMNS) + list(DUTY_CYCLE_COLUMNS) + list(COST_COLUMNS)[1:]].assign(**{
+        "Infrastructure cost ($)": infra_cost,
+        "Infrastructure subsidy ($)": infra_subsidy,
+        "NPV existing ($)": npv[:, 0],
+        "NPV alternative ($)": npv[:, 1],
+        "NPV alternative with subsidies ($)": npv[:, 2],
+        "Subsidy per vehicle ($)": subsidy,
+        "Break-even year": break_even[:, 0],
+        "Break-even year with subsidies": break_even[:, 1],
+        "GHG existing (t)": ghg[:, 0],
+        "GHG alternative (t)": ghg[:, 1],
+        "GHG reduction (t)": ghg[:, 0] - ghg[:, 1],
+    })
@@ -0,0 +1,167 @@
+"""
+Goal seek on the vectorized TCO kernel.
+
+Finds the value of one input (vehicle subsidy, fuel prices, vehicle price or
+daily distance) at which the alternative reaches cost parity with the existing
+vehicle: equal NPV over the vehicle lifetime, or break-even by a target year.
+The parity gap (cumulative cost of the alternative minus that of the existing
+vehicle at the target year) is found with a bracketed false-position search
+(Illinois variant), every step evaluating the whole batch in one kernel call.
+Any other numeric input may be an array, in which case every scenario of the
+batch is solved at once.
+"""
+import numpy as np
+
+from scenario_batch import evaluate_scenario
+from tco_kernel import fuel_cost_per_km
+
+# Inputs that can be solved for, with their label
+SOLVABLE_INPUTS = {
+    "user_vehicle_incentive_amount": "Subsidy per alternative vehicle ($)",
+    "evaluated_fuel_price": "Alternative fuel price",
+    "existing_fuel_price": "Existing fuel price",
+    "evaluated_price": "Alternative vehicle price ($)",
+    "daily_distance": "Daily distance (km)",
+}
+
+
+def _with_value(inputs, name, value):
+    # Copy of the scenario with one input replaced, keeping the fuel costs per km consistent with the fuel prices
+    inputs = dict(inputs, **{name: value})
+    if name == "evaluated_fuel_price":
+        inputs["evaluated_fuel_perkm"] = fuel_cost_per_km(inputs["evaluated_fuel"], value, inputs["evaluated_fuel_efficiency"])
+    elif name == "existing_fuel_price":
+        inputs["existing_fuel_perkm"] = fuel_cost_per_km(inputs["existing_fuel"], value, inputs["existing_fuel_efficiency"])
+    return inputs
+
+
+def parity_gap(cumulative, target_year=None, with_subsidies=True):
+    """
+    Cumulative cost of the alternative minus that of the existing vehicle at a target year.
+
+    Parameters:
+        cumulative (ndarray): Cumulative costs of shape batch + (series, year), see tco_kernel.summarize.
+        target_year (array): Year at which the gap is taken, linearly interpolated between years;
+                             None for the last year (NPV parity).
+        with_subsidies (bool): Whether the alternative is taken with its subsidies.
+
+    Returns:
+        ndarray: Gap ($) of the batch shape; negative where the alternative has already broken even.
+    """
+    gap = cumulative[..., 2 if with_subsidies else 1, :] - cumulative[..., 0, :]
+    if target_year is None:
+        return gap[..., -1]
+    last = gap.shape[-1] - 1
+    target_year = np.asarray(target_year, dtype=float)
+    shape = np.broadcast_shapes(gap.shape[:-1], target_year.shape)
+    gap = np.broadcast_to(gap, shape + gap.shape[-1:])
+    target_year = np.clip(np.broadcast_to(target_year, shape), 0, last)
+    index = np.minimum(np.floor(target_year).astype(int), max(last - 1, 0))[..., None]
+    before = np.take_along_axis(gap, index, axis=-1)[..., 0]
+    after = np.take_along_axis(gap, np.minimum(index + 1, last), axis=-1)[..., 0]
+    return before + (target_year - index[..., 0]) * (after - before)
+
+
+def bracketed_root(objective, lower, upper, xtol=1e-6, ftol=0.01, max_iter=60, max_expansions=20):
+    """
+    Vectorized root of a function known to change sign on an interval.
+
+    Where the function has the same sign at both ends but is closer to zero at the upper end, the
+    upper end is pushed away from the lower one (doubling the interval) until it changes sign. Roots are then refined by false position with
+    the Illinois modification, which converges in a few steps for the near-linear costs of the kernel.
+
+    Parameters:
+        objective (callable): Maps an array of candidate values to the function values, elementwise.
+        lower, upper (array): Initial interval of each element of the batch.
+        xtol (float): Relative interval width at which an element has converged.
+        ftol (float): Absolute function value at which an element has converged.
+        max_iter (int): Maximum number of refinement steps.
+        max_expansions (int): Maximum number of interval doublings.
+
+    Returns:
+        tuple: Roots (NaN where no sign change was found), convergence mask and the number of calls to objective.
+    """
+    a, b = np.broadcast_arrays(np.asarray(lower, dtype=float), np.asarray(upper, dtype=float))
+    a, b = a.copy(), b.copy()
+    fa, fb = objective(np.stack([a, b]))
+    calls = 1
+
+    # Widen the intervals that do not bracket a root
+    for _ in range(max_expansions):
+        unbracketed = (np.sign(fa) == np.sign(fb)) & (np.abs(fb) < np.abs(fa))
+        if not unbracketed.any():
+            break
+        b = np.where(unbracketed, a + 2 * (b - a), b)
+        fb = np.where(unbracketed, objective(b), fb)
+        calls += 1
+
+    bracketed = (np.sign(fa) != np.sign(fb)) & np.isfinite(fa) & np.isfinite(fb)
+    root = np.where(np.abs(fa) <= np.abs(fb), a, b)
+    converged = bracketed & (np.minimum(np.abs(fa), np.abs(fb)) <= ftol)
+
+    for _ in range(max_iter):
+        active = bracketed & ~converged
+        if not active.any():
+            break
+        with np.errstate(divide="ignore", invalid="ignore"):
+            c = np.where(fb != fa, b - fb * (b - a) / (fb - fa), (a + b) / 2)
+        c = np.where(active, c, root)
+        fc = objective(c)
+        calls += 1
+
+        # Keep the root bracketed by c and the end of opposite sign, halving the retained end's value
+        # when the same end is kept twice in a row
+        crossed = np.sign(fc) != np.sign(fb)
+        a, fa = np.where(active & crossed, b, a), np.where(active & crossed, fb, np.where(active, fa / 2, fa))
+        b, fb = np.where(active, c, b), np.where(active, fc, fb)
+        root = np.where(active, c, root)
+        converged |= active & ((np.abs(fc) <= ftol) | (np.abs(b - a) <= xtol * (1 + np.abs(c))))
+
+    return np.where(bracketed, root, np.nan), converged, calls
+
+
+def goal_seek(inputs, name, vehicle_index, province_index, target_year=None, with_subsidies=True,
+              lower=0.0, upper=None, evaluate=evaluate_scenario):
+    """
+    Solves for the value of one input at which the alternative reaches parity with the existing vehicle.
+
+    Parameters:
+        inputs (dict): The scenario entered in the app; numeric inputs may be arrays to solve a batch.
+        name (str): Input solved for, one of SOLVABLE_INPUTS.
+        vehicle_index (dict): Output of catalog.build_vehicle_index.
+        province_index (dict): Output of catalog.build_province_index.
+        target_year (array): Year by which the alternative breaks even; None (or NaN) for NPV parity
+                             over the vehicle lifetime.
+        with_subsidies (bool): Whether the alternative is taken with its subsidies.
+        lower, upper (array): Initial search interval; upper defaults to twice the current value, or the
+                              alternative vehicle price for the subsidy.
+        evaluate (callable): Scenario evaluation returning kernel summary arrays, see evaluate_scenario.
+
+    Returns:
+        dict: 'value' (NaN where no value reaches parity), 'converged' (bool) and 'current_gap' (gap in $ at
+        the current inputs, negative where parity is already reached), of the batch shape, and
+        'evaluations', the number of kernel calls.
+
+    Raises:
+        ValueError: If name is not a solvable input.
+    """
+    if name not in SOLVABLE_INPUTS:
+        raise ValueError(f"Cannot solve for {name}; choose one of {', '.join(SOLVABLE_INPUTS)}")
+
+    if target_year is not None:
+        target_year = np.asarray(target_year, dtype=float)
+        target_year = np.where(np.isnan(target_year), np.asarray(inputs["vehicle_lifetime"], dtype=float), target_year)
+
+    def objective(value):
+        cumulative = evaluate(_with_value(inputs, name, value), vehicle_index, province_index)["cumulative"]
+        return parity_gap(cumulative, target_year, with_subsidies)
+
+    current = np.asarray(0.0 if inputs[name] is None else inputs[name], dtype=float)
+    current_gap = parity_gap(evaluate(inputs, vehicle_index, province_index)["cumulative"], target_year, with_subsidies)
+    if upper is None:
+        upper = np.maximum(2 * current, np.asarray(inputs["evaluated_price"], dtype=float)
+                           if name == "user_vehicle_incentive_amount" else 1.0)
+    shape = np.broadcast(np.asarray(lower), np.asarray(upper), current_gap).shape
+    value, converged, calls = bracketed_root(
+        objective, np.broadcast_to(lower, shape), np.broadcast_to(upper, shape))
+    return {"value": value, "converged": converged, "current_gap": current_gap, "evaluations": calls + 1}
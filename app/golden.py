@@ -0,0 +1,474 @@
+"""
+Golden-scenario corpus for checking cost engines against the original loops.
+
+The corpus is a seeded sample of a few thousand scenarios covering every
+province, vehicle configuration and fuel pair of the app, with financing
+(including zero-rate loans) on and off, depreciation on neither, one or both
+vehicles, insurance, infrastructure costs and subsidies on and off. The
+outputs of the loops in legacy_tco.py (cumulative costs, cost breakdown, NPV
+and break-even years) are stored with the inputs in golden_scenarios.npz:
+the references, from the loops with the fixes the kernel made on purpose
+(INTENDED_FIXES) applied, and the outputs of the original loops.
+
+An engine is any function taking the corpus inputs (a dict of arrays, one
+entry per scenario) and returning arrays laid out as tco_kernel.summarize.
+check_engine compares it with the references on every scenario within a
+tolerance, and times it against the loops in the same run. It also checks
+that the fixed loops depart from the original ones only on the scenarios
+INTENDED_FIXES names, so that the fixes stay confined to what they claim:
+
+    python app/golden.py generate
+    python app/golden.py check --engine scenario_engine:my_engine
+"""
+import argparse
+import importlib
+import time
+
+import numpy as np
+import pandas as pd
+
+import legacy_tco
+from catalog import build_dutycycle_index, build_province_index, build_vehicle_index
+from precompute import default_combinations
+from reference_data import combined_labels, load_reference_table
+from tco_kernel import fuel_cost_per_km, summarize, yearly_costs
+
+CORPUS_PATH = "golden_scenarios.npz"
+CORPUS_SIZE = 3000
+
+# Scenario labels and numeric inputs, named as in the app; NaN is an input left empty
+LABEL_COLUMNS = ("user_province", "user_weight_configuration", "existing_fuel", "evaluated_fuel")
+INPUT_COLUMNS = (
+    "provincial_tax", "n_vehicles", "existing_price", "evaluated_price", "charging_station_costs",
+    "infra_constr_grid_upgrade_costs", "total_infra_cost", "existing_maintenance", "evaluated_maintenance",
+    "existing_fuel_perkm", "evaluated_fuel_perkm", "vehicle_lifetime", "daily_distance", "yearly_days_operations",
+    "user_vehicle_incentive_amount", "user_chargerRefuelling_incentive_amount", "discount_rate",
+    "existing_vehicle_insurance", "alternative_vehicle_insurance", "existing_vehicle_depreciation",
+    "alternative_vehicle_depreciation", "financing_period", "downpayment", "financing_rate",
+)
+
+# Categories of the loops' cost breakdown, the first ones of tco_kernel.CATEGORIES
+LEGACY_CATEGORIES = ("Vehicle", "Infrastructure", "Maintenance", "Fuel", "Insurance")
+
+OUTPUTS = ("cumulative", "by_category", "npv", "break_even")
+
+
+def _financed_at_zero_rate(scenarios, reference):
+    return (np.nan_to_num(scenarios["financing_period"]) > 0) & ~(np.nan_to_num(scenarios["financing_rate"]) > 0)
+
+
+def _one_sided_resale(scenarios, reference):
+    return (np.nan_to_num(scenarios["existing_vehicle_depreciation"]) > 0) != (np.nan_to_num(scenarios["alternative_vehicle_depreciation"]) > 0)
+
+
+def _any_resale(scenarios, reference):
+    return (np.nan_to_num(scenarios["existing_vehicle_depreciation"]) > 0) | (np.nan_to_num(scenarios["alternative_vehicle_depreciation"]) > 0)
+
+
+def _any_insurance(scenarios, reference):
+    return (scenarios["existing_vehicle_insurance"] > 0) | (scenarios["alternative_vehicle_insurance"] > 0)
+
+
+def _clamped_vehicle_cost(scenarios, reference):
+    return _any_resale(scenarios, reference) & (reference["by_category"][..., 0] == 0).any(axis=-1)
+
+
+# Scenarios where the kernel, and the fixed loops, intentionally depart from the original loops, per output:
+# (reason, mask function)
+INTENDED_FIXES = {
+    "cumulative": [
+        ("financing at a zero rate divided by zero", _financed_at_zero_rate),
+        ("resale was only counted when both depreciation rates were set", _one_sided_resale),
+    ],
+    "break_even": [
+        ("financing at a zero rate divided by zero", _financed_at_zero_rate),
+        ("resale was only counted when both depreciation rates were set", _one_sided_resale),
+    ],
+    "by_category": [
+        ("financing at a zero rate left the financed share unpaid", _financed_at_zero_rate),
+        ("vehicle cost net of resale was clamped at zero", _clamped_vehicle_cost),
+    ],
+    "npv": [
+        ("financing at a zero rate divided by zero", _financed_at_zero_rate),
+        ("insurance was left out of the NPV", _any_insurance),
+        ("resale was not scaled by the number of vehicles, and needed both depreciation rates", _any_resale),
+    ],
+}
+
+
+def generate_scenarios(vehicle_index, dutycycle_index, province_index, size=CORPUS_SIZE, seed=0):
+    """
+    Seeded sample of scenarios around the catalog, duty cycle and provincial defaults.
+
+    Every (province, Weight_Confi, existing fuel, alternative fuel) combination of the app is drawn once
+    before any is drawn again; the other inputs are varied around their defaults, and financing,
+    depreciation, insurance, infrastructure and subsidies are each switched on in about half the scenarios.
+
+    Returns:
+        dict: LABEL_COLUMNS and INPUT_COLUMNS arrays of length size.
+    """
+    rng = np.random.RandomState(seed)
+    combinations = default_combinations(vehicle_index, dutycycle_index, province_index)
+    repeats = -(-size // len(combinations))
+    order = np.concatenate([rng.permutation(len(combinations)) for _ in range(repeats)])[:size]
+
+    rows = []
+    for index in order:
+        province, weight_configuration, existing_fuel, evaluated_fuel = combinations[index]
+        base_row = vehicle_index[(weight_configuration, existing_fuel)]
+        alt_row = vehicle_index[(weight_configuration, evaluated_fuel)]
+        duty = dutycycle_index[weight_configuration]
+        prices = province_index[province]
+
+        def around(value, spread=0.2):
+            return float(value) * rng.uniform(1 - spread, 1 + spread)
+
+        lifetime = rng.randint(3, 21)
+        row = dict(
+            user_province=province, user_weight_configuration=weight_configuration,
+            existing_fuel=existing_fuel, evaluated_fuel=evaluated_fuel,
+            provincial_tax=prices["taxes_perc"] / 100,
+            n_vehicles=rng.randint(1, 51),
+            existing_price=round(around(base_row["Default_price"])),
+            evaluated_price=round(around(alt_row["Default_price"])),
+            existing_maintenance=around(base_row["Maintenance"]),
+            evaluated_maintenance=around(alt_row["Maintenance"]),
+            existing_fuel_perkm=float(fuel_cost_per_km(existing_fuel, around(prices[existing_fuel]), base_row["FuelEfficiencyCAD"])),
+            evaluated_fuel_perkm=float(fuel_cost_per_km(evaluated_fuel, around(prices[evaluated_fuel]), alt_row["FuelEfficiencyCAD"])),
+            vehicle_lifetime=lifetime,
+            daily_distance=max(1, round(around(duty["average_daily_distance"], 0.5))),
+            yearly_days_operations=min(365, max(1, round(around(duty["yearly_days_operation"])))),
+            discount_rate=round(rng.uniform(0, 0.12), 3),
+        )
+
+        # Infrastructure, entered as a total or split into station and construction costs
+        infra = round(rng.uniform(2e4, 2e6)) if rng.rand() < 0.5 else 0.0
+        station_share = rng.uniform(0.3, 0.9) if infra and rng.rand() < 0.5 else 0.0
+        row.update(total_infra_cost=infra, charging_station_costs=infra * station_share,
+                   infra_constr_grid_upgrade_costs=infra * (1 - station_share) if station_share else 0.0)
+
+        subsidised = rng.rand() < 0.5
+        row.update(user_vehicle_incentive_amount=round(rng.uniform(0, 0.4) * row["evaluated_price"]) if subsidised else 0.0,
+                   user_chargerRefuelling_incentive_amount=round(rng.uniform(0, 0.5) * infra) if subsidised else 0.0)
+
+        insured = rng.rand() < 0.5
+        row.update(existing_vehicle_insurance=rng.uniform(0.02, 0.3) if insured else 0.0,
+                   alternative_vehicle_insurance=rng.uniform(0.02, 0.3) if insured else 0.0)
+
+        # Depreciation on neither, both, the existing or the alternative vehicle
+        resale = rng.randint(4)
+        row.update(existing_vehicle_depreciation=rng.uniform(5, 25) if resale in (1, 2) else np.nan,
+                   alternative_vehicle_depreciation=rng.uniform(5, 25) if resale in (1, 3) else np.nan)
+
+        if rng.rand() < 0.5:
+            row.update(financing_period=rng.randint(1, lifetime + 4), downpayment=rng.uniform(0, 50),
+                       financing_rate=0.0 if rng.rand() < 0.15 else rng.uniform(1, 12))
+        else:
+            row.update(financing_period=np.nan, downpayment=np.nan, financing_rate=np.nan)
+        rows.append(row)
+
+    table = pd.DataFrame(rows)
+    scenarios = {column: table[column].to_numpy(dtype=str) for column in LABEL_COLUMNS}
+    scenarios.update({column: table[column].to_numpy(dtype=float) for column in INPUT_COLUMNS})
+    return scenarios
+
+
+def _legacy_args(scenarios, k, energy_price_province):
+    # Positional arguments of the loops for scenario k, empty inputs passed as None
+    def value(column):
+        x = scenarios[column][k]
+        return None if np.isnan(x) else float(x)
+
+    return (
+        scenarios["existing_fuel"][k], scenarios["evaluated_fuel"][k], value("n_vehicles"), value("existing_price"),
+        value("evaluated_price"), value("charging_station_costs"), value("infra_constr_grid_upgrade_costs"),
+        value("existing_maintenance"), value("evaluated_maintenance"), value("existing_fuel_perkm"),
+        value("evaluated_fuel_perkm"), int(scenarios["vehicle_lifetime"][k]), value("daily_distance"),
+        value("yearly_days_operations"), value("user_vehicle_incentive_amount"),
+        value("user_chargerRefuelling_incentive_amount"), value("discount_rate"), scenarios["user_province"][k],
+        energy_price_province, value("total_infra_cost"), value("existing_vehicle_insurance"),
+        value("alternative_vehicle_insurance"), value("existing_vehicle_depreciation"),
+        value("alternative_vehicle_depreciation"), value("financing_period"), value("downpayment"), value("financing_rate"),
+    )
+
+
+def _legacy_provinces(scenarios):
+    # The loops look the tax rate up in the provincial price table
+    provinces, first = np.unique(scenarios["user_province"], return_index=True)
+    return pd.DataFrame({"province": provinces, "taxes_perc": scenarios["provincial_tax"][first] * 100})
+
+
+def run_legacy(scenarios, k, energy_price_province, fixed=False):
+    """
+    Runs the four loops of legacy_tco for one scenario, with or without the intended fixes.
+
+    Returns:
+        dict: OUTPUTS for the scenario (NaN for the alternative with subsidies when there are none), leaving
+        out those whose loop raised.
+    """
+    args = _legacy_args(scenarios, k, energy_price_province)
+
+    def by_series(values):
+        values = np.asarray(values, dtype=float)
+        return values if len(values) == 3 else np.concatenate([values, np.full((1,) + values.shape[1:], np.nan)])
+
+    outputs = {}
+    try:
+        total_cost = legacy_tco.discounted_TCO(*args, fixed=fixed)
+        break_even = legacy_tco.analyze_break_even_points_interpolated(total_cost)
+        outputs["cumulative"] = total_cost[["DCO_base", "DCO_alternative", "DCO_alternative_Withincentive"]].to_numpy(dtype=float).T
+        outputs["break_even"] = np.array([np.nan if year is None else year for year in break_even], dtype=float)
+    except ZeroDivisionError:
+        pass
+    try:
+        outputs["by_category"] = by_series(legacy_tco.stacked_bar_DCO(*args, fixed=fixed).to_numpy())
+    except ZeroDivisionError:
+        pass
+    try:
+        outputs["npv"] = by_series(legacy_tco.calculate_NPV_and_percent_changes(*args, fixed=fixed).to_numpy())
+    except ZeroDivisionError:
+        pass
+    return outputs
+
+
+def reference_outputs(scenarios, fixed=True):
+    """
+    Outputs of the loops, with or without the intended fixes, for every scenario of the corpus.
+
+    Returns:
+        dict: 'cumulative' (K, series, year), padded with NaN after each lifetime, 'by_category' (K, series,
+        LEGACY_CATEGORIES), 'npv' (K, series) and 'break_even' (K, 2), NaN where the loops give no value,
+        and 'legacy_error' (K, output), True where the loop of an output raised.
+    """
+    energy_price_province = _legacy_provinces(scenarios)
+    size = len(scenarios["vehicle_lifetime"])
+    years = int(np.max(scenarios["vehicle_lifetime"])) + 1
+    reference = {
+        "cumulative": np.full((size, 3, years), np.nan),
+        "by_category": np.full((size, 3, len(LEGACY_CATEGORIES)), np.nan),
+        "npv": np.full((size, 3), np.nan),
+        "break_even": np.full((size, 2), np.nan),
+        "legacy_error": np.zeros((size, len(OUTPUTS)), dtype=bool),
+    }
+    for k in range(size):
+        outputs = run_legacy(scenarios, k, energy_price_province, fixed)
+        for i, name in enumerate(OUTPUTS):
+            if name not in outputs:
+                reference["legacy_error"][k, i] = True
+            elif name == "cumulative":
+                reference[name][k, :, :outputs[name].shape[-1]] = outputs[name]
+            else:
+                reference[name][k] = outputs[name]
+    return reference
+
+
+def save_corpus(scenarios, reference, legacy, path=CORPUS_PATH, seed=0):
+    np.savez_compressed(path, seed=seed, **scenarios, **{f"reference_{name}": value for name, value in reference.items()},
+                        **{f"legacy_{name}": value for name, value in legacy.items()})
+
+
+def load_corpus(path=CORPUS_PATH):
+    """
+    Reads the corpus written by save_corpus.
+
+    Returns:
+        tuple: Scenario inputs, reference outputs (fixed loops) and outputs of the original loops, as dicts of
+        arrays.
+    """
+    with np.load(path, allow_pickle=False) as archive:
+        scenarios = {column: archive[column] for column in LABEL_COLUMNS + INPUT_COLUMNS}
+        reference = {name[len("reference_"):]: archive[name] for name in archive.files if name.startswith("reference_")}
+        legacy = {name[len("legacy_"):]: archive[name] for name in archive.files if name.startswith("legacy_")}
+    return scenarios, reference, legacy
+
+
+def kernel_engine(scenarios):
+    """
+    Evaluates the corpus with the vectorized kernel in a single call.
+
+    Returns:
+        dict: Kernel summary arrays, see tco_kernel.summarize.
+    """
+    def value(column, default=0.0):
+        return np.where(np.isnan(scenarios[column]), default, scenarios[column])
+
+    costs = yearly_costs(
+        n_vehicles=scenarios["n_vehicles"], daily_distance=scenarios["daily_distance"],
+        days_operation=scenarios["yearly_days_operations"], lifetime=scenarios["vehicle_lifetime"],
+        discount_rate=scenarios["discount_rate"], provincial_tax=scenarios["provincial_tax"],
+        base_vehicle_cost=scenarios["existing_price"], alt_vehicle_cost=scenarios["evaluated_price"],
+        base_maintenance=scenarios["existing_maintenance"], alt_maintenance=scenarios["evaluated_maintenance"],
+        base_fuel=scenarios["existing_fuel_perkm"], alt_fuel=scenarios["evaluated_fuel_perkm"],
+        base_insurance=value("existing_vehicle_insurance"), alt_insurance=value("alternative_vehicle_insurance"),
+        base_depreciation=value("existing_vehicle_depreciation"), alt_depreciation=value("alternative_vehicle_depreciation"),
+        infra_cost=scenarios["total_infra_cost"], vehicle_subsidy=scenarios["user_vehicle_incentive_amount"],
+        infra_subsidy=scenarios["user_chargerRefuelling_incentive_amount"],
+        financing_period=value("financing_period"), downpayment=value("downpayment", 100.0),
+        financing_rate=value("financing_rate"),
+    )
+    return summarize(costs)
+
+
+def _comparable(name, scenarios, reference):
+    # Elements with a reference value; a missing break-even year is only a value with subsidies
+    if name != "break_even":
+        return ~np.isnan(reference[name])
+    subsidised = (scenarios["user_vehicle_incentive_amount"] > 0) | (scenarios["user_chargerRefuelling_incentive_amount"] > 0)
+    return np.stack([np.ones_like(subsidised), subsidised], axis=-1)
+
+
+def compare_outputs(outputs, scenarios, reference, rtol=1e-9, atol=1e-6, intended_fixes=None):
+    """
+    Compares an engine's outputs with the references, scenario by scenario.
+
+    Parameters:
+        intended_fixes (dict): Scenarios to set aside per output, as INTENDED_FIXES; none by default.
+
+    Returns:
+        dict: Per output, 'checked', 'matched', 'intended' (scenarios set aside, per reason, including those where
+        the reference loop raised), 'failed' (indices of the other mismatching scenarios) and 'max_error' (largest
+        absolute difference among the matched scenarios).
+    """
+    size = len(scenarios["vehicle_lifetime"])
+    report = {}
+    for name in OUTPUTS:
+        expected = reference[name]
+        actual = np.asarray(outputs[name], dtype=float)
+        if name == "by_category":
+            actual = actual[..., :len(LEGACY_CATEGORIES)]
+        if name == "cumulative":
+            width = expected.shape[-1]
+            actual = actual[..., :width] if actual.shape[-1] >= width else np.concatenate(
+                [actual, np.full(actual.shape[:-1] + (width - actual.shape[-1],), np.nan)], axis=-1)
+
+        comparable = _comparable(name, scenarios, reference)
+        close = np.isclose(actual, expected, rtol=rtol, atol=atol) | (np.isnan(actual) & np.isnan(expected))
+        matched = (close | ~comparable).reshape(size, -1).all(axis=1)
+
+        intended = {}
+        set_aside = np.zeros(size, dtype=bool)
+        for reason, mask in (intended_fixes or {}).get(name, []):
+            hit = mask(scenarios, reference) & ~set_aside
+            intended[reason] = int(hit.sum())
+            set_aside |= hit
+        raised = reference["legacy_error"][:, OUTPUTS.index(name)] & ~set_aside
+        intended["the loop raised"] = int(raised.sum())
+        set_aside |= raised
+        errors = np.where(comparable & ~np.isnan(expected), np.abs(actual - expected), 0.0).reshape(size, -1).max(axis=1)
+        report[name] = {
+            "checked": int((~set_aside).sum()),
+            "matched": int((matched & ~set_aside).sum()),
+            "intended": intended,
+            "failed": np.flatnonzero(~matched & ~set_aside),
+            "max_error": float(np.nanmax(np.where(matched & ~set_aside, errors, 0.0))) if size else 0.0,
+        }
+    return report
+
+
+def check_fixes(scenarios, reference, legacy, rtol=1e-9, atol=1e-6):
+    """
+    Compares the fixed loops with the original ones, setting aside the scenarios of INTENDED_FIXES only.
+
+    Returns:
+        dict: compare_outputs report; any failure is a departure from the original loops no fix accounts for.
+    """
+    return compare_outputs(reference, scenarios, legacy, rtol, atol, INTENDED_FIXES)
+
+
+def check_engine(engine, scenarios=None, reference=None, rtol=1e-9, atol=1e-6, repeat=3, legacy_sample=200):
+    """
+    Runs an engine on the corpus, compares it with the references on every scenario and times it against the
+    loops.
+
+    Parameters:
+        engine (callable): Maps the corpus inputs to arrays laid out as tco_kernel.summarize.
+        scenarios, reference (dict): Corpus inputs and references (fixed loops); read from CORPUS_PATH when not
+                                     given.
+        rtol, atol (float): Relative and absolute ($) tolerance.
+        repeat (int): Engine runs timed; the fastest is kept.
+        legacy_sample (int): Scenarios the loops are timed on, extrapolated to the corpus.
+
+    Returns:
+        dict: compare_outputs report, plus 'scenarios', 'engine_seconds', 'legacy_seconds' and 'speedup'.
+    """
+    if scenarios is None:
+        scenarios, reference, _ = load_corpus()
+    size = len(scenarios["vehicle_lifetime"])
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        outputs = engine(scenarios)
+        timings.append(time.perf_counter() - start)
+    report = compare_outputs(outputs, scenarios, reference, rtol, atol)
+
+    sample = np.linspace(0, size - 1, min(legacy_sample, size)).astype(int)
+    energy_price_province = _legacy_provinces(scenarios)
+    start = time.perf_counter()
+    for k in sample:
+        run_legacy(scenarios, k, energy_price_province, fixed=True)
+    legacy_seconds = (time.perf_counter() - start) / max(len(sample), 1) * size
+
+    report.update(scenarios=size, engine_seconds=min(timings), legacy_seconds=legacy_seconds,
+                  speedup=legacy_seconds / min(timings))
+    return report
+
+
+def format_report(report):
+    """
+    Text summary of a check_engine or check_fixes report.
+
+    Returns:
+        str: One line per output, then the timings if there are any.
+    """
+    lines = []
+    for name in OUTPUTS:
+        result = report[name]
+        status = "ok" if not len(result["failed"]) else f"FAILED on {len(result['failed'])} (e.g. {[int(k) for k in result['failed'][:5]]})"
+        intended = ", ".join(f"{count} {reason}" for reason, count in result["intended"].items() if count)
+        lines.append(f"{name:12s} {result['matched']}/{result['checked']} matched, max error {result['max_error']:.2e}: {status}"
+                     + (f"; set aside: {intended}" if intended else ""))
+    if "engine_seconds" in report:
+        lines.append(f"{report['scenarios']} scenarios in {report['engine_seconds'] * 1e3:.1f} ms "
+                     f"(loops: {report['legacy_seconds']:.1f} s, estimated), speed-up {report['speedup']:,.0f}x")
+    return "\n".join(lines)
+
+
+def _load_engine(spec):
+    # 'module:function' on the app path
+    module, function = spec.split(":")
+    return getattr(importlib.import_module(module), function)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate the golden-scenario corpus or check an engine against it.")
+    parser.add_argument("command", choices=["generate", "check"])
+    parser.add_argument("--size", type=int, default=CORPUS_SIZE)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--engine", default="golden:kernel_engine", help="Engine to check, as module:function")
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument("--atol", type=float, default=1e-6)
+    parser.add_argument("--legacy-sample", type=int, default=200)
+    parser.add_argument("--path", default=CORPUS_PATH)
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        vehicles_info = load_reference_table("MHDV_costs_efficiency_final.csv")
+        vehicles_dutycycles = load_reference_table("MHDV_duty_cycles_final.csv")
+        vehicles_info["Weight_Confi"] = combined_labels(vehicles_info, ["WeightClass", "Configuration"])
+        vehicles_dutycycles["Weight_Confi"] = combined_labels(vehicles_dutycycles, ["WeightClass", "Configuration"])
+        scenarios = generate_scenarios(build_vehicle_index(vehicles_info), build_dutycycle_index(vehicles_dutycycles),
+                                       build_province_index(load_reference_table("province_energy_prices.csv")), args.size, args.seed)
+        reference = reference_outputs(scenarios, fixed=True)
+        legacy = reference_outputs(scenarios, fixed=False)
+        save_corpus(scenarios, reference, legacy, args.path, args.seed)
+        print(f"Wrote {args.size} scenarios to {args.path} ({int(reference['legacy_error'].any(axis=1).sum())} where a "
+              f"fixed loop raised, {int(legacy['legacy_error'].any(axis=1).sum())} where an original loop raised)")
+    else:
+        scenarios, reference, legacy = load_corpus(args.path)
+        print("Fixed loops against the original loops:")
+        print(format_report(check_fixes(scenarios, reference, legacy, args.rtol, args.atol)))
+        print(f"Engine {args.engine} against the fixed loops:")
+        report = check_engine(_load_engine(args.engine), scenarios, reference, args.rtol, args.atol,
+                              legacy_sample=args.legacy_sample)
+        print(format_report(report))
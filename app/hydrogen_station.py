@@ -0,0 +1,169 @@
+"""
+Bottom-up sizing and cost of a hydrogen refuelling station.
+
+The fleet's daily hydrogen demand (vehicles x daily distance x kg/100 km) must
+be dispensed within a peak fill window, when the vehicles return to the depot:
+
+- dispensers must fill every vehicle within the window, each fill taking the
+  vehicle's daily hydrogen at the dispenser's rate plus a changeover time;
+- compressors must deliver the daily demand within their daily operating hours;
+- storage must hold what the dispensers draw during the window beyond what the
+  compressors deliver meanwhile, only part of a storage bank being usable.
+
+Compression, storage and dispensers come from a cost table
+(hydrogen_station_costs.csv, one row per component option with its capacity: kg/h
+for compressors and dispensers, kg for storage). Every combination of options and
+compressor count is costed at once as an array, and the cheapest design that
+meets the window is kept, so that a station is sized within a rerun and a whole
+batch of scenarios (leading axes of the inputs) in one call.
+"""
+import numpy as np
+
+from reference_data import load_reference_table
+
+COMPONENTS = ("Compressor", "Storage", "Dispenser")
+
+# Hours per day the compressors may run
+COMPRESSOR_HOURS = 20.0
+
+# Share of a storage bank's capacity that can be dispensed before its pressure is too low
+USABLE_STORAGE_SHARE = 0.7
+
+# Hours between two fills at a dispenser (connecting, purging, moving the vehicles)
+CHANGEOVER_HOURS = 0.15
+
+# Installation, engineering and commissioning, as a share of the equipment cost
+INSTALLATION_SHARE = 0.35
+
+# Site preparation, permitting and utility connections ($)
+SITE_COST = 400_000.0
+
+# Most compressors of one option considered in a design
+MAX_COMPRESSORS = 8
+
+
+def load_station_components(path="hydrogen_station_costs.csv"):
+    """
+    Reads the station component cost table.
+
+    Returns:
+        dict: Per component in COMPONENTS, a dict of 'option' names, 'capacity' (kg/h or kg) and 'price' ($)
+        arrays.
+    """
+    table = load_reference_table(path)
+    return {component: {
+        "option": rows["Option"].astype(str).to_numpy(),
+        "capacity": rows["Capacity"].to_numpy(dtype=float),
+        "price": rows["Price"].to_numpy(dtype=float),
+    } for component, rows in ((component, table[table["Component"] == component]) for component in COMPONENTS)}
+
+
+def daily_hydrogen_demand(n_vehicles, daily_distance, fuel_efficiency):
+    """
+    Hydrogen dispensed per day (kg).
+
+    Parameters:
+        n_vehicles, daily_distance (array): Fleet size and daily distance (km).
+        fuel_efficiency (array): Consumption (kg/100 km).
+    """
+    return (np.asarray(n_vehicles, dtype=float) * np.asarray(daily_distance, dtype=float)
+            * np.asarray(fuel_efficiency, dtype=float) / 100)
+
+
+def size_station(components, n_vehicles, daily_distance, fuel_efficiency, fill_window=4.0,
+                 compressor_hours=COMPRESSOR_HOURS, max_compressors=MAX_COMPRESSORS):
+    """
+    Cheapest station design for a batch of fleets.
+
+    Parameters:
+        components (dict): Output of load_station_components.
+        n_vehicles, daily_distance (array): Fleet size and daily distance (km), broadcast together.
+        fuel_efficiency (array): Consumption (kg/100 km).
+        fill_window (array): Hours in which every vehicle must be refuelled.
+        compressor_hours (float): Hours per day the compressors may run.
+        max_compressors (int): Most compressors of one option considered.
+
+    Returns:
+        dict: Arrays of the batch shape: 'daily_demand' (kg), 'cost' ($, NaN where no design meets the window),
+        'equipment_cost', and per component the option index ('compressor', 'storage', 'dispenser') and count
+        ('n_compressors', 'n_storage', 'n_dispensers'). Fleets without demand get no station and a zero cost.
+    """
+    n_vehicles, daily_distance, fuel_efficiency, fill_window = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (n_vehicles, daily_distance, fuel_efficiency, fill_window)])
+    demand = daily_hydrogen_demand(n_vehicles, daily_distance, fuel_efficiency)
+    fill = daily_distance * fuel_efficiency / 100
+    compressor, storage, dispenser = (components[component] for component in COMPONENTS)
+
+    # Design axes: batch + (compressor option, compressor count, storage option, dispenser option)
+    def batch(x):
+        return x[..., None, None, None, None]
+
+    compressor_rate = (compressor["capacity"][:, None] * np.arange(1, max_compressors + 1))[:, :, None, None]
+    compressor_cost = (compressor["price"][:, None] * np.arange(1, max_compressors + 1))[:, :, None, None]
+    meets_demand = compressor_rate * compressor_hours >= batch(demand)
+
+    # Storage covers the window's draw beyond the compressors' delivery, with at least one bank as a buffer
+    shortfall = np.maximum(batch(demand) - compressor_rate * batch(fill_window), 0.0)
+    n_storage = np.maximum(np.ceil(shortfall / (storage["capacity"][:, None] * USABLE_STORAGE_SHARE)), 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        hours_per_fill = batch(fill) / dispenser["capacity"] + CHANGEOVER_HOURS
+        n_dispensers = np.maximum(np.ceil(batch(n_vehicles) * hours_per_fill / batch(fill_window)), 1.0)
+    # A fill longer than the window cannot be met by adding dispensers
+    meets_window = hours_per_fill <= batch(fill_window)
+
+    equipment = compressor_cost + n_storage * storage["price"][:, None] + n_dispensers * dispenser["price"]
+    equipment = np.where(meets_demand & meets_window, equipment, np.inf)
+
+    flat = equipment.reshape(demand.shape + (-1,))
+    best = flat.argmin(axis=-1)
+    equipment_cost = np.take_along_axis(flat, best[..., None], axis=-1)[..., 0]
+    i_compressor, i_count, i_storage, i_dispenser = np.unravel_index(best, equipment.shape[-4:])
+
+    def pick(values):
+        values = np.broadcast_to(values, equipment.shape).reshape(flat.shape)
+        return np.take_along_axis(values, best[..., None], axis=-1)[..., 0]
+
+    has_demand = demand > 0
+    feasible = np.isfinite(equipment_cost)
+    built = has_demand & feasible
+    cost = np.where(feasible, equipment_cost * (1 + INSTALLATION_SHARE) + SITE_COST, np.nan)
+    return {
+        "daily_demand": demand,
+        "cost": np.where(has_demand, cost, 0.0),
+        "equipment_cost": np.where(built, equipment_cost, 0.0),
+        "compressor": i_compressor,
+        "n_compressors": np.where(built, i_count + 1, 0),
+        "storage": i_storage,
+        "n_storage": np.where(built, pick(n_storage), 0).astype(int),
+        "dispenser": i_dispenser,
+        "n_dispensers": np.where(built, pick(n_dispensers), 0).astype(int),
+    }
+
+
+def station_bill_of_materials(components, design, index=()):
+    """
+    Components of one sized station.
+
+    Parameters:
+        components (dict): Output of load_station_components.
+        design (dict): Output of size_station.
+        index (tuple): Position of the station in the batch.
+
+    Returns:
+        list: (component, option, count, cost) tuples, then the installation and site costs; empty for a fleet
+        without demand, which gets no station.
+    """
+    if not design["daily_demand"][index] > 0:
+        return []
+    rows = []
+    for component, choice, count in zip(COMPONENTS, ("compressor", "storage", "dispenser"),
+                                        ("n_compressors", "n_storage", "n_dispensers")):
+        option = int(design[choice][index])
+        n = int(design[count][index])
+        rows.append((component, components[component]["option"][option], n,
+                     n * float(components[component]["price"][option])))
+    equipment = float(design["equipment_cost"][index])
+    rows.append(("Installation", f"{INSTALLATION_SHARE:.0%} of equipment", 1, equipment * INSTALLATION_SHARE))
+    rows.append(("Site", "Preparation, permitting and utilities", 1, SITE_COST))
+    return rows
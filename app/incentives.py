@@ -0,0 +1,161 @@
+"""
+Federal and provincial incentive rules.
+
+Vehicle and infrastructure incentive programs are declared in
+incentive_rules.csv, one row per rule: the program, what it applies to
+('Vehicle' or 'Infrastructure'), the provinces, Weight_Confi and powertrains it
+covers ('All', or a ';'-separated list), an amount cap ($ per vehicle, or per
+project for infrastructure), a percentage cap of its basis ('Price', the vehicle
+price or infrastructure cost, or 'Premium', the price difference with the
+existing vehicle), a maximum number of vehicles funded and a stacking limit (the
+most public funding, as a % of the basis, that may be combined with the
+program). Empty caps and limits do not apply.
+
+compile_incentive_rules turns the rules into lookup tables: an eligibility
+array indexed by (province, Weight_Confi, powertrain, rule) and one array per
+rule parameter. Evaluating a batch of scenarios is then a table lookup and a
+few array operations, with no rule interpreted per scenario:
+
+- each eligible rule grants the lesser of its amount cap and its percentage cap,
+  spread over the fleet when it funds fewer vehicles than the fleet has;
+- a program whose rules overlap grants the largest of them;
+- programs stack, scaled down together to the tightest stacking limit.
+"""
+import numpy as np
+import pandas as pd
+
+ANY = "All"
+
+APPLIES_TO = ("Vehicle", "Infrastructure")
+
+
+def load_incentive_rules(path="incentive_rules.csv"):
+    """
+    Reads the incentive rules.
+
+    Returns:
+        DataFrame: One row per rule, see the module docstring.
+    """
+    return pd.read_csv(path)
+
+
+def _matches(cells, names):
+    # (rule, name) whether each rule's cell covers each name
+    covered = [None if cell.strip() == ANY else {value.strip() for value in cell.split(";")} for cell in cells]
+    return np.array([[values is None or name in values for name in names] for values in covered], dtype=bool)
+
+
+def _limit(values):
+    # Fractions or amounts with empty cells as no limit
+    return pd.to_numeric(values, errors="coerce").fillna(np.inf).to_numpy(dtype=float)
+
+
+def compile_incentive_rules(rules, provinces, weight_configurations, powertrains):
+    """
+    Compiles incentive rules into lookup tables.
+
+    Parameters:
+        rules (DataFrame): Output of load_incentive_rules.
+        provinces, weight_configurations, powertrains (iterable): Labels the tables are indexed by; other labels
+                                                                  are eligible for nothing.
+
+    Returns:
+        dict: One table per APPLIES_TO entry, each a dict with the label indexes 'provinces',
+        'weight_configurations' and 'powertrains', 'eligible' (P + 1, W + 1, F + 1, rule) whose last row along each
+        label axis stands for unknown labels, 'programs' (program names), 'member' (program, rule), and per rule
+        'amount_cap', 'percent_cap' and 'stacking_limit' (fractions), 'premium' (whether the basis is the price
+        premium) and 'max_units'.
+    """
+    provinces, weight_configurations, powertrains = (pd.Index(list(labels)) for labels in
+                                                     (provinces, weight_configurations, powertrains))
+    rules = rules.fillna({"Province": ANY, "Weight_Confi": ANY, "Powertrain": ANY, "Percent_basis": "Price"})
+
+    tables = {}
+    for applies_to in APPLIES_TO:
+        selected = rules[rules["Applies_to"] == applies_to]
+        eligible = np.zeros((len(provinces) + 1, len(weight_configurations) + 1, len(powertrains) + 1, len(selected)),
+                            dtype=bool)
+        eligible[:-1, :-1, :-1] = (_matches(selected["Province"], provinces).T[:, None, None, :]
+                                   & _matches(selected["Weight_Confi"], weight_configurations).T[None, :, None, :]
+                                   & _matches(selected["Powertrain"], powertrains).T[None, None, :, :])
+        programs = pd.unique(selected["Program"])
+        tables[applies_to] = {
+            "provinces": provinces,
+            "weight_configurations": weight_configurations,
+            "powertrains": powertrains,
+            "eligible": eligible,
+            "programs": np.array(programs),
+            "member": selected["Program"].to_numpy() == np.array(programs)[:, None],
+            "amount_cap": _limit(selected["Amount_cap"]),
+            "percent_cap": _limit(selected["Percent_cap"]) / 100,
+            "premium": (selected["Percent_basis"].str.strip() == "Premium").to_numpy(),
+            "max_units": _limit(selected["Max_units"]),
+            "stacking_limit": _limit(selected["Stacking_limit"]) / 100,
+        }
+    return tables
+
+
+def _codes(index, labels):
+    # Positions of labels in an index, -1 where missing; each distinct label is looked up once
+    labels = np.asarray(labels, dtype=object)
+    codes, uniques = pd.factorize(labels.ravel())
+    return index.get_indexer(uniques)[codes].reshape(labels.shape)
+
+
+def _eligible(table, province, weight_configuration, powertrain):
+    # batch + (rule,) eligibility; unknown labels get index -1, the all-False last row
+    return table["eligible"][_codes(table["provinces"], province),
+                             _codes(table["weight_configurations"], weight_configuration),
+                             _codes(table["powertrains"], powertrain)]
+
+
+def program_amounts(table, province, weight_configuration, powertrain, price, premium=None, units=1):
+    """
+    Incentive of each program for a batch of scenarios.
+
+    Parameters:
+        table (dict): One of the tables returned by compile_incentive_rules.
+        province, weight_configuration, powertrain (array of str): Labels of the scenarios.
+        price (array): Vehicle price or infrastructure cost ($).
+        premium (array): Price difference with the existing vehicle ($); the price where not given.
+        units (array): Number of vehicles, for the programs funding a limited number of them.
+
+    Returns:
+        ndarray: Incentive per unit ($) of shape batch + (program,), see table['programs'].
+    """
+    eligible = _eligible(table, province, weight_configuration, powertrain)
+    price = np.asarray(price, dtype=float)
+    premium = price if premium is None else np.asarray(premium, dtype=float)
+    basis = np.maximum(np.where(table["premium"], premium[..., None], price[..., None]), 0.0)
+    units = np.maximum(np.asarray(units, dtype=float), 1.0)[..., None]
+
+    amount = np.minimum(table["amount_cap"], table["percent_cap"] * basis)
+    amount = np.where(eligible, amount * np.minimum(1.0, table["max_units"] / units), 0.0)
+    by_program = np.zeros(amount.shape[:-1] + (len(table["programs"]),))
+    for i, member in enumerate(table["member"]):
+        by_program[..., i] = amount[..., member].max(axis=-1, initial=0.0)
+
+    # Stacked programs are scaled down to the tightest stacking limit among the eligible rules
+    total = by_program.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        limit = np.where(eligible, table["stacking_limit"] * basis, np.inf).min(axis=-1, initial=np.inf)
+        scale = np.where(total > limit, limit / total, 1.0)
+    return by_program * scale[..., None]
+
+
+def vehicle_subsidy(tables, province, weight_configuration, powertrain, vehicle_price, existing_price, n_vehicles=1):
+    """
+    Total incentive per alternative vehicle ($), for a batch of scenarios; see program_amounts.
+    """
+    return program_amounts(tables["Vehicle"], province, weight_configuration, powertrain, vehicle_price,
+                           np.asarray(vehicle_price, dtype=float) - np.asarray(existing_price, dtype=float),
+                           n_vehicles).sum(axis=-1)
+
+
+def infrastructure_subsidy(tables, province, weight_configuration, powertrain, infra_cost):
+    """
+    Total incentive for the charging or refuelling infrastructure ($), for a batch of scenarios; see
+    program_amounts.
+    """
+    return program_amounts(tables["Infrastructure"], province, weight_configuration, powertrain,
+                           infra_cost).sum(axis=-1)
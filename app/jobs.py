@@ -0,0 +1,177 @@
+"""
+In-process background jobs.
+
+Long evaluations (e.g. a whole fleet inventory) run on a small shared thread
+pool instead of in the Streamlit script, so that the session stays responsive
+and no request waits on them. Each job gets an ID that the page keeps in its
+session state and polls for progress; it can be cancelled, and its result is
+kept for RETENTION_SECONDS after it finishes, the oldest finished jobs being
+evicted first once more than MAX_RETAINED are kept.
+
+Admission control keeps a few heavy jobs from starving interactive users of
+the same worker process: the pool has MAX_WORKERS threads, each session may
+have MAX_JOBS_PER_OWNER job queued or running, and jobs are refused once
+MAX_ACTIVE_JOBS are queued or running or their total weight (e.g. rows to
+evaluate) would exceed MAX_ACTIVE_WEIGHT. Jobs report progress between chunks
+of work, and every report briefly yields the interpreter to the other threads.
+
+A job function takes a report callable as its first argument:
+
+    def evaluate(report, rows):
+        for i, chunk in enumerate(chunks):
+            ...
+            report((i + 1) / len(chunks), f"Evaluated chunk {i + 1}")
+        return result
+
+    job_id = submit_job(evaluate, rows, owner=session_id, weight=len(rows))
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+MAX_WORKERS = 2
+MAX_ACTIVE_JOBS = 8
+MAX_JOBS_PER_OWNER = 1
+MAX_ACTIVE_WEIGHT = 1_000_000
+
+RETENTION_SECONDS = 3600
+MAX_RETAINED = 64
+
+# Pause at each progress report, letting interactive sessions run between chunks of work
+YIELD_SECONDS = 0.002
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_lock = threading.Lock()
+_jobs = {}
+_executor = None
+
+
+def _pool():
+    # Shared pool, started with the first job
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(MAX_WORKERS, thread_name_prefix="background-job")
+    return _executor
+
+
+def _evict(now):
+    # Drops expired finished jobs, then the oldest finished ones beyond MAX_RETAINED; called with the lock held
+    finished = sorted((job["finished"], job_id) for job_id, job in _jobs.items() if job["status"] not in ACTIVE_STATUSES)
+    expired = [job_id for time_finished, job_id in finished if now - time_finished > RETENTION_SECONDS]
+    excess = [job_id for _, job_id in finished[:max(0, len(finished) - MAX_RETAINED)]]
+    for job_id in set(expired) | set(excess):
+        del _jobs[job_id]
+
+
+def _run(job, function, args, kwargs):
+    with _lock:
+        if job["cancel"].is_set():
+            job.update(status="cancelled", message="Cancelled", finished=time.time())
+            return
+        job.update(status="running", message="Running", started=time.time())
+
+    def report(progress, message=None):
+        if job["cancel"].is_set():
+            raise CancelledError()
+        with _lock:
+            job["progress"] = min(max(float(progress), 0.0), 1.0)
+            if message:
+                job["message"] = message
+        time.sleep(YIELD_SECONDS)
+
+    try:
+        result = function(report, *args, **kwargs)
+    except CancelledError:
+        update = dict(status="cancelled", message="Cancelled")
+    except Exception as error:
+        update = dict(status="failed", message="Failed", error=f"{type(error).__name__}: {error}")
+    else:
+        update = dict(status="done", message="Done", progress=1.0, result=result)
+    with _lock:
+        job.update(update, finished=time.time())
+
+
+def submit_job(function, *args, owner=None, kind="job", weight=1, **kwargs):
+    """
+    Queues a job on the background pool.
+
+    Parameters:
+        function (callable): Called as function(report, *args, **kwargs) on a pool thread. report(progress,
+                             message=None) records the progress (0 to 1) and raises CancelledError once the job is
+                             cancelled; its return value is the job's result.
+        owner (str): Session submitting the job, for the per-session limit.
+        kind (str): Label of the job.
+        weight (float): Size of the job (e.g. rows to evaluate), for the admission limit.
+
+    Returns:
+        str: Job ID.
+
+    Raises:
+        RuntimeError: If the job is refused by admission control; the message can be shown to the user.
+    """
+    if weight > MAX_ACTIVE_WEIGHT:
+        raise RuntimeError(f"This job is too large to run in the app ({weight:,.0f} items, at most "
+                           f"{MAX_ACTIVE_WEIGHT:,d}); split it into smaller parts.")
+    with _lock:
+        _evict(time.time())
+        active = [job for job in _jobs.values() if job["status"] in ACTIVE_STATUSES]
+        if owner is not None and sum(job["owner"] == owner for job in active) >= MAX_JOBS_PER_OWNER:
+            raise RuntimeError("A background job of this session is still running; wait for it to finish or cancel it.")
+        if len(active) >= MAX_ACTIVE_JOBS or sum(job["weight"] for job in active) + weight > MAX_ACTIVE_WEIGHT:
+            raise RuntimeError("The server is busy with other background jobs; try again in a few minutes.")
+
+        job_id = uuid.uuid4().hex
+        job = dict(id=job_id, owner=owner, kind=kind, weight=weight, status="queued", progress=0.0, message="Queued",
+                   submitted=time.time(), started=None, finished=None, result=None, error=None,
+                   cancel=threading.Event())
+        _jobs[job_id] = job
+        job["future"] = _pool().submit(_run, job, function, args, kwargs)
+    return job_id
+
+
+def job_status(job_id):
+    """
+    Current state of a job.
+
+    Returns:
+        dict or None: 'id', 'owner', 'kind', 'weight', 'status' ('queued', 'running', 'done', 'failed' or
+        'cancelled'), 'progress' (0 to 1), 'message', 'error' and the 'submitted', 'started' and 'finished'
+        times; None if the job is unknown or was evicted.
+    """
+    with _lock:
+        _evict(time.time())
+        job = _jobs.get(job_id)
+        if job is None:
+            return None
+        return {key: value for key, value in job.items() if key not in ("result", "cancel", "future")}
+
+
+def job_result(job_id):
+    """
+    Result of a finished job.
+
+    Returns:
+        The value returned by the job function, or None if the job has not finished successfully or was evicted.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        return job["result"] if job is not None and job["status"] == "done" else None
+
+
+def cancel_job(job_id):
+    """
+    Cancels a job. A queued job is dropped at once; a running one stops at its next progress report.
+
+    Returns:
+        bool: Whether the job was still queued or running.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+        if job is None or job["status"] not in ACTIVE_STATUSES:
+            return False
+        job["cancel"].set()
+        if job["future"].cancel():
+            job.update(status="cancelled", message="Cancelled", finished=time.time())
+        return True
@@ -0,0 +1,448 @@
+"""
+Reference cost calculations as implemented before the vectorized kernel.
+
+These are the year-by-year loops of discounted_TCO, stacked_bar_DCO,
+calculate_NPV_and_percent_changes and analyze_break_even_points_interpolated
+from app.py, kept line for line with their known quirks but without the
+Plotly figures and Streamlit output, so that their results can be returned
+(a financing period with a zero rate still raises ZeroDivisionError).
+They are not used by the app: golden.py runs them to generate the reference
+outputs of the golden-scenario corpus and to time faster engines against.
+
+With fixed=True, the loops apply the fixes the vectorized kernel made on
+purpose (golden.INTENDED_FIXES) and nothing else: a zero-rate loan is repaid in
+equal instalments, each vehicle's resale counts when its own depreciation rate
+is set and is scaled by the number of vehicles, insurance is part of the NPV,
+and the vehicle cost net of resale is not clamped at zero. The corpus
+references are the outputs of the fixed loops, so that an engine is checked
+on every scenario.
+"""
+import pandas as pd
+
+
+def _annual_payment(loan_amount, financing_rate, financing_period, fixed):
+    # Annual loan payment; without the fix, a zero rate divides by zero
+    if fixed and financing_rate == 0:
+        return loan_amount / financing_period
+    return (loan_amount * financing_rate) / (1 - (1 + financing_rate) ** -financing_period)
+
+
+def discounted_TCO(base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost, refueling_station_cost,
+                   refueling_station_infra, maintenance_base, maintenance_alt, fuel_base, fuel_alt, v_lifetime,
+                   daily_distance, days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate, user_province, energy_price_province, total_infra_cost,
+                   existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation, financing_period, downpayment, financing_rate,
+                   fixed=False):
+    """
+    Cumulative discounted total cost of ownership, year by year; fixed applies the kernel's intended fixes.
+
+    Returns:
+        DataFrame: 'Year', 'DCO_base', 'DCO_alternative' and 'DCO_alternative_Withincentive' (NaN without
+        subsidies), in dollars.
+    """
+    # Convert all numerical inputs to appropriate types
+    n_vehicles = float(n_vehicles)
+    basevehicle_cost = float(basevehicle_cost)
+    altvehicle_cost = float(altvehicle_cost)
+    refueling_station_cost = float(refueling_station_cost)
+    refueling_station_infra = float(refueling_station_infra)
+    maintenance_base = float(maintenance_base)
+    maintenance_alt = float(maintenance_alt)
+    fuel_base = float(fuel_base)
+    fuel_alt = float(fuel_alt)
+    v_lifetime = int(v_lifetime)
+    daily_distance = float(daily_distance)
+    days_operation = float(days_operation)
+    vehicle_subsidy = float(vehicle_subsidy)
+    infrastructure_subsidy = float(infrastructure_subsidy)
+    discount_rate = float(discount_rate)
+    existing_vehicle_insurance = float(existing_vehicle_insurance)
+    alternative_vehicle_insurance = float(alternative_vehicle_insurance)
+
+    # Depreciation values (as percentage)
+    existing_vehicle_depreciation = float(existing_vehicle_depreciation) if existing_vehicle_depreciation and existing_vehicle_depreciation > 0 else None
+    alternative_vehicle_depreciation = float(alternative_vehicle_depreciation) if alternative_vehicle_depreciation and alternative_vehicle_depreciation > 0 else None
+
+    # Financing parameters defaults if not specified
+    if financing_period is None:
+        financing_period = 0  # Assume no financing if not provided
+    if downpayment is None:
+        downpayment = 100.0  # Assume full payment upfront if not provided
+    if financing_rate is None:
+        financing_rate = 0.0  # No interest if not provided
+
+    downpayment = downpayment / 100  # Ensure downpayment is divided by 100 once
+    financing_rate = financing_rate / 100
+
+    # Tax rate per province (moved outside the loop)
+    provincial_tax = energy_price_province.loc[(energy_price_province['province'] == user_province)]['taxes_perc'].iloc[0] / 100
+
+    # Initialize dataframe where yearly cost will be added
+    df_total_cost = pd.DataFrame(columns=['Year', 'DCO_base', 'DCO_alternative', 'DCO_alternative_Withincentive'])
+
+    # Base vehicle loan amount (no subsidy assumed)
+    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
+
+    # Alternative vehicle loan amount with and without subsidy
+    loan_amount_alt_without_subsidy = altvehicle_cost * n_vehicles * (1 - downpayment)
+    loan_amount_alt_with_subsidy = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
+
+    # If there is a financing period, calculate the annual payment, else set it to 0
+    if financing_period > 0:
+        annual_payment_base = _annual_payment(loan_amount_base, financing_rate, financing_period, fixed)
+        annual_payment_alt_with_subsidy = _annual_payment(loan_amount_alt_with_subsidy, financing_rate, financing_period, fixed)
+        annual_payment_alt_without_subsidy = _annual_payment(loan_amount_alt_without_subsidy, financing_rate, financing_period, fixed)
+    else:
+        # No financing applied
+        annual_payment_base = 0
+        annual_payment_alt_with_subsidy = 0
+        annual_payment_alt_without_subsidy = 0
+
+    # Determine if we are including incentives
+    plot_incentive = vehicle_subsidy > 0 or infrastructure_subsidy > 0
+
+    # Loop through each year
+    for year in range(v_lifetime + 1):
+        discount_factor = 1 / ((1 + discount_rate) ** year)
+
+        if year == 0:
+            # For year 0, include downpayment and infrastructure costs
+            df_total_cost.loc[year, 'Year'] = year
+            df_total_cost.loc[year, 'DCO_base'] = (basevehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax) * discount_factor
+
+            alt_capital_cost = (altvehicle_cost * n_vehicles * downpayment) + (refueling_station_cost + refueling_station_infra if refueling_station_cost > 0 else total_infra_cost)
+            df_total_cost.loc[year, 'DCO_alternative'] = alt_capital_cost * discount_factor * (1 + provincial_tax)
+
+            # For alternative vehicles with incentives, apply the subsidy only once per vehicle
+            if plot_incentive:
+                alt_capital_cost_with_incentive = ((altvehicle_cost - vehicle_subsidy) * n_vehicles * downpayment) + (refueling_station_cost + refueling_station_infra if refueling_station_cost > 0 else total_infra_cost) - infrastructure_subsidy
+                df_total_cost.loc[year, 'DCO_alternative_Withincentive'] = alt_capital_cost_with_incentive * discount_factor * (1 + provincial_tax)
+        else:
+            # Add discounted operational costs for each year
+            df_total_cost.loc[year, 'Year'] = year
+            discounted_op_cost_base = (maintenance_base + fuel_base + existing_vehicle_insurance) * daily_distance * days_operation * n_vehicles * discount_factor
+            discounted_op_cost_alt = (maintenance_alt + fuel_alt + alternative_vehicle_insurance) * daily_distance * days_operation * n_vehicles * discount_factor
+
+            # Add loan payments during the financing period
+            if year <= financing_period:
+                discounted_payment_base = annual_payment_base * discount_factor
+                discounted_payment_alt_without_subsidy = annual_payment_alt_without_subsidy * discount_factor
+                if plot_incentive:
+                    discounted_payment_alt_with_subsidy = annual_payment_alt_with_subsidy * discount_factor
+            else:
+                discounted_payment_base = 0
+                discounted_payment_alt_without_subsidy = 0
+                discounted_payment_alt_with_subsidy = 0
+
+            df_total_cost.loc[year, 'DCO_base'] = df_total_cost.loc[year - 1, 'DCO_base'] + discounted_op_cost_base + discounted_payment_base
+            df_total_cost.loc[year, 'DCO_alternative'] = df_total_cost.loc[year - 1, 'DCO_alternative'] + discounted_op_cost_alt + discounted_payment_alt_without_subsidy
+            if plot_incentive:
+                df_total_cost.loc[year, 'DCO_alternative_Withincentive'] = df_total_cost.loc[year - 1, 'DCO_alternative_Withincentive'] + discounted_op_cost_alt + discounted_payment_alt_with_subsidy
+
+    # Calculate resale value if depreciation rates are provided
+    if fixed:
+        # Each vehicle's resale counts when its own depreciation rate is set
+        if existing_vehicle_depreciation:
+            resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
+            df_total_cost.loc[v_lifetime, 'DCO_base'] -= resale_value_base / ((1 + discount_rate) ** v_lifetime) * n_vehicles
+        if alternative_vehicle_depreciation:
+            resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
+            df_total_cost.loc[v_lifetime, 'DCO_alternative'] -= resale_value_alt / ((1 + discount_rate) ** v_lifetime) * n_vehicles
+            if plot_incentive:
+                df_total_cost.loc[v_lifetime, 'DCO_alternative_Withincentive'] -= resale_value_alt / ((1 + discount_rate) ** v_lifetime) * n_vehicles
+    elif existing_vehicle_depreciation and alternative_vehicle_depreciation:
+        resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
+        resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
+
+        resale_value_base_discounted = resale_value_base / ((1 + discount_rate) ** v_lifetime)
+        resale_value_alt_discounted = resale_value_alt / ((1 + discount_rate) ** v_lifetime)
+
+        df_total_cost.loc[v_lifetime, 'DCO_base'] -= resale_value_base_discounted * n_vehicles
+        df_total_cost.loc[v_lifetime, 'DCO_alternative'] -= resale_value_alt_discounted * n_vehicles
+        if plot_incentive:
+            df_total_cost.loc[v_lifetime, 'DCO_alternative_Withincentive'] -= resale_value_alt_discounted * n_vehicles
+
+    return df_total_cost.astype(float)
+
+
+def analyze_break_even_points_interpolated(df_total_cost):
+    """
+    Break-even years of the alternative without and with subsidies, linearly interpolated between years.
+
+    Returns:
+        tuple: Break-even years, None where there is none.
+    """
+    exact_break_even_year_without_subsidy = None
+    exact_break_even_year_with_subsidy = None
+
+    has_incentive_data = df_total_cost['DCO_alternative_Withincentive'].notna().any()
+
+    for index in range(1, len(df_total_cost)):
+        previous_row = df_total_cost.iloc[index - 1]
+        current_row = df_total_cost.iloc[index]
+
+        if exact_break_even_year_without_subsidy is None and previous_row['DCO_alternative'] > previous_row['DCO_base'] and current_row['DCO_alternative'] <= current_row['DCO_base']:
+            exact_break_even_year_without_subsidy = previous_row['Year'] + (current_row['Year'] - previous_row['Year']) * ((previous_row['DCO_base'] - previous_row['DCO_alternative']) / (current_row['DCO_alternative'] - previous_row['DCO_alternative'] + previous_row['DCO_base'] - current_row['DCO_base']))
+
+        if has_incentive_data and exact_break_even_year_with_subsidy is None:
+            if previous_row['DCO_alternative_Withincentive'] > previous_row['DCO_base'] and current_row['DCO_alternative_Withincentive'] <= current_row['DCO_base']:
+                exact_break_even_year_with_subsidy = previous_row['Year'] + (current_row['Year'] - previous_row['Year']) * ((previous_row['DCO_base'] - previous_row['DCO_alternative_Withincentive']) / (current_row['DCO_alternative_Withincentive'] - previous_row['DCO_alternative_Withincentive'] + previous_row['DCO_base'] - current_row['DCO_base']))
+
+    return exact_break_even_year_without_subsidy, exact_break_even_year_with_subsidy
+
+
+def stacked_bar_DCO(
+    base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost,
+    refueling_station_cost, refueling_station_infra, maintenance_base,
+    maintenance_alt, fuel_base, fuel_alt, v_lifetime, daily_distance,
+    days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate,
+    user_province, energy_price_province, total_infra_cost,
+    existing_vehicle_insurance, alternative_vehicle_insurance,
+    existing_vehicle_depreciation, alternative_vehicle_depreciation,
+    financing_period=None, downpayment=None, financing_rate=None, fixed=False
+):
+    """
+    Discounted lifetime cost of each category; fixed applies the kernel's intended fixes.
+
+    Returns:
+        DataFrame: One row per technology (the alternative with subsidies only when there are subsidies) and the
+        'Vehicle', infrastructure, 'Maintenance', 'Fuel' and 'Insurance' columns, in dollars, before empty columns
+        were dropped for the chart.
+    """
+    n_vehicles = float(n_vehicles)
+    basevehicle_cost = float(basevehicle_cost)
+    altvehicle_cost = float(altvehicle_cost)
+    maintenance_base = float(maintenance_base)
+    maintenance_alt = float(maintenance_alt)
+    fuel_base = float(fuel_base)
+    fuel_alt = float(fuel_alt)
+    daily_distance = float(daily_distance)
+    days_operation = float(days_operation)
+    v_lifetime = int(v_lifetime)
+    vehicle_subsidy = float(vehicle_subsidy)
+    infrastructure_subsidy = float(infrastructure_subsidy)
+    discount_rate = float(discount_rate)
+
+    existing_vehicle_insurance = float(existing_vehicle_insurance or 0)
+    alternative_vehicle_insurance = float(alternative_vehicle_insurance or 0)
+
+    if existing_vehicle_depreciation not in [None, "", 0]:
+        existing_vehicle_depreciation = float(existing_vehicle_depreciation) / 100
+    else:
+        existing_vehicle_depreciation = None
+
+    if alternative_vehicle_depreciation not in [None, "", 0]:
+        alternative_vehicle_depreciation = float(alternative_vehicle_depreciation) / 100
+    else:
+        alternative_vehicle_depreciation = None
+
+    if financing_period is None:
+        financing_period = 0
+    if downpayment is None:
+        downpayment = 100
+    if financing_rate is None:
+        financing_rate = 0
+
+    financing_period = int(financing_period)
+    downpayment = float(downpayment) / 100
+    financing_rate = float(financing_rate) / 100
+
+    provincial_tax = (
+        energy_price_province.loc[
+            energy_price_province["province"] == user_province, "taxes_perc"
+        ].iloc[0] / 100
+    )
+
+    if alternative_tech == "Battery electric":
+        infra_label = "Charging Infrastructure"
+    elif alternative_tech in ["Biodiesel B20", "Hydrogen Fuel Cell"]:
+        infra_label = "Refuelling Infrastructure"
+    else:
+        infra_label = "Charging/Refuelling Infrastructure"
+
+    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
+    loan_amount_alt = altvehicle_cost * n_vehicles * (1 - downpayment)
+    loan_amount_alt_sub = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
+
+    if financing_period > 0 and (financing_rate > 0 or fixed):
+        ann_pay_base = _annual_payment(loan_amount_base, financing_rate, financing_period, fixed)
+        ann_pay_alt = _annual_payment(loan_amount_alt, financing_rate, financing_period, fixed)
+        ann_pay_alt_sub = _annual_payment(loan_amount_alt_sub, financing_rate, financing_period, fixed)
+    else:
+        ann_pay_base = ann_pay_alt = ann_pay_alt_sub = 0
+
+    total_costs = {}
+
+    total_costs[base_tech] = {
+        "Vehicle": basevehicle_cost * n_vehicles * downpayment * (1 + provincial_tax),
+        "Maintenance": 0.0,
+        "Fuel": 0.0,
+        "Insurance": 0.0,
+        infra_label: 0.0,
+    }
+
+    total_costs[alternative_tech] = {
+        "Vehicle": altvehicle_cost * n_vehicles * downpayment * (1 + provincial_tax),
+        "Maintenance": 0.0,
+        "Fuel": 0.0,
+        "Insurance": 0.0,
+        infra_label: total_infra_cost * (1 + provincial_tax),
+    }
+
+    alt_sub_name = alternative_tech + " (with subsidies)"
+    plot_incentive = vehicle_subsidy > 0 or infrastructure_subsidy > 0
+
+    if plot_incentive:
+        total_costs[alt_sub_name] = {
+            "Vehicle": (altvehicle_cost - vehicle_subsidy) * n_vehicles * downpayment * (1 + provincial_tax),
+            "Maintenance": 0.0,
+            "Fuel": 0.0,
+            "Insurance": 0.0,
+            infra_label: (total_infra_cost - infrastructure_subsidy) * (1 + provincial_tax),
+        }
+
+    km_year = daily_distance * days_operation * n_vehicles
+
+    for year in range(1, v_lifetime + 1):
+        df = 1 / ((1 + discount_rate) ** year)
+
+        total_costs[base_tech]["Maintenance"] += maintenance_base * km_year * df
+        total_costs[base_tech]["Fuel"] += fuel_base * km_year * df
+        if existing_vehicle_insurance > 0:
+            total_costs[base_tech]["Insurance"] += existing_vehicle_insurance * km_year * df
+        if year <= financing_period:
+            total_costs[base_tech]["Vehicle"] += ann_pay_base * df
+
+        for tech in total_costs.keys():
+            if tech == base_tech:
+                continue
+
+            total_costs[tech]["Maintenance"] += maintenance_alt * km_year * df
+            total_costs[tech]["Fuel"] += fuel_alt * km_year * df
+            if alternative_vehicle_insurance > 0:
+                total_costs[tech]["Insurance"] += alternative_vehicle_insurance * km_year * df
+
+            if year <= financing_period:
+                if tech == alternative_tech:
+                    total_costs[tech]["Vehicle"] += ann_pay_alt * df
+                elif tech == alt_sub_name:
+                    total_costs[tech]["Vehicle"] += ann_pay_alt_sub * df
+
+    if existing_vehicle_depreciation is not None:
+        resale_base = basevehicle_cost * (1 - existing_vehicle_depreciation)**v_lifetime * n_vehicles
+        resale_base /= (1 + discount_rate)**v_lifetime
+        net_vehicle_cost = total_costs[base_tech]["Vehicle"] - resale_base
+        total_costs[base_tech]["Vehicle"] = net_vehicle_cost if fixed else max(0, net_vehicle_cost)
+
+    if alternative_vehicle_depreciation is not None:
+        resale_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation)**v_lifetime * n_vehicles
+        resale_alt /= (1 + discount_rate)**v_lifetime
+        for tech in total_costs.keys():
+            if tech != base_tech:
+                net_vehicle_cost = total_costs[tech]["Vehicle"] - resale_alt
+                total_costs[tech]["Vehicle"] = net_vehicle_cost if fixed else max(0, net_vehicle_cost)
+
+    df = pd.DataFrame(total_costs).transpose()
+    return df[["Vehicle", infra_label, "Maintenance", "Fuel", "Insurance"]].astype(float)
+
+
+def calculate_NPV_and_percent_changes(base_tech, alternative_tech, n_vehicles, basevehicle_cost, altvehicle_cost, refueling_station_cost,
+                                      refueling_station_infra, maintenance_base, maintenance_alt, fuel_base, fuel_alt, v_lifetime,
+                                      daily_distance, days_operation, vehicle_subsidy, infrastructure_subsidy, discount_rate, user_province, energy_price_province, total_infra_cost,
+                                      existing_vehicle_insurance, alternative_vehicle_insurance, existing_vehicle_depreciation, alternative_vehicle_depreciation,
+                                      financing_period=None, downpayment=None, financing_rate=None, fixed=False):
+    """
+    Total NPV of each technology; fixed applies the kernel's intended fixes.
+
+    Returns:
+        Series: NPV ($) per technology, the alternative with subsidies only when there are subsidies.
+    """
+    provincial_tax = energy_price_province.loc[(energy_price_province['province'] == user_province)]['taxes_perc'].iloc[0] / 100
+
+    if financing_period is None:
+        financing_period = 0
+    if downpayment is None:
+        downpayment = 100.0
+    if financing_rate is None:
+        financing_rate = 0.0
+
+    downpayment /= 100
+    financing_rate /= 100
+
+    loan_amount_base = basevehicle_cost * n_vehicles * (1 - downpayment)
+    loan_amount_alt = altvehicle_cost * n_vehicles * (1 - downpayment)
+    loan_amount_alt_with_subsidy = (altvehicle_cost - vehicle_subsidy) * n_vehicles * (1 - downpayment)
+
+    if financing_period > 0:
+        annual_payment_base = _annual_payment(loan_amount_base, financing_rate, financing_period, fixed)
+        annual_payment_alt = _annual_payment(loan_amount_alt, financing_rate, financing_period, fixed)
+        annual_payment_alt_with_subsidy = _annual_payment(loan_amount_alt_with_subsidy, financing_rate, financing_period, fixed)
+    else:
+        annual_payment_base = 0
+        annual_payment_alt = 0
+        annual_payment_alt_with_subsidy = 0
+
+    infra_label = "Charging Infrastructure" if alternative_tech == "Battery electric" else "Refuelling Infrastructure"
+
+    total_costs = {
+        base_tech: {'Vehicle': (basevehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax), 'Maintenance': 0, 'Fuel': 0, 'Insurance': 0},
+        alternative_tech: {'Vehicle': (altvehicle_cost * n_vehicles * downpayment) * (1 + provincial_tax), infra_label: total_infra_cost * (1 + provincial_tax), 'Maintenance': 0, 'Fuel': 0, 'Insurance': 0}
+    }
+
+    if vehicle_subsidy > 0 or infrastructure_subsidy > 0:
+        total_costs[alternative_tech + ' (with subsidies)'] = {
+            'Vehicle': ((altvehicle_cost - vehicle_subsidy) * n_vehicles * downpayment) * (1 + provincial_tax),
+            infra_label: (total_infra_cost - infrastructure_subsidy) * (1 + provincial_tax),
+            'Maintenance': 0,
+            'Fuel': 0,
+            'Insurance': 0
+        }
+
+    for year in range(1, v_lifetime + 1):
+        discount_factor = 1 / ((1 + discount_rate) ** year)
+
+        total_costs[base_tech]['Maintenance'] += maintenance_base * daily_distance * days_operation * n_vehicles * discount_factor
+        total_costs[base_tech]['Fuel'] += fuel_base * daily_distance * days_operation * n_vehicles * discount_factor
+        total_costs[base_tech]['Insurance'] += (existing_vehicle_insurance or 0) * daily_distance * days_operation * n_vehicles * discount_factor
+
+        if year <= financing_period:
+            total_costs[base_tech]['Vehicle'] += annual_payment_base * discount_factor
+
+        for tech in total_costs:
+            if tech != base_tech:
+                total_costs[tech]['Maintenance'] += maintenance_alt * daily_distance * days_operation * n_vehicles * discount_factor
+                total_costs[tech]['Fuel'] += fuel_alt * daily_distance * days_operation * n_vehicles * discount_factor
+                total_costs[tech]['Insurance'] += (alternative_vehicle_insurance or 0) * daily_distance * days_operation * n_vehicles * discount_factor
+
+                if tech == alternative_tech and year <= financing_period:
+                    total_costs[tech]['Vehicle'] += annual_payment_alt * discount_factor
+                elif tech == alternative_tech + ' (with subsidies)' and year <= financing_period:
+                    total_costs[tech]['Vehicle'] += annual_payment_alt_with_subsidy * discount_factor
+
+    if fixed:
+        # Each vehicle's resale counts when its own depreciation rate is set, for every vehicle
+        if existing_vehicle_depreciation:
+            resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
+            total_costs[base_tech]['Vehicle'] -= resale_value_base / ((1 + discount_rate) ** v_lifetime) * n_vehicles
+        if alternative_vehicle_depreciation:
+            resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
+            for tech in total_costs:
+                if tech != base_tech:
+                    total_costs[tech]['Vehicle'] -= resale_value_alt / ((1 + discount_rate) ** v_lifetime) * n_vehicles
+    elif existing_vehicle_depreciation and alternative_vehicle_depreciation:
+        resale_value_base = basevehicle_cost * (1 - existing_vehicle_depreciation / 100) ** v_lifetime
+        resale_value_alt = altvehicle_cost * (1 - alternative_vehicle_depreciation / 100) ** v_lifetime
+
+        total_costs[base_tech]['Vehicle'] -= resale_value_base / ((1 + discount_rate) ** v_lifetime)
+
+        for tech in total_costs:
+            if tech != base_tech:
+                total_costs[tech]['Vehicle'] -= resale_value_alt / ((1 + discount_rate) ** v_lifetime)
+
+    df_total_costs = pd.DataFrame(total_costs).transpose()
+
+    # Without the fix, insurance is left out of the NPV
+    columns = ['Vehicle', 'Maintenance', 'Fuel'] + (['Insurance'] if fixed else [])
+    if total_infra_cost > 0:
+        columns.insert(1, infra_label)
+
+    return df_total_costs[columns].sum(axis=1)
@@ -0,0 +1,70 @@
+"""
+Scheduled lifecycle events (battery or stack replacements, overhauls, charger refreshes).
+
+An event is a one-off cost at a given age, attached to a powertrain and applied
+either to the vehicles (as a share of the vehicle price, for every vehicle) or
+to the charging or refuelling infrastructure (as a share of the infrastructure
+cost). Events at or after the end of the vehicle lifetime are not incurred.
+event_costs turns a list of events into undiscounted yearly costs for a batch
+of scenarios in one pass, which tco_kernel.yearly_costs discounts into its
+"Lifecycle events" category.
+"""
+import numpy as np
+import pandas as pd
+
+
+def load_event_schedule(path="lifecycle_events.csv"):
+    """
+    Reads the default lifecycle event schedule.
+
+    Returns:
+        DataFrame: One row per event with its Powertrain, Event name, Applies_to ('Vehicle' or 'Infrastructure'),
+        Year (age) and Cost_share (% of the vehicle price or of the infrastructure cost).
+    """
+    return pd.read_csv(path)
+
+
+def event_costs(events, base_powertrain, alt_powertrain, lifetime, horizon, n_vehicles,
+                base_vehicle_cost, alt_vehicle_cost, infra_cost):
+    """
+    Undiscounted yearly cost of the scheduled events for a batch of scenarios.
+
+    Parameters:
+        events (list): Event dicts with the columns of load_event_schedule.
+        base_powertrain, alt_powertrain (array of str): Powertrains of the existing and alternative vehicles.
+        lifetime (array): Vehicle lifetime (years).
+        horizon (int): Last year on the kernel's time axis.
+        n_vehicles (array): Number of vehicles.
+        base_vehicle_cost, alt_vehicle_cost (array): Vehicle price ($).
+        infra_cost (array): Charging or refuelling infrastructure cost ($) of the alternative.
+
+    Returns:
+        ndarray: Costs of shape batch + (series, horizon + 1), the alternative with subsidies sharing the
+        alternative's events.
+    """
+    (base_powertrain, alt_powertrain, lifetime, n_vehicles, base_vehicle_cost, alt_vehicle_cost,
+     infra_cost) = np.broadcast_arrays(np.asarray(base_powertrain), np.asarray(alt_powertrain),
+                                       *[np.asarray(x, dtype=float) for x in (lifetime, n_vehicles, base_vehicle_cost,
+                                                                              alt_vehicle_cost, infra_cost)])
+    costs = np.zeros(base_powertrain.shape + (3, horizon + 1))
+    if not events:
+        return costs
+
+    powertrain = np.array([event["Powertrain"] for event in events])
+    on_vehicle = np.array([event["Applies_to"] == "Vehicle" for event in events])
+    year = np.array([event["Year"] for event in events], dtype=int)
+    share = np.array([event["Cost_share"] for event in events], dtype=float) / 100
+
+    # (event, year) one-hot schedule; (batch, event) incurred before the end of the lifetime
+    schedule = (np.arange(horizon + 1) == year[:, None]).astype(float)
+    incurred = (year > 0) & (year < lifetime[..., None])
+
+    def amounts(series_powertrain, vehicle_cost, infrastructure):
+        matches = series_powertrain[..., None] == powertrain
+        base = np.where(on_vehicle, (vehicle_cost * n_vehicles)[..., None], infrastructure[..., None])
+        return np.where(matches & incurred, base * share, 0.0) @ schedule
+
+    costs[..., 0, :] = amounts(base_powertrain, base_vehicle_cost, np.zeros_like(infra_cost))
+    costs[..., 1, :] = amounts(alt_powertrain, alt_vehicle_cost, infra_cost)
+    costs[..., 2, :] = costs[..., 1, :]
+    return costs
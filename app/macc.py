@@ -0,0 +1,71 @@
+"""
+Marginal abatement cost curve (MACC) across the vehicle catalog.
+
+For every (Weight_Confi, alternative powertrain) pair in a province, the cost
+of abatement is the lifetime NPV difference against the existing fuel divided
+by the lifetime GHG reduction, both per vehicle and at the catalog,
+duty-cycle and provincial defaults. The curve itself keeps one alternative per
+configuration, the cheapest per tonne, since a fleet is replaced by one
+alternative. The pairs are read from the precomputed
+default results (see precompute.py), which hold the whole catalog evaluated
+in one batched kernel call, so building a curve needs no model computation.
+"""
+import numpy as np
+import pandas as pd
+
+
+def abatement_costs(default_results, province, existing_fuel="Diesel"):
+    """
+    Cost per tonne of CO2eq avoided for every configuration and alternative powertrain in a province.
+
+    Parameters:
+        default_results (dict): Output of precompute.default_results_table.
+        province (str): Province of operation.
+        existing_fuel (str): Fuel replaced.
+
+    Returns:
+        DataFrame: 'Weight_Confi', 'Powertrain', 'npv_delta' ($ per vehicle), 'ghg_reduction' (tonnes per vehicle)
+        and 'cost_per_tonne' ($/tCO2eq), sorted by cost per tonne. Pairs that do not reduce emissions are left out.
+    """
+    keys = np.array([key.split("|") for key in default_results["keys"].tolist()])
+    rows = (keys[:, 0] == province) & (keys[:, 2] == existing_fuel)
+
+    npv = default_results["npv"][rows]
+    ghg = default_results["ghg"][rows]
+    costs = pd.DataFrame({
+        "Weight_Confi": keys[rows, 1],
+        "Powertrain": keys[rows, 3],
+        "npv_delta": npv[:, 1] - npv[:, 0],
+        "ghg_reduction": ghg[:, 0] - ghg[:, 1],
+    })
+    costs = costs[costs["ghg_reduction"] > 0]
+    costs["cost_per_tonne"] = costs["npv_delta"] / costs["ghg_reduction"]
+    return costs.sort_values("cost_per_tonne", ignore_index=True)
+
+
+def abatement_curve(costs, fleet_counts=None):
+    """
+    Steps of the abatement curve, each as wide as the tonnes abated by the fleet of that configuration.
+
+    The alternatives of a configuration are competing options (its vehicles are replaced by one of them), so each
+    configuration enters the curve once, with its cheapest alternative per tonne, and the cumulative abatement
+    counts every vehicle once.
+
+    Parameters:
+        costs (DataFrame): Output of abatement_costs.
+        fleet_counts (dict): Number of vehicles per Weight_Confi, or None for one vehicle of each; configurations
+            missing from the dict have no vehicles.
+
+    Returns:
+        DataFrame: The cheapest row of costs per configuration with 'vehicles', 'abatement' (tonnes for the
+        fleet), 'start' and 'end' (cumulative tonnes) and 'total_cost' ($ for the fleet), keeping the cost-per-tonne
+        order and dropping configurations with no vehicles.
+    """
+    curve = costs.sort_values("cost_per_tonne", kind="stable").drop_duplicates("Weight_Confi")
+    curve["vehicles"] = curve["Weight_Confi"].map(fleet_counts or {}).fillna(1 if fleet_counts is None else 0)
+    curve = curve[curve["vehicles"] > 0].reset_index(drop=True)
+    curve["abatement"] = curve["ghg_reduction"] * curve["vehicles"]
+    curve["end"] = curve["abatement"].cumsum()
+    curve["start"] = curve["end"] - curve["abatement"]
+    curve["total_cost"] = curve["npv_delta"] * curve["vehicles"]
+    return curve
@@ -0,0 +1,139 @@
+"""
+Cost-versus-emissions trade-off across the options of a configuration.
+
+An option combines an alternative powertrain, its charging or refuelling
+infrastructure (a charger model and count for battery electric vehicles, a
+station sized for a fill window for hydrogen) and the financing of the
+vehicles. option_grid lays out every combination as flat arrays,
+scenario_batch.evaluate_options evaluates them in one kernel call, and
+pareto_front keeps the options that no other option beats on both NPV and
+lifetime GHG emissions.
+"""
+import numpy as np
+
+from financing import FINANCING_TYPES
+from hydrogen_station import size_station
+
+# Chargers per vehicle considered for battery electric options
+CHARGERS_PER_VEHICLE = (0.25, 0.5, 0.75, 1.0)
+
+# Hours a day the vehicles are parked at the depot and can charge
+CHARGING_HOURS = 10.0
+
+# Peak fill windows (hours) considered for hydrogen refuelling stations
+FILL_WINDOWS = (2.0, 4.0, 6.0, 8.0)
+
+# Financing terms (years) and down payments (%) considered besides paying cash
+FINANCING_TERMS = (3, 5, 7, 10)
+DOWNPAYMENTS = (0.0, 10.0, 20.0, 30.0)
+
+# Balloon (balloon loans) or residual value (leases) as a % of the price, when none is entered
+DEFAULT_RESIDUAL = 20.0
+
+
+def charger_options(chargers, n_vehicles, daily_energy, charging_hours=CHARGING_HOURS, fixed_cost=0.0):
+    """
+    Charger mixes that can deliver the fleet's daily energy, one charger model each.
+
+    Parameters:
+        chargers (DataFrame): Charger catalog with 'charging_models', 'PowerLevel' (e.g. '50 kW') and 'Price'.
+        n_vehicles (int): Number of vehicles.
+        daily_energy (float): Energy each vehicle draws per day (kWh).
+        charging_hours (float): Hours a day the vehicles can charge.
+        fixed_cost (float): Construction and grid upgrade cost added to every mix ($).
+
+    Returns:
+        list: (label, cost) tuples.
+    """
+    power = chargers["PowerLevel"].astype(str).str.replace("kW", "").astype(float).to_numpy()
+    price = chargers["Price"].to_numpy(dtype=float)
+    counts = np.unique(np.maximum(np.ceil(np.multiply.outer(CHARGERS_PER_VEHICLE, n_vehicles)), 1)).astype(int)
+    # (model, count) mixes delivering every vehicle's energy within the charging hours
+    feasible = power[:, None] * counts * charging_hours >= n_vehicles * daily_energy
+    models, sizes = np.nonzero(feasible)
+    return [(f"{counts[j]} x {chargers['charging_models'].iloc[i]}", counts[j] * price[i] + fixed_cost)
+            for i, j in zip(models, sizes)]
+
+
+def station_options(components, n_vehicles, daily_distance, fuel_efficiency, fill_windows=FILL_WINDOWS):
+    """
+    Cheapest hydrogen refuelling station for each fill window, see hydrogen_station.size_station.
+
+    Returns:
+        list: (label, cost) tuples for the windows a station design can meet.
+    """
+    design = size_station(components, n_vehicles, daily_distance, fuel_efficiency, np.asarray(fill_windows, dtype=float))
+    return [(f"Station for a {window:g} h fill window", float(cost))
+            for window, cost in zip(fill_windows, design["cost"]) if np.isfinite(cost)]
+
+
+def financing_options(financing_rate, residual=DEFAULT_RESIDUAL):
+    """
+    Paying cash, and every financing type, term and down payment of the grid.
+
+    Parameters:
+        financing_rate (float): Annual interest rate (%).
+        residual (float): Balloon or lease residual value (% of the price).
+
+    Returns:
+        dict: Arrays 'label', 'financing_type', 'financing_period' (years), 'downpayment', 'financing_rate' and
+        'financing_residual' (%); cash is a loan with a full down payment.
+    """
+    plans = [("Cash", "Loan", 0, 100.0)]
+    plans += [(f"{financing_type}, {term} years, {downpayment:g}% down", financing_type, term, downpayment)
+              for financing_type in FINANCING_TYPES for term in FINANCING_TERMS for downpayment in DOWNPAYMENTS]
+    label, financing_type, period, downpayment = zip(*plans)
+    return {
+        "label": np.array(label, dtype=object),
+        "financing_type": np.array(financing_type),
+        "financing_period": np.array(period, dtype=float),
+        "downpayment": np.array(downpayment, dtype=float),
+        "financing_rate": np.full(len(plans), float(financing_rate)),
+        "financing_residual": np.array([0.0 if t == "Loan" else residual for t in financing_type]),
+    }
+
+
+def option_grid(infrastructure, financing):
+    """
+    Every combination of a powertrain's infrastructure option and a financing option.
+
+    Parameters:
+        infrastructure (dict): Maps each alternative powertrain to its (label, cost) infrastructure options.
+        financing (dict): Output of financing_options.
+
+    Returns:
+        dict: Arrays of the options (N,) as taken by scenario_batch.evaluate_options, with 'infrastructure' and
+        'financing' labels.
+    """
+    equipment = [(powertrain, label, cost) for powertrain, choices in infrastructure.items() for label, cost in choices]
+    powertrain, infra_label, infra_cost = (np.array(column, dtype=object) for column in zip(*equipment))
+    n_financing = len(financing["label"])
+    grid = {name: np.tile(values, len(equipment)) for name, values in financing.items()}
+    grid["financing"] = grid.pop("label")
+    grid["powertrain"] = np.repeat(powertrain.astype(str), n_financing)
+    grid["infrastructure"] = np.repeat(infra_label, n_financing)
+    grid["infra_cost"] = np.repeat(infra_cost.astype(float), n_financing)
+    return grid
+
+
+def pareto_front(cost, emissions):
+    """
+    Options not dominated on cost and emissions, in O(n log n).
+
+    Options are sorted by cost (then emissions); an option is on the front if its emissions are below those of
+    every cheaper option. Of identical options, only the first is kept.
+
+    Parameters:
+        cost, emissions (array): Objectives to minimize; options with NaN are never on the front.
+
+    Returns:
+        ndarray: Boolean mask of the front.
+    """
+    cost, emissions = np.asarray(cost, dtype=float), np.asarray(emissions, dtype=float)
+    order = np.lexsort((emissions, cost))
+    order = order[np.isfinite(cost[order]) & np.isfinite(emissions[order])]
+    sorted_emissions = emissions[order]
+    lowest_before = np.concatenate([[np.inf], np.minimum.accumulate(sorted_emissions)[:-1]])
+    front = np.zeros(cost.shape, dtype=bool)
+    front[order[sorted_emissions < lowest_before]] = True
+    return front
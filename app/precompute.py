@@ -0,0 +1,359 @@
+"""
+Precomputed results for every default-input scenario.
+
+Most sessions keep the catalog, duty-cycle and provincial defaults and only
+choose the province, vehicle and fuels. This module evaluates every such
+(province, Weight_Confi, existing fuel, alternative fuel) combination in one
+batched kernel call and stores the results, per vehicle, in a compressed NumPy
+archive indexed by combination. With no infrastructure cost, insurance, resale
+or financing, every cost and emission is proportional to the number of vehicles,
+so one row serves any fleet size. The vehicle subsidy only lowers the year-0
+cost of the subsidised alternative, so rows are built with the subsidy of the
+incentive rules for one vehicle and lookups adjust them to the subsidy entered.
+
+The archive records a fingerprint of the source CSVs and of the model's source
+code (this module and the app modules it imports, directly or not); an archive
+built from other data or another version of the model is ignored and rebuilt. Run at build time with:
+
+    python app/precompute.py
+"""
+import ast
+import hashlib
+import os
+
+import numpy as np
+
+from catalog import build_dutycycle_index, build_province_index, build_vehicle_index
+from incentives import compile_incentive_rules, load_incentive_rules, vehicle_subsidy
+from reference_data import combined_labels, load_reference_table
+from scenario_batch import lifetime_pollutants
+from tco_kernel import break_even_years, fuel_cost_per_km, ghg_per_km, summarize, yearly_costs
+
+# Datasets the default results are derived from
+SOURCE_FILES = (
+    "MHDV_costs_efficiency_final.csv",
+    "MHDV_duty_cycles_final.csv",
+    "province_energy_prices.csv",
+    "incentive_rules.csv",
+)
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+ARTIFACT_PATH = "default_results.npz"
+
+# Default emission factor of grey hydrogen (gCO2eq/kg), as preselected in the app
+DEFAULT_HYDROGEN_INTENSITY = 11000
+
+# Inputs that are the same in every default scenario, as returned by the app's widgets
+FIXED_DEFAULTS = dict(
+    discount_rate=0.03,
+    existing_vehicle_insurance=0,
+    alternative_vehicle_insurance=0,
+    existing_vehicle_depreciation=None,
+    alternative_vehicle_depreciation=None,
+    financing_type=None,
+    financing_period=None,
+    downpayment=None,
+    financing_rate=None,
+    total_infra_cost=0.0,
+    user_chargerRefuelling_incentive_amount=0.0,
+    price_escalation=None,
+    lifecycle_events=None,
+    efficiency_degradation=None,
+)
+
+# Inputs that depend on the combination, stored as one column each
+DEFAULT_COLUMNS = (
+    "existing_fuel_efficiency", "evaluated_fuel_efficiency", "daily_distance", "yearly_days_operations",
+    "vehicle_lifetime", "existing_fuel_price", "evaluated_fuel_price", "existing_price", "evaluated_price",
+    "existing_maintenance", "evaluated_maintenance", "existing_fuel_perkm", "evaluated_fuel_perkm",
+    "hydro_electricity_intensity",
+)
+
+
+def model_sources(module="precompute"):
+    """
+    Source files of an app module and of the app modules it imports, directly or not.
+
+    Returns:
+        tuple: Paths, sorted.
+    """
+    pending, found = [module], {}
+    while pending:
+        name = pending.pop()
+        path = os.path.join(APP_DIR, name + ".py")
+        if name in found or not os.path.exists(path):
+            continue
+        found[name] = path
+        with open(path) as f:
+            tree = ast.parse(f.read())
+        for node in ast.walk(tree):
+            if isinstance(node, ast.ImportFrom) and node.module:
+                pending.append(node.module)
+            elif isinstance(node, ast.Import):
+                pending += [alias.name for alias in node.names]
+    return tuple(sorted(found.values()))
+
+
+# Code the default results are computed by, found once per process
+MODEL_SOURCES = model_sources()
+
+
+def source_fingerprint(paths=SOURCE_FILES, sources=MODEL_SOURCES):
+    """
+    Hash of the source datasets and of the model's source code.
+
+    Parameters:
+        paths (tuple): CSV files the results are derived from.
+        sources (tuple): Python files computing them.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha1()
+    for path in sources + tuple(paths):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def combination_key(province, weight_configuration, existing_fuel, evaluated_fuel):
+    return "|".join((province, weight_configuration, existing_fuel, evaluated_fuel))
+
+
+def default_combinations(vehicle_index, dutycycle_index, province_index):
+    """
+    Every (province, Weight_Confi, existing fuel, alternative fuel) combination offered by the app.
+
+    Returns:
+        list: Combination tuples.
+    """
+    combinations = []
+    for weight_configuration in dutycycle_index:
+        existing_fuels = [fuel for fuel in ("Diesel", "Gasoline") if (weight_configuration, fuel) in vehicle_index]
+        evaluated_fuels = [fuel for fuel in ("Biodiesel B20", "Renewable Diesel R99", "Battery electric",
+                                             "Hydrogen Fuel Cell", "HEV")
+                           if (weight_configuration, fuel) in vehicle_index]
+        for province in province_index:
+            for existing_fuel in existing_fuels:
+                for evaluated_fuel in evaluated_fuels:
+                    combinations.append((province, weight_configuration, existing_fuel, evaluated_fuel))
+    return combinations
+
+
+def default_inputs(vehicle_index, dutycycle_index, province_index, combination):
+    """
+    Values the app's inputs take for a combination when every default is kept.
+
+    Returns:
+        dict: Input values keyed by the names used in DEFAULT_COLUMNS.
+    """
+    province, weight_configuration, existing_fuel, evaluated_fuel = combination
+    base_row = vehicle_index[(weight_configuration, existing_fuel)]
+    alt_row = vehicle_index[(weight_configuration, evaluated_fuel)]
+    duty = dutycycle_index[weight_configuration]
+    prices = province_index[province]
+
+    inputs = dict(
+        existing_fuel_efficiency=float(base_row["FuelEfficiencyCAD"]),
+        evaluated_fuel_efficiency=float(alt_row["FuelEfficiencyCAD"]),
+        daily_distance=int(duty["average_daily_distance"]),
+        yearly_days_operations=int(duty["yearly_days_operation"]),
+        vehicle_lifetime=int(duty["years_ownership"]),
+        existing_fuel_price=float(prices[existing_fuel]),
+        evaluated_fuel_price=float(prices[evaluated_fuel]),
+        existing_price=int(base_row["Default_price"]),
+        evaluated_price=int(alt_row["Default_price"]),
+        existing_maintenance=float(base_row["Maintenance"]),
+        evaluated_maintenance=float(alt_row["Maintenance"]),
+    )
+    inputs["existing_fuel_perkm"] = inputs["existing_fuel_price"] * inputs["existing_fuel_efficiency"] / 100
+    if evaluated_fuel == "Battery electric":
+        inputs["evaluated_fuel_perkm"] = inputs["evaluated_fuel_price"] * inputs["evaluated_fuel_efficiency"]
+        inputs["hydro_electricity_intensity"] = float(prices["grid_intensity"])
+    else:
+        inputs["evaluated_fuel_perkm"] = inputs["evaluated_fuel_price"] * inputs["evaluated_fuel_efficiency"] / 100
+        inputs["hydro_electricity_intensity"] = DEFAULT_HYDROGEN_INTENSITY if evaluated_fuel == "Hydrogen Fuel Cell" else None
+    return inputs
+
+
+def build_default_results(vehicle_index, dutycycle_index, province_index, discount_rate=FIXED_DEFAULTS["discount_rate"],
+                          incentives=None):
+    """
+    Evaluates every default combination for a single vehicle in one batched kernel call.
+
+    Parameters:
+        discount_rate (float): Discount rate; other rates than the app default are used by results_store sweeps.
+        incentives (dict): Output of incentives.compile_incentive_rules; no vehicle subsidy without it.
+
+    Returns:
+        dict: 'keys' (K,), 'inputs' (K, len(DEFAULT_COLUMNS)) with NaN for missing values, the kernel summary
+        arrays with a leading combination axis ('cumulative' padded with its final value past each lifetime),
+        'ghg' (K, 2) in tonnes and 'nox_pm25' (K, 4) in g, ordered as in the app, and the 'vehicle_subsidy' and
+        'provincial_tax' (K,) the rows were built with.
+    """
+    combinations = default_combinations(vehicle_index, dutycycle_index, province_index)
+    defaults = [default_inputs(vehicle_index, dutycycle_index, province_index, c) for c in combinations]
+
+    def column(name):
+        return np.array([np.nan if d[name] is None else d[name] for d in defaults], dtype=float)
+
+    provinces, weight_configurations, existing_fuels, evaluated_fuels = (np.array(x) for x in zip(*combinations))
+    provincial_tax = np.array([province_index[p]["taxes_perc"] for p in provinces], dtype=float) / 100
+    subsidy = np.zeros(len(combinations)) if incentives is None else vehicle_subsidy(
+        incentives, provinces, weight_configurations, evaluated_fuels, column("evaluated_price"), column("existing_price"))
+    costs = yearly_costs(
+        n_vehicles=1,
+        daily_distance=column("daily_distance"),
+        days_operation=column("yearly_days_operations"),
+        lifetime=column("vehicle_lifetime"),
+        discount_rate=discount_rate,
+        provincial_tax=provincial_tax,
+        base_vehicle_cost=column("existing_price"),
+        alt_vehicle_cost=column("evaluated_price"),
+        base_maintenance=column("existing_maintenance"),
+        alt_maintenance=column("evaluated_maintenance"),
+        base_fuel=column("existing_fuel_perkm"),
+        alt_fuel=fuel_cost_per_km(evaluated_fuels, column("evaluated_fuel_price"), column("evaluated_fuel_efficiency")),
+        vehicle_subsidy=subsidy,
+    )
+    results = summarize(costs)
+
+    def catalog(fuels, name):
+        return np.array([vehicle_index[(w, f)][name] for w, f in zip(weight_configurations, fuels)], dtype=float)
+
+    base_rows = {"GHG EF": catalog(existing_fuels, "GHG EF"), "NOx EF": catalog(existing_fuels, "NOx EF"),
+                 "PM2.5 EF": catalog(existing_fuels, "PM2.5 EF")}
+    duty = dict(n_vehicles=1, daily_distance=column("daily_distance"),
+                yearly_days_operations=column("yearly_days_operations"), vehicle_lifetime=column("vehicle_lifetime"))
+    intensity = np.nan_to_num(column("hydro_electricity_intensity"))
+    alt_ghg_per_km = ghg_per_km(evaluated_fuels, column("evaluated_fuel_efficiency"), catalog(evaluated_fuels, "GHG EF"),
+                                intensity, intensity)
+    emissions = lifetime_pollutants(duty, base_rows, alt_ghg_per_km, catalog(evaluated_fuels, "NOx EF"),
+                                    catalog(evaluated_fuels, "PM2.5 EF"))
+
+    results["keys"] = np.array([combination_key(*c) for c in combinations])
+    results["inputs"] = np.stack([column(name) for name in DEFAULT_COLUMNS], axis=1)
+    results["ghg"] = emissions["ghg"]
+    results["nox_pm25"] = np.stack([emissions["nox"][:, 0], emissions["pm25"][:, 0],
+                                    emissions["nox"][:, 1], emissions["pm25"][:, 1]], axis=1)
+    results["vehicle_subsidy"] = subsidy
+    results["provincial_tax"] = provincial_tax
+    return results
+
+
+def save_default_results(results, fingerprint, path=ARTIFACT_PATH):
+    """Writes the results built by build_default_results to a compressed archive."""
+    np.savez_compressed(path, fingerprint=np.array(fingerprint), **results)
+
+
+def load_default_results(fingerprint, path=ARTIFACT_PATH):
+    """
+    Reads the default results archive.
+
+    Parameters:
+        fingerprint (str): Current source_fingerprint.
+        path (str): Archive file.
+
+    Returns:
+        dict or None: The results with a 'row' dict mapping each combination key to its row, or None if the
+        archive is missing or was built from other data.
+    """
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as archive:
+        if str(archive["fingerprint"]) != fingerprint:
+            return None
+        results = {name: archive[name] for name in archive.files if name != "fingerprint"}
+    results["row"] = {key: i for i, key in enumerate(results["keys"].tolist())}
+    return results
+
+
+def default_results_table(vehicle_index, dutycycle_index, province_index, fingerprint, incentives=None,
+                          path=ARTIFACT_PATH):
+    """
+    Loads the default results archive, rebuilding and rewriting it if it is missing or out of date.
+
+    Returns:
+        dict: See load_default_results.
+    """
+    results = load_default_results(fingerprint, path)
+    if results is None:
+        results = build_default_results(vehicle_index, dutycycle_index, province_index, incentives=incentives)
+        try:
+            save_default_results(results, fingerprint, path)
+        except OSError:
+            pass
+        results["row"] = {key: i for i, key in enumerate(results["keys"].tolist())}
+    return results
+
+
+def lookup_default_results(table, inputs):
+    """
+    Returns the precomputed results of a scenario if all of its inputs are the defaults, the vehicle subsidy
+    aside.
+
+    Parameters:
+        table (dict): Output of default_results_table.
+        inputs (dict): The scenario entered in the app. The emission intensity is checked only if present.
+
+    Returns:
+        dict or None: 'costs' (kernel summary, see tco_kernel.summarize), 'ghg' and 'nox_pm25' tuples as returned
+        by the app's emission functions, scaled to the number of vehicles; None if any input differs from its
+        default.
+    """
+    if not inputs.get("n_vehicles"):
+        return None
+    row = table["row"].get(combination_key(inputs["user_province"], inputs["user_weight_configuration"],
+                                           inputs["existing_fuel"], inputs["evaluated_fuel"]))
+    if row is None or any(inputs.get(name) != value for name, value in FIXED_DEFAULTS.items()):
+        return None
+    for name, value in zip(DEFAULT_COLUMNS, table["inputs"][row]):
+        if name not in inputs:
+            continue
+        if (inputs[name] is None) != np.isnan(value) or (inputs[name] is not None and inputs[name] != value):
+            return None
+
+    n_vehicles = inputs["n_vehicles"]
+    lifetime = inputs["vehicle_lifetime"]
+    cumulative = table["cumulative"][row, :, :lifetime + 1] * n_vehicles
+    npv = table["npv"][row] * n_vehicles
+    by_category = table["by_category"][row] * n_vehicles
+    break_even = table["break_even"][row].copy()
+
+    # The subsidised alternative's year-0 vehicle cost moves with the difference to the subsidy of the row
+    extra = ((table["vehicle_subsidy"][row] - (inputs.get("user_vehicle_incentive_amount") or 0))
+             * n_vehicles * (1 + table["provincial_tax"][row]))
+    if extra:
+        cumulative[2] += extra
+        npv[2] += extra
+        by_category[2, 0] += extra
+        break_even[1] = break_even_years(cumulative[0], cumulative[2])
+    return {
+        "costs": {
+            "cumulative": cumulative,
+            "npv": npv,
+            "by_category": by_category,
+            "break_even": break_even,
+        },
+        "ghg": tuple(table["ghg"][row] * n_vehicles),
+        "nox_pm25": tuple(table["nox_pm25"][row] * n_vehicles),
+    }
+
+
+if __name__ == "__main__":
+    vehicles_info = load_reference_table("MHDV_costs_efficiency_final.csv")
+    vehicles_dutycycles = load_reference_table("MHDV_duty_cycles_final.csv")
+    energy_price_province = load_reference_table("province_energy_prices.csv")
+    vehicles_info["Weight_Confi"] = combined_labels(vehicles_info, ["WeightClass", "Configuration"])
+    vehicles_dutycycles["Weight_Confi"] = combined_labels(vehicles_dutycycles, ["WeightClass", "Configuration"])
+
+    vehicle_index = build_vehicle_index(vehicles_info)
+    province_index = build_province_index(energy_price_province)
+    dutycycle_index = build_dutycycle_index(vehicles_dutycycles)
+    incentives = compile_incentive_rules(load_incentive_rules(), province_index, dutycycle_index,
+                                         vehicles_info["Powertrain"].unique())
+    results = build_default_results(vehicle_index, dutycycle_index, province_index, incentives=incentives)
+    save_default_results(results, source_fingerprint(), ARTIFACT_PATH)
+    print(f"Wrote {len(results['keys'])} default scenarios to {ARTIFACT_PATH}")
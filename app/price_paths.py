@@ -0,0 +1,107 @@
+"""
+Year-by-year price paths for the TCO kernel.
+
+Operating costs entered in the app are today's prices. This module turns
+yearly escalation rates (per cost category, and per province and fuel for
+energy prices) and a carbon price schedule into multiplier matrices of shape
+batch + (series, category, year) that tco_kernel.yearly_costs applies to its
+discounted costs. Year 1 is priced at today's prices; each later year
+escalates by the yearly rate. The carbon price is charged on each vehicle's
+catalog 'GHG EF' (gCO2eq/km), so it only affects liquid fuels; it is folded
+into the fuel multiplier relative to the fuel cost per kilometre.
+"""
+import numpy as np
+import pandas as pd
+
+from tco_kernel import CATEGORIES, SERIES
+
+
+def load_carbon_schedule(path="carbon_price_schedule.csv"):
+    """
+    Reads the carbon price schedule.
+
+    Returns:
+        dict: Maps the calendar year to the carbon price ($/tCO2eq).
+    """
+    schedule = pd.read_csv(path)
+    return dict(zip(schedule["year"].astype(int), schedule["price"].astype(float)))
+
+
+def carbon_price_path(schedule, start_year, lifetime):
+    """
+    Carbon price in each year of operation.
+
+    Parameters:
+        schedule (dict): Output of load_carbon_schedule.
+        start_year (int): Calendar year of the first year of operation.
+        lifetime (int): Number of years of operation.
+
+    Returns:
+        list: Price ($/tCO2eq) for years 1 to lifetime; years past the end of the schedule keep its last price.
+    """
+    years = sorted(schedule)
+    prices = [schedule[year] for year in years]
+    calendar = np.arange(start_year, start_year + int(lifetime))
+    return np.interp(calendar, years, prices).tolist()
+
+
+def escalation_factors(rate, horizon):
+    """
+    Price level in each year relative to today for a constant yearly escalation.
+
+    Parameters:
+        rate (array): Yearly escalation (%).
+        horizon (int): Last year on the time axis.
+
+    Returns:
+        ndarray: Factors of shape batch + (horizon + 1,), equal to 1 in years 0 and 1.
+    """
+    years = np.maximum(np.arange(horizon + 1) - 1, 0)
+    return (1 + np.asarray(rate, dtype=float)[..., None] / 100) ** years
+
+
+def cost_multipliers(horizon, base_fuel, alt_fuel, base_fuel_escalation, alt_fuel_escalation,
+                     maintenance_escalation=0.0, insurance_escalation=0.0,
+                     base_ghg_ef=0.0, alt_ghg_ef=0.0, carbon_prices=None):
+    """
+    Multiplier matrices applying escalating prices and carbon pricing to the kernel's yearly costs.
+
+    Parameters:
+        horizon (int): Last year on the kernel's time axis.
+        base_fuel, alt_fuel (array): Fuel cost ($/km) of the existing and alternative vehicles at today's prices.
+        base_fuel_escalation, alt_fuel_escalation (array): Yearly fuel price escalation (%).
+        maintenance_escalation, insurance_escalation (array): Yearly escalation (%) of maintenance and insurance.
+        base_ghg_ef, alt_ghg_ef (array): Catalog 'GHG EF' (gCO2eq/km); NaN (battery electric, hydrogen) is no charge.
+        carbon_prices (list): Carbon price ($/tCO2eq) for years 1 to horizon, or None for no carbon price.
+
+    Returns:
+        ndarray: Multipliers of shape batch + (series, category, horizon + 1). Vehicle and infrastructure costs
+        are left unchanged.
+    """
+    (base_fuel, alt_fuel, base_fuel_escalation, alt_fuel_escalation, maintenance_escalation,
+     insurance_escalation, base_ghg_ef, alt_ghg_ef) = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in (
+        base_fuel, alt_fuel, base_fuel_escalation, alt_fuel_escalation, maintenance_escalation,
+        insurance_escalation, base_ghg_ef, alt_ghg_ef)])
+
+    carbon = np.zeros(horizon + 1)
+    if carbon_prices is not None:
+        carbon_prices = np.asarray(carbon_prices, dtype=float)[:horizon]
+        carbon[1:len(carbon_prices) + 1] = carbon_prices
+        carbon[len(carbon_prices) + 1:] = carbon_prices[-1] if len(carbon_prices) else 0.0
+
+    def fuel(per_km, escalation, ghg_ef):
+        # Carbon cost per km (g/km x $/t), expressed relative to the fuel cost per km
+        carbon_per_km = np.nan_to_num(ghg_ef)[..., None] / 1e6 * carbon
+        with np.errstate(divide="ignore", invalid="ignore"):
+            relative = np.where(per_km[..., None] > 0, carbon_per_km / per_km[..., None], 0.0)
+        return escalation_factors(escalation, horizon) + relative
+
+    multipliers = np.ones(base_fuel.shape + (len(SERIES), len(CATEGORIES), horizon + 1))
+    maintenance = CATEGORIES.index("Maintenance")
+    insurance = CATEGORIES.index("Insurance")
+    fuel_category = CATEGORIES.index("Fuel")
+    multipliers[..., :, maintenance, :] = escalation_factors(maintenance_escalation, horizon)[..., None, :]
+    multipliers[..., :, insurance, :] = escalation_factors(insurance_escalation, horizon)[..., None, :]
+    multipliers[..., 0, fuel_category, :] = fuel(base_fuel, base_fuel_escalation, base_ghg_ef)
+    multipliers[..., 1:, fuel_category, :] = fuel(alt_fuel, alt_fuel_escalation, alt_ghg_ef)[..., None, :]
+    return multipliers
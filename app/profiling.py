@@ -0,0 +1,113 @@
+"""
+Opt-in sampling profiler for app reruns.
+
+When a rerun is profiled, a sampler thread records the stack of the script
+thread every few milliseconds until the script finishes (including reruns cut
+short by st.stop or st.rerun), then writes the samples as collapsed stacks, one
+'frame;frame;...;frame count' line per distinct stack, which flamegraph.pl and
+speedscope read directly. Time spent in discounted_TCO, the chart builders or
+load_datasets shows up under their own frames.
+
+Profiling is off unless enabled on the server:
+
+- ALTFLEET_PROFILE=1 profiles every rerun;
+- ALTFLEET_PROFILE_TOKEN=<secret> profiles the reruns of pages opened with
+  ?profile=<secret>.
+
+Profiles are written to ALTFLEET_PROFILE_DIR (default 'profiles') on the
+server only; nothing is sent elsewhere. When profiling is off, nothing but the
+environment check runs.
+"""
+import hmac
+import os
+import sys
+import threading
+import time
+
+PROFILE_DIR = os.environ.get("ALTFLEET_PROFILE_DIR", "profiles")
+
+# Seconds between samples
+SAMPLE_INTERVAL = 0.005
+
+# Samples stop after this many seconds, whatever the script does
+MAX_DURATION = 300
+
+
+def profiling_requested(query_token=None):
+    """
+    Whether this rerun should be profiled.
+
+    Parameters:
+        query_token (str): Value of the page's 'profile' query parameter, if any.
+
+    Returns:
+        bool: True if ALTFLEET_PROFILE is set, or if ALTFLEET_PROFILE_TOKEN is set and matches query_token.
+    """
+    if os.environ.get("ALTFLEET_PROFILE", "") not in ("", "0"):
+        return True
+    token = os.environ.get("ALTFLEET_PROFILE_TOKEN")
+    return bool(token and query_token) and hmac.compare_digest(token.encode(), str(query_token).encode())
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ",")
+
+
+def _stack(frame, root):
+    # Labels from the root frame down to the sampled frame, or None once the root frame has returned
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        if frame is root:
+            return ";".join(reversed(labels))
+        frame = frame.f_back
+    return None
+
+
+def write_collapsed(counts, path):
+    """
+    Writes stack samples in the collapsed format of flamegraph.pl.
+
+    Parameters:
+        counts (dict): Number of samples per ';'-joined stack.
+        path (str): Output file.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        for stack, count in sorted(counts.items()):
+            f.write(f"{stack} {count}\n")
+
+
+def start_profiler(name, directory=PROFILE_DIR, interval=SAMPLE_INTERVAL, max_duration=MAX_DURATION):
+    """
+    Samples the calling thread until the calling frame (e.g. the app script's module) returns, then writes the
+    profile.
+
+    Parameters:
+        name (str): Name of the profile, e.g. the session ID; the file is '<directory>/<name>-<time>.collapsed'.
+        directory (str): Directory of the profiles.
+        interval (float): Seconds between samples.
+        max_duration (float): Seconds after which sampling stops.
+
+    Returns:
+        str: Path the profile will be written to.
+    """
+    thread_id = threading.get_ident()
+    root = sys._getframe(1)
+    path = os.path.join(directory, f"{name}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed")
+
+    def sample():
+        counts = {}
+        deadline = time.monotonic() + max_duration
+        while time.monotonic() < deadline:
+            frame = sys._current_frames().get(thread_id)
+            stack = None if frame is None else _stack(frame, root)
+            if stack is None:
+                break
+            counts[stack] = counts.get(stack, 0) + 1
+            time.sleep(interval)
+        write_collapsed(counts, path)
+
+    threading.Thread(target=sample, name="profiler", daemon=True).start()
+    return path
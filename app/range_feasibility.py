@@ -0,0 +1,84 @@
+"""
+Daily range feasibility of battery-electric replacements.
+
+A vehicle fails a day when the energy needed for that day's distance exceeds
+the usable battery capacity left after a reserve (cold weather, battery
+degradation, return margin), assuming one full charge per day and no
+opportunity charging. Daily distances are held in a (vehicle x day) matrix
+with NaN for days without operation, so a fleet of thousands of vehicles over
+a year is checked in a single vectorized pass.
+"""
+import numpy as np
+import pandas as pd
+
+
+def load_battery_capacities(path="bev_battery_capacity.csv"):
+    """
+    Reads the usable battery capacity of the battery-electric vehicles in the catalog.
+
+    Returns:
+        dict: Maps Weight_Confi to the usable battery capacity (kWh).
+    """
+    capacities = pd.read_csv(path)
+    weight_configuration = capacities["WeightClass"] + " " + capacities["Configuration"]
+    return dict(zip(weight_configuration, capacities["usable_battery_kWh"].astype(float)))
+
+
+def daily_distance_matrix(daily):
+    """
+    Pivots daily distances into a (vehicle x day) matrix.
+
+    Parameters:
+        daily (DataFrame): 'vehicle_id', 'day' and 'distance_km', see telematics.daily_distances.
+
+    Returns:
+        tuple: Vehicle IDs (V,) and distances (V, D), NaN where a vehicle has no data for a day.
+    """
+    matrix = daily.pivot_table(index="vehicle_id", columns="day", values="distance_km", aggfunc="sum")
+    return matrix.index.to_numpy(), matrix.to_numpy(dtype=float)
+
+
+def default_distance_matrix(daily_distance, days_operation, n_vehicles=1):
+    """
+    Daily distances of vehicles that drive the same distance on every operating day, for use with the
+    duty-cycle defaults.
+
+    Returns:
+        ndarray: Distances of shape (n_vehicles, days_operation).
+    """
+    return np.full((int(n_vehicles), int(days_operation)), float(daily_distance))
+
+
+def range_feasibility(distances, consumption, usable_capacity, reserve=0.2, min_daily_distance=1.0):
+    """
+    Share of operating days each vehicle could not complete on a single charge.
+
+    Parameters:
+        distances (ndarray): (vehicle x day) daily distances (km), NaN for days without data.
+        consumption (array): Energy consumption (kWh/km), scalar or one per vehicle.
+        usable_capacity (array): Usable battery capacity (kWh), scalar or one per vehicle.
+        reserve (float): Share of the usable capacity kept in reserve.
+        min_daily_distance (float): Distance (km) below which a day is not counted as an operating day.
+
+    Returns:
+        dict: 'range_km' (V,) single-charge range, 'operating_days' (V,), 'failed_days' (V,) and
+        'failure_share' (V,), the share of operating days whose distance exceeds the range (NaN for a
+        vehicle without operating days).
+    """
+    distances = np.asarray(distances, dtype=float)
+    range_km = np.broadcast_to(
+        np.asarray(usable_capacity, dtype=float) * (1 - reserve) / np.asarray(consumption, dtype=float),
+        distances.shape[:1],
+    )
+    operating = distances >= min_daily_distance
+    failed = operating & (distances > range_km[:, None])
+    operating_days = operating.sum(axis=1)
+    failed_days = failed.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        failure_share = np.where(operating_days > 0, failed_days / operating_days, np.nan)
+    return {
+        "range_km": range_km,
+        "operating_days": operating_days,
+        "failed_days": failed_days,
+        "failure_share": failure_share,
+    }
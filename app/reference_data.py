@@ -0,0 +1,167 @@
+"""
+Declared schema of the reference datasets.
+
+Each reference CSV is read with the dtypes declared here rather than inferred:
+labels (weight class, configuration, powertrain, application, province, ...) as
+categoricals, whose comparisons in the selection widgets work on integer codes,
+and measures as floats or integers. Columns the schema does not declare, such
+as the empty 'Unnamed: N' columns left by trailing commas, are never read, and
+rows with no value at all are dropped.
+
+Values are checked at load against the plausible range and unit of their
+column, so that a mistyped unit (a fuel efficiency in km/L, a tax as a
+fraction) is reported when the data are loaded instead of skewing results.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+LABEL = "category"
+
+# Fuels priced per province, in $/L, $/kWh or $/kg
+PRICED_FUELS = ("Gasoline", "Diesel", "HEV", "Biodiesel B20", "Renewable Diesel R99", "Battery electric",
+                "Hydrogen Fuel Cell")
+
+# Plausible (lower, upper, unit) of the fuel efficiency (FuelEfficiencyCAD) per powertrain, liquid fuels otherwise
+EFFICIENCY_RANGES = {
+    "Battery electric": (0.1, 5.0, "kWh/km"),
+    "Hydrogen Fuel Cell": (2.0, 40.0, "kg/100 km"),
+}
+LIQUID_EFFICIENCY_RANGE = (5.0, 150.0, "L/100 km")
+
+# Per file, each column's dtype, or (dtype, lower, upper, unit) for the measures checked at load
+SCHEMAS = {
+    "MHDV_costs_efficiency_final.csv": {
+        "WeightClass": LABEL,
+        "VehicleApplication": LABEL,
+        "Configuration": LABEL,
+        "Powertrain": LABEL,
+        "FuelEfficiencyUS": ("float64", 0.0, 100.0, "mpg, mi/kWh or mi/kg"),
+        "FuelEfficiencyCAD": ("float64", 0.1, 150.0, "L/100 km, kWh/km or kg/100 km"),
+        "Maintenance": ("float64", 0.0, 10.0, "$/km"),
+        "Default_price": ("int64", 10_000, 5_000_000, "$"),
+        "NOx EF": ("float64", 0.0, 50.0, "g/km"),
+        "PM2.5 EF": ("float64", 0.0, 5.0, "g/km"),
+        "GHG EF": ("float64", 0.0, 5_000.0, "g/km"),
+    },
+    "MHDV_duty_cycles_final.csv": {
+        "WeightClass": LABEL,
+        "VehicleApplication": LABEL,
+        "Configuration": LABEL,
+        "average_daily_distance": ("float64", 1.0, 2_000.0, "km"),
+        "yearly_days_operation": ("float64", 1.0, 366.0, "days"),
+        "years_ownership": ("float64", 1.0, 30.0, "years"),
+    },
+    "MHDV_charging_infa_prices_final.csv": {
+        "PowerLevel": LABEL,
+        "PortConfiguration": LABEL,
+        "Price": ("int64", 0, 1_000_000, "$"),
+    },
+    "embodied_emissions.csv": {
+        "WeightClass": LABEL,
+        "Configuration": LABEL,
+        "Powertrain": LABEL,
+        "Vehicle_manufacturing": ("float64", 0.0, 200.0, "tCO2eq/vehicle"),
+        "Battery_manufacturing": ("float64", 0.0, 200.0, "tCO2eq/vehicle"),
+    },
+    "hydrogen_station_costs.csv": {
+        "Component": LABEL,
+        "Option": LABEL,
+        "Capacity": ("float64", 1.0, 100_000.0, "kg/h or kg"),
+        "Price": ("float64", 0.0, 50_000_000.0, "$"),
+    },
+    "powertrain_degradation.csv": {
+        "Powertrain": LABEL,
+        "Yearly_increase": ("float64", 0.0, 10.0, "%/year"),
+        "Max_increase": ("float64", 0.0, 50.0, "%"),
+    },
+    "province_energy_prices.csv": dict(
+        {"province": LABEL},
+        **{fuel: ("float64", 0.0, 50.0, "$/L, $/kWh or $/kg") for fuel in PRICED_FUELS},
+        grid_intensity=("float64", 0.0, 1_500.0, "gCO2eq/kWh"),
+        hydrogen_intensity=("float64", 0.0, 30_000.0, "gCO2eq/kg"),
+        taxes_perc=("float64", 0.0, 25.0, "%"),
+    ),
+    "province_fuel_escalation.csv": dict(
+        {"province": LABEL},
+        **{fuel: ("float64", -20.0, 20.0, "%/year") for fuel in PRICED_FUELS},
+    ),
+}
+
+
+def _dtype(spec):
+    return spec if isinstance(spec, str) else spec[0]
+
+
+def _out_of_range(table, column, lower, upper, unit):
+    # Messages for the values outside [lower, upper], with their spreadsheet row; empty cells are left to the
+    # code using the column
+    values = table[column].to_numpy(dtype=float)
+    if column == "FuelEfficiencyCAD" and "Powertrain" in table:
+        # Fuel efficiency units depend on the powertrain
+        powertrain = table["Powertrain"].astype(object).to_numpy()
+        lower = np.full(len(table), LIQUID_EFFICIENCY_RANGE[0])
+        upper = np.full(len(table), LIQUID_EFFICIENCY_RANGE[1])
+        unit = np.full(len(table), LIQUID_EFFICIENCY_RANGE[2], dtype=object)
+        for fuel, (fuel_lower, fuel_upper, fuel_unit) in EFFICIENCY_RANGES.items():
+            is_fuel = powertrain == fuel
+            lower[is_fuel], upper[is_fuel], unit[is_fuel] = fuel_lower, fuel_upper, fuel_unit
+    bounds = np.broadcast_arrays(values, lower, upper, np.asarray(unit, dtype=object))
+    return [f"{column} {value:g} (row {row + 2}) is outside the plausible range {low:g}-{high:g} {name}"
+            for row, value, low, high, name in zip(table.index, *bounds) if value < low or value > high]
+
+
+def load_reference_table(path, schema=None):
+    """
+    Reads a reference dataset with its declared dtypes and checks its values.
+
+    Parameters:
+        path (str): CSV file.
+        schema (dict): Dtype spec per column, see SCHEMAS; defaults to the schema of the file's name.
+
+    Returns:
+        DataFrame: The declared columns only, without empty rows, labels as categoricals.
+
+    Raises:
+        ValueError: If declared columns are missing, or values are not numbers or outside their range.
+    """
+    if schema is None:
+        schema = SCHEMAS[os.path.basename(path)]
+    header = pd.read_csv(path, nrows=0).columns
+    missing = [column for column in schema if column not in header]
+    if missing:
+        raise ValueError(f"{path}: missing columns {', '.join(missing)}")
+
+    # Measures are read as floats first, so that integer columns with empty padding rows parse
+    table = pd.read_csv(path, usecols=list(schema),
+                        dtype={column: LABEL if _dtype(spec) == LABEL else "float64" for column, spec in schema.items()})
+    table = table.dropna(how="all")
+
+    problems = []
+    for column, spec in schema.items():
+        if isinstance(spec, str):
+            continue
+        dtype, lower, upper, unit = spec
+        problems += _out_of_range(table, column, lower, upper, unit)
+        if dtype != "float64":
+            if table[column].isna().any():
+                problems.append(f"{column} has empty cells but is declared {dtype}")
+            else:
+                table[column] = table[column].astype(dtype)
+    if problems:
+        raise ValueError(f"{path}: " + "; ".join(problems[:20]))
+    return table[list(schema)].reset_index(drop=True)
+
+
+def combined_labels(table, columns):
+    """
+    Joins label columns with spaces, e.g. WeightClass and Configuration into 'Weight_Confi'.
+
+    Returns:
+        Series: Categorical labels.
+    """
+    labels = table[columns[0]].astype(str)
+    for column in columns[1:]:
+        labels = labels + " " + table[column].astype(str)
+    return labels.astype(LABEL)
@@ -0,0 +1,248 @@
+"""
+Columnar store for the results of large scenario sweeps.
+
+Sweeps across provinces, configurations, powertrains and input grids produce
+millions of result rows, too many to write as CSV or to hold in one DataFrame.
+results_writer appends each batch of rows as Parquet row groups to one file per
+partition (province and alternative powertrain by default, hive-style
+directories), with compact dtypes: float32 for costs and inputs unless a column
+needs full precision, and dictionary-encoded (categorical) labels. read_results
+loads only the requested columns, and only the partitions that match the
+filters, so a dashboard can reload a slice of a sweep instantly.
+
+Parquet support comes from pyarrow, pinned in requirements.txt. Write
+the sweep of every default scenario over a grid of discount rates with:
+
+    python app/results_store.py sweep results/ --discount-rates 0.02 0.03 0.05 0.08
+"""
+import argparse
+import os
+import time
+import uuid
+from contextlib import contextmanager
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from catalog import build_dutycycle_index, build_province_index, build_vehicle_index
+from incentives import compile_incentive_rules, load_incentive_rules
+from precompute import DEFAULT_COLUMNS, FIXED_DEFAULTS, build_default_results
+from quantile_sketch import new_sketches, sketch_bands, update_sketches
+from reference_data import combined_labels, load_reference_table
+from tco_kernel import CATEGORIES, SERIES
+
+# Columns encoded in the directory names rather than stored in the files
+PARTITION_COLUMNS = ("user_province", "evaluated_fuel")
+
+# Labels of a scenario, named as the app's inputs
+LABEL_COLUMNS = ("user_province", "user_weight_configuration", "existing_fuel", "evaluated_fuel")
+
+
+def _column_name(series, category):
+    return f"{series}_{category.lower().replace(' ', '_')}"
+
+
+def summary_rows(labels, summary, inputs=None):
+    """
+    Flattens kernel results into one row per scenario.
+
+    Parameters:
+        labels (dict): Label columns (e.g. LABEL_COLUMNS), as arrays of the batch shape or scalars.
+        summary (dict): Kernel summary arrays, see tco_kernel.summarize.
+        inputs (dict): Numeric inputs kept alongside the results, as arrays of the batch shape or scalars.
+
+    Returns:
+        DataFrame: The labels and inputs, 'npv_<series>' for each of SERIES, '<series>_<category>' for the NPV
+        of each category, and 'break_even' and 'break_even_with_subsidies' (years, NaN if never).
+    """
+    npv = np.asarray(summary["npv"])
+    shape = npv.shape[:-1]
+    size = int(np.prod(shape))
+
+    columns = {name: np.broadcast_to(value, shape).reshape(size) for name, value in dict(labels, **(inputs or {})).items()}
+    for i, series in enumerate(SERIES):
+        columns[f"npv_{series}"] = npv[..., i].reshape(size)
+    for i, series in enumerate(SERIES):
+        for j, category in enumerate(CATEGORIES):
+            columns[_column_name(series, category)] = summary["by_category"][..., i, j].reshape(size)
+    columns["break_even"] = summary["break_even"][..., 0].reshape(size)
+    columns["break_even_with_subsidies"] = summary["break_even"][..., 1].reshape(size)
+    return pd.DataFrame(columns)
+
+
+def compact_dtypes(frame, precise_columns=()):
+    """
+    Converts results to compact dtypes: text to categoricals, floats to float32 and integers to the smallest
+    integer type holding them.
+
+    Parameters:
+        frame (DataFrame): Result rows.
+        precise_columns (iterable): Float columns kept in float64.
+
+    Returns:
+        DataFrame: The converted copy.
+    """
+    converted = {}
+    for column in frame.columns:
+        values = frame[column]
+        if pd.api.types.is_float_dtype(values) and column not in precise_columns:
+            converted[column] = values.astype(np.float32)
+        elif pd.api.types.is_integer_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            converted[column] = pd.to_numeric(values, downcast="integer")
+        elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+            converted[column] = values.astype("category")
+    return frame.assign(**converted)
+
+
+def _file_schema(schema):
+    # Dictionary indices as int32 whatever the number of categories of the first batch, so later batches fit
+    return pa.schema([pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+                      if pa.types.is_dictionary(field.type) else field for field in schema],
+                     metadata=schema.metadata)
+
+
+@contextmanager
+def results_writer(path, partition_by=PARTITION_COLUMNS, precise_columns=(), buffer_rows=500_000, compression="zstd"):
+    """
+    Opens a results store for appending.
+
+    Batches of rows passed to the yielded function are converted with compact_dtypes and buffered; once
+    buffer_rows rows are buffered, and when the store is closed, the buffer is split by partition and written as
+    one row group per partition. Each writer adds its own file to each partition, so a store can be extended by
+    later sweeps; batches of one writer must have the same columns.
+
+    Parameters:
+        path (str): Directory of the store.
+        partition_by (tuple): Columns whose values name the partition directories.
+        precise_columns (iterable): Float columns kept in float64.
+        buffer_rows (int): Rows buffered before they are written.
+        compression (str): Parquet compression codec.
+
+    Yields:
+        callable: Function appending a DataFrame of result rows (see summary_rows).
+    """
+    writers, buffer = {}, []
+    part = uuid.uuid4().hex[:12]
+
+    def flush():
+        # Categories of the batches are merged by converting the concatenated labels again
+        frame = compact_dtypes(pd.concat(buffer, ignore_index=True), precise_columns)
+        buffer.clear()
+        table = pa.Table.from_pandas(frame.drop(columns=list(partition_by)), preserve_index=False)
+        for values, positions in frame.groupby(list(partition_by), observed=True, sort=False).indices.items():
+            values = values if isinstance(values, tuple) else (values,)
+            writer = writers.get(values)
+            if writer is None:
+                directory = os.path.join(path, *(f"{column}={quote(str(value), safe='')}"
+                                                 for column, value in zip(partition_by, values)))
+                os.makedirs(directory, exist_ok=True)
+                writer = pq.ParquetWriter(os.path.join(directory, f"part-{part}.parquet"), _file_schema(table.schema),
+                                          compression=compression)
+                writers[values] = writer
+            writer.write_table(table.take(positions).cast(writer.schema))
+
+    def append(frame):
+        buffer.append(compact_dtypes(frame, precise_columns))
+        if sum(len(batch) for batch in buffer) >= buffer_rows:
+            flush()
+
+    try:
+        yield append
+        if buffer:
+            flush()
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+
+def read_results(path, columns=None, filters=None, partition_by=PARTITION_COLUMNS):
+    """
+    Reads part of a results store.
+
+    Parameters:
+        path (str): Directory of the store.
+        columns (list): Columns to read; None for all.
+        filters (dict): Value, or list of accepted values, per column. Filters on partition columns skip the
+                        other partitions without opening their files.
+        partition_by (tuple): Partition columns the store was written with.
+
+    Returns:
+        DataFrame: The matching rows, labels and partition columns as categoricals.
+    """
+    partitioning = ds.partitioning(pa.schema([(column, pa.string()) for column in partition_by]), flavor="hive")
+    dataset = ds.dataset(path, format="parquet", partitioning=partitioning)
+
+    expression = None
+    for column, value in (filters or {}).items():
+        accepted = [value] if isinstance(value, str) or np.ndim(value) == 0 else list(value)
+        condition = ds.field(column).isin(accepted)
+        expression = condition if expression is None else expression & condition
+
+    frame = dataset.to_table(columns=list(columns) if columns else None, filter=expression).to_pandas()
+    for column in partition_by:
+        if column in frame:
+            frame[column] = frame[column].astype("category")
+    return frame
+
+
+def default_sweep_rows(vehicle_index, dutycycle_index, province_index, discount_rate, incentives=None):
+    """
+    Results of every default scenario (see precompute) at one discount rate, for a single vehicle.
+
+    Returns:
+        DataFrame: Rows of summary_rows with the LABEL_COLUMNS, 'discount_rate', the DEFAULT_COLUMNS inputs and
+        the 'vehicle_subsidy' of the incentive rules.
+    """
+    results = build_default_results(vehicle_index, dutycycle_index, province_index, discount_rate, incentives)
+    labels = dict(zip(LABEL_COLUMNS, np.array([key.split("|") for key in results["keys"]]).T))
+    inputs = dict(zip(DEFAULT_COLUMNS, results["inputs"].T), discount_rate=discount_rate,
+                  vehicle_subsidy=results["vehicle_subsidy"])
+    return summary_rows(labels, results, inputs)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write a scenario sweep to a results store, or query one.")
+    parser.add_argument("command", choices=["sweep", "query"])
+    parser.add_argument("path", help="Directory of the results store")
+    parser.add_argument("--discount-rates", type=float, nargs="+", default=[FIXED_DEFAULTS["discount_rate"]])
+    parser.add_argument("--columns", nargs="+", help="Columns to read")
+    parser.add_argument("--province", nargs="+", help="Provinces to read")
+    parser.add_argument("--fuel", nargs="+", help="Alternative powertrains to read")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    if args.command == "sweep":
+        vehicles_info = load_reference_table("MHDV_costs_efficiency_final.csv")
+        vehicles_dutycycles = load_reference_table("MHDV_duty_cycles_final.csv")
+        vehicles_info["Weight_Confi"] = combined_labels(vehicles_info, ["WeightClass", "Configuration"])
+        vehicles_dutycycles["Weight_Confi"] = combined_labels(vehicles_dutycycles, ["WeightClass", "Configuration"])
+        vehicle_index = build_vehicle_index(vehicles_info)
+        dutycycle_index = build_dutycycle_index(vehicles_dutycycles)
+        province_index = build_province_index(load_reference_table("province_energy_prices.csv"))
+        incentives = compile_incentive_rules(load_incentive_rules(), province_index, dutycycle_index,
+                                             vehicles_info["Powertrain"].unique())
+
+        rows = 0
+        sketches = new_sketches(("npv_delta", "break_even"))
+        with results_writer(args.path, precise_columns=("discount_rate",)) as append:
+            for discount_rate in args.discount_rates:
+                frame = default_sweep_rows(vehicle_index, dutycycle_index, province_index, discount_rate, incentives)
+                append(frame)
+                update_sketches(sketches, {"npv_delta": frame["npv_alternative_with_subsidies"] - frame["npv_base"],
+                                           "break_even": frame["break_even_with_subsidies"]})
+                rows += len(frame)
+        print(f"Wrote {rows:,d} scenarios to {args.path} in {time.perf_counter() - start:.2f} s")
+        print(sketch_bands(sketches).round(1).to_string())
+    else:
+        filters = {}
+        if args.province:
+            filters["user_province"] = args.province
+        if args.fuel:
+            filters["evaluated_fuel"] = args.fuel
+        frame = read_results(args.path, args.columns, filters)
+        print(frame)
+        print(f"Read {len(frame):,d} rows in {time.perf_counter() - start:.2f} s")
@@ -0,0 +1,459 @@
+"""
+Batch evaluations built on the vectorized kernel.
+
+Each function takes the scenario entered in the app (a dict keyed by the app's
+input variable names, see scenario_inputs in app.py), expands it along one axis
+(powertrain, province, ...) using catalog defaults, and evaluates the whole axis
+in a single call to the kernel.
+"""
+import numpy as np
+import pandas as pd
+
+from degradation import degradation_multipliers, fuel_use_factors, lifetime_average
+from embodied_emissions import embodied_per_vehicle, infrastructure_embodied, lifecycle_ghg
+from financing import vehicle_payments
+from incentives import infrastructure_subsidy, vehicle_subsidy
+from lifecycle_events import event_costs
+from price_paths import cost_multipliers
+from tco_kernel import fuel_cost_per_km, ghg_per_km, lifetime_emissions, summarize, yearly_costs
+
+
+def _value(inputs, key, default=0.0):
+    # Input value, or the default where it was left empty; array-valued inputs are kept as they are
+    value = inputs.get(key)
+    return default if value is None else value
+
+
+def _common_kernel_args(inputs):
+    # Inputs shared by every scenario of a batch
+    return dict(
+        n_vehicles=inputs["n_vehicles"],
+        daily_distance=inputs["daily_distance"],
+        days_operation=inputs["yearly_days_operations"],
+        lifetime=inputs["vehicle_lifetime"],
+        discount_rate=inputs["discount_rate"],
+        base_insurance=_value(inputs, "existing_vehicle_insurance"),
+        alt_insurance=_value(inputs, "alternative_vehicle_insurance"),
+        base_depreciation=_value(inputs, "existing_vehicle_depreciation"),
+        alt_depreciation=_value(inputs, "alternative_vehicle_depreciation"),
+        financing_period=_value(inputs, "financing_period", 0),
+        downpayment=_value(inputs, "downpayment", 100.0),
+        financing_rate=_value(inputs, "financing_rate"),
+    )
+
+
+def _fuel_use(inputs, alt_powertrain):
+    # Yearly energy use relative to new of the existing and alternative vehicles, or None without degradation
+    rates = inputs.get("efficiency_degradation")
+    if not rates:
+        return None
+    horizon = int(np.max(inputs["vehicle_lifetime"]))
+    return fuel_use_factors(rates, inputs["existing_fuel"], horizon), fuel_use_factors(rates, alt_powertrain, horizon)
+
+
+def _price_multipliers(inputs, base_fuel, alt_fuel, base_fuel_escalation, alt_fuel_escalation, base_ghg_ef, alt_ghg_ef,
+                       fuel_use=None):
+    # Escalation, carbon price and degradation multipliers, or None when prices and efficiencies are constant
+    escalation = inputs.get("price_escalation")
+    multipliers = None
+    if escalation:
+        multipliers = cost_multipliers(
+            int(inputs["vehicle_lifetime"]), base_fuel, alt_fuel, base_fuel_escalation, alt_fuel_escalation,
+            escalation["maintenance"], escalation["insurance"], base_ghg_ef, alt_ghg_ef, escalation.get("carbon_prices"),
+        )
+    if fuel_use is not None:
+        degraded = degradation_multipliers(*fuel_use)
+        multipliers = degraded if multipliers is None else multipliers * degraded
+    return multipliers
+
+
+def _event_costs(inputs, alt_powertrain, alt_vehicle_cost, infra_cost):
+    # Scheduled lifecycle event costs, or None when the scenario has no events
+    events = inputs.get("lifecycle_events")
+    if not events:
+        return None
+    return event_costs(
+        events, inputs["existing_fuel"], alt_powertrain, inputs["vehicle_lifetime"], int(inputs["vehicle_lifetime"]),
+        inputs["n_vehicles"], inputs["existing_price"], alt_vehicle_cost, infra_cost,
+    )
+
+
+def _financing(inputs, provincial_tax, base_vehicle_cost, alt_vehicle_cost, alt_vehicle_subsidy):
+    # Monthly loan or lease payments replacing the kernel's annual loan, or nothing when no financing type is set
+    financing_type = inputs.get("financing_type")
+    if not financing_type:
+        return {}
+    base_vehicle_cost, alt_vehicle_cost, alt_vehicle_subsidy = np.broadcast_arrays(
+        *[np.asarray(x, dtype=float) for x in (base_vehicle_cost, alt_vehicle_cost, alt_vehicle_subsidy)])
+    payments, owned = vehicle_payments(
+        financing_type, np.stack([base_vehicle_cost, alt_vehicle_cost, alt_vehicle_cost - alt_vehicle_subsidy], axis=-1),
+        inputs["n_vehicles"], provincial_tax, inputs["discount_rate"], inputs["vehicle_lifetime"],
+        int(np.max(inputs["vehicle_lifetime"])), _value(inputs, "financing_period", 0) * 12,
+        _value(inputs, "downpayment", 100.0), _value(inputs, "financing_rate"), _value(inputs, "financing_residual"),
+        _value(inputs, "lease_buyout", False),
+    )
+    return dict(vehicle_payments=payments, owned=owned)
+
+
+def lifetime_pollutants(inputs, base_row, alt_ghg_per_km, alt_nox_ef, alt_pm25_ef, fuel_use=None):
+    """
+    Lifetime GHG and tailpipe NOx / PM2.5 emissions of the existing and alternative vehicles.
+
+    Parameters:
+        inputs (dict): Duty cycle: 'n_vehicles', 'daily_distance', 'yearly_days_operations' and 'vehicle_lifetime'.
+        base_row (dict): 'GHG EF', 'NOx EF' and 'PM2.5 EF' of the existing vehicle.
+        alt_ghg_per_km (float or ndarray): GHG emission factor of the alternative (g/km), see tco_kernel.ghg_per_km.
+        alt_nox_ef, alt_pm25_ef (float or ndarray): Tailpipe NOx and PM2.5 factors of the alternative (g/km).
+        fuel_use (tuple): Optional yearly fuel use factors of both vehicles (see _fuel_use); degradation raises the
+                          GHG with the energy used.
+
+    Returns:
+        dict: 'ghg' (tonnes), 'nox' and 'pm25' (g), each stacked as (..., [existing, alternative]).
+    """
+    duty = (inputs["n_vehicles"], inputs["daily_distance"], inputs["yearly_days_operations"], inputs["vehicle_lifetime"])
+
+    def pair(base_ef, alt_ef):
+        base_ef, alt_ef = np.broadcast_arrays(np.asarray(base_ef, dtype=float), np.asarray(alt_ef, dtype=float))
+        return np.stack([lifetime_emissions(*duty, base_ef), lifetime_emissions(*duty, alt_ef)], axis=-1)
+
+    ghg = pair(base_row["GHG EF"], alt_ghg_per_km) / 1e6
+    if fuel_use is not None:
+        ghg = ghg * np.stack(np.broadcast_arrays(*[lifetime_average(factors, inputs["vehicle_lifetime"])
+                                                   for factors in fuel_use]), axis=-1)
+    return {
+        "ghg": ghg,
+        "nox": pair(base_row["NOx EF"], alt_nox_ef),
+        "pm25": pair(base_row["PM2.5 EF"], alt_pm25_ef),
+    }
+
+
+def evaluate_scenario(inputs, vehicle_index, province_index):
+    """
+    Evaluates the costs of the scenario entered in the app, as shown in the results section.
+
+    Parameters:
+        inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Output of catalog.build_vehicle_index.
+        province_index (dict): Output of catalog.build_province_index.
+
+    Returns:
+        dict: Kernel summary arrays for the single scenario, see tco_kernel.summarize.
+    """
+    escalation = inputs.get("price_escalation") or {}
+    weight_configuration = inputs["user_weight_configuration"]
+    price_multipliers = _price_multipliers(
+        inputs, inputs["existing_fuel_perkm"], inputs["evaluated_fuel_perkm"],
+        escalation.get("existing_fuel", 0.0), escalation.get("evaluated_fuel", 0.0),
+        vehicle_index[(weight_configuration, inputs["existing_fuel"])]["GHG EF"],
+        vehicle_index[(weight_configuration, inputs["evaluated_fuel"])]["GHG EF"],
+        _fuel_use(inputs, inputs["evaluated_fuel"]),
+    )
+    provincial_tax = province_index[inputs["user_province"]]["taxes_perc"] / 100
+    alt_vehicle_subsidy = _value(inputs, "user_vehicle_incentive_amount")
+    costs = yearly_costs(
+        provincial_tax=provincial_tax,
+        base_vehicle_cost=inputs["existing_price"],
+        alt_vehicle_cost=inputs["evaluated_price"],
+        base_maintenance=inputs["existing_maintenance"],
+        alt_maintenance=inputs["evaluated_maintenance"],
+        base_fuel=inputs["existing_fuel_perkm"],
+        alt_fuel=inputs["evaluated_fuel_perkm"],
+        infra_cost=_value(inputs, "total_infra_cost"),
+        vehicle_subsidy=alt_vehicle_subsidy,
+        infra_subsidy=_value(inputs, "user_chargerRefuelling_incentive_amount"),
+        price_multipliers=price_multipliers,
+        event_costs=_event_costs(inputs, inputs["evaluated_fuel"], inputs["evaluated_price"], _value(inputs, "total_infra_cost")),
+        **_financing(inputs, provincial_tax, inputs["existing_price"], inputs["evaluated_price"], alt_vehicle_subsidy),
+        **_common_kernel_args(inputs),
+    )
+    return summarize(costs)
+
+
+def _alternatives(inputs, vehicle_index, province, alternatives, incentives):
+    # Values of each alternative powertrain: the user's for the one selected in the app, catalog and provincial
+    # defaults for the others, with the vehicle subsidy of the incentive rules (none without them)
+    weight_configuration = inputs["user_weight_configuration"]
+    rows = [vehicle_index[(weight_configuration, fuel)] for fuel in alternatives]
+    powertrain = np.array(alternatives)
+    selected = powertrain == inputs["evaluated_fuel"]
+
+    def catalog(column):
+        return np.array([row[column] for row in rows], dtype=float)
+
+    def user_or_default(key, default):
+        return np.where(selected, float(inputs[key] or 0.0), default)
+
+    efficiency = user_or_default("evaluated_fuel_efficiency", catalog("FuelEfficiencyCAD"))
+    fuel_price = user_or_default("evaluated_fuel_price", np.array([province[fuel] for fuel in alternatives], dtype=float))
+    intensity = inputs.get("hydro_electricity_intensity")
+    grid_intensity = np.where(selected & (intensity is not None), intensity or 0.0, province["grid_intensity"])
+    hydrogen_intensity = np.where(selected & (intensity is not None), intensity or 0.0, province["hydrogen_intensity"])
+
+    escalation = inputs.get("price_escalation") or {}
+    default_escalation = np.array([province.get("escalation", {}).get(fuel, 0.0) for fuel in alternatives], dtype=float)
+
+    vehicle_cost = user_or_default("evaluated_price", catalog("Default_price"))
+    rule_subsidy = 0.0 if incentives is None else vehicle_subsidy(
+        incentives, inputs["user_province"], weight_configuration, powertrain, vehicle_cost,
+        inputs["existing_price"], inputs["n_vehicles"])
+    return dict(
+        powertrain=powertrain,
+        selected=selected,
+        fuel=fuel_cost_per_km(powertrain, fuel_price, efficiency),
+        fuel_escalation=np.where(selected, escalation.get("evaluated_fuel", 0.0), default_escalation),
+        vehicle_cost=vehicle_cost,
+        vehicle_subsidy=user_or_default("user_vehicle_incentive_amount", rule_subsidy),
+        maintenance=user_or_default("evaluated_maintenance", catalog("Maintenance")),
+        ghg_ef=catalog("GHG EF"),
+        ghg_per_km=ghg_per_km(powertrain, efficiency, catalog("GHG EF"), grid_intensity, hydrogen_intensity),
+        nox_ef=catalog("NOx EF"),
+        pm25_ef=catalog("PM2.5 EF"),
+    )
+
+
+def evaluate_alternatives(inputs, vehicle_index, province_index, alternatives, incentives=None, embodied=None):
+    """
+    Evaluates every alternative powertrain for the user's configuration in one pass.
+
+    The alternative selected in the app uses the values entered by the user (price, maintenance,
+    efficiency, fuel price, infrastructure, subsidies and emission intensity). Other alternatives
+    use the catalog and provincial defaults, with no infrastructure cost, and the vehicle subsidy
+    of the incentive rules (none without them). Lifecycle events apply to the powertrains they are
+    entered for.
+
+    Parameters:
+        inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Output of catalog.build_vehicle_index.
+        province_index (dict): Output of catalog.build_province_index.
+        alternatives (list): Alternative powertrains to evaluate.
+        incentives (dict): Output of incentives.compile_incentive_rules.
+        embodied (dict): Output of embodied_emissions.load_embodied_factors, for lifecycle emissions.
+
+    Returns:
+        dict: 'powertrain' (P,), kernel summary arrays with a leading powertrain axis (see
+        tco_kernel.summarize), and 'ghg' (tonnes), 'nox' and 'pm25' (g) of shape (P, 2); with embodied factors,
+        'lifecycle_ghg' (tonnes) of shape (P, 2) and the 'carbon_payback' year (P,), see
+        embodied_emissions.lifecycle_ghg.
+    """
+    province = province_index[inputs["user_province"]]
+    base_row = vehicle_index[(inputs["user_weight_configuration"], inputs["existing_fuel"])]
+    alternative = _alternatives(inputs, vehicle_index, province, alternatives, incentives)
+    powertrain, selected = alternative["powertrain"], alternative["selected"]
+
+    escalation = inputs.get("price_escalation") or {}
+    fuel_use = _fuel_use(inputs, powertrain)
+    price_multipliers = _price_multipliers(
+        inputs, inputs["existing_fuel_perkm"], alternative["fuel"], escalation.get("existing_fuel", 0.0),
+        alternative["fuel_escalation"], base_row["GHG EF"], alternative["ghg_ef"], fuel_use,
+    )
+
+    alt_vehicle_cost = alternative["vehicle_cost"]
+    alt_vehicle_subsidy = alternative["vehicle_subsidy"]
+    infra_cost = np.where(selected, float(inputs["total_infra_cost"] or 0.0), 0.0)
+    costs = yearly_costs(
+        provincial_tax=province["taxes_perc"] / 100,
+        base_vehicle_cost=inputs["existing_price"],
+        alt_vehicle_cost=alt_vehicle_cost,
+        base_maintenance=inputs["existing_maintenance"],
+        alt_maintenance=alternative["maintenance"],
+        base_fuel=inputs["existing_fuel_perkm"],
+        alt_fuel=alternative["fuel"],
+        infra_cost=infra_cost,
+        vehicle_subsidy=alt_vehicle_subsidy,
+        infra_subsidy=np.where(selected, float(inputs["user_chargerRefuelling_incentive_amount"] or 0.0), 0.0),
+        price_multipliers=price_multipliers,
+        event_costs=_event_costs(inputs, powertrain, alt_vehicle_cost, infra_cost),
+        **_financing(inputs, province["taxes_perc"] / 100, inputs["existing_price"], alt_vehicle_cost, alt_vehicle_subsidy),
+        **_common_kernel_args(inputs),
+    )
+
+    result = summarize(costs)
+    result["powertrain"] = powertrain
+    result.update(lifetime_pollutants(inputs, base_row, alternative["ghg_per_km"], alternative["nox_ef"], alternative["pm25_ef"],
+                                       fuel_use))
+    if embodied is not None:
+        lifecycle = _lifecycle(inputs, embodied, powertrain, result["ghg"], infra_cost)
+        result["lifecycle_ghg"] = lifecycle["total"]
+        result["carbon_payback"] = lifecycle["payback"]
+    return result
+
+
+def _lifecycle(inputs, embodied, alt_powertrain, ghg, infra_cost):
+    # Lifecycle emissions of the existing vehicles and of each alternative, see embodied_emissions.lifecycle_ghg
+    vehicle, battery = embodied_per_vehicle(embodied, inputs["user_weight_configuration"],
+                                            [inputs["existing_fuel"]] + list(alt_powertrain))
+    per_vehicle = vehicle + battery
+    return lifecycle_ghg(inputs["n_vehicles"], inputs["vehicle_lifetime"], ghg,
+                         np.stack(np.broadcast_arrays(per_vehicle[0], per_vehicle[1:]), axis=-1),
+                         infrastructure_embodied(infra_cost))
+
+
+def evaluate_options(inputs, vehicle_index, province_index, options, incentives=None, embodied=None):
+    """
+    Evaluates a grid of options for the user's configuration in one pass: the alternative powertrain, its
+    infrastructure cost and the vehicle financing.
+
+    Powertrains take the values of evaluate_alternatives. The infrastructure subsidy is that of the incentive
+    rules for each option's infrastructure cost (none without them). Financing payments are computed once per
+    distinct (powertrain, financing) combination and shared by the options using it.
+
+    Parameters:
+        inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Output of catalog.build_vehicle_index.
+        province_index (dict): Output of catalog.build_province_index.
+        options (dict): Arrays of the options (N,): 'powertrain', 'infra_cost' ($), 'financing_type' (one of
+                        financing.FINANCING_TYPES), 'financing_period' (years, zero for cash), 'downpayment' (%),
+                        'financing_rate' (%) and 'financing_residual' (%).
+        incentives (dict): Output of incentives.compile_incentive_rules.
+        embodied (dict): Output of embodied_emissions.load_embodied_factors, for lifecycle emissions.
+
+    Returns:
+        dict: 'npv' (N, series), and 'ghg' (tonnes) of shape (N, 2) for the existing vehicles and the option,
+        lifecycle emissions with embodied factors and well-to-wheel emissions without.
+    """
+    province = province_index[inputs["user_province"]]
+    provincial_tax = province["taxes_perc"] / 100
+    base_row = vehicle_index[(inputs["user_weight_configuration"], inputs["existing_fuel"])]
+    alternatives, codes = np.unique(np.asarray(options["powertrain"]), return_inverse=True)
+    alternative = _alternatives(inputs, vehicle_index, province, list(alternatives), incentives)
+    powertrain = alternative["powertrain"][codes]
+    infra_cost = np.asarray(options["infra_cost"], dtype=float)
+
+    escalation = inputs.get("price_escalation") or {}
+    fuel_use = _fuel_use(inputs, alternative["powertrain"])
+    price_multipliers = _price_multipliers(
+        inputs, inputs["existing_fuel_perkm"], alternative["fuel"], escalation.get("existing_fuel", 0.0),
+        alternative["fuel_escalation"], base_row["GHG EF"], alternative["ghg_ef"], fuel_use,
+    )
+
+    # Payments of each distinct financing of each powertrain
+    financing = pd.MultiIndex.from_arrays([codes, np.asarray(options["financing_type"]), options["financing_period"],
+                                           options["downpayment"], options["financing_rate"], options["financing_residual"]])
+    financing_codes, plans = pd.factorize(financing)
+    plan_powertrain = plans.get_level_values(0).to_numpy()
+    vehicle_cost = alternative["vehicle_cost"][plan_powertrain]
+    payments, owned = vehicle_payments(
+        plans.get_level_values(1).to_numpy(),
+        np.stack(np.broadcast_arrays(float(inputs["existing_price"]), vehicle_cost,
+                                     vehicle_cost - alternative["vehicle_subsidy"][plan_powertrain]), axis=-1),
+        inputs["n_vehicles"], provincial_tax, inputs["discount_rate"], inputs["vehicle_lifetime"],
+        int(np.max(inputs["vehicle_lifetime"])), plans.get_level_values(2).to_numpy(dtype=float) * 12,
+        plans.get_level_values(3).to_numpy(dtype=float), plans.get_level_values(4).to_numpy(dtype=float),
+        plans.get_level_values(5).to_numpy(dtype=float),
+    )
+
+    infra_subsidy = 0.0 if incentives is None else infrastructure_subsidy(
+        incentives, inputs["user_province"], inputs["user_weight_configuration"], powertrain, infra_cost)
+    costs = yearly_costs(
+        provincial_tax=provincial_tax,
+        base_vehicle_cost=inputs["existing_price"],
+        alt_vehicle_cost=alternative["vehicle_cost"][codes],
+        base_maintenance=inputs["existing_maintenance"],
+        alt_maintenance=alternative["maintenance"][codes],
+        base_fuel=inputs["existing_fuel_perkm"],
+        alt_fuel=alternative["fuel"][codes],
+        infra_cost=infra_cost,
+        vehicle_subsidy=alternative["vehicle_subsidy"][codes],
+        infra_subsidy=infra_subsidy,
+        price_multipliers=None if price_multipliers is None else price_multipliers[codes],
+        event_costs=_event_costs(inputs, powertrain, alternative["vehicle_cost"][codes], infra_cost),
+        vehicle_payments=payments[financing_codes],
+        owned=owned[financing_codes],
+        **_common_kernel_args(inputs),
+    )
+
+    ghg = lifetime_pollutants(inputs, base_row, alternative["ghg_per_km"], 0.0, 0.0, fuel_use)["ghg"][codes]
+    if embodied is not None:
+        ghg = _lifecycle(inputs, embodied, powertrain, ghg, infra_cost)["total"]
+    return {"npv": costs.sum(axis=-2).sum(axis=-1), "ghg": ghg}
+
+
+def evaluate_provinces(inputs, vehicle_index, province_index, incentives=None):
+    """
+    Evaluates the user's configuration in every province in one pass.
+
+    Fuel prices, tax rates and emission intensities come from each province's defaults, except
+    for the user's own province which keeps the values entered in the app. Vehicle, duty cycle,
+    infrastructure and financing inputs are shared by every province. Subsidies are those entered
+    in the app, or with incentive rules, those of the rules outside the user's own province.
+
+    Parameters:
+        inputs (dict): The scenario entered in the app.
+        vehicle_index (dict): Output of catalog.build_vehicle_index.
+        province_index (dict): Output of catalog.build_province_index.
+        incentives (dict): Output of incentives.compile_incentive_rules.
+
+    Returns:
+        dict: 'province' (R,), kernel summary arrays with a leading province axis (see
+        tco_kernel.summarize), and 'ghg' (tonnes), 'nox' and 'pm25' (g) of shape (R, 2).
+    """
+    existing_fuel, evaluated_fuel = inputs["existing_fuel"], inputs["evaluated_fuel"]
+    weight_configuration = inputs["user_weight_configuration"]
+    base_row = vehicle_index[(weight_configuration, existing_fuel)]
+    alt_row = vehicle_index[(weight_configuration, evaluated_fuel)]
+
+    provinces = list(province_index)
+    rows = [province_index[province] for province in provinces]
+    home = np.array(provinces) == inputs["user_province"]
+
+    def provincial(column, override=None):
+        values = np.array([row[column] for row in rows], dtype=float)
+        return values if override is None else np.where(home, override, values)
+
+    intensity = inputs.get("hydro_electricity_intensity")
+    grid_intensity = provincial("grid_intensity", intensity if evaluated_fuel == "Battery electric" else None)
+    hydrogen_intensity = provincial("hydrogen_intensity", intensity if evaluated_fuel == "Hydrogen Fuel Cell" else None)
+    base_fuel = fuel_cost_per_km(existing_fuel, provincial(existing_fuel, inputs["existing_fuel_price"]),
+                                 inputs["existing_fuel_efficiency"])
+    alt_fuel = fuel_cost_per_km(evaluated_fuel, provincial(evaluated_fuel, inputs["evaluated_fuel_price"]),
+                                inputs["evaluated_fuel_efficiency"])
+
+    escalation = inputs.get("price_escalation") or {}
+
+    def provincial_escalation(fuel, override):
+        values = np.array([row.get("escalation", {}).get(fuel, 0.0) for row in rows], dtype=float)
+        return np.where(home, override, values)
+
+    fuel_use = _fuel_use(inputs, evaluated_fuel)
+    price_multipliers = _price_multipliers(
+        inputs, base_fuel, alt_fuel,
+        provincial_escalation(existing_fuel, escalation.get("existing_fuel", 0.0)),
+        provincial_escalation(evaluated_fuel, escalation.get("evaluated_fuel", 0.0)),
+        base_row["GHG EF"], alt_row["GHG EF"], fuel_use,
+    )
+
+    provincial_tax = provincial("taxes_perc") / 100
+    alt_vehicle_subsidy = inputs["user_vehicle_incentive_amount"] or 0.0
+    infra_subsidy = inputs["user_chargerRefuelling_incentive_amount"] or 0.0
+    if incentives is not None:
+        alt_vehicle_subsidy = np.where(home, alt_vehicle_subsidy, vehicle_subsidy(
+            incentives, provinces, weight_configuration, evaluated_fuel, inputs["evaluated_price"],
+            inputs["existing_price"], inputs["n_vehicles"]))
+        infra_subsidy = np.where(home, infra_subsidy, infrastructure_subsidy(
+            incentives, provinces, weight_configuration, evaluated_fuel, inputs["total_infra_cost"] or 0.0))
+
+    costs = yearly_costs(
+        provincial_tax=provincial_tax,
+        base_vehicle_cost=inputs["existing_price"],
+        alt_vehicle_cost=inputs["evaluated_price"],
+        base_maintenance=inputs["existing_maintenance"],
+        alt_maintenance=inputs["evaluated_maintenance"],
+        base_fuel=base_fuel,
+        alt_fuel=alt_fuel,
+        infra_cost=inputs["total_infra_cost"] or 0.0,
+        vehicle_subsidy=alt_vehicle_subsidy,
+        infra_subsidy=infra_subsidy,
+        price_multipliers=price_multipliers,
+        event_costs=_event_costs(inputs, evaluated_fuel, inputs["evaluated_price"], inputs["total_infra_cost"] or 0.0),
+        **_financing(inputs, provincial_tax, inputs["existing_price"], inputs["evaluated_price"], alt_vehicle_subsidy),
+        **_common_kernel_args(inputs),
+    )
+
+    result = summarize(costs)
+    result["province"] = np.array(provinces)
+    result.update(lifetime_pollutants(
+        inputs, base_row,
+        ghg_per_km(evaluated_fuel, inputs["evaluated_fuel_efficiency"], alt_row["GHG EF"], grid_intensity, hydrogen_intensity),
+        alt_row["NOx EF"], alt_row["PM2.5 EF"], fuel_use,
+    ))
+    return result
@@ -0,0 +1,171 @@
+"""
+Persistent scenario store backed by a local SQLite database.
+
+A scenario is saved with its full input vector (the scenario_inputs dict of
+app.py) and the outputs computed for it, under a short shareable ID. The table
+is indexed by province, vehicle configuration, alternative powertrain and
+creation date so that queries such as "all Class 8 Tractor battery electric
+scenarios in Quebec" are answered from the index.
+"""
+import hashlib
+import json
+import os
+import secrets
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+# Database location, overridable for deployments with a persistent volume
+DEFAULT_STORE_PATH = os.environ.get("ALTFLEET_SCENARIO_DB", "scenarios.db")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scenarios (
+    scenario_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    province TEXT,
+    weight_configuration TEXT,
+    existing_fuel TEXT,
+    evaluated_fuel TEXT,
+    fingerprint TEXT NOT NULL,
+    inputs TEXT NOT NULL,
+    outputs TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_scenarios_selection
+    ON scenarios (province, weight_configuration, evaluated_fuel, created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_powertrain ON scenarios (evaluated_fuel, created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_created ON scenarios (created_at);
+CREATE INDEX IF NOT EXISTS idx_scenarios_fingerprint ON scenarios (fingerprint);
+"""
+
+_initialized = set()
+
+
+def _json_default(value):
+    # NumPy scalars and arrays coming from the datasets and the kernel
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _dumps(value):
+    return json.dumps(value, sort_keys=True, default=_json_default)
+
+
+@contextmanager
+def _connect(path):
+    # One short-lived connection per operation keeps the store safe to use from any session thread
+    connection = sqlite3.connect(path, timeout=10)
+    connection.row_factory = sqlite3.Row
+    try:
+        if path not in _initialized:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(_SCHEMA)
+            _initialized.add(path)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+
+def scenario_fingerprint(inputs):
+    """
+    Stable hash of an input vector, used to recognise identical scenarios.
+
+    Parameters:
+        inputs (dict): Scenario inputs keyed by name.
+
+    Returns:
+        str: Hex digest.
+    """
+    return hashlib.sha1(_dumps(inputs).encode()).hexdigest()
+
+
+def save_scenario(name, inputs, outputs, path=DEFAULT_STORE_PATH):
+    """
+    Saves a named scenario.
+
+    Parameters:
+        name (str): Name given by the user.
+        inputs (dict): Scenario inputs keyed by name.
+        outputs (dict): Computed outputs; NumPy arrays are stored as lists.
+        path (str): Database file.
+
+    Returns:
+        str: The shareable scenario ID.
+    """
+    scenario_id = secrets.token_urlsafe(6)
+    with _connect(path) as connection:
+        connection.execute(
+            "INSERT INTO scenarios VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (scenario_id, name, datetime.now().isoformat(timespec="seconds"),
+             inputs.get("user_province"), inputs.get("user_weight_configuration"),
+             inputs.get("existing_fuel"), inputs.get("evaluated_fuel"),
+             scenario_fingerprint(inputs), _dumps(inputs), _dumps(outputs)),
+        )
+    return scenario_id
+
+
+def load_scenario(scenario_id, path=DEFAULT_STORE_PATH):
+    """
+    Loads a scenario by ID.
+
+    Returns:
+        dict or None: 'scenario_id', 'name', 'created_at', 'fingerprint', 'inputs' and 'outputs',
+        or None if the ID is unknown.
+    """
+    with _connect(path) as connection:
+        row = connection.execute(
+            "SELECT scenario_id, name, created_at, fingerprint, inputs, outputs FROM scenarios WHERE scenario_id = ?",
+            (scenario_id,),
+        ).fetchone()
+    if row is None:
+        return None
+    scenario = dict(row)
+    scenario["inputs"] = json.loads(scenario["inputs"])
+    scenario["outputs"] = json.loads(scenario["outputs"])
+    return scenario
+
+
+def find_scenarios(province=None, weight_configuration=None, powertrain=None, since=None, until=None,
+                   limit=200, path=DEFAULT_STORE_PATH):
+    """
+    Lists saved scenarios matching the given filters, newest first.
+
+    Parameters:
+        province (str): Province of operation.
+        weight_configuration (str): Weight class and configuration, e.g. 'Class 8 Tractor'.
+        powertrain (str): Alternative powertrain evaluated.
+        since, until (str): ISO dates bounding the creation date.
+        limit (int): Maximum number of rows returned.
+        path (str): Database file.
+
+    Returns:
+        list: One dict per scenario with its ID, name, date and selections (without inputs or outputs).
+    """
+    clauses, params = [], []
+    for column, value in (("province", province), ("weight_configuration", weight_configuration),
+                          ("evaluated_fuel", powertrain)):
+        if value:
+            clauses.append(f"{column} = ?")
+            params.append(value)
+    if since:
+        clauses.append("created_at >= ?")
+        params.append(since)
+    if until:
+        clauses.append("created_at < ?")
+        params.append(until)
+
+    query = ("SELECT scenario_id, name, created_at, province, weight_configuration, existing_fuel, evaluated_fuel "
+             "FROM scenarios")
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    query += " ORDER BY created_at DESC LIMIT ?"
+    params.append(int(limit))
+
+    with _connect(path) as connection:
+        return [dict(row) for row in connection.execute(query, params).fetchall()]
@@ -0,0 +1,256 @@
+"""
+Vectorized total cost of ownership (TCO) and emissions kernel.
+
+Every input may be a scalar or a NumPy array; all inputs are broadcast together
+into a common batch shape so that many scenarios (powertrains, provinces,
+catalog entries, parameter sweeps...) are evaluated in a single pass. Yearly
+costs are returned along a series axis holding the existing vehicle, the
+alternative vehicle, and the alternative vehicle with subsidies, following the
+same accounting as discounted_TCO and stacked_bar_DCO in app.py.
+"""
+import numpy as np
+
+# Order of the series axis
+SERIES = ("base", "alternative", "alternative_with_subsidies")
+
+# Order of the cost category axis
+CATEGORIES = ("Vehicle", "Infrastructure", "Maintenance", "Fuel", "Insurance", "Lifecycle events")
+
+ALTERNATIVE_FUELS = ("Biodiesel B20", "Renewable Diesel R99", "Battery electric", "Hydrogen Fuel Cell", "HEV")
+
+
+def _as_float(x):
+    return np.asarray(x, dtype=float)
+
+
+def loan_payment(principal, rate, period):
+    """
+    Annual payment of a fully amortizing loan.
+
+    Parameters:
+        principal (array): Amount borrowed ($).
+        rate (array): Annual interest rate (fraction).
+        period (array): Number of yearly payments.
+
+    Returns:
+        ndarray: Annual payment; zero where there is no financing period, and the straight-line
+        principal / period where the rate is zero.
+    """
+    principal, rate, period = np.broadcast_arrays(_as_float(principal), _as_float(rate), _as_float(period))
+    payment = np.zeros(principal.shape)
+    financed = period > 0
+    with_interest = financed & (rate > 0)
+    no_interest = financed & ~(rate > 0)
+    r, n = rate[with_interest], period[with_interest]
+    payment[with_interest] = principal[with_interest] * r / (1 - (1 + r) ** -n)
+    payment[no_interest] = principal[no_interest] / period[no_interest]
+    return payment
+
+
+def fuel_cost_per_km(powertrain, fuel_price, fuel_efficiency):
+    """
+    Fuel cost per kilometre, vectorized version of estimate_fuel_costs_per_km.
+
+    Parameters:
+        powertrain (array of str): Powertrain of each scenario.
+        fuel_price (array): $/L, $/kWh or $/kg depending on the powertrain.
+        fuel_efficiency (array): L/100 km, kWh/km or kg/100 km depending on the powertrain.
+
+    Returns:
+        ndarray: Fuel cost ($/km).
+    """
+    powertrain = np.asarray(powertrain)
+    cost = _as_float(fuel_price) * _as_float(fuel_efficiency)
+    return np.where(powertrain == "Battery electric", cost, cost / 100)
+
+
+def ghg_per_km(powertrain, fuel_efficiency, ghg_ef, grid_intensity, hydrogen_intensity):
+    """
+    Well-to-wheel GHG emission factor per kilometre, following estimateGHG_emissions.
+
+    Parameters:
+        powertrain (array of str): Powertrain of each scenario.
+        fuel_efficiency (array): kWh/km for battery electric, kg/100 km for hydrogen.
+        ghg_ef (array): Catalog 'GHG EF' (gCO2eq/km) used for liquid fuels.
+        grid_intensity (array): Electricity intensity (gCO2eq/kWh).
+        hydrogen_intensity (array): Hydrogen production intensity (gCO2eq/kg).
+
+    Returns:
+        ndarray: Emission factor (gCO2eq/km).
+    """
+    powertrain = np.asarray(powertrain)
+    fuel_efficiency = _as_float(fuel_efficiency)
+    return np.where(
+        powertrain == "Battery electric", fuel_efficiency * _as_float(grid_intensity),
+        np.where(powertrain == "Hydrogen Fuel Cell", fuel_efficiency / 100 * _as_float(hydrogen_intensity),
+                 np.nan_to_num(_as_float(ghg_ef)))
+    )
+
+
+def yearly_costs(n_vehicles, daily_distance, days_operation, lifetime, discount_rate, provincial_tax,
+                 base_vehicle_cost, alt_vehicle_cost, base_maintenance, alt_maintenance, base_fuel, alt_fuel,
+                 base_insurance=0.0, alt_insurance=0.0, base_depreciation=0.0, alt_depreciation=0.0,
+                 infra_cost=0.0, vehicle_subsidy=0.0, infra_subsidy=0.0,
+                 financing_period=0, downpayment=100.0, financing_rate=0.0, horizon=None, price_multipliers=None,
+                 event_costs=None, vehicle_payments=None, owned=True):
+    """
+    Discounted cost of every category in every year for a batch of scenarios.
+
+    Parameters:
+        n_vehicles, daily_distance, days_operation, lifetime (array): Fleet size and duty cycle.
+        discount_rate (array): Discount rate (fraction).
+        provincial_tax (array): Provincial tax (fraction) applied to capital costs.
+        base_*/alt_* (array): Vehicle price ($), maintenance, fuel and insurance ($/km), and yearly
+                              depreciation (%) of the existing and alternative vehicles; a depreciation
+                              of zero means no resale.
+        infra_cost (array): Charging or refuelling infrastructure cost ($).
+        vehicle_subsidy (array): Subsidy per alternative vehicle ($).
+        infra_subsidy (array): Infrastructure subsidy ($).
+        financing_period (array): Loan period (years), zero for no financing.
+        downpayment (array): Downpayment (%).
+        financing_rate (array): Annual interest rate (%).
+        horizon (int): Number of years on the time axis; defaults to the longest lifetime.
+        price_multipliers (ndarray): Optional batch + (series, category, horizon + 1) factors applied to the costs
+                                     before resale, see price_paths.cost_multipliers.
+        event_costs (ndarray): Optional batch + (series, horizon + 1) undiscounted costs of scheduled lifecycle
+                               events ($), taxed and discounted like capital costs, see lifecycle_events.event_costs.
+        vehicle_payments (ndarray): Optional batch + (series, horizon + 1) discounted vehicle payments, tax included,
+                                    replacing the downpayment and annual loan payments, see
+                                    financing.vehicle_payments.
+        owned (array): Whether the vehicles are owned, and so resold, at the end of the lifetime, batch + (series,).
+
+    Returns:
+        ndarray: Discounted costs of shape batch + (series, category, year), see SERIES and CATEGORIES.
+    """
+    (n_vehicles, daily_distance, days_operation, lifetime, discount_rate, provincial_tax,
+     base_vehicle_cost, alt_vehicle_cost, base_maintenance, alt_maintenance, base_fuel, alt_fuel,
+     base_insurance, alt_insurance, base_depreciation, alt_depreciation,
+     infra_cost, vehicle_subsidy, infra_subsidy,
+     financing_period, downpayment, financing_rate) = np.broadcast_arrays(*[_as_float(x) for x in (
+        n_vehicles, daily_distance, days_operation, lifetime, discount_rate, provincial_tax,
+        base_vehicle_cost, alt_vehicle_cost, base_maintenance, alt_maintenance, base_fuel, alt_fuel,
+        base_insurance, alt_insurance, base_depreciation, alt_depreciation,
+        infra_cost, vehicle_subsidy, infra_subsidy,
+        financing_period, downpayment, financing_rate)])
+    lifetime = lifetime.astype(int)
+    if horizon is None:
+        horizon = int(lifetime.max()) if lifetime.size else 0
+
+    years = np.arange(horizon + 1)
+    # (batch, year) discount factors, zeroed after the end of each scenario's lifetime
+    discount = (1 + discount_rate[..., None]) ** -years
+    in_service = (years >= 1) & (years <= lifetime[..., None])
+    operating = discount * in_service
+
+    def by_series(base, alt, alt_subsidised=None):
+        return np.stack([base, alt, alt if alt_subsidised is None else alt_subsidised], axis=-1)
+
+    downpayment = downpayment / 100
+    financing_rate = financing_rate / 100
+    km_year = (daily_distance * days_operation * n_vehicles)[..., None]
+
+    vehicle_cost = by_series(base_vehicle_cost, alt_vehicle_cost, alt_vehicle_cost - vehicle_subsidy)
+    infra = by_series(np.zeros_like(infra_cost), infra_cost, infra_cost - infra_subsidy)
+
+    costs = np.zeros(vehicle_cost.shape + (len(CATEGORIES), horizon + 1))
+
+    # Year 0: downpayment and infrastructure, taxed and undiscounted
+    costs[..., 1, 0] = infra * (1 + provincial_tax[..., None])
+    if vehicle_payments is not None:
+        costs[..., 0, :] = vehicle_payments
+    else:
+        costs[..., 0, 0] = vehicle_cost * n_vehicles[..., None] * downpayment[..., None] * (1 + provincial_tax[..., None])
+
+        # Loan payments for the financed share of the vehicles
+        payment = loan_payment(vehicle_cost * n_vehicles[..., None] * (1 - downpayment[..., None]),
+                               financing_rate[..., None], financing_period[..., None])
+        financed_years = operating * (years <= financing_period[..., None])
+        costs[..., 0, :] += payment[..., None] * financed_years[..., None, :]
+
+    # Operating costs per kilometre
+    per_km = np.stack([
+        by_series(base_maintenance, alt_maintenance),
+        by_series(base_fuel, alt_fuel),
+        by_series(base_insurance, alt_insurance),
+    ], axis=-1)
+    costs[..., 2:5, :] = (per_km * km_year[..., None])[..., None] * operating[..., None, None, :]
+
+    # One-off lifecycle events (replacements, overhauls, refreshes)
+    if event_costs is not None:
+        costs[..., 5, :] = event_costs * (1 + provincial_tax[..., None, None]) * discount[..., None, :]
+
+    # Year-by-year price paths (escalation and carbon pricing)
+    if price_multipliers is not None:
+        costs *= price_multipliers
+
+    # Resale at the end of the lifetime, on the undiscounted vehicle price
+    depreciation = by_series(base_depreciation, alt_depreciation) / 100
+    resale_price = by_series(base_vehicle_cost, alt_vehicle_cost)
+    end_discount = np.take_along_axis(discount, np.minimum(lifetime, horizon)[..., None], axis=-1)
+    resale = np.where((depreciation > 0) & owned, resale_price * (1 - depreciation) ** lifetime[..., None], 0.0)
+    resale = resale * n_vehicles[..., None] * end_discount
+    end_of_life = years == lifetime[..., None, None]
+    costs[..., 0, :] -= resale[..., None] * end_of_life
+
+    return costs
+
+
+def break_even_years(cumulative_base, cumulative_alt):
+    """
+    First year where the alternative's cumulative cost falls to or below the base, linearly
+    interpolated between years as in analyze_break_even_points_interpolated.
+
+    Parameters:
+        cumulative_base (ndarray): Cumulative costs of the base series, last axis is the year.
+        cumulative_alt (ndarray): Cumulative costs of the alternative series.
+
+    Returns:
+        ndarray: Break-even year, NaN where there is none.
+    """
+    gap = _as_float(cumulative_alt) - _as_float(cumulative_base)
+    crossing = (gap[..., :-1] > 0) & (gap[..., 1:] <= 0)
+    found = crossing.any(axis=-1)
+    index = np.argmax(crossing, axis=-1)[..., None]
+    before = np.take_along_axis(gap[..., :-1], index, axis=-1)[..., 0]
+    after = np.take_along_axis(gap[..., 1:], index, axis=-1)[..., 0]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        year = index[..., 0] + before / (before - after)
+    return np.where(found, year, np.nan)
+
+
+def summarize(costs):
+    """
+    Reduces yearly costs into the outputs shown in the results section.
+
+    Parameters:
+        costs (ndarray): Output of yearly_costs.
+
+    Returns:
+        dict: 'cumulative' (batch, series, year), 'npv' (batch, series), 'by_category' (batch, series, category)
+        and 'break_even' (batch, 2) for the alternative without and with subsidies.
+    """
+    cumulative = costs.sum(axis=-2).cumsum(axis=-1)
+    return {
+        "cumulative": cumulative,
+        "npv": cumulative[..., -1],
+        "by_category": costs.sum(axis=-1),
+        "break_even": np.stack([
+            break_even_years(cumulative[..., 0, :], cumulative[..., 1, :]),
+            break_even_years(cumulative[..., 0, :], cumulative[..., 2, :]),
+        ], axis=-1),
+    }
+
+
+def lifetime_emissions(n_vehicles, daily_distance, days_operation, lifetime, emission_factor):
+    """
+    Total emissions over the vehicle lifetime.
+
+    Parameters:
+        n_vehicles, daily_distance, days_operation, lifetime (array): Fleet size and duty cycle.
+        emission_factor (array): Emission factor (g/km).
+
+    Returns:
+        ndarray: Emissions (g).
+    """
+    return (_as_float(n_vehicles) * _as_float(lifetime) * _as_float(daily_distance)
+            * _as_float(days_operation) * _as_float(emission_factor))
@@ -0,0 +1,189 @@
+"""
+Duty cycles derived from telematics exports.
+
+Odometer logs (one reading per row, e.g. at 1 Hz) or trip logs (one trip per
+row) are streamed in chunks, so memory use depends on the number of
+vehicle-days rather than on the number of rows. Each chunk is reduced to the
+first and last odometer reading (or the summed trip distance) of every vehicle
+and day, and merged into a running per-vehicle-day table. The resulting daily
+distances are summarised per vehicle (operating days per year, mean and
+percentile daily distance) and per vehicle group, using the column names of
+MHDV_duty_cycles_final.csv so that they can replace its defaults.
+
+Large exports are best reduced from the command line, and the per-vehicle
+summary uploaded to the app:
+
+    python app/telematics.py logs/*.csv --groups groups.csv -o duty_cycles.csv --daily-output daily.csv
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# Default column names of the two supported export layouts
+ODOMETER_COLUMNS = dict(vehicle="vehicle_id", timestamp="timestamp", odometer="odometer_km")
+TRIP_COLUMNS = dict(vehicle="vehicle_id", timestamp="start_time", distance="distance_km")
+
+# Percentiles of the daily distance reported per vehicle
+PERCENTILES = (50, 90, 95)
+
+CHUNKSIZE = 2_000_000
+
+
+# Length of a day in each unit accepted for numeric (epoch) timestamps
+_UNITS_PER_DAY = dict(s=86400, ms=86400 * 10**3, us=86400 * 10**6, ns=86400 * 10**9)
+
+
+def _days(timestamps, timestamp_unit):
+    # Day number (days since 1970-01-01) of each reading, from epoch numbers or date-time strings
+    if pd.api.types.is_numeric_dtype(timestamps):
+        return timestamps.to_numpy() // _UNITS_PER_DAY[timestamp_unit]
+    return pd.to_datetime(timestamps).values.astype("datetime64[D]").astype(np.int64)
+
+
+def daily_distances(sources, kind="odometer", columns=None, timestamp_unit="s", chunksize=CHUNKSIZE):
+    """
+    Streams telematics exports into the distance driven by each vehicle on each day.
+
+    Parameters:
+        sources (list): CSV file paths or file-like objects.
+        kind (str): 'odometer' for odometer readings, 'trip' for trip distances.
+        columns (dict): Column names, defaulting to ODOMETER_COLUMNS or TRIP_COLUMNS.
+        timestamp_unit (str): Unit of numeric (epoch) timestamps: 's', 'ms', 'us' or 'ns'.
+        chunksize (int): Rows read at a time.
+
+    Returns:
+        DataFrame: 'vehicle_id', 'day' and 'distance_km', one row per vehicle and day with data.
+    """
+    columns = dict(ODOMETER_COLUMNS if kind == "odometer" else TRIP_COLUMNS, **(columns or {}))
+    value = columns["odometer" if kind == "odometer" else "distance"]
+    usecols = [columns["vehicle"], columns["timestamp"], value]
+
+    state = None
+    for source in sources:
+        for chunk in pd.read_csv(source, usecols=usecols, chunksize=chunksize, dtype={columns["vehicle"]: "category"}):
+            chunk = chunk.dropna()
+            keys = [chunk[columns["vehicle"]], _days(chunk[columns["timestamp"]], timestamp_unit)]
+            grouped = chunk[value].astype(float).groupby(keys, sort=False, observed=True)
+            part = grouped.agg(["min", "max"]) if kind == "odometer" else grouped.sum().to_frame("sum")
+            if state is not None:
+                part = pd.concat([state, part]).groupby(level=[0, 1]).agg(
+                    {"min": "min", "max": "max"} if kind == "odometer" else {"sum": "sum"})
+            state = part
+
+    if state is None:
+        return pd.DataFrame(columns=["vehicle_id", "day", "distance_km"])
+    distance = (state["max"] - state["min"]).clip(lower=0) if kind == "odometer" else state["sum"].clip(lower=0)
+    daily = distance.rename("distance_km").rename_axis(["vehicle_id", "day"]).reset_index()
+    daily["vehicle_id"] = daily["vehicle_id"].astype(str)
+    daily["day"] = daily["day"].to_numpy().astype("datetime64[D]")
+    return daily.sort_values(["vehicle_id", "day"], ignore_index=True)
+
+
+def load_telematics(sources, groups=None):
+    """
+    Reads telematics files in any of the layouts produced along the pipeline, recognised from the columns
+    of the first file: raw odometer or trip logs, daily distances (daily_distances output) or a per-vehicle
+    summary (summarize_duty_cycles output).
+
+    Parameters:
+        sources (list): CSV file paths or file-like objects, all in the same layout.
+        groups (dict): Optional vehicle group per vehicle_id.
+
+    Returns:
+        tuple: Daily distances (None when a summary was given) and the per-vehicle summary.
+
+    Raises:
+        ValueError: If the columns match none of the layouts.
+    """
+    header = set(pd.read_csv(sources[0], nrows=0).columns)
+    for source in sources:
+        if hasattr(source, "seek"):
+            source.seek(0)
+
+    if "average_daily_distance" in header:
+        summary = pd.concat([pd.read_csv(source, dtype={"vehicle_id": str}) for source in sources], ignore_index=True)
+        return None, summary
+    if {"vehicle_id", "day", "distance_km"} <= header:
+        daily = pd.concat([pd.read_csv(source, dtype={"vehicle_id": str}, parse_dates=["day"]) for source in sources],
+                          ignore_index=True)
+    elif set(ODOMETER_COLUMNS.values()) <= header:
+        daily = daily_distances(sources, kind="odometer")
+    elif set(TRIP_COLUMNS.values()) <= header:
+        daily = daily_distances(sources, kind="trip")
+    else:
+        raise ValueError(f"Unrecognised telematics columns: {', '.join(sorted(header))}")
+    return daily, summarize_duty_cycles(daily, groups)
+
+
+def summarize_duty_cycles(daily, groups=None, min_daily_distance=1.0):
+    """
+    Per-vehicle duty cycle from daily distances.
+
+    Parameters:
+        daily (DataFrame): Output of daily_distances.
+        groups (dict): Optional vehicle group per vehicle_id; vehicles without one form the 'All vehicles' group.
+        min_daily_distance (float): Distance (km) below which a day is not counted as an operating day.
+
+    Returns:
+        DataFrame: One row per vehicle with 'vehicle_group', 'observed_days' (first to last day with data),
+        'operating_days', 'yearly_days_operation', 'average_daily_distance' (over operating days) and
+        'daily_distance_p50', '_p90', '_p95' and '_max'.
+    """
+    operating = daily[daily["distance_km"] >= min_daily_distance]
+    by_vehicle = daily.groupby("vehicle_id")["day"]
+    observed_days = (by_vehicle.max() - by_vehicle.min()).dt.days + 1
+    distances = operating.groupby("vehicle_id")["distance_km"]
+
+    summary = pd.DataFrame({"observed_days": observed_days})
+    summary["operating_days"] = distances.size().reindex(summary.index, fill_value=0)
+    summary["yearly_days_operation"] = np.round(summary["operating_days"] / summary["observed_days"] * 365)
+    summary["average_daily_distance"] = distances.mean()
+    for percentile in PERCENTILES:
+        summary[f"daily_distance_p{percentile}"] = distances.quantile(percentile / 100)
+    summary["daily_distance_max"] = distances.max()
+    summary.insert(0, "vehicle_group", [(groups or {}).get(vehicle, "All vehicles") for vehicle in summary.index])
+    return summary.rename_axis("vehicle_id").reset_index()
+
+
+def group_duty_cycles(summary):
+    """
+    Average duty cycle of each vehicle group.
+
+    Parameters:
+        summary (DataFrame): Output of summarize_duty_cycles.
+
+    Returns:
+        DataFrame: One row per 'vehicle_group' with the number of 'vehicles', the mean 'average_daily_distance'
+        and 'yearly_days_operation', and the highest 'daily_distance_p95' of the group.
+    """
+    grouped = summary.groupby("vehicle_group")
+    return pd.DataFrame({
+        "vehicles": grouped.size(),
+        "average_daily_distance": grouped["average_daily_distance"].mean(),
+        "yearly_days_operation": grouped["yearly_days_operation"].mean(),
+        "daily_distance_p95": grouped["daily_distance_p95"].max(),
+    }).reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Derive per-vehicle duty cycles from telematics CSV exports.")
+    parser.add_argument("sources", nargs="+", help="Odometer or trip log CSV files")
+    parser.add_argument("--kind", choices=["odometer", "trip"], default="odometer")
+    parser.add_argument("--groups", help="CSV mapping vehicle_id to vehicle_group")
+    parser.add_argument("--min-daily-distance", type=float, default=1.0)
+    parser.add_argument("--chunksize", type=int, default=CHUNKSIZE)
+    parser.add_argument("-o", "--output", default="duty_cycles.csv", help="Per-vehicle summary")
+    parser.add_argument("--daily-output", help="Optional per-vehicle daily distances")
+    args = parser.parse_args()
+
+    groups = None
+    if args.groups:
+        mapping = pd.read_csv(args.groups, dtype=str)
+        groups = dict(zip(mapping["vehicle_id"], mapping["vehicle_group"]))
+
+    daily = daily_distances(args.sources, kind=args.kind, chunksize=args.chunksize)
+    summarize_duty_cycles(daily, groups, args.min_daily_distance).to_csv(args.output, index=False)
+    if args.daily_output:
+        daily.to_csv(args.daily_output, index=False)
+    print(f"Summarised {daily['vehicle_id'].nunique()} vehicles over {len(daily)} vehicle-days to {args.output}")
@@ -0,0 +1,26 @@
+"""
+Shared fixtures: the app modules are imported from app/ and the datasets read from the repository root.
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "app"))
+
+
+@pytest.fixture(scope="session")
+def indexes():
+    """
+    Vehicle, duty-cycle and province indexes of the built-in catalog.
+    """
+    from catalog import build_dutycycle_index, build_province_index, build_vehicle_index
+
+    vehicles_info = pd.read_csv(os.path.join(ROOT, "MHDV_costs_efficiency_final.csv"))
+    vehicles_dutycycles = pd.read_csv(os.path.join(ROOT, "MHDV_duty_cycles_final.csv"))
+    for table in (vehicles_info, vehicles_dutycycles):
+        table["Weight_Confi"] = table["WeightClass"] + " " + table["Configuration"]
+    return (build_vehicle_index(vehicles_info), build_dutycycle_index(vehicles_dutycycles),
+            build_province_index(pd.read_csv(os.path.join(ROOT, "province_energy_prices.csv"))))
@@ -0,0 +1,90 @@
+import numpy as np
+import pytest
+
+from financing import amortization_schedule, level_payment, vehicle_payments
+
+PRICE = 200_000.0
+TAX = 0.13
+
+
+def _payments(financing_type, term_months=60, rate=0.0, residual=0.0, buyout=False, lifetime=5, downpayment=0.0):
+    # Undiscounted payments of a fleet of two vehicles, so that the totals are plain sums
+    payments, owned = vehicle_payments(financing_type, [PRICE], 2, TAX, 0.0, lifetime, 12, term_months, downpayment,
+                                       rate, residual, buyout)
+    return payments[0], bool(owned[0])
+
+
+def test_level_payment_matches_annuity_formula():
+    monthly = 0.06 / 12
+    expected = 100_000 * monthly / (1 - (1 + monthly) ** -60)
+    assert level_payment(100_000, 0.06, 60) == pytest.approx(expected)
+    assert level_payment(100_000, 0.0, 60) == pytest.approx(100_000 / 60)
+    assert level_payment(100_000, 0.06, 0) == 0
+
+
+@pytest.mark.parametrize("rate", [0.0, 0.06])
+@pytest.mark.parametrize("balloon", [0.0, 30_000.0])
+def test_schedule_repays_principal(rate, balloon):
+    schedule = amortization_schedule(100_000, rate, 60, balloon, months=72)
+    assert schedule["principal"].sum() == pytest.approx(100_000)
+    assert schedule["payment"].sum() == pytest.approx(100_000 + schedule["interest"].sum())
+    assert schedule["balance"][59] == pytest.approx(0, abs=1e-6)
+    assert not schedule["payment"][60:].any()
+    # The balloon is repaid with the last payment
+    assert schedule["payment"][59] - schedule["payment"][58] == pytest.approx(balloon)
+
+
+def test_loan_total_is_taxed_price():
+    payments, owned = _payments("Loan", downpayment=20.0)
+    assert owned
+    assert payments.sum() == pytest.approx(2 * PRICE * (1 + TAX))
+    # Down payment and the tax on the full price up front
+    assert payments[0] == pytest.approx(2 * PRICE * (0.2 * (1 + TAX) + 0.8 * TAX))
+
+
+def test_loan_past_lifetime_is_paid_off_at_sale():
+    payments, _ = _payments("Loan", term_months=120, lifetime=5)
+    assert payments.sum() == pytest.approx(2 * PRICE * (1 + TAX))
+    assert not payments[6:].any()
+
+
+def test_interest_raises_loan_total():
+    payments, _ = _payments("Loan", rate=6.0)
+    interest = 60 * level_payment(2 * PRICE, 0.06, 60) - 2 * PRICE
+    assert payments.sum() == pytest.approx(2 * PRICE * (1 + TAX) + interest)
+
+
+def test_balloon_loan_total_is_taxed_price():
+    payments, owned = _payments("Balloon loan", residual=30.0)
+    assert owned
+    assert payments.sum() == pytest.approx(2 * PRICE * (1 + TAX))
+    # Lower level payments, with the balloon in the last year
+    assert payments[1] == pytest.approx(2 * PRICE * 0.7 / 5)
+    assert payments[5] == pytest.approx(2 * PRICE * (0.7 / 5 + 0.3))
+
+
+def test_lease_pays_taxed_depreciation_and_returns_vehicles():
+    payments, owned = _payments("Lease", residual=30.0)
+    assert not owned
+    assert payments[0] == 0
+    assert payments.sum() == pytest.approx(2 * PRICE * 0.7 * (1 + TAX))
+
+
+def test_lease_is_renewed_until_end_of_lifetime():
+    payments, owned = _payments("Lease", term_months=36, residual=30.0, lifetime=6)
+    assert not owned
+    assert payments.sum() == pytest.approx(2 * PRICE * 0.7 / 36 * 72 * (1 + TAX))
+
+
+def test_lease_buyout_pays_residual_and_keeps_vehicles():
+    payments, owned = _payments("Lease", residual=30.0, buyout=True)
+    assert owned
+    assert payments.sum() == pytest.approx(2 * PRICE * (1 + TAX))
+
+
+def test_financing_types_broadcast():
+    types = np.array(["Loan", "Balloon loan", "Lease"])
+    payments, owned = vehicle_payments(types, [[PRICE]] * 3, 1, TAX, 0.0, 5, 12, 60, 0.0, 0.0, 30.0)
+    assert payments.shape == (3, 1, 13)
+    assert owned[:, 0].tolist() == [True, True, False]
+    assert payments.sum(axis=-1)[:, 0] == pytest.approx([PRICE * (1 + TAX)] * 2 + [PRICE * 0.7 * (1 + TAX)])
@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from fleet import REQUIRED_COLUMNS, evaluate_fleet, fleet_inputs, infrastructure_costs, validate_fleet
+from hydrogen_station import load_station_components
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+VALID = ("Ontario", "Class 8", "Tractor", "Diesel", "Battery electric", 10)
+
+
+def _validate(rows, indexes, **columns):
+    table = pd.DataFrame(rows, columns=list(REQUIRED_COLUMNS))
+    for column, values in columns.items():
+        table[column] = values
+    return validate_fleet(table, *indexes)
+
+
+def test_valid_rows_take_duty_cycle_defaults(indexes):
+    _, dutycycle_index, _ = indexes
+    valid, errors = _validate([VALID], indexes)
+    assert errors.empty
+    assert valid["Weight_Confi"].tolist() == ["Class 8 Tractor"]
+    assert valid["Vehicles"].tolist() == [10]
+    assert valid["Daily distance (km)"].iloc[0] == float(dutycycle_index["Class 8 Tractor"]["average_daily_distance"])
+
+
+def test_missing_columns_raise(indexes):
+    with pytest.raises(ValueError, match="Vehicles"):
+        validate_fleet(pd.DataFrame([VALID[:5]], columns=list(REQUIRED_COLUMNS[:5])), *indexes)
+
+
+def test_errors_point_at_spreadsheet_rows(indexes):
+    rows = [
+        VALID,
+        ("Atlantis", "Class 8", "Tractor", "Diesel", "Battery electric", 10),
+        ("Ontario", "Class 8", "Spaceship", "Diesel", "Battery electric", 10),
+        ("Ontario", "Class 8", "Tractor", "Kerosene", "Battery electric", 10),
+        ("Ontario", "Class 8", "Tractor", "Diesel", "Battery electric", 2.5),
+        ("Ontario", None, "Tractor", "Diesel", "Battery electric", 0),
+        VALID,
+    ]
+    valid, errors = _validate(rows, indexes)
+    assert len(valid) == 2
+    # Row 1 holds the column names, so the first data row is row 2
+    assert errors[["row", "column"]].values.tolist() == [
+        [3, "Province"], [4, "Configuration"], [5, "Existing fuel"], [6, "Vehicles"], [7, "WeightClass"],
+        [7, "Vehicles"]]
+    assert errors["error"].iloc[1] == "No duty cycle for Class 8 Spaceship"
+    assert errors["error"].iloc[2].startswith("Unknown powertrain")
+
+
+def test_duty_cycle_columns_are_range_checked(indexes):
+    valid, errors = _validate([VALID] * 3, indexes, **{"Daily distance (km)": [250, "far", 5_000]})
+    assert valid["Daily distance (km)"].tolist() == [250]
+    assert errors["row"].tolist() == [3, 4]
+    assert errors["error"].tolist() == ["Not a number: far", "5000 is outside the plausible range 1-2000"]
+
+
+@pytest.fixture(scope="module")
+def chargers():
+    return pd.read_csv(os.path.join(ROOT, "MHDV_charging_infa_prices_final.csv"))
+
+
+def test_infrastructure_is_estimated_per_alternative(indexes, chargers):
+    rows = [VALID, VALID[:4] + ("Hydrogen Fuel Cell", 10), VALID[:4] + ("Biodiesel B20", 10)]
+    valid, _ = _validate(rows, indexes)
+    inputs = fleet_inputs(valid, *indexes)
+    stations = load_station_components(os.path.join(ROOT, "hydrogen_station_costs.csv"))
+    cost = infrastructure_costs(inputs, valid["Alternative fuel"], chargers, stations)
+    assert cost[0] > 0 and cost[1] > 0 and cost[2] == 0
+
+    # The cheapest chargers recharge every vehicle within the charging hours
+    power = chargers["PowerLevel"].str.replace("kW", "").astype(float).to_numpy()
+    energy = inputs["n_vehicles"][0] * inputs["evaluated_fuel_efficiency"][0] * inputs["daily_distance"][0]
+    counts = np.maximum(np.ceil(energy / (power * 10.0)), 1)
+    assert cost[0] == (counts * chargers["Price"]).min()
+
+
+def test_given_infrastructure_and_insurance_enter_the_tco(indexes, chargers):
+    def npv(**columns):
+        valid, errors = _validate([VALID], indexes, **columns)
+        assert errors.empty
+        results = evaluate_fleet(lambda *args: None, valid, *indexes, chargers=chargers)
+        return results.iloc[0]
+
+    estimated = npv()
+    given = npv(**{"Infrastructure cost ($)": [500_000]})
+    insured = npv(**{"Infrastructure cost ($)": [500_000], "Insurance existing ($/km)": [0.05]})
+    assert estimated["Infrastructure cost ($)"] > 0
+    assert given["Infrastructure cost ($)"] == 500_000
+    # Infrastructure is paid in year 0 with the provincial tax
+    tax = indexes[2]["Ontario"]["taxes_perc"] / 100
+    assert given["NPV alternative ($)"] - estimated["NPV alternative ($)"] == pytest.approx(
+        (500_000 - estimated["Infrastructure cost ($)"]) * (1 + tax))
+    assert insured["NPV existing ($)"] > given["NPV existing ($)"]
+    assert insured["NPV alternative ($)"] == given["NPV alternative ($)"]
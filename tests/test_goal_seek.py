@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+
+from goal_seek import bracketed_root, goal_seek, parity_gap
+from precompute import FIXED_DEFAULTS, default_inputs
+from scenario_batch import evaluate_scenario
+
+COMBINATION = ("Quebec", "Class 8 Tractor", "Diesel", "Battery electric")
+
+
+@pytest.fixture
+def scenario(indexes):
+    vehicle_index, dutycycle_index, province_index = indexes
+    province, weight_configuration, existing_fuel, evaluated_fuel = COMBINATION
+    return dict(FIXED_DEFAULTS, **default_inputs(vehicle_index, dutycycle_index, province_index, COMBINATION),
+                user_province=province, user_weight_configuration=weight_configuration, existing_fuel=existing_fuel,
+                evaluated_fuel=evaluated_fuel, n_vehicles=3, user_vehicle_incentive_amount=0.0)
+
+
+def _gap(scenario, indexes, name, value, target_year=None):
+    vehicle_index, _, province_index = indexes
+    cumulative = evaluate_scenario(dict(scenario, **{name: value}), vehicle_index, province_index)["cumulative"]
+    return parity_gap(cumulative, target_year)
+
+
+def test_bracketed_root_of_nonlinear_batch():
+    targets = np.array([2.0, 10.0, 50.0])
+    root, converged, _ = bracketed_root(lambda x: x ** 2 - targets, np.zeros(3), np.ones(3), ftol=1e-9)
+    assert converged.all()
+    assert root == pytest.approx(np.sqrt(targets))
+
+
+def test_parity_gap_interpolates_target_year():
+    cumulative = np.zeros((3, 4))
+    cumulative[2] = [40.0, 20.0, 0.0, -20.0]
+    assert parity_gap(cumulative) == -20.0
+    assert parity_gap(cumulative, 1.5) == pytest.approx(10.0)
+
+
+@pytest.mark.parametrize("target_year", [None, 8])
+def test_subsidy_at_parity_closes_the_gap(scenario, indexes, target_year):
+    vehicle_index, _, province_index = indexes
+    result = goal_seek(scenario, "user_vehicle_incentive_amount", vehicle_index, province_index, target_year=target_year)
+    assert result["converged"] and result["current_gap"] > 0
+    assert _gap(scenario, indexes, "user_vehicle_incentive_amount", result["value"], target_year) == pytest.approx(0, abs=0.01)
+
+
+def test_batch_solves_each_distance(scenario, indexes):
+    vehicle_index, _, province_index = indexes
+    scenario["user_vehicle_incentive_amount"] = 150_000.0
+    distances = np.array([100.0, 200.0, 300.0])
+    batch = goal_seek(dict(scenario, evaluated_price=np.full(3, scenario["evaluated_price"]), daily_distance=distances),
+                      "evaluated_price", vehicle_index, province_index)
+    assert batch["converged"].all()
+    for distance, price in zip(distances, batch["value"]):
+        assert _gap(dict(scenario, daily_distance=distance), indexes, "evaluated_price", price) == pytest.approx(0, abs=0.01)
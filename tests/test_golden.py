@@ -0,0 +1,28 @@
+import os
+
+import pytest
+
+from golden import CORPUS_PATH, OUTPUTS, check_engine, check_fixes, kernel_engine, load_corpus
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def corpus():
+    return load_corpus(os.path.join(ROOT, CORPUS_PATH))
+
+
+def test_kernel_matches_every_golden_scenario(corpus):
+    scenarios, reference, _ = corpus
+    report = check_engine(kernel_engine, scenarios, reference, repeat=1, legacy_sample=1)
+    for name in OUTPUTS:
+        result = report[name]
+        assert not len(result["failed"]), (name, result["failed"][:5].tolist())
+        assert result["matched"] == result["checked"] == report["scenarios"]
+
+
+def test_fixed_loops_only_depart_on_intended_fixes(corpus):
+    scenarios, reference, legacy = corpus
+    report = check_fixes(scenarios, reference, legacy)
+    for name in OUTPUTS:
+        assert not len(report[name]["failed"]), (name, report[name]["failed"][:5].tolist())
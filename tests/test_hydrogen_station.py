@@ -0,0 +1,54 @@
+import os
+
+import numpy as np
+import pytest
+
+from hydrogen_station import (CHANGEOVER_HOURS, COMPRESSOR_HOURS, USABLE_STORAGE_SHARE, load_station_components,
+                              size_station, station_bill_of_materials)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def components():
+    return load_station_components(os.path.join(ROOT, "hydrogen_station_costs.csv"))
+
+
+@pytest.mark.parametrize("fill_window", [2.0, 4.0, 8.0])
+def test_station_meets_its_fill_window(components, fill_window):
+    n_vehicles = np.array([1, 5, 20, 60])
+    daily_distance, fuel_efficiency = 350.0, 8.0
+    design = size_station(components, n_vehicles, daily_distance, fuel_efficiency, fill_window)
+    assert np.isfinite(design["cost"]).all()
+
+    compressor = components["Compressor"]["capacity"][design["compressor"]] * design["n_compressors"]
+    storage = components["Storage"]["capacity"][design["storage"]] * design["n_storage"]
+    dispenser = components["Dispenser"]["capacity"][design["dispenser"]]
+    fill = daily_distance * fuel_efficiency / 100
+    # Every vehicle is filled within the window, the compressors deliver the day's demand, and the storage
+    # covers what the dispensers draw during the window beyond the compressors' delivery
+    assert (n_vehicles * (fill / dispenser + CHANGEOVER_HOURS) <= design["n_dispensers"] * fill_window).all()
+    assert (compressor * COMPRESSOR_HOURS >= design["daily_demand"]).all()
+    assert (storage * USABLE_STORAGE_SHARE + compressor * fill_window >= design["daily_demand"] - 1e-9).all()
+    # Larger fleets never get a cheaper station
+    assert (np.diff(design["cost"]) >= 0).all()
+
+
+def test_bill_of_materials_adds_up_to_the_cost(components):
+    design = size_station(components, 12, 300.0, 8.0)
+    rows = station_bill_of_materials(components, design)
+    assert [row[0] for row in rows[:3]] == ["Compressor", "Storage", "Dispenser"]
+    assert sum(row[3] for row in rows) == pytest.approx(design["cost"])
+
+
+def test_no_station_without_demand(components):
+    design = size_station(components, [0, 10], [300.0, 0.0], 8.0)
+    assert design["cost"].tolist() == [0.0, 0.0]
+    assert not design["n_compressors"].any() and not design["n_storage"].any() and not design["n_dispensers"].any()
+    assert station_bill_of_materials(components, design, (0,)) == []
+
+
+def test_fill_longer_than_the_window_is_infeasible(components):
+    # 1,000 km at 10 kg/100 km is 100 kg per vehicle, which no dispenser delivers in six minutes
+    design = size_station(components, 4, 1000.0, 10.0, fill_window=0.1)
+    assert np.isnan(design["cost"])
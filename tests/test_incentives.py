@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from incentives import compile_incentive_rules, infrastructure_subsidy, program_amounts, vehicle_subsidy
+
+COLUMNS = ["Program", "Applies_to", "Province", "Weight_Confi", "Powertrain", "Amount_cap", "Percent_cap",
+           "Percent_basis", "Max_units", "Stacking_limit"]
+
+RULES = pd.DataFrame([
+    ("Federal", "Vehicle", "All", "All", "Battery electric", 100_000, 50, "Premium", 10, None),
+    ("Federal", "Vehicle", "All", "Class 8 Tractor", "Battery electric", 150_000, 50, "Premium", 10, None),
+    ("Provincial", "Vehicle", "British Columbia", "All", "Battery electric;Hydrogen Fuel Cell", 50_000, 33, "Price",
+     None, None),
+    ("Federal", "Infrastructure", "All", "All", "Battery electric", 5_000_000, 50, "Price", None, 75),
+    ("Provincial", "Infrastructure", "British Columbia", "All", "Battery electric", 150_000, 50, "Price", None, 75),
+], columns=COLUMNS)
+
+
+@pytest.fixture(scope="module")
+def tables():
+    return compile_incentive_rules(RULES, ["Ontario", "British Columbia"], ["Class 8 Tractor", "Class 6 Box Truck"],
+                                   ["Battery electric", "Hydrogen Fuel Cell"])
+
+
+def test_lesser_of_amount_and_percent_caps(tables):
+    # 50% of the premium below the cap, then the cap
+    subsidy = vehicle_subsidy(tables, "Ontario", "Class 6 Box Truck", "Battery electric",
+                              [150_000, 400_000], [50_000, 50_000])
+    assert subsidy.tolist() == [50_000, 100_000]
+
+
+def test_overlapping_rules_of_a_program_grant_the_largest(tables):
+    subsidy = vehicle_subsidy(tables, "Ontario", "Class 8 Tractor", "Battery electric", 500_000, 100_000)
+    assert subsidy == 150_000
+
+
+def test_max_units_spread_over_fleet(tables):
+    subsidy = vehicle_subsidy(tables, "Ontario", "Class 6 Box Truck", "Battery electric", 400_000, 50_000,
+                              n_vehicles=[5, 20])
+    assert subsidy.tolist() == [100_000, 50_000]
+
+
+def test_programs_stack_below_limit(tables):
+    amounts = program_amounts(tables["Vehicle"], "British Columbia", "Class 6 Box Truck", "Battery electric",
+                              200_000, 100_000)
+    assert tables["Vehicle"]["programs"].tolist() == ["Federal", "Provincial"]
+    assert amounts.tolist() == [50_000, 50_000]
+
+
+def test_stacking_limit_scales_programs_down(tables):
+    # 100k from each program on a 200k project, limited to 75% of it
+    amounts = program_amounts(tables["Infrastructure"], "British Columbia", "Class 6 Box Truck", "Battery electric",
+                              200_000)
+    assert amounts.tolist() == pytest.approx([75_000, 75_000])
+    assert infrastructure_subsidy(tables, "British Columbia", "Class 6 Box Truck", "Battery electric",
+                                  200_000) == pytest.approx(150_000)
+    # A single program within the limit is not scaled
+    assert infrastructure_subsidy(tables, "Ontario", "Class 6 Box Truck", "Battery electric",
+                                  200_000) == pytest.approx(100_000)
+
+
+def test_ineligible_and_unknown_labels_get_nothing(tables):
+    subsidy = vehicle_subsidy(tables, np.array(["Ontario", "Yukon", "Ontario"]),
+                              np.array(["Class 6 Box Truck", "Class 6 Box Truck", "Class 2b Cargo Van"]),
+                              np.array(["Hydrogen Fuel Cell", "Battery electric", "Battery electric"]),
+                              300_000, 100_000)
+    assert subsidy.tolist() == [0, 0, 0]
+    assert infrastructure_subsidy(tables, "British Columbia", "Class 6 Box Truck", "Hydrogen Fuel Cell",
+                                  200_000) == 0
+
+
+def test_cheaper_alternative_gets_no_premium_subsidy(tables):
+    assert vehicle_subsidy(tables, "Ontario", "Class 6 Box Truck", "Battery electric", 80_000, 100_000) == 0
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from pareto import pareto_front
+
+
+def _brute_force(cost, emissions):
+    # An option is dominated by any other no worse on both objectives, or by an identical option listed before it
+    front = np.zeros(len(cost), dtype=bool)
+    for i in range(len(cost)):
+        if not (np.isfinite(cost[i]) and np.isfinite(emissions[i])):
+            continue
+        no_worse = (cost <= cost[i]) & (emissions <= emissions[i])
+        identical = (cost == cost[i]) & (emissions == emissions[i])
+        front[i] = not (no_worse & ~identical).any() and not identical[:i].any()
+    return front
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    # Small integers, so that ties on either objective are common
+    cost = rng.integers(0, 15, 60).astype(float)
+    emissions = rng.integers(0, 15, 60).astype(float)
+    cost[rng.random(60) < 0.05] = np.nan
+    emissions[rng.random(60) < 0.05] = np.nan
+    assert pareto_front(cost, emissions).tolist() == _brute_force(cost, emissions).tolist()
+
+
+def test_trade_off_front():
+    cost = [1.0, 2.0, 3.0, 2.0, 4.0]
+    emissions = [5.0, 3.0, 1.0, 4.0, 1.0]
+    assert pareto_front(cost, emissions).tolist() == [True, True, True, False, False]
+
+
+def test_empty():
+    assert pareto_front([], []).tolist() == []
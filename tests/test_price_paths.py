@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from price_paths import carbon_price_path, cost_multipliers, escalation_factors
+from tco_kernel import CATEGORIES
+
+
+def test_carbon_price_path_interpolates_and_holds_last_price():
+    schedule = {2025: 80.0, 2027: 110.0, 2030: 170.0}
+    assert carbon_price_path(schedule, 2026, 7) == pytest.approx([95.0, 110.0, 130.0, 150.0, 170.0, 170.0, 170.0])
+
+
+def test_escalation_starts_after_year_one():
+    assert escalation_factors(2.0, 3).tolist() == pytest.approx([1.0, 1.0, 1.02, 1.02 ** 2])
+
+
+def test_carbon_multipliers_match_hand_calculation():
+    # Diesel at $0.60/km emitting 1,000 gCO2eq/km, against a battery electric truck (no GHG EF) at $0.25/km
+    multipliers = cost_multipliers(4, 0.60, 0.25, 2.0, 1.0, maintenance_escalation=3.0, insurance_escalation=0.0,
+                                   base_ghg_ef=1000.0, alt_ghg_ef=np.nan, carbon_prices=[50.0, 65.0, 80.0])
+    fuel, maintenance = CATEGORIES.index("Fuel"), CATEGORIES.index("Maintenance")
+
+    # 1 t/1,000 km at $50/t is $0.05/km, i.e. 0.05/0.60 of the fuel cost; the schedule's last price is kept
+    carbon = np.array([0.0, 50.0, 65.0, 80.0, 80.0]) * 1000 / 1e6 / 0.60
+    escalation = np.array([1.0, 1.0, 1.02, 1.02 ** 2, 1.02 ** 3])
+    assert multipliers[0, fuel] == pytest.approx(escalation + carbon)
+    for series in (1, 2):
+        assert multipliers[series, fuel] == pytest.approx([1.0, 1.0, 1.01, 1.01 ** 2, 1.01 ** 3])
+        assert multipliers[series, maintenance] == pytest.approx([1.0, 1.0, 1.03, 1.03 ** 2, 1.03 ** 3])
+    # Vehicle, infrastructure and insurance costs are left unchanged
+    unchanged = [CATEGORIES.index(name) for name in ("Vehicle", "Infrastructure", "Insurance")]
+    assert (multipliers[:, unchanged] == 1.0).all()
+
+
+def test_carbon_multipliers_broadcast_over_a_batch():
+    base_ghg_ef = np.array([0.0, 500.0, 1500.0])
+    multipliers = cost_multipliers(2, 0.5, 0.3, 0.0, 0.0, base_ghg_ef=base_ghg_ef, alt_ghg_ef=0.0,
+                                   carbon_prices=[100.0, 100.0])
+    fuel = CATEGORIES.index("Fuel")
+    assert multipliers.shape[0] == 3
+    assert multipliers[:, 0, fuel, 1] == pytest.approx(1 + base_ghg_ef / 1e6 * 100.0 / 0.5)
+    assert (multipliers[:, 1:, fuel] == 1.0).all()
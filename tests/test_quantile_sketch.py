@@ -0,0 +1,49 @@
+import numpy as np
+
+from quantile_sketch import merge_sketch, new_sketch, sketch_quantiles, update_sketch
+
+QUANTILES = np.linspace(0.01, 0.99, 99)
+
+
+def _rank_error(sketch, samples):
+    estimates = sketch_quantiles(sketch, QUANTILES)
+    ranks = np.searchsorted(np.sort(samples), estimates) / len(samples)
+    return np.abs(ranks - QUANTILES).max()
+
+
+def test_merged_sketches_keep_rank_error_and_size():
+    rng = np.random.default_rng(0)
+    parts, samples = [], []
+    for seed in range(4):
+        sketch = new_sketch(seed=seed)
+        for _ in range(50):
+            # Workers see differently distributed samples, so the merge has to interleave them
+            chunk = rng.normal(loc=seed, size=5_000)
+            samples.append(chunk)
+            update_sketch(sketch, chunk)
+        parts.append(sketch)
+    merged = new_sketch(seed=10)
+    for sketch in parts:
+        merge_sketch(merged, sketch)
+    samples = np.concatenate(samples)
+
+    assert merged["count"] == len(samples)
+    assert sum(len(items) for items in merged["levels"]) < 3 * merged["k"]
+    assert _rank_error(merged, samples) < 0.01
+    assert sketch_quantiles(merged, [0, 1]).tolist() == [samples.min(), samples.max()]
+
+
+def test_merge_leaves_other_unchanged():
+    sketch, other = new_sketch(seed=0), new_sketch(seed=1)
+    update_sketch(other, np.arange(1_000.0))
+    levels = [items.copy() for items in other["levels"]]
+    merge_sketch(sketch, other)
+    assert all(np.array_equal(a, b) for a, b in zip(levels, other["levels"]))
+    assert other["count"] == 1_000
+
+
+def test_nan_ranked_as_inf():
+    sketch = new_sketch(seed=0)
+    update_sketch(sketch, np.r_[np.arange(70.0), [np.nan] * 30])
+    low, high = sketch_quantiles(sketch, [0.5, 0.9])
+    assert low == 49 and high == np.inf
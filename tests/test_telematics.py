@@ -0,0 +1,65 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from telematics import daily_distances, summarize_duty_cycles
+
+DAY = 86400
+
+
+def _odometer_log(seed=0):
+    # Readings of three vehicles every 20 minutes over ten days, shuffled so that each vehicle-day is spread
+    # over several chunks; vehicle v3 stays parked on odd days
+    rng = np.random.default_rng(seed)
+    rows = []
+    for vehicle, km_per_reading in (("v1", 4.0), ("v2", 7.5), ("v3", 2.0)):
+        odometer = 10_000.0
+        for day in range(10):
+            for reading in range(72):
+                if vehicle != "v3" or day % 2 == 0:
+                    odometer += km_per_reading * (reading > 0)
+                rows.append((vehicle, day * DAY + reading * 1200, odometer))
+    log = pd.DataFrame(rows, columns=["vehicle_id", "timestamp", "odometer_km"])
+    return log.iloc[rng.permutation(len(log))]
+
+
+def _sources(table, parts=2):
+    bounds = np.linspace(0, len(table), parts + 1).astype(int)
+    return [io.StringIO(table.iloc[start:stop].to_csv(index=False)) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+@pytest.mark.parametrize("chunksize", [13, 37, 500, 10**6])
+def test_odometer_chunking_is_chunk_size_invariant(chunksize):
+    log = _odometer_log()
+    expected = daily_distances(_sources(log, 1), chunksize=10**7)
+    pd.testing.assert_frame_equal(daily_distances(_sources(log, 3), chunksize=chunksize), expected)
+
+
+def test_odometer_daily_distance_is_last_minus_first_reading():
+    daily = daily_distances(_sources(_odometer_log()), chunksize=100)
+    by_vehicle = daily.groupby("vehicle_id")["distance_km"]
+    assert by_vehicle.size().tolist() == [10, 10, 10]
+    assert daily[daily["vehicle_id"] == "v1"]["distance_km"].tolist() == [4.0 * 71] * 10
+    assert daily[daily["vehicle_id"] == "v3"]["distance_km"].tolist() == [2.0 * 71, 0.0] * 5
+
+
+@pytest.mark.parametrize("chunksize", [3, 1000])
+def test_trip_distances_are_summed_per_day(chunksize):
+    trips = pd.DataFrame({"vehicle_id": ["a", "b", "a", "a", "b"],
+                          "start_time": ["2024-03-01 08:00", "2024-03-01 09:00", "2024-03-01 17:00", "2024-03-02 08:00",
+                                         "2024-03-03 12:00"],
+                          "distance_km": [120.0, 80.0, 60.0, 200.0, 90.0]})
+    daily = daily_distances(_sources(trips), kind="trip", chunksize=chunksize)
+    assert daily["vehicle_id"].tolist() == ["a", "a", "b", "b"]
+    assert daily["distance_km"].tolist() == [180.0, 200.0, 80.0, 90.0]
+
+
+def test_summary_counts_operating_days():
+    summary = summarize_duty_cycles(daily_distances(_sources(_odometer_log())), groups={"v1": "Tractors"})
+    v3 = summary.set_index("vehicle_id").loc["v3"]
+    assert v3["observed_days"] == 10 and v3["operating_days"] == 5
+    assert v3["yearly_days_operation"] == round(5 / 10 * 365)
+    assert v3["average_daily_distance"] == pytest.approx(2.0 * 71)
+    assert summary["vehicle_group"].tolist() == ["Tractors", "All vehicles", "All vehicles"]